@@ -39,6 +39,7 @@ __all__ = [
     # electrostatics
     'pair_ewald',
     'setup_esp_cost_cube',
+    'compute_esp_design_cube',
     'compute_esp_grid_cube',
     # mask
     'multiply_dens_mask', 'multiply_near_mask', 'multiply_far_mask',
@@ -96,6 +97,80 @@ def setup_esp_cost_cube(horton.grid.cext.UniformGrid ugrid not None,
         &B[0], <double*>np.PyArray_DATA(C), ncenter, rcut, alpha, gcut)
 
 
+def compute_esp_design_cube(horton.grid.cext.UniformGrid ugrid not None,
+                            np.ndarray[double, ndim=3] vref not None,
+                            np.ndarray[double, ndim=3] weights not None,
+                            np.ndarray[double, ndim=2] centers not None,
+                            np.ndarray[double, ndim=2] design not None,
+                            np.ndarray[double, ndim=1] vrefw not None,
+                            long begin, long end,
+                            double rcut, double alpha, double gcut):
+    '''Compute a block of rows of the weighted design matrix of an ESPCost
+
+       **Arguments:**
+
+       ugrid, vref, weights, centers, rcut, alpha, gcut
+            See ``setup_esp_cost_cube``.
+
+       design
+            The output array for the rows of the design matrix, with shape
+            (at least end-begin, ncenter+is3d). Each row contains the ESP of
+            unit charges on all centers (and a constant for 3D periodic grids),
+            multiplied by the square root of the weight.
+
+       vrefw
+            The output array for the reference ESP, multiplied by the square
+            root of the weight. Its size must be at least end-begin.
+
+       begin, end
+            The range of (flattened) grid points to consider.
+
+       **Returns:** the number of rows written, i.e. the number of points in
+       the range with a positive weight.
+
+       The Global Interpreter Lock is released, such that blocks of grid points
+       can be processed in parallel threads.
+    '''
+    is0d = (ugrid.pbc == [0, 0, 0]).all()
+    is3d = (ugrid.pbc == [1, 1, 1]).all()
+
+    assert vref.flags['C_CONTIGUOUS']
+    assert vref.shape[0] == ugrid.shape[0]
+    assert vref.shape[1] == ugrid.shape[1]
+    assert vref.shape[2] == ugrid.shape[2]
+    assert weights.flags['C_CONTIGUOUS']
+    assert weights.shape[0] == ugrid.shape[0]
+    assert weights.shape[1] == ugrid.shape[1]
+    assert weights.shape[2] == ugrid.shape[2]
+    assert centers.flags['C_CONTIGUOUS']
+    cdef long ncenter = centers.shape[0]
+    assert ncenter > 0
+    assert centers.shape[1] == 3
+    assert begin >= 0 and begin <= end and end <= vref.size
+    assert design.flags['C_CONTIGUOUS']
+    assert design.shape[0] >= end - begin
+    assert design.shape[1] == ncenter+is3d
+    assert vrefw.flags['C_CONTIGUOUS']
+    assert vrefw.shape[0] >= end - begin
+    if is0d:
+        assert rcut == 0.0
+        assert alpha == 0.0
+        assert gcut == 0.0
+    elif is3d:
+        assert rcut > 0
+        assert alpha > 0
+        assert gcut > 0
+    else:
+        raise NotImplementedError
+
+    cdef long nrow
+    with nogil:
+        nrow = electrostatics.compute_esp_design_cube(ugrid._this,
+            &vref[0, 0, 0], &weights[0, 0, 0], &centers[0, 0],
+            &design[0, 0], &vrefw[0], ncenter, begin, end, rcut, alpha, gcut)
+    return nrow
+
+
 def compute_esp_grid_cube(horton.grid.cext.UniformGrid ugrid not None,
                           np.ndarray[double, ndim=3] esp not None,
                           np.ndarray[double, ndim=2] centers not None,
@@ -21,20 +21,28 @@
 '''ESP cost functions for estimating and testing charges'''
 
 
+from multiprocessing.pool import ThreadPool
+
 import numpy as np
+from scipy.linalg.blas import dsyrk
 
 from horton.log import log
 from horton.units import angstrom
 from horton.grid.cext import UniformGrid
-from horton.espfit.cext import setup_esp_cost_cube, multiply_dens_mask, \
+from horton.espfit.cext import compute_esp_design_cube, multiply_dens_mask, \
     multiply_near_mask, multiply_far_mask
-from horton.utils import typecheck_geo
+from horton.espfit.spme import SPMEGrid
+from horton.utils import typecheck_geo, check_options
 
 
 __all__ = ['ESPCost', 'setup_weights']
 
 
 class ESPCost(object):
+    # The maximum size (in bytes) of a block of the design matrix in
+    # from_grid_data
+    block_size = 2**23
+
     def __init__(self, A, B, C, natom):
         # Set attributes
         self._A = A
@@ -60,31 +68,144 @@ class ESPCost(object):
         grp['natom'] = self.natom
 
     @classmethod
-    def from_grid_data(cls, coordinates, ugrid, vref, weights, rcut=20.0, alpha=None, gcut=None):
+    def from_grid_data(cls, coordinates, ugrid, vref, weights, rcut=None, alpha=None, gcut=None, method='ewald', nthread=1):
+        '''Construct the cost function from ESP data on a UniformGrid
+
+           **Arguments:**
+
+           coordinates
+                An array with shape (natom, 3) with the atomic positions.
+
+           ugrid
+                A UniformGrid instance.
+
+           vref
+                The reference ESP on the grid.
+
+           weights
+                The weights of the grid points in the cost function.
+
+           **Optional arguments:**
+
+           rcut, alpha, gcut
+                The Ewald parameters for 3D periodic grids. With the ``ewald``
+                method, the defaults are 20.0, 3.0/rcut and 1.1*alpha. With
+                the ``spme`` method, gcut is not used and the defaults of
+                ``SPMEGrid`` apply.
+
+           method
+                ``ewald`` or ``spme``. With ``ewald``, the Ewald sum is
+                carried out for every pair of grid point and atom. With
+                ``spme``, the potentials of all atoms are computed on the
+                entire grid with smooth particle-mesh Ewald summation. This is
+                much faster for large grids, but it needs natom+1 arrays with
+                the size of the grid in memory. The spme method is only
+                supported for 3D periodic grids.
+
+           nthread
+                The number of threads used with the ``ewald`` method to
+                process blocks of grid points concurrently. The result does not
+                depend on the number of threads.
+        '''
+        check_options('method', method, 'ewald', 'spme')
         if len(coordinates.shape) != 2 or coordinates.shape[1] != 3:
             raise TypeError('The argument coordinates must be an array with three columns.')
-        natom = coordinates.shape[0]
+        if method == 'spme':
+            return cls._from_grid_data_spme(coordinates, ugrid, vref, weights, rcut, alpha)
+        if rcut is None:
+            rcut = 20.0
         if alpha is None:
             alpha = 3.0 / rcut
         if gcut is None:
             gcut = 1.1 * alpha
         if isinstance(ugrid, UniformGrid):
-            natom = len(coordinates)
             if (ugrid.pbc == [1, 1, 1]).all():
-                A = np.zeros((natom+1, natom+1), float)
-                B = np.zeros(natom+1, float)
-                C = np.zeros((), float)
-                setup_esp_cost_cube(ugrid, vref, weights, coordinates, A, B, C, rcut, alpha, gcut)
-                return cls(A, B, C, natom)
+                return cls._from_grid_data_blocks(coordinates, ugrid, vref, weights, rcut, alpha, gcut, nthread)
             else:
-                A = np.zeros((natom, natom), float)
-                B = np.zeros(natom, float)
-                C = np.zeros((), float)
-                setup_esp_cost_cube(ugrid, vref, weights, coordinates, A, B, C, 0.0, 0.0, 0.0)
-                return cls(A, B, C, natom)
+                return cls._from_grid_data_blocks(coordinates, ugrid, vref, weights, 0.0, 0.0, 0.0, nthread)
         else:
             raise NotImplementedError
 
+    @classmethod
+    def _from_grid_data_blocks(cls, coordinates, ugrid, vref, weights, rcut, alpha, gcut, nthread):
+        '''Construct the cost function from blocks of rows of the design matrix
+
+           The grid points are processed in blocks of at most ``block_size``
+           bytes of design matrix. The rows of each block are computed in
+           ``compute_esp_design_cube`` and added to the normal equations with
+           a symmetric rank-k update. Blocks are processed concurrently in
+           ``nthread`` threads, but their contributions are added in a fixed
+           order, such that the result does not depend on the number of
+           threads.
+        '''
+        natom = len(coordinates)
+        neq = natom + (ugrid.pbc == [1, 1, 1]).all()
+        npoint = vref.size
+        npoint_block = max(1, cls.block_size/(8*neq))
+        ranges = [(begin, min(begin + npoint_block, npoint)) for begin in xrange(0, npoint, npoint_block)]
+
+        def compute_block(begin_end):
+            begin, end = begin_end
+            design = np.zeros((end - begin, neq))
+            vrefw = np.zeros(end - begin)
+            nrow = compute_esp_design_cube(ugrid, vref, weights, coordinates, design, vrefw, begin, end, rcut, alpha, gcut)
+            if nrow == 0:
+                return 0.0, 0.0, 0.0
+            # The transpose of the C-ordered design matrix is in Fortran order,
+            # so BLAS works on it without a copy. Only the upper triangle of
+            # the result is computed.
+            A = dsyrk(1.0, design[:nrow].T)
+            B = np.dot(vrefw[:nrow], design[:nrow])
+            C = np.dot(vrefw[:nrow], vrefw[:nrow])
+            return A, B, C
+
+        A = np.zeros((neq, neq), float)
+        B = np.zeros(neq, float)
+        C = np.zeros((), float)
+        if nthread > 1:
+            pool = ThreadPool(nthread)
+            try:
+                partials = pool.imap(compute_block, ranges)
+                for partial in partials:
+                    A += partial[0]
+                    B += partial[1]
+                    C += partial[2]
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for begin_end in ranges:
+                partial = compute_block(begin_end)
+                A += partial[0]
+                B += partial[1]
+                C += partial[2]
+        # Copy the upper triangle of A to the lower triangle.
+        A = np.triu(A) + np.triu(A, 1).T
+        return cls(A, B, C, natom)
+
+    @classmethod
+    def _from_grid_data_spme(cls, coordinates, ugrid, vref, weights, rcut, alpha):
+        '''Construct the cost function with potentials computed by SPME
+
+           Only grid points with a non-zero weight are kept in the design
+           matrix. Its rows are the potentials of a unit charge on each atom
+           and a constant (for the reference level of the periodic ESP), all
+           multiplied by the square root of the weights.
+        '''
+        natom = len(coordinates)
+        spme = SPMEGrid(ugrid, alpha, rcut)
+        mask = (weights > 0).ravel()
+        sqrtw = np.sqrt(weights.ravel()[mask]*ugrid.get_grid_cell().volume)
+        design = np.zeros((natom+1, mask.sum()))
+        for iatom in xrange(natom):
+            design[iatom] = spme.compute_column(coordinates[iatom]).ravel()[mask]*sqrtw
+        design[natom] = sqrtw
+        vrefw = vref.ravel()[mask]*sqrtw
+        A = np.dot(design, design.T)
+        B = np.dot(design, vrefw)
+        C = np.array(np.dot(vrefw, vrefw))
+        return cls(A, B, C, natom)
+
     def value(self, x):
         return np.dot(x, np.dot(self._A, x) - 2*self._B) + self._C
 
@@ -166,6 +166,55 @@ void setup_esp_cost_cube(UniformGrid* ugrid, double* vref,
 }
 
 
+long compute_esp_design_cube(UniformGrid* ugrid, double* vref,
+    double* weights, double* centers, double* design, double* vrefw,
+    long ncenter, long begin, long end, double rcut, double alpha,
+    double gcut) {
+
+    Cell* cell = ugrid->get_cell();
+    Cell* grid_cell = ugrid->get_grid_cell();
+    double gvol = grid_cell->get_volume();
+    bool is3d = (cell->get_nvec() == 3);
+    long neq = ncenter + is3d;
+    double grid_cart[3];
+
+    Cube3Iterator c3i = Cube3Iterator(NULL, ugrid->shape);
+    long i[3];
+    long nrow = 0;
+
+    for (long ipoint=begin; ipoint<end; ipoint++) {
+        // Points with a zero weight do not contribute to the cost function.
+        if (weights[ipoint] <= 0) continue;
+
+        c3i.set_point(ipoint, i);
+        grid_cart[0] = 0;
+        grid_cart[1] = 0;
+        grid_cart[2] = 0;
+        ugrid->delta_grid_point(grid_cart, i);
+
+        double sqrtw = sqrt(weights[ipoint]*gvol);
+        double* row = design + nrow*neq;
+
+        // Do some electrostatics
+        for (long icenter=0; icenter<ncenter; icenter++) {
+            double delta[3];
+            delta[0] = centers[3*icenter]   - grid_cart[0];
+            delta[1] = centers[3*icenter+1] - grid_cart[1];
+            delta[2] = centers[3*icenter+2] - grid_cart[2];
+
+            row[icenter] = sqrtw*pair_electrostatics(delta, cell, rcut, alpha, gcut);
+        }
+        if (is3d) row[ncenter] = sqrtw;
+        vrefw[nrow] = vref[ipoint]*sqrtw;
+        nrow++;
+    }
+
+    delete cell;
+    delete grid_cell;
+    return nrow;
+}
+
+
 void compute_esp_cube(UniformGrid* ugrid, double* esp,
     double* centers, double* charges, long ncenter, double rcut, double alpha,
     double gcut) {
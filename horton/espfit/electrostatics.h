@@ -36,6 +36,11 @@ void setup_esp_cost_cube(UniformGrid* ugrid, double* vref,
     double* weights, double* centers, double* A, double* B, double* C,
     long ncenter, double rcut, double alpha, double gcut);
 
+long compute_esp_design_cube(UniformGrid* ugrid, double* vref,
+    double* weights, double* centers, double* design, double* vrefw,
+    long ncenter, long begin, long end, double rcut, double alpha,
+    double gcut);
+
 void compute_esp_cube(UniformGrid* ugrid, double* esp,
     double* centers, double* charges, long ncenter, double rcut, double alpha,
     double gcut);
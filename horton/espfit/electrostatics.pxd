@@ -33,6 +33,11 @@ cdef extern from "horton/espfit/electrostatics.h":
         double* vref, double* weights, double* centers, double* A, double* B,
         double* C, long ncenter, double rcut, double alpha, double gcut) except +
 
+    long compute_esp_design_cube(horton.grid.uniform.UniformGrid* ugrid,
+        double* vref, double* weights, double* centers, double* design,
+        double* vrefw, long ncenter, long begin, long end, double rcut,
+        double alpha, double gcut) nogil except +
+
     void compute_esp_cube(horton.grid.uniform.UniformGrid* ugrid, double* esp,
         double* centers, double* charges, long ncenter, double rcut,
         double alpha, double gcut)
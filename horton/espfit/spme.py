@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+# HORTON: Helpful Open-source Research TOol for N-fermion systems.
+# Copyright (C) 2011-2015 The HORTON Development Team
+#
+# This file is part of HORTON.
+#
+# HORTON is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# HORTON is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+#--
+'''Smooth particle-mesh Ewald summation of the ESP on periodic cube grids'''
+
+
+import numpy as np
+from scipy.special import erfc
+
+from horton.log import log
+
+
+__all__ = ['SPMEGrid']
+
+
+def _bspline_weights(t, order):
+    '''Cardinal B-spline weights for a point at fractional offset t
+
+       **Arguments:**
+
+       t
+            An array with fractional parts, all in the interval [0, 1).
+
+       order
+            The order of the B-splines.
+
+       The result has an additional last axis of size order. Element k
+       contains M_order(t + k), i.e. the weight of the mesh point floor(u) - k
+       for a point u on the mesh with fractional part t.
+    '''
+    x = t[..., np.newaxis] + np.arange(order)
+    m = np.zeros(x.shape)
+    m[..., 0] = 1.0
+    for n in xrange(2, order+1):
+        shifted = np.zeros(x.shape)
+        shifted[..., 1:] = m[..., :-1]
+        m = (x*m + (n - x)*shifted)/(n - 1)
+    return m
+
+
+def _bspline_moduli(size, freqs, order):
+    '''The Euler exponential spline factors b(m) of Essmann et al.
+
+       **Arguments:**
+
+       size
+            The number of mesh points along one axis.
+
+       freqs
+            The (integer) frequencies m for which b(m) is computed.
+
+       order
+            The order of the B-splines.
+    '''
+    mvals = _bspline_weights(np.zeros(()), order)[1:]
+    phases = 2j*np.pi*freqs/float(size)
+    denom = np.dot(np.exp(np.outer(phases, np.arange(order-1))), mvals)
+    return np.exp((order-1)*phases)/denom
+
+
+class SPMEGrid(object):
+    '''Smooth particle-mesh Ewald summation on a 3D periodic UniformGrid
+
+       The electrostatic potential of point charges is computed in all points
+       of the grid at once. The long-range part is obtained by spreading the
+       charges on the grid with cardinal B-splines, followed by a convolution
+       with fast Fourier transforms. Because the potential is only needed in
+       the grid points, no interpolation back to the charges is needed. The
+       short-range part is a sum over grid points within the real-space cutoff
+       of each charge. The cost scales as O(N log N + natom), instead of
+       O(N natom nk) for ``compute_esp_grid_cube``.
+
+       The conventions of ``pair_ewald`` are followed: the potential includes
+       a uniform background charge that neutralizes the point charges, such
+       that the result does not depend on alpha.
+    '''
+    def __init__(self, ugrid, alpha=None, rcut=None, order=8):
+        '''
+           **Arguments:**
+
+           ugrid
+                A UniformGrid instance that is periodic along all three
+                directions.
+
+           **Optional arguments:**
+
+           alpha
+                The Ewald separation parameter. The default is pi/(10*h) where
+                h is the largest spacing between grid planes, such that the
+                Gaussian screening is negligible at the highest frequencies
+                that the grid can represent.
+
+           rcut
+                The real-space cutoff. The default is 4.5/alpha.
+
+           order
+                The order of the B-splines, must be even. It may not exceed the
+                number of grid points along each axis.
+        '''
+        if not (ugrid.pbc == [1, 1, 1]).all():
+            raise ValueError('SPME requires a grid that is periodic in all three directions.')
+        if order < 4 or order % 2 != 0:
+            raise ValueError('The order of the B-splines must be even and at least 4.')
+        shape = np.array(ugrid.shape)
+        if shape.min() < order:
+            raise ValueError('The grid needs at least order points along each axis.')
+        grid_cell = ugrid.get_grid_cell()
+        if alpha is None:
+            alpha = np.pi/(10*grid_cell.rspacings.max())
+        if rcut is None:
+            rcut = 4.5/alpha
+
+        self.alpha = alpha
+        self.rcut = rcut
+        self.order = order
+        self._shape = shape
+        self._origin = ugrid.origin.copy()
+        self._grid_rvecs = ugrid.grid_rvecs.copy()
+        self._grid_gvecs = grid_cell.gvecs.copy()
+
+        cell = ugrid.get_cell()
+        volume = cell.volume
+        self._background = -np.pi/volume/alpha**2
+        self._influence = self._get_influence(cell.gvecs, volume)
+
+        # Offsets of all grid points that may lie within the cutoff sphere,
+        # relative to the grid point just below a charge.
+        ranges = [np.arange(-n, n+2) for n in np.ceil(rcut/grid_cell.rspacings).astype(int)]
+        self._box = np.array([o.ravel() for o in np.meshgrid(*ranges, indexing='ij')]).T
+
+        log.cite('essmann1995', 'the smooth particle-mesh Ewald summation')
+        if log.do_medium:
+            log('Initialized: %s' % self)
+            log.deflist([
+                ('Ewald alpha', '%12.5e' % alpha),
+                ('Real-space cutoff', '%12.5e' % rcut),
+                ('B-spline order', '%12i' % order),
+            ])
+
+    def _get_influence(self, gvecs, volume):
+        '''Compute the reciprocal-space kernel, including B-spline corrections
+
+           The kernel is multiplied with the real FFT of the spread charges.
+           The normalization of the inverse FFT is already absorbed.
+        '''
+        freqs = [np.fft.fftfreq(self._shape[0], 1.0/self._shape[0]),
+                 np.fft.fftfreq(self._shape[1], 1.0/self._shape[1]),
+                 np.arange(self._shape[2]//2+1)]
+        kvecs = 2*np.pi*(
+            freqs[0][:, None, None, None]*gvecs[0] +
+            freqs[1][None, :, None, None]*gvecs[1] +
+            freqs[2][None, None, :, None]*gvecs[2]
+        )
+        ksq = (kvecs**2).sum(axis=3)
+        ksq[0, 0, 0] = 1.0
+        result = (4*np.pi/volume*self._shape.prod())*np.exp(-ksq/(4*self.alpha**2))/ksq
+        result[0, 0, 0] = 0.0
+        for axis in xrange(3):
+            b = _bspline_moduli(self._shape[axis], freqs[axis], self.order).conj()
+            result = result*b.reshape([-1 if i == axis else 1 for i in xrange(3)])
+        return result
+
+    def _spread(self, center, charge, q):
+        '''Add the B-spline representation of one point charge to q'''
+        u = np.dot(self._grid_gvecs, center - self._origin)
+        base = np.floor(u).astype(int)
+        w = _bspline_weights(u - base, self.order)
+        indexes = [(base[i] - np.arange(self.order)) % self._shape[i] for i in xrange(3)]
+        q[np.ix_(*indexes)] += charge*w[0][:, None, None]*w[1][None, :, None]*w[2][None, None, :]
+
+    def _add_real(self, center, charge, esp):
+        '''Add the real-space contribution of one point charge to esp'''
+        u = np.dot(self._grid_gvecs, center - self._origin)
+        indexes = np.floor(u).astype(int) + self._box
+        deltas = self._origin + np.dot(indexes, self._grid_rvecs) - center
+        dists = np.sqrt((deltas**2).sum(axis=1))
+        mask = dists < self.rcut
+        dists = dists[mask]
+        flat = np.ravel_multi_index((indexes[mask] % self._shape).T, self._shape)
+        np.add.at(esp.ravel(), flat, charge*erfc(self.alpha*dists)/dists)
+
+    def _reciprocal(self, q):
+        '''Convolute spread charges with the reciprocal-space kernel'''
+        return np.fft.irfftn(np.fft.rfftn(q)*self._influence, s=tuple(self._shape))
+
+    def compute_esp(self, centers, charges):
+        '''Compute the electrostatic potential of point charges on the grid
+
+           **Arguments:**
+
+           centers
+                An array with shape (ncenter, 3) with the positions of the
+                point charges.
+
+           charges
+                An array with shape (ncenter,) with the point charges.
+
+           **Returns:** an array with the shape of the grid.
+        '''
+        q = np.zeros(self._shape)
+        for center, charge in zip(centers, charges):
+            self._spread(center, charge, q)
+        esp = self._reciprocal(q)
+        esp += self._background*charges.sum()
+        for center, charge in zip(centers, charges):
+            self._add_real(center, charge, esp)
+        return esp
+
+    def compute_column(self, center):
+        '''Compute the electrostatic potential of a unit charge on the grid
+
+           **Arguments:**
+
+           center
+                The position of the unit charge.
+
+           **Returns:** an array with the shape of the grid. These are the
+           columns of the design matrix in ``ESPCost.from_grid_data``.
+        '''
+        return self.compute_esp(center.reshape(1, 3), np.ones(1))
@@ -189,6 +189,64 @@ def test_esp_cost_cube3d_invariance_rcut():
     check_costs(costs, eps1=1e-8)
 
 
+def check_esp_cost_cube_blocks(args):
+    coordinates, numbers, origin, grid_rvecs, shape, pbc, vref, weights = args
+    weights[weights < 0.2] = 0.0
+    grid = UniformGrid(origin, grid_rvecs, shape, pbc)
+    is3d = pbc.all()
+    natom = len(coordinates)
+    A = np.zeros((natom+is3d, natom+is3d), float)
+    B = np.zeros(natom+is3d, float)
+    C = np.zeros((), float)
+    if is3d:
+        setup_esp_cost_cube(grid, vref, weights, coordinates, A, B, C, 20.0, 0.15, 0.165)
+    else:
+        setup_esp_cost_cube(grid, vref, weights, coordinates, A, B, C, 0.0, 0.0, 0.0)
+    costs = []
+    old_block_size = ESPCost.block_size
+    try:
+        ESPCost.block_size = 8*len(A)*7
+        for nthread in 1, 3:
+            costs.append(ESPCost.from_grid_data(coordinates, grid, vref, weights, nthread=nthread))
+    finally:
+        ESPCost.block_size = old_block_size
+    costs.append(ESPCost.from_grid_data(coordinates, grid, vref, weights))
+    for cost in costs:
+        assert abs(cost._A - A).max() < 1e-10*abs(A).max()
+        assert abs(cost._A - cost._A.T).max() == 0.0
+        assert abs(cost._B - B).max() < 1e-10*abs(B).max()
+        assert abs(cost._C - C) < 1e-10*C
+    # Independent of the number of threads
+    assert (costs[0]._A == costs[1]._A).all()
+    assert (costs[0]._B == costs[1]._B).all()
+
+
+def test_esp_cost_cube3d_blocks():
+    check_esp_cost_cube_blocks(get_random_esp_cost_cube3d_args())
+
+
+def test_esp_cost_cube0d_blocks():
+    check_esp_cost_cube_blocks(get_random_esp_cost_cube0d_args())
+
+
+def test_esp_cost_cube3d_spme():
+    coordinates, numbers, origin, grid_rvecs, shape, pbc, vref, weights = \
+        get_random_esp_cost_cube3d_args()
+    # SPME needs at least order grid points along each axis.
+    grid_rvecs /= 2
+    shape *= 2
+    vref = np.random.normal(0, 1, shape)
+    weights = np.random.uniform(0, 1, shape)
+    weights[weights < 0.2] = 0.0
+    grid = UniformGrid(origin, grid_rvecs, shape, pbc)
+    cost_ewald = ESPCost.from_grid_data(coordinates, grid, vref, weights, rcut=20.0, alpha=0.225, gcut=0.3375)
+    cost_spme = ESPCost.from_grid_data(coordinates, grid, vref, weights, method='spme')
+    assert cost_spme.natom == 5
+    assert abs(cost_ewald._A - cost_spme._A).max() < 1e-6*abs(cost_ewald._A).max()
+    assert abs(cost_ewald._B - cost_spme._B).max() < 1e-6*abs(cost_ewald._B).max()
+    assert abs(cost_ewald._C - cost_spme._C) < 1e-10*cost_ewald._C
+
+
 def test_esp_cost_cube3d_gradient():
     # Some parameters
     coordinates, numbers, origin, grid_rvecs, shape, pbc, vref, weights = \
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# HORTON: Helpful Open-source Research TOol for N-fermion systems.
+# Copyright (C) 2011-2015 The HORTON Development Team
+#
+# This file is part of HORTON.
+#
+# HORTON is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# HORTON is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+#--
+#pylint: skip-file
+
+
+
+import numpy as np
+from nose.tools import assert_raises
+from horton import *
+
+
+def get_random_spme_args(pbc=[1, 1, 1]):
+    coordinates = np.random.uniform(0, 5, (4, 3))
+    charges = np.random.normal(0, 1, 4)
+    origin = np.random.uniform(-3, 3, 3)
+    grid_rvecs = np.diag(np.random.uniform(0.5, 0.6, 3))
+    grid_rvecs += np.random.uniform(-0.02, 0.02, (3, 3))
+    shape = np.array([10, 11, 12])
+    ugrid = UniformGrid(origin, grid_rvecs, shape, np.array(pbc))
+    return coordinates, charges, ugrid
+
+
+def test_spme_esp_ewald():
+    coordinates, charges, ugrid = get_random_spme_args()
+    rcut = 20.0
+    alpha = 4.5/rcut
+    gcut = 1.5*alpha
+    expected = np.zeros(ugrid.shape)
+    compute_esp_grid_cube(ugrid, expected, coordinates, charges, rcut, alpha, gcut)
+    esp = SPMEGrid(ugrid).compute_esp(coordinates, charges)
+    assert esp.shape == tuple(ugrid.shape)
+    assert abs(esp - expected).max() < 1e-6
+
+
+def test_spme_esp_invariance_alpha():
+    coordinates, charges, ugrid = get_random_spme_args()
+    esp1 = SPMEGrid(ugrid).compute_esp(coordinates, charges)
+    esp2 = SPMEGrid(ugrid, alpha=0.8*np.pi/(10*ugrid.get_grid_cell().rspacings.max()), order=10).compute_esp(coordinates, charges)
+    assert abs(esp1 - esp2).max() < 1e-6
+
+
+def test_spme_columns():
+    coordinates, charges, ugrid = get_random_spme_args()
+    spme = SPMEGrid(ugrid)
+    esp = spme.compute_esp(coordinates, charges)
+    columns = [spme.compute_column(center) for center in coordinates]
+    assert abs(esp - np.tensordot(charges, columns, axes=1)).max() < 1e-10
+    # Images of an atom have the same potential
+    shifted = coordinates[0] + np.dot([1, -2, 0], ugrid.get_cell().rvecs)
+    assert abs(spme.compute_column(shifted) - columns[0]).max() < 1e-10
+
+
+def test_spme_errors():
+    coordinates, charges, ugrid = get_random_spme_args([1, 0, 1])
+    with assert_raises(ValueError):
+        SPMEGrid(ugrid)
+    coordinates, charges, ugrid = get_random_spme_args()
+    with assert_raises(ValueError):
+        SPMEGrid(ugrid, order=7)
+    with assert_raises(ValueError):
+        SPMEGrid(ugrid, order=12)
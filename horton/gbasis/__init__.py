@@ -24,3 +24,5 @@
 from horton.gbasis.cext import *
 from horton.gbasis.gobasis import *
 from horton.gbasis.iobas import *
+from horton.gbasis.direct import *
+from horton.gbasis.densfit import *
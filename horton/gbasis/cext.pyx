@@ -27,6 +27,7 @@ cimport numpy as np
 np.import_array()
 
 cimport libc.string
+from libcpp.vector cimport vector
 
 cimport boys
 cimport cartpure
@@ -38,11 +39,12 @@ cimport iter_gb
 cimport iter_pow
 cimport cholesky
 cimport gbw
+cimport screening
 
 import atexit
 
 from horton.log import log
-from horton.matrix import LinalgFactory, CholeskyLinalgFactory
+from horton.matrix import LinalgFactory, CholeskyLinalgFactory, PackedFourIndex
 from horton.cext import compute_grid_nucpot
 from horton.utils import typecheck_geo
 
@@ -60,6 +62,8 @@ __all__ = [
     # gbasis
     'gob_cart_normalization', 'gob_pure_normalization',
     'GOBasis',
+    # screening
+    'GB4Screening',
     # gbw (testing)
     'get_2index_slice', 'compute_diagonal', 'select_2index',
     # ints
@@ -67,7 +71,7 @@ __all__ = [
     'GB2NuclearAttractionIntegral',
     'GB4ElectronRepulsionIntegralLibInt',
     # fns
-    'GB1DMGridDensityFn', 'GB1DMGridGradientFn',
+    'GB1DMGridDensityFn', 'GB1DMGridGradientFn', 'GB1DMGridGGAFn',
     # iter_gb
     'IterGB1', 'IterGB2', 'IterGB4',
     # iter_pow
@@ -103,28 +107,78 @@ def cart_to_pure_low(np.ndarray[double] work_cart not None,
 # cholesky wrappers
 #
 
-def compute_cholesky(GOBasis gobasis, double threshold=1e-8, lf = None):
+def compute_cholesky(GOBasis gobasis, double threshold=1e-8, lf = None,
+                     double screening_threshold=0.0, long nthread=0,
+                     filename=None):
+    '''Compute the Cholesky decomposition of the electron repulsion integrals
+
+       **Arguments:**
+
+       gobasis
+            The Gaussian orbital basis set.
+
+       **Optional arguments:**
+
+       threshold
+            The Cholesky vectors are generated until the error on the diagonal
+            of the four-index object falls below this threshold.
+
+       lf
+            When a ``CholeskyLinalgFactory`` is given, it is used to construct
+            a ``CholeskyFourIndex`` object. Otherwise, a Numpy array with the
+            Cholesky vectors is returned.
+
+       screening_threshold
+            When positive, shell quartets whose Schwarz bound is below this
+            threshold are not computed. Also primitive quartets with a small
+            prefactor are skipped.
+
+       nthread
+            The number of threads used to compute the integrals. When not
+            positive, the default number of OpenMP threads is used, which can
+            be controlled with the environment variable OMP_NUM_THREADS.
+
+       filename
+            When given, the Cholesky vectors are written to a file with this
+            name while they are generated, instead of keeping them in memory.
+            The vectors are then returned as a ``numpy.memmap`` array, which
+            allows one to decompose four-index objects whose Cholesky vectors
+            do not fit in memory. The file is not removed afterwards.
+    '''
     cdef ints.GB4ElectronRepulsionIntegralLibInt* gb4int = NULL
+    cdef GB4Screening gb4s = None
     cdef gbw.GB4IntegralWrapper* gb4w = NULL
     cdef double* data = NULL
     cdef np.npy_intp dims[3]
     cdef np.ndarray result
+    cdef char* c_filename = NULL
 
+    if filename is not None:
+        c_filename = filename
+    if screening_threshold > 0:
+        gb4s = GB4Screening(gobasis, screening_threshold)
     try:
         gb4int = new ints.GB4ElectronRepulsionIntegralLibInt(
                             gobasis.max_shell_type)
         gb4w = new gbw.GB4IntegralWrapper((<gbasis.GOBasis* > gobasis._this),
-                            <ints.GB4Integral*> gb4int)
-        nvec = cholesky.cholesky(gb4w, &data, threshold)
-        dims[0] = <np.npy_intp> nvec
-        dims[1] = <np.npy_intp> gobasis.nbasis
-        dims[2] = <np.npy_intp> gobasis.nbasis
-        result = np.PyArray_SimpleNewFromData(3, dims, np.NPY_DOUBLE, data)
+                            <ints.GB4Integral*> gb4int,
+                            _get_screening_ptr(gb4s), nthread)
+        nvec = cholesky.cholesky(gb4w, &data, threshold, c_filename)
+        if filename is None:
+            dims[0] = <np.npy_intp> nvec
+            dims[1] = <np.npy_intp> gobasis.nbasis
+            dims[2] = <np.npy_intp> gobasis.nbasis
+            result = np.PyArray_SimpleNewFromData(3, dims, np.NPY_DOUBLE, data)
+        else:
+            result = np.memmap(filename, float, 'r+',
+                               shape=(nvec, gobasis.nbasis, gobasis.nbasis))
     finally:
         if gb4int is not NULL:
             del gb4int
         if gb4w is not NULL:
             del gb4w
+    if gb4s is not None:
+        gb4s.log()
 
     if lf is not None and isinstance(lf, CholeskyLinalgFactory):
         result_py = lf.create_four_index(gobasis.nbasis, array=result)
@@ -632,7 +686,7 @@ cdef class GOBasis(GBasis):
         assert matrix.shape[2] == self.nbasis
         assert matrix.shape[3] == self.nbasis
 
-    def compute_overlap(self, output):
+    def compute_overlap(self, output, long nthread=0):
         """Compute the overlap integrals in a Gaussian orbital basis
 
            **Arguments:**
@@ -643,6 +697,14 @@ cdef class GOBasis(GBasis):
                 is given, it is used to construct the output ``TwoIndex``
                 object. In both cases, the output two-index object is returned.
 
+           **Optional arguments:**
+
+           nthread
+                The number of threads used to compute the integrals. When not
+                positive, the default number of OpenMP threads is used, which
+                can be controlled with the environment variable
+                OMP_NUM_THREADS.
+
            **Returns:** ``TwoIndex`` object
         """
         # prepare the output array
@@ -653,11 +715,11 @@ cdef class GOBasis(GBasis):
         output_array = output._array
         self.check_matrix_two_index(output_array)
         # call the low-level routine
-        (<gbasis.GOBasis*>self._this).compute_overlap(&output_array[0, 0])
+        (<gbasis.GOBasis*>self._this).compute_overlap(&output_array[0, 0], nthread)
         # done
         return output
 
-    def compute_kinetic(self, output):
+    def compute_kinetic(self, output, long nthread=0):
         """Compute the kinetic energy integrals in a Gaussian orbital basis
 
            **Arguments:**
@@ -668,6 +730,14 @@ cdef class GOBasis(GBasis):
                 is given, it is used to construct the output ``TwoIndex``
                 object. In both cases, the output two-index object is returned.
 
+           **Optional arguments:**
+
+           nthread
+                The number of threads used to compute the integrals. When not
+                positive, the default number of OpenMP threads is used, which
+                can be controlled with the environment variable
+                OMP_NUM_THREADS.
+
            **Returns:** ``TwoIndex`` object
         """
         # prepare the output array
@@ -678,14 +748,14 @@ cdef class GOBasis(GBasis):
         output_array = output._array
         self.check_matrix_two_index(output_array)
         # call the low-level routine
-        (<gbasis.GOBasis*>self._this).compute_kinetic(&output_array[0, 0])
+        (<gbasis.GOBasis*>self._this).compute_kinetic(&output_array[0, 0], nthread)
         # done
         return output
 
     def compute_nuclear_attraction(self,
                                    np.ndarray[double, ndim=2] coordinates not None,
                                    np.ndarray[double, ndim=1] charges not None,
-                                   output):
+                                   output, long nthread=0):
         """Compute the nuclear attraction integral in a Gaussian orbital basis
 
            **Arguments:**
@@ -704,6 +774,14 @@ cdef class GOBasis(GBasis):
                 is given, it is used to construct the output ``TwoIndex``
                 object. In both cases, the output two-index object is returned.
 
+           **Optional arguments:**
+
+           nthread
+                The number of threads used to compute the integrals. When not
+                positive, the default number of OpenMP threads is used, which
+                can be controlled with the environment variable
+                OMP_NUM_THREADS.
+
            **Returns:** ``TwoIndex`` object
         """
         # type checking
@@ -720,23 +798,40 @@ cdef class GOBasis(GBasis):
         # call the low-level routine
         (<gbasis.GOBasis*>self._this).compute_nuclear_attraction(
             &charges[0], &coordinates[0, 0], ncharge,
-            &output_array[0, 0],
+            &output_array[0, 0], nthread,
         )
         # done
         return output
 
-    def compute_electron_repulsion(self, output):
+    def compute_electron_repulsion(self, output, double threshold=0.0, long nthread=0):
         '''Compute electron-electron repulsion integrals
 
            **Argument:**
 
            output
-                When a ``DenseFourIndex`` object is given, it is used as output
-                argument and its contents are overwritten. When a
-                ``DenseLinalgFactory`` or ``CholeskyLinalgFactory`` is given, it
-                is used to construct the four-index object in which the
+                When a ``DenseFourIndex`` or ``PackedFourIndex`` object is
+                given, it is used as output argument and its contents are
+                overwritten. When a ``DenseLinalgFactory``,
+                ``PackedLinalgFactory`` or ``CholeskyLinalgFactory`` is given,
+                it is used to construct the four-index object in which the
                 integrals are stored.
 
+           **Optional arguments:**
+
+           threshold
+                When positive, Schwarz screening is used to skip all shell
+                quartets whose integrals are certainly smaller than this
+                threshold. Primitive quartets are also skipped when the
+                prefactor of the corresponding (ss|ss) integral is below the
+                threshold. The number of skipped shell quartets is reported
+                in the screen output.
+
+           nthread
+                The number of threads used to compute the integrals. When not
+                positive, the default number of OpenMP threads is used, which
+                can be controlled with the environment variable
+                OMP_NUM_THREADS.
+
            **Returns:** The four-index object with the electron repulsion
            integrals.
 
@@ -746,19 +841,166 @@ cdef class GOBasis(GBasis):
         # prepare the output array
         if isinstance(output, CholeskyLinalgFactory):
             lf = output
-            output = compute_cholesky(self, lf=lf)
+            output = compute_cholesky(self, lf=lf, screening_threshold=threshold,
+                                      nthread=nthread)
             return output
         cdef np.ndarray[double, ndim=4] output_array
+        cdef np.ndarray[double, ndim=1] packed_array
         if isinstance(output, LinalgFactory):
             lf = output
             output = lf.create_four_index(self.nbasis)
+        # call the low-level routine
+        cdef GB4Screening gb4s = None
+        if threshold > 0:
+            gb4s = GB4Screening(self, threshold)
+        if isinstance(output, PackedFourIndex):
+            if output.nbasis != self.nbasis:
+                raise TypeError('The output PackedFourIndex object does not have the right number of basis functions.')
+            packed_array = output._array
+            (<gbasis.GOBasis*>self._this).compute_electron_repulsion_packed(
+                &packed_array[0], _get_screening_ptr(gb4s), nthread)
+        else:
+            output_array = output._array
+            self.check_matrix_four_index(output_array)
+            (<gbasis.GOBasis*>self._this).compute_electron_repulsion(
+                &output_array[0, 0, 0, 0], _get_screening_ptr(gb4s), nthread)
+        if gb4s is not None:
+            gb4s.log()
+        # done
+        return output
+
+    def compute_electron_repulsion_dm(self, dm, direct=None, exchange=None,
+                                      GB4Screening screening=None, long nthread=0):
+        '''Contract the electron repulsion integrals with a density matrix
+
+           The integrals are computed on the fly and are never stored, such
+           that the memory usage only scales quadratically with the number of
+           basis functions.
+
+           **Arguments:**
+
+           dm
+                A symmetric density matrix (DenseTwoIndex).
+
+           **Optional arguments:**
+
+           direct
+                An output DenseTwoIndex object for the direct (Coulomb) term,
+                i.e. the contraction ``abcd,bd->ac``. Its contents are
+                overwritten.
+
+           exchange
+                An output DenseTwoIndex object for the exchange term, i.e. the
+                contraction ``abcd,cb->ad``. Its contents are overwritten.
+
+           screening
+                A ``GB4Screening`` instance. When given, shell quartets whose
+                Schwarz bound times the largest relevant density matrix
+                element is below the screening threshold are skipped.
+
+           nthread
+                The number of threads used to compute the integrals. When not
+                positive, the default number of OpenMP threads is used, which
+                can be controlled with the environment variable
+                OMP_NUM_THREADS.
+        '''
+        log.cite('valeev2014', 'the efficient implementation of four-center electron repulsion integrals')
+        cdef np.ndarray[double, ndim=2] dm_array = dm._array
+        self.check_matrix_two_index(dm_array)
+        cdef np.ndarray[double, ndim=2] direct_array
+        cdef np.ndarray[double, ndim=2] exchange_array
+        cdef double* direct_ptr = NULL
+        cdef double* exchange_ptr = NULL
+        if direct is not None:
+            direct_array = direct._array
+            self.check_matrix_two_index(direct_array)
+            direct_ptr = &direct_array[0, 0]
+        if exchange is not None:
+            exchange_array = exchange._array
+            self.check_matrix_two_index(exchange_array)
+            exchange_ptr = &exchange_array[0, 0]
+        if screening is not None and screening.gobasis is not self:
+            raise ValueError('The screening object belongs to another basis set.')
+        (<gbasis.GOBasis*>self._this).compute_electron_repulsion_dm(
+            &dm_array[0, 0], direct_ptr, exchange_ptr,
+            _get_screening_ptr(screening), nthread)
+
+    def compute_electron_repulsion_two_center(self, output, long nthread=0):
+        '''Compute the two-center electron repulsion integrals
+
+           These are the integrals ``(a|b)`` with the Coulomb operator between
+           two basis functions, e.g. the Coulomb metric of an auxiliary basis.
+
+           **Arguments:**
+
+           output
+                When a ``TwoIndex`` instance is given, it is used as output
+                argument and its contents are overwritten. When ``LinalgFactory``
+                is given, it is used to construct the output ``TwoIndex``
+                object. In both cases, the output two-index object is returned.
+
+           **Optional arguments:**
+
+           nthread
+                The number of threads used to compute the integrals. When not
+                positive, the default number of OpenMP threads is used, which
+                can be controlled with the environment variable
+                OMP_NUM_THREADS.
+
+           **Returns:** ``TwoIndex`` object
+        '''
+        log.cite('valeev2014', 'the efficient implementation of four-center electron repulsion integrals')
+        # prepare the output array
+        cdef np.ndarray[double, ndim=2] output_array
+        if isinstance(output, LinalgFactory):
+            lf = output
+            output = lf.create_two_index(self.nbasis)
         output_array = output._array
-        self.check_matrix_four_index(output_array)
+        self.check_matrix_two_index(output_array)
         # call the low-level routine
-        (<gbasis.GOBasis*>self._this).compute_electron_repulsion(&output_array[0, 0, 0, 0])
+        (<gbasis.GOBasis*>self._this).compute_electron_repulsion_two_center(&output_array[0, 0], nthread)
         # done
         return output
 
+    def compute_electron_repulsion_three_center(self, GOBasis auxbasis not None,
+                                                np.ndarray[double, ndim=3] output=None,
+                                                long nthread=0):
+        '''Compute the three-center electron repulsion integrals
+
+           These are the integrals ``(ab|P)`` where ``a`` and ``b`` are
+           functions of this basis and ``P`` is a function of the auxiliary
+           basis.
+
+           **Arguments:**
+
+           auxbasis
+                The auxiliary basis, a GOBasis instance.
+
+           **Optional arguments:**
+
+           output
+                An output array with shape (nbasis, nbasis, auxbasis.nbasis).
+                Its contents are overwritten. When not given, it is allocated.
+
+           nthread
+                The number of threads used to compute the integrals. When not
+                positive, the default number of OpenMP threads is used, which
+                can be controlled with the environment variable
+                OMP_NUM_THREADS.
+
+           **Returns:** the output array.
+        '''
+        log.cite('valeev2014', 'the efficient implementation of four-center electron repulsion integrals')
+        shape = (self.nbasis, self.nbasis, auxbasis.nbasis)
+        if output is None:
+            output = np.zeros(shape, float)
+        elif (output.shape[0], output.shape[1], output.shape[2]) != shape or \
+             not output.flags['C_CONTIGUOUS']:
+            raise TypeError('The output array must be C-contiguous with shape %s.' % (shape,))
+        (<gbasis.GOBasis*>self._this).compute_electron_repulsion_three_center(
+            <gbasis.GOBasis*>auxbasis._this, &output[0, 0, 0], nthread)
+        return output
+
     def compute_grid_orbitals_exp(self, exp,
                                   np.ndarray[double, ndim=2] points not None,
                                   np.ndarray[long, ndim=1] iorbs not None,
@@ -831,38 +1073,84 @@ cdef class GOBasis(GBasis):
            **Optional arguments:**
 
            epsilon
-                Allow errors on the density of this magnitude for the sake of
+                Allow errors on the output of this magnitude for the sake of
                 efficiency.
 
+           The basis functions are evaluated for blocks of grid points at
+           once, leaving out shells that are negligible in the entire block.
+           The contraction with the density matrix is carried out with
+           matrix-matrix products.
+
            **Warning:** the results are added to the output array! This may
            be useful to combine results from different spin components.
         '''
-        # Get the array of the density matrix
-        cdef np.ndarray[double, ndim=2] dmar = dm._array
-        self.check_matrix_two_index(dmar)
+        self._compute_grid1_dms([dm], points, grid_fn, [output], epsilon)
 
-        # Get the maximum of the absolute value over the rows
-        cdef np.ndarray[double, ndim=1] dmmaxrow = np.abs(dmar).max(axis=0)
+    def _compute_grid1_dms(self, dms, np.ndarray[double, ndim=2] points not None,
+                           GB1DMGridFn grid_fn not None, outputs,
+                           double epsilon=0):
+        '''Compute some density function on a grid for several density matrices.
 
-        # Check the output array
-        assert output.flags['C_CONTIGUOUS']
-        npoint = output.shape[0]
-        if grid_fn.dim_output == 1:
-            assert output.ndim == 1
-        else:
-            assert output.ndim == 2
-            assert output.shape[1] == grid_fn.dim_output
+           **Arguments:**
+
+           dms
+                A list of density matrices. For now, these must be
+                DenseTwoIndex objects.
+
+           points
+                A Numpy array with grid points, shape (npoint,3).
+
+           grid_fn
+                A grid function.
+
+           outputs
+                A list of Numpy arrays for the output, one for each density
+                matrix.
+
+           **Optional arguments:**
+
+           epsilon
+                Allow errors on the outputs of this magnitude for the sake of
+                efficiency. Basis functions whose contributions are certainly
+                smaller in an entire block of grid points are left out.
+
+           The basis functions are evaluated only once for each block of grid
+           points and are then contracted with all density matrices.
+
+           **Warning:** the results are added to the output arrays!
+        '''
+        cdef vector[double*] dm_ptrs
+        cdef vector[double*] output_ptrs
+        cdef np.ndarray[double, ndim=2] dmar
+        cdef np.ndarray output
+        assert len(dms) == len(outputs)
+        assert len(dms) > 0
 
         # Check the points array
         assert points.flags['C_CONTIGUOUS']
-        assert points.shape[0] == npoint
+        npoint = points.shape[0]
         assert points.shape[1] == 3
 
+        for dm, output in zip(dms, outputs):
+            # Get the array of the density matrix
+            dmar = dm._array
+            self.check_matrix_two_index(dmar)
+            dm_ptrs.push_back(&dmar[0, 0])
+
+            # Check the output array
+            assert output.flags['C_CONTIGUOUS']
+            assert output.shape[0] == npoint
+            if grid_fn.dim_output == 1:
+                assert output.ndim == 1
+            else:
+                assert output.ndim == 2
+                assert output.shape[1] == grid_fn.dim_output
+            output_ptrs.push_back(<double*>np.PyArray_DATA(output))
+
         # Go!
-        (<gbasis.GOBasis*>self._this).compute_grid1_dm(
-            &dmar[0, 0], npoint, &points[0, 0],
-            grid_fn._this, <double*>np.PyArray_DATA(output), epsilon,
-            &dmmaxrow[0])
+        (<gbasis.GOBasis*>self._this).compute_grid1_dms(
+            len(dms), &dm_ptrs[0], npoint, &points[0, 0],
+            grid_fn._this, &output_ptrs[0], epsilon)
 
     def compute_grid_density_dm(self, dm,
                                 np.ndarray[double, ndim=2] points not None,
@@ -898,6 +1186,39 @@ cdef class GOBasis(GBasis):
         self._compute_grid1_dm(dm, points, GB1DMGridDensityFn(self.max_shell_type), output, epsilon)
         return output
 
+    def compute_grid_density_dms(self, dms,
+                                 np.ndarray[double, ndim=2] points not None,
+                                 outputs=None):
+        '''Compute the electron densities on a grid for several density matrices.
+
+           **Arguments:**
+
+           dms
+                A list of density matrices, e.g. the alpha and beta density
+                matrix. For now, these must be DenseTwoIndex objects.
+
+           points
+                A Numpy array with grid points, shape (npoint,3).
+
+           **Optional arguments:**
+
+           outputs
+                A list of Numpy arrays for the output, one for each density
+                matrix, with shape (npoint,). When not given, they will be
+                allocated.
+
+           The basis functions are evaluated only once for all density
+           matrices.
+
+           **Returns:** the list of output arrays.
+
+           **Warning:** the results are added to the output arrays!
+        '''
+        if outputs is None:
+            outputs = [np.zeros(points.shape[0]) for dm in dms]
+        self._compute_grid1_dms(dms, points, GB1DMGridDensityFn(self.max_shell_type), outputs)
+        return outputs
+
     def compute_grid_gradient_dm(self, dm,
                                  np.ndarray[double, ndim=2] points not None,
                                  np.ndarray[double, ndim=2] output=None,
@@ -919,8 +1240,8 @@ cdef class GOBasis(GBasis):
                 it will be allocated.
 
            epsilon
-                Allow errors on the density of this magnitude for the sake of
-                efficiency.
+                Allow errors on the density gradient of this magnitude for the
+                sake of efficiency.
 
            **Warning:** the results are added to the output array! This may
            be useful to combine results from different spin components.
@@ -961,6 +1282,45 @@ cdef class GOBasis(GBasis):
         self._compute_grid1_dm(dm, points, GB1DMGridKineticFn(self.max_shell_type), output)
         return output
 
+    def compute_grid_gga_dm(self, dms,
+                            np.ndarray[double, ndim=2] points not None,
+                            outputs=None, tau=False):
+        '''Compute the density and its gradient on a grid for several density matrices.
+
+           **Arguments:**
+
+           dms
+                A list of density matrices, e.g. the alpha and beta density
+                matrix. For now, these must be DenseTwoIndex objects.
+
+           points
+                A Numpy array with grid points, shape (npoint,3).
+
+           **Optional arguments:**
+
+           outputs
+                A list of Numpy arrays for the output, one for each density
+                matrix, with shape (npoint,4) or (npoint,5) when tau is set.
+                When not given, they will be allocated.
+
+           tau
+                When set to True, the kinetic energy density is also computed.
+
+           The basis functions and their derivatives are evaluated only once
+           for all density matrices. The columns of each output array are the
+           density, the three components of its gradient and (optionally)
+           the kinetic energy density.
+
+           **Returns:** the list of output arrays.
+
+           **Warning:** the results are added to the output arrays!
+        '''
+        grid_fn = GB1DMGridGGAFn(self.max_shell_type, tau)
+        if outputs is None:
+            outputs = [np.zeros((points.shape[0], grid_fn.dim_output), float) for dm in dms]
+        self._compute_grid1_dms(dms, points, grid_fn, outputs)
+        return outputs
+
     def compute_grid_hartree_dm(self, dm,
                                 np.ndarray[double, ndim=2] points not None,
                                 np.ndarray[double, ndim=1] output=None):
@@ -1069,27 +1429,70 @@ cdef class GOBasis(GBasis):
 
            **Warning:** the results are added to the fock operator!
         '''
-        cdef np.ndarray[double, ndim=2] output = fock._array
-        self.check_matrix_two_index(output)
+        self._compute_grid1_focks(points, weights, [pots], grid_fn, [fock])
+
+    def _compute_grid1_focks(self, np.ndarray[double, ndim=2] points not None,
+                            np.ndarray[double, ndim=1] weights not None,
+                            pots, GB1DMGridFn grid_fn not None, focks):
+        '''Compute several two-index operators based on potential grids in real-space
+
+           **Arguments:**
+
+           points
+                A Numpy array with grid points, shape (npoint,3).
+
+           weights
+                A Numpy array with integration weights, shape (npoint,).
+
+           pots
+                A list of Numpy arrays with potential data on the grid. All
+                arrays must have the same strides.
+
+           grid_fn
+                A grid function.
+
+           focks
+                A list of two-index operators, one for each potential. For
+                now, these must be DenseTwoIndex objects.
+
+           The basis functions are evaluated only once for each block of grid
+           points and are then used for all potentials.
+
+           **Warning:** the results are added to the fock operators!
+        '''
+        cdef vector[double*] pot_ptrs
+        cdef vector[double*] output_ptrs
+        cdef np.ndarray[double, ndim=2] output
+        cdef np.ndarray pot
+        assert len(pots) == len(focks)
+        assert len(pots) > 0
         assert points.flags['C_CONTIGUOUS']
         npoint = points.shape[0]
         assert points.shape[1] == 3
         assert weights.flags['C_CONTIGUOUS']
         assert npoint == weights.shape[0]
-        assert pots.strides[0] % 8 == 0
-        pot_stride = pots.strides[0]/8
-        assert npoint == pots.shape[0]
-        if grid_fn.dim_output == 1:
-            assert pots.ndim == 1
-        else:
-            assert pots.ndim == 2
-            assert pots.shape[1] == grid_fn.dim_output
-            assert pots.strides[1] % 8 == 0
-            pot_stride *= (pots.strides[1] / 8)
-        (<gbasis.GOBasis*>self._this).compute_grid1_fock(
-            npoint, &points[0, 0], &weights[0],
-            pot_stride, <double*>np.PyArray_DATA(pots),
-            grid_fn._this, &output[0, 0])
+        strides = pots[0].strides
+        assert strides[0] % 8 == 0
+        pot_stride = strides[0]/8
+        if grid_fn.dim_output > 1:
+            assert strides[1] % 8 == 0
+            pot_stride *= (strides[1] / 8)
+        for pot, fock in zip(pots, focks):
+            assert (<object>pot).strides == strides
+            assert npoint == pot.shape[0]
+            if grid_fn.dim_output == 1:
+                assert pot.ndim == 1
+            else:
+                assert pot.ndim == 2
+                assert pot.shape[1] == grid_fn.dim_output
+            pot_ptrs.push_back(<double*>np.PyArray_DATA(pot))
+            output = fock._array
+            self.check_matrix_two_index(output)
+            output_ptrs.push_back(&output[0, 0])
+        (<gbasis.GOBasis*>self._this).compute_grid1_focks(
+            len(pots), npoint, &points[0, 0], &weights[0],
+            pot_stride, &pot_ptrs[0],
+            grid_fn._this, &output_ptrs[0])
 
     def compute_grid_density_fock(self, np.ndarray[double, ndim=2] points not None,
                                   np.ndarray[double, ndim=1] weights not None,
@@ -1115,6 +1518,33 @@ cdef class GOBasis(GBasis):
         '''
         self._compute_grid1_fock(points, weights, pots, GB1DMGridDensityFn(self.max_shell_type), fock)
 
+    def compute_grid_density_focks(self, np.ndarray[double, ndim=2] points not None,
+                                   np.ndarray[double, ndim=1] weights not None,
+                                   pots, focks):
+        '''Compute two-index operators based on density potential grids for several spin channels
+
+           **Arguments:**
+
+           points
+                A Numpy array with grid points, shape (npoint,3).
+
+           weights
+                A Numpy array with integration weights, shape (npoint,).
+
+           pots
+                A list of Numpy arrays with density potential data, one for
+                each operator, with shape (npoint,).
+
+           focks
+                A list of two-index operators. For now, these must be
+                DenseTwoIndex objects.
+
+           The basis functions are evaluated only once for all operators.
+
+           **Warning:** the results are added to the fock operators!
+        '''
+        self._compute_grid1_focks(points, weights, pots, GB1DMGridDensityFn(self.max_shell_type), focks)
+
     def compute_grid_gradient_fock(self, np.ndarray[double, ndim=2] points not None,
                                    np.ndarray[double, ndim=1] weights not None,
                                    np.ndarray[double, ndim=2] pots not None, fock):
@@ -1165,6 +1595,128 @@ cdef class GOBasis(GBasis):
         self._compute_grid1_fock(points, weights, pots, GB1DMGridKineticFn(self.max_shell_type), fock)
 
 
+    def compute_grid_gga_fock(self, np.ndarray[double, ndim=2] points not None,
+                              np.ndarray[double, ndim=1] weights not None,
+                              pots, focks, tau=False):
+        '''Compute two-index operators from density and gradient potentials for several spin channels
+
+           **Arguments:**
+
+           points
+                A Numpy array with grid points, shape (npoint,3).
+
+           weights
+                A Numpy array with integration weights, shape (npoint,).
+
+           pots
+                A list of Numpy arrays with potential data, one for each
+                operator, with shape (npoint,4) or (npoint,5) when tau is set.
+                The columns contain the derivatives of the energy density
+                towards the density, the three components of its gradient and
+                (optionally) the kinetic energy density.
+
+           focks
+                A list of two-index operators. For now, these must be
+                DenseTwoIndex objects.
+
+           **Optional arguments:**
+
+           tau
+                When set to True, the kinetic energy density potential is also
+                included.
+
+           The basis functions and their derivatives are evaluated only once
+           for all operators.
+
+           **Warning:** the results are added to the fock operators!
+        '''
+        self._compute_grid1_focks(points, weights, pots, GB1DMGridGGAFn(self.max_shell_type, tau), focks)
+
+#
+# screening
+#
+
+
+cdef class GB4Screening:
+    '''Schwarz screening of the electron repulsion integrals
+
+       The Schwarz bounds of all shell pairs are computed once when the object
+       is constructed, such that it can be reused for many integral
+       evaluations with the same basis set.
+    '''
+    cdef screening.GB4Screening* _this
+    cdef GOBasis _gobasis
+
+    def __cinit__(self, GOBasis gobasis not None, double threshold):
+        '''
+           **Arguments:**
+
+           gobasis
+                The Gaussian orbital basis set.
+
+           threshold
+                Shell quartets whose Schwarz bound falls below this threshold
+                are skipped.
+        '''
+        cdef ints.GB4ElectronRepulsionIntegralLibInt* gb4int = NULL
+        if threshold <= 0:
+            raise ValueError('The screening threshold must be strictly positive.')
+        self._gobasis = gobasis
+        try:
+            gb4int = new ints.GB4ElectronRepulsionIntegralLibInt(
+                                gobasis.max_shell_type)
+            self._this = new screening.GB4Screening(
+                                gobasis._this, <ints.GB4Integral*> gb4int,
+                                threshold)
+        finally:
+            if gb4int is not NULL:
+                del gb4int
+
+    def __dealloc__(self):
+        if self._this != NULL:
+            del self._this
+
+    property gobasis:
+        def __get__(self):
+            return self._gobasis
+
+    property threshold:
+        def __get__(self):
+            return self._this.get_threshold()
+
+    property nquartet:
+        '''The number of shell quartets tested so far'''
+        def __get__(self):
+            return self._this.get_nquartet()
+
+    property nskip:
+        '''The number of shell quartets skipped so far'''
+        def __get__(self):
+            return self._this.get_nskip()
+
+    def get_shell_bounds(self):
+        '''Return a copy of the Schwarz bounds, shape (nshell, nshell)'''
+        cdef np.npy_intp shape[2]
+        shape[0] = self._gobasis.nshell
+        shape[1] = self._gobasis.nshell
+        tmp = np.PyArray_SimpleNewFromData(2, shape, np.NPY_DOUBLE, <void*> self._this.get_shell_bounds())
+        return tmp.copy()
+
+    def log(self):
+        '''Report the number of skipped shell quartets on screen'''
+        if log.do_medium:
+            log('Schwarz screening (threshold=%.1e) skipped %i out of %i shell quartets (%.1f%%).' % (
+                self.threshold, self.nskip, self.nquartet,
+                100.0*self.nskip/max(self.nquartet, 1)))
+
+
+cdef screening.GB4Screening* _get_screening_ptr(GB4Screening gb4s):
+    '''Return the low-level screening object, or NULL when gb4s is None'''
+    if gb4s is None:
+        return NULL
+    return gb4s._this
+
+
 #
 # gbw wrappers
 #
@@ -1185,7 +1737,7 @@ def select_2index(GOBasis gobasis, long index0, long index2):
         gb4int = new ints.GB4ElectronRepulsionIntegralLibInt(
                             gobasis.max_shell_type)
         gb4w = new gbw.GB4IntegralWrapper((<gbasis.GOBasis* > gobasis._this),
-                            <ints.GB4Integral*> gb4int)
+                            <ints.GB4Integral*> gb4int, NULL, 0)
         gb4w.select_2index(index0, index2, &pbegin0, &pend0, &pbegin2, &pend2)
     finally:
         if gb4int is not NULL:
@@ -1206,7 +1758,7 @@ def compute_diagonal(GOBasis gobasis, np.ndarray[double, ndim=2] diagonal not
         gb4int = new ints.GB4ElectronRepulsionIntegralLibInt(
                             gobasis.max_shell_type)
         gb4w = new gbw.GB4IntegralWrapper((<gbasis.GOBasis* > gobasis._this),
-                            <ints.GB4Integral*> gb4int)
+                            <ints.GB4Integral*> gb4int, NULL, 0)
         gb4w.compute_diagonal(&output[0, 0])
 
     finally:
@@ -1232,7 +1784,7 @@ def get_2index_slice(GOBasis gobasis, long index0, long index2,
         gb4int = new ints.GB4ElectronRepulsionIntegralLibInt(
                             gobasis.max_shell_type)
         gb4w = new gbw.GB4IntegralWrapper((<gbasis.GOBasis* > gobasis._this),
-                            <ints.GB4Integral*> gb4int)
+                            <ints.GB4Integral*> gb4int, NULL, 0)
         gb4w.select_2index(index0, index2, &pbegin0, &pend0, &pbegin2, &pend2)
         gb4w.compute()
         output = gb4w.get_2index_slice(index0, index2)
@@ -1524,6 +2076,11 @@ cdef class GB1DMGridKineticFn(GB1DMGridFn):
         self._this = <fns.GB1DMGridFn*>(new fns.GB1DMGridKineticFn(max_nbasis))
 
 
+cdef class GB1DMGridGGAFn(GB1DMGridFn):
+    def __cinit__(self, long max_nbasis, bint tau=False):
+        self._this = <fns.GB1DMGridFn*>(new fns.GB1DMGridGGAFn(max_nbasis, tau))
+
+
 #
 # iter_gb wrappers (for testing only)
 #
@@ -22,8 +22,105 @@
 #include <cstring>
 #include <cmath>
 #include <stdexcept>
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <unistd.h>
 #include "horton/gbasis/cholesky.h"
 
+
+/**
+    Storage for Cholesky vectors that grows as vectors are added.
+
+    Without a filename, the vectors are kept in memory. Otherwise, they are
+    written to a memory-mapped file, such that the operating system can page
+    them out when they do not fit in memory.
+*/
+class CholeskyStorage {
+    private:
+        long vector_size;
+        long nvec;
+        long capacity;         // number of vectors that fit in the storage
+        std::vector<double>* vectors;
+        int fd;
+        double* mapped;
+
+        void remap(long new_capacity) {
+            if (mapped != NULL) munmap(mapped, capacity*vector_size*sizeof(double));
+            mapped = NULL;
+            if (ftruncate(fd, new_capacity*vector_size*sizeof(double)) != 0)
+                throw std::runtime_error("Could not resize the Cholesky vector file.");
+            void* result = mmap(NULL, new_capacity*vector_size*sizeof(double),
+                                PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+            if (result == MAP_FAILED)
+                throw std::runtime_error("Could not memory-map the Cholesky vector file.");
+            mapped = static_cast<double*>(result);
+            capacity = new_capacity;
+        }
+    public:
+        CholeskyStorage(long nbasis, const char* filename) :
+            vector_size(nbasis*nbasis), nvec(0), capacity(0), vectors(NULL),
+            fd(-1), mapped(NULL)
+        {
+            if (filename == NULL) {
+                // Start with an allocation of 15% of the full 4-center matrix.
+                vectors = new std::vector<double>;
+                vectors->reserve(vector_size*vector_size*0.15);
+            } else {
+                fd = open(filename, O_RDWR | O_CREAT | O_TRUNC, 0644);
+                if (fd == -1)
+                    throw std::runtime_error("Could not open the Cholesky vector file.");
+                remap(nbasis);
+            }
+        }
+
+        ~CholeskyStorage() {
+            if (mapped != NULL) munmap(mapped, capacity*vector_size*sizeof(double));
+            if (fd != -1) close(fd);
+            delete vectors;
+        }
+
+        /** Return a pointer to the Cholesky vector with index ivec. */
+        double* get(long ivec) {
+            if (vectors == NULL) return mapped + ivec*vector_size;
+            return &(*vectors)[ivec*vector_size];
+        }
+
+        /**
+            Add a vector at the end and return a pointer to it. Pointers
+            obtained before this call may become invalid.
+        */
+        double* append() {
+            if (vectors == NULL) {
+                if (nvec == capacity) remap(2*capacity);
+            } else {
+                vectors->resize((nvec + 1)*vector_size);
+            }
+            nvec++;
+            return get(nvec - 1);
+        }
+
+        /**
+            Finish the decomposition. For in-memory storage, the ownership of
+            the vectors is transferred to the caller. Otherwise, the file is
+            truncated to its final size, closed and NULL is returned.
+        */
+        double* release() {
+            if (vectors == NULL) {
+                munmap(mapped, capacity*vector_size*sizeof(double));
+                mapped = NULL;
+                if (ftruncate(fd, nvec*vector_size*sizeof(double)) != 0)
+                    throw std::runtime_error("Could not resize the Cholesky vector file.");
+                close(fd);
+                fd = -1;
+                return NULL;
+            }
+            // Not efficient! Who cares?
+            double* result = &(*vectors)[0];
+            vectors = NULL;
+            return result;
+        }
+};
+
 /**
     Find the maximum diagonal error, used several times in the cholesky routine.
 */
@@ -47,7 +144,7 @@ double find_maxdiag(double* diagerr, long nbasis, long begin1, long end1,
 
 
 long cholesky(GB4IntegralWrapper* gbw4, double** uninit_result,
-    double threshold)
+    double threshold, const char* filename)
 {
   if (threshold <= 0) {
     // The algorithm below may go crazy with a non-positive threshold.
@@ -58,10 +155,8 @@ long cholesky(GB4IntegralWrapper* gbw4, double** uninit_result,
   double* diagonal = new double[nbasis*nbasis];  // allocate 2 index object
   double* diagerr = new double[nbasis*nbasis];   //  "
   double* slice = NULL;                          //  "
-  // storage for 2-index cholesky vectors, start with allocation of 15% of the
-  // full 4-center matrix
-  std::vector<double>* vectors = new std::vector<double>;
-  vectors->reserve(nbasis*nbasis*nbasis*nbasis*0.15);
+  // storage for 2-index cholesky vectors
+  CholeskyStorage vectors(nbasis, filename);
 
   /*
     In some future version, we'll introduce a mask to only compute integrals
@@ -96,6 +191,7 @@ long cholesky(GB4IntegralWrapper* gbw4, double** uninit_result,
                                 index1, index2);
 
   // std::cout << "initial maxdiag " << maxdiag << " " << index1 << " " << index2 << std::endl;
+  const long nbasis_sq = nbasis*nbasis;
   unsigned long nvec=0;
   do {
     // call wrapper to let it select a pair of shells for the given variables
@@ -110,47 +206,66 @@ long cholesky(GB4IntegralWrapper* gbw4, double** uninit_result,
     // gbw4->compute(mask);
     gbw4->compute();
 
-    do {
-      // Get the the slice of computed four-center integrals that correspond
-      // to the pair index1,index2.
-      slice = gbw4->get_2index_slice(index1, index2);
-
-      // construct new cholesky vector
-      double* pastvector_sum = new double[nbasis*nbasis];
-      memset(pastvector_sum, 0, sizeof(double)*nbasis*nbasis);
-      maxdiag = 1.0 / sqrt(maxdiag);
-
-      //compute sum of past Ls
-      for (unsigned long l=0; l<nvec; l++){
-        /*
-        for (long i=0; i<nbasis; i++){
-          for (long j=0; j<nbasis; j++){
-            pastvector_sum[i*nbasis + j] +=
-                (*vectors)[(l*nbasis*nbasis) + index1*nbasis + index2]
-                *(*vectors)[(l*nbasis*nbasis) + i*nbasis + j];
+    /*
+      All pairs of basis functions in the selected pair of shells are
+      candidate pivots. Their slices of the four-center integrals are copied
+      into the residual array, from which the contributions of all past
+      Cholesky vectors are subtracted with a single DGEMM:
+
+        residual[q, :] -= sum_l vectors[l, pivot_q]*vectors[l, :]
+    */
+    const long n1 = end1 - begin1;
+    const long n2 = end2 - begin2;
+    const long ncandidate = n1*n2;
+    double* residual = new double[ncandidate*nbasis_sq];
+    for (long i1=begin1; i1<end1; i1++) {
+      for (long i2=begin2; i2<end2; i2++) {
+        slice = gbw4->get_2index_slice(i1, i2);
+        memcpy(residual + ((i1-begin1)*n2 + (i2-begin2))*nbasis_sq, slice,
+               sizeof(double)*nbasis_sq);
+      }
+    }
+    if (nvec > 0) {
+      double* coeffs = new double[nvec*ncandidate];
+      for (unsigned long l=0; l<nvec; l++) {
+        const double* pastvector = vectors.get(l);
+        for (long i1=begin1; i1<end1; i1++) {
+          for (long i2=begin2; i2<end2; i2++) {
+            coeffs[l*ncandidate + (i1-begin1)*n2 + (i2-begin2)] =
+                pastvector[i1*nbasis + i2];
           }
         }
-        */
-        cblas_daxpy(nbasis*nbasis,
-                    (*vectors)[(l*nbasis*nbasis) + index1*nbasis + index2],
-                    &(*vectors)[l*nbasis*nbasis], 1, pastvector_sum, 1);
       }
+      // The past vectors are stored contiguously.
+      cblas_dgemm(CblasRowMajor, CblasTrans, CblasNoTrans,
+                  ncandidate, nbasis_sq, nvec,
+                  -1.0, coeffs, ncandidate, vectors.get(0), nbasis_sq,
+                  1.0, residual, nbasis_sq);
+      delete[] coeffs;
+    }
+
+    do {
+      // The residual for the pair index1,index2.
+      const long ipivot = (index1-begin1)*n2 + (index2-begin2);
+      const double* pivot_residual = residual + ipivot*nbasis_sq;
 
       //compute current L
-      for (long i=0; i<nbasis; i++){
-        for (long j=0; j<nbasis; j++){
-          vectors->push_back(maxdiag * (slice[i*nbasis + j] -
-                             pastvector_sum[i*nbasis + j]));
-        }
+      double* vector = vectors.append();
+      cblas_dcopy(nbasis_sq, pivot_residual, 1, vector, 1);
+      cblas_dscal(nbasis_sq, 1.0/sqrt(maxdiag), vector, 1);
+
+      // Subtract the new vector from the residuals of all candidates in this
+      // pair of shells. (Only those can become pivots in this batch.)
+      for (long q=0; q<ncandidate; q++) {
+        const long i1 = begin1 + q/n2;
+        const long i2 = begin2 + q%n2;
+        cblas_daxpy(nbasis_sq, -vector[i1*nbasis + i2], vector, 1,
+                    residual + q*nbasis_sq, 1);
       }
 
       // update diagerr
-      for (long i=0; i<nbasis; i++){
-        for (long j=0; j<nbasis; j++){
-          diagerr[i*nbasis + j] -=
-              (*vectors)[(nvec*nbasis*nbasis) + i*nbasis + j] *
-              (*vectors)[(nvec*nbasis*nbasis) + i*nbasis + j];
-        }
+      for (long i=0; i<nbasis_sq; i++){
+        diagerr[i] -= vector[i]*vector[i];
       }
 
       // We've just added one vector.
@@ -163,6 +278,7 @@ long cholesky(GB4IntegralWrapper* gbw4, double** uninit_result,
                              index1, index2);
       // std::cout << "current maxdiag " << maxdiag << " " << index1 << " " << index2 << std::endl;
     } while (maxdiag > threshold*1000);
+    delete[] residual;
 
     // Look for the new maximum error on the diagonal
     maxdiag = find_maxdiag(diagerr, nbasis, 0, nbasis, 0, nbasis,
@@ -171,8 +287,9 @@ long cholesky(GB4IntegralWrapper* gbw4, double** uninit_result,
     // std::cout << "shell maxdiag " << maxdiag << " " << index1 << " " << index2 << std::endl;
   } while (maxdiag > threshold);
 
-  // Concatenate results array. Not efficient! Who cares?
-  *uninit_result = &((*vectors)[0]);
+  delete[] diagonal;
+  delete[] diagerr;
+  *uninit_result = vectors.release();
 
   return nvec;
 }
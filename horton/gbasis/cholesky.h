@@ -51,15 +51,21 @@ extern "C"
     @param uninit_result
         An output pointer. The Cholesky vectors will be allocated as part of
         this routine and the pointer to the Cholesky vectors is assigned to this
-        output argument.
+        output argument. When filename is not NULL, NULL is assigned instead.
 
     @param threshold
         A threshold for the error on the (double) diagonal of the four-center
         object. The Cholesky decomposition stops when sufficient vectors are
         generated such that the error on the diagonal falls below this
         threshold.
+
+    @param filename
+        When not NULL, the Cholesky vectors are written to a memory-mapped file
+        with this name instead of being kept in memory. After the
+        decomposition, the file contains the vectors as a C-ordered array of
+        doubles with shape (nvec, nbasis, nbasis).
 */
 long cholesky(GB4IntegralWrapper* gbw4, double** uninit_result,
-    double threshold);
+    double threshold, const char* filename);
 
 #endif
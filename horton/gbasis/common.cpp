@@ -20,6 +20,9 @@
 
 
 #include <cmath>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
 #include "horton/gbasis/common.h"
 
 
@@ -73,6 +76,27 @@ long get_max_shell_type() {
 }
 
 
+long get_nthread(long nthread) {
+    // Non-positive values select the default number of OpenMP threads. Without
+    // OpenMP, everything runs in a single thread.
+#ifdef _OPENMP
+    if (nthread <= 0) return omp_get_max_threads();
+    return nthread;
+#else
+    return 1;
+#endif
+}
+
+
+long get_ithread() {
+#ifdef _OPENMP
+    return omp_get_thread_num();
+#else
+    return 0;
+#endif
+}
+
+
 const double dist_sq(const double* r0, const double* r1) {
     double result, tmp;
     tmp = r0[0] - r1[0];
@@ -34,6 +34,10 @@ long get_shell_nbasis(long shell_type);
 long get_max_shell_type();
 const double dist_sq(const double* r0, const double* r1);
 
+// Parallelization
+long get_nthread(long nthread);
+long get_ithread();
+
 // Auxiliary functions for Gaussian integrals
 void compute_gpt_center(double alpha0, const double* r0, double alpha1, const double* r1, double gamma_inv, double* gpt_center);
 double gpt_coeff(long k, long n0, long n1, double pa, double pb);
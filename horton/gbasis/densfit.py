@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+# HORTON: Helpful Open-source Research TOol for N-fermion systems.
+# Copyright (C) 2011-2015 The HORTON Development Team
+#
+# This file is part of HORTON.
+#
+# HORTON is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# HORTON is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+#--
+"""Density-fitted four-index operator for the Coulomb term (RI-J)."""
+
+
+import numpy as np
+from scipy.linalg import cho_factor, cho_solve
+
+from horton.log import log
+from horton.matrix.base import FourIndex
+from horton.matrix.dense import DenseTwoIndex, DenseLinalgFactory
+from horton.utils import check_type, check_options
+
+
+__all__ = ['DensityFitFourIndex']
+
+
+class DensityFitFourIndex(FourIndex):
+    """Electron repulsion integrals approximated with an auxiliary basis.
+
+       The integrals are written as ``(ab|cd) = sum_PQ (ab|P) (P|Q)^-1 (Q|cd)``,
+       where ``P`` and ``Q`` are functions of the auxiliary basis. Only the
+       three-center integrals and the Cholesky factor of the two-center Coulomb
+       metric are stored, i.e. the memory usage scales as the square of the
+       orbital basis times the size of the auxiliary basis.
+
+       Only the direct (Coulomb) contraction is supported, such that this
+       object can be used in ``RDirectTerm`` and ``UDirectTerm`` instead of the
+       exact four-index integrals.
+    """
+    def __init__(self, obasis, auxbasis):
+        """
+           **Arguments:**
+
+           obasis
+                The Gaussian orbital basis set (GOBasis).
+
+           auxbasis
+                The auxiliary basis set (GOBasis), e.g. obtained with
+                ``get_gobasis`` with a fitting basis set for the same molecule.
+        """
+        log.cite('eichkorn1995', 'the density fitting approximation of the Coulomb term')
+        self._obasis = obasis
+        self._auxbasis = auxbasis
+        nbasis = obasis.nbasis
+        # Three-center integrals, reshaped such that the first two indexes
+        # are merged.
+        self._three = obasis.compute_electron_repulsion_three_center(auxbasis)
+        self._three.shape = (nbasis*nbasis, auxbasis.nbasis)
+        # Cholesky factor of the Coulomb metric of the auxiliary basis.
+        metric = auxbasis.compute_electron_repulsion_two_center(
+            DenseLinalgFactory(auxbasis.nbasis))
+        self._metric_factor = cho_factor(metric._array)
+
+    #
+    # Properties
+    #
+
+    def _get_nbasis(self):
+        '''The number of basis functions'''
+        return self._obasis.nbasis
+
+    nbasis = property(_get_nbasis)
+
+    def _get_shape(self):
+        '''The shape of the object'''
+        return (self.nbasis, self.nbasis, self.nbasis, self.nbasis)
+
+    shape = property(_get_shape)
+
+    def _get_obasis(self):
+        '''The Gaussian orbital basis set'''
+        return self._obasis
+
+    obasis = property(_get_obasis)
+
+    def _get_auxbasis(self):
+        '''The auxiliary basis set'''
+        return self._auxbasis
+
+    auxbasis = property(_get_auxbasis)
+
+    #
+    # Methods from base class
+    #
+
+    def __check_init_args__(self, obasis, auxbasis):
+        '''Is self compatible with the given constructor arguments?'''
+        assert obasis is self._obasis
+        assert auxbasis is self._auxbasis
+
+    def new(self):
+        '''Return a new four-index object with the same basis sets'''
+        return DensityFitFourIndex(self._obasis, self._auxbasis)
+
+    def clear(self):
+        '''Nothing is cached, so there is nothing to clear'''
+        pass
+
+    def is_symmetric(self, symmetry=8, rtol=1e-5, atol=1e-8):
+        '''The fitted integrals have an eight-fold symmetry'''
+        return True
+
+    #
+    # Contractions
+    #
+
+    def contract_two_to_two(self, subscripts, two, out=None, factor=1.0, clear=True):
+        """Contract self with a two-index to obtain a two-index.
+
+           **Arguments:**
+
+           subscripts
+                Only ``abcd,bd->ac`` (direct) is supported.
+
+           two
+                The input two-index object. (DenseTwoIndex) This must be a
+                symmetric matrix.
+
+           **Optional arguments:**
+
+           out, factor, clear
+                See :py:meth:`DenseLinalgFactory.einsum`
+        """
+        check_options('subscripts', subscripts, 'abcd,bd->ac')
+        check_type('two', two, DenseTwoIndex)
+        if out is None:
+            out = DenseTwoIndex(self.nbasis)
+        else:
+            check_type('out', out, DenseTwoIndex)
+            if clear:
+                out.clear()
+        # Project the density on the auxiliary basis, solve the fitting
+        # equations and expand the fitted potential in the orbital basis.
+        projection = np.dot(two._array.ravel(), self._three)
+        coeffs = cho_solve(self._metric_factor, projection)
+        result = np.dot(self._three, coeffs)
+        out._array += factor*result.reshape(self.nbasis, self.nbasis)
+        return out
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+# HORTON: Helpful Open-source Research TOol for N-fermion systems.
+# Copyright (C) 2011-2015 The HORTON Development Team
+#
+# This file is part of HORTON.
+#
+# HORTON is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# HORTON is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+#--
+"""Integral-direct four-index operator for the electron repulsion integrals."""
+
+
+import numpy as np
+
+from horton.gbasis.cext import GB4Screening
+from horton.log import log
+from horton.matrix.base import FourIndex
+from horton.matrix.dense import DenseTwoIndex
+from horton.utils import check_type, check_options
+
+
+__all__ = ['DirectFourIndex']
+
+
+class DirectFourIndex(FourIndex):
+    """Electron repulsion integrals that are computed on the fly.
+
+       The four-index object is never stored. Only the contractions with a
+       density matrix that are needed for mean-field methods are supported,
+       i.e. the direct and the exchange term. As a result, the memory usage
+       scales quadratically with the number of basis functions.
+
+       Results are computed incrementally: the contraction is carried out with
+       the difference between the given density matrix and the most similar
+       density matrix of a previous call. Together with density-weighted
+       screening, this makes late SCF iterations much cheaper than early ones.
+       From time to time, the results are rebuilt from scratch to avoid the
+       accumulation of screening errors.
+    """
+    def __init__(self, obasis, threshold=1e-12, rebuild_interval=10, nchannel=4):
+        """
+           **Arguments:**
+
+           obasis
+                The Gaussian orbital basis set (GOBasis).
+
+           **Optional arguments:**
+
+           threshold
+                The screening threshold. Shell quartets whose Schwarz bound
+                times the largest relevant density matrix element is below this
+                threshold are skipped. When zero, no screening is used.
+
+           rebuild_interval
+                The maximum number of incremental updates before the result is
+                recomputed from scratch with the full density matrix.
+
+           nchannel
+                The number of density matrices (and corresponding results)
+                that are kept in memory for incremental updates, e.g. one for
+                the alpha and one for the beta density.
+        """
+        if rebuild_interval < 1:
+            raise ValueError('The rebuild_interval must be strictly positive.')
+        if nchannel < 1:
+            raise ValueError('The nchannel must be strictly positive.')
+        self._obasis = obasis
+        self._threshold = threshold
+        if threshold > 0:
+            self._screening = GB4Screening(obasis, threshold)
+        else:
+            self._screening = None
+        self._rebuild_interval = rebuild_interval
+        self._nchannel = nchannel
+        # All the subscripts that have been requested so far. These are always
+        # computed together to avoid multiple passes over the integrals.
+        self._subscripts = set([])
+        # Each channel is a list [dm, results, nupdate], where results is a
+        # dictionary with the contractions of dm for the given subscripts.
+        self._channels = []
+
+    #
+    # Properties
+    #
+
+    def _get_nbasis(self):
+        '''The number of basis functions'''
+        return self._obasis.nbasis
+
+    nbasis = property(_get_nbasis)
+
+    def _get_shape(self):
+        '''The shape of the object'''
+        return (self.nbasis, self.nbasis, self.nbasis, self.nbasis)
+
+    shape = property(_get_shape)
+
+    def _get_obasis(self):
+        '''The Gaussian orbital basis set'''
+        return self._obasis
+
+    obasis = property(_get_obasis)
+
+    def _get_screening(self):
+        '''The GB4Screening object, or None when screening is disabled'''
+        return self._screening
+
+    screening = property(_get_screening)
+
+    #
+    # Methods from base class
+    #
+
+    def __check_init_args__(self, obasis, threshold=1e-12, rebuild_interval=10, nchannel=4):
+        '''Is self compatible with the given constructor arguments?'''
+        assert obasis is self._obasis
+        assert threshold == self._threshold
+
+    def new(self):
+        '''Return a new four-index object with the same basis and settings'''
+        return DirectFourIndex(self._obasis, self._threshold,
+                               self._rebuild_interval, self._nchannel)
+
+    def clear(self):
+        '''Forget all results of previous contractions'''
+        self._channels = []
+
+    def is_symmetric(self, symmetry=8, rtol=1e-5, atol=1e-8):
+        '''The electron repulsion integrals have an eight-fold symmetry'''
+        return True
+
+    #
+    # Contractions
+    #
+
+    def contract_two_to_two(self, subscripts, two, out=None, factor=1.0, clear=True):
+        """Contract self with a two-index to obtain a two-index.
+
+           **Arguments:**
+
+           subscripts
+                Any of ``abcd,bd->ac`` (direct), ``abcd,cb->ad`` (exchange)
+
+           two
+                The input two-index object. (DenseTwoIndex) This must be a
+                symmetric matrix.
+
+           **Optional arguments:**
+
+           out, factor, clear
+                See :py:meth:`DenseLinalgFactory.einsum`
+        """
+        check_options('subscripts', subscripts, 'abcd,bd->ac', 'abcd,cb->ad')
+        check_type('two', two, DenseTwoIndex)
+        if out is None:
+            out = DenseTwoIndex(self.nbasis)
+        else:
+            check_type('out', out, DenseTwoIndex)
+            if clear:
+                out.clear()
+        self._subscripts.add(subscripts)
+        result = self._get_result(subscripts, two)
+        out.iadd(result, factor)
+        return out
+
+    def _get_result(self, subscripts, dm):
+        '''Return the contraction of the integrals with dm, using the channels'''
+        # Find the channel with the most similar density matrix.
+        best = None
+        best_error = None
+        for channel in self._channels:
+            error = abs(channel[0]._array - dm._array).max()
+            if best is None or error < best_error:
+                best = channel
+                best_error = error
+        if best is not None:
+            self._channels.remove(best)
+            self._channels.append(best)
+            if best_error == 0.0 and subscripts in best[1]:
+                # Nothing has changed since the last call.
+                return best[1][subscripts]
+
+        # Decide between an incremental update and a rebuild from scratch.
+        similar = best is not None and best_error < abs(dm._array).max()
+        incremental = similar and best[2] < self._rebuild_interval and \
+            self._subscripts.issubset(best[1])
+        if incremental:
+            delta = dm.copy()
+            delta.iadd(best[0], -1)
+            results = self._compute(delta)
+            for key, result in results.iteritems():
+                result.iadd(best[1][key])
+            best[2] += 1
+        else:
+            results = self._compute(dm)
+            if not similar:
+                # Start a new channel and drop the least recently used one.
+                if len(self._channels) == self._nchannel:
+                    del self._channels[0]
+                best = [None, None, 0]
+                self._channels.append(best)
+            best[2] = 0
+        best[0] = dm.copy()
+        best[1] = results
+        return results[subscripts]
+
+    def _compute(self, dm):
+        '''Contract the integrals with dm for all subscripts requested so far'''
+        direct = None
+        exchange = None
+        if 'abcd,bd->ac' in self._subscripts:
+            direct = DenseTwoIndex(self.nbasis)
+        if 'abcd,cb->ad' in self._subscripts:
+            exchange = DenseTwoIndex(self.nbasis)
+        self._obasis.compute_electron_repulsion_dm(dm, direct, exchange, self._screening)
+        if self._screening is not None:
+            self._screening.log()
+        results = {}
+        if direct is not None:
+            results['abcd,bd->ac'] = direct
+        if exchange is not None:
+            results['abcd,cb->ad'] = exchange
+        return results
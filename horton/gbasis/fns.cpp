@@ -33,6 +33,16 @@
 #include "horton/gbasis/fns.h"
 using namespace std;
 
+// Include the CBLAS headers
+#ifdef BLAS_MKL
+#include <mkl.h>
+#else
+extern "C"
+{
+#include <cblas.h>
+}
+#endif
+
 
 /*
     GB1GridFn
@@ -142,54 +152,26 @@ void GB1DMGridDensityFn::add(double coeff, double alpha0, const double* scales0)
     }
 }
 
-void GB1DMGridDensityFn::compute_point_from_dm(double* work_basis, double* dm, long nbasis, double* output, double epsilon, double* dmmaxrow) {
-    double absmax_basis = 0.0;
-    if (epsilon > 0) {
-        // compute the maximum basis function
-        for (long ibasis=0; ibasis<nbasis; ibasis++) {
-            double tmp = fabs(work_basis[ibasis]);
-            if (tmp > absmax_basis) absmax_basis = tmp;
-        }
-        // upper estimate of the density
-        double rho_upper = 0.0;
-        for (long ibasis=0; ibasis<nbasis; ibasis++) {
-            rho_upper += fabs(work_basis[ibasis])*dmmaxrow[ibasis];
-        }
-        rho_upper *= nbasis*absmax_basis;
-
-        // if the upper bound is too low, do not compute density.
-        if (rho_upper < epsilon) return;
-
-        // modify epsilon to avoid recomputation
-        epsilon /= absmax_basis*nbasis*nbasis;
-    }
-
-    // Loop over all basis functions and add significant contributions
-    double rho = 0.0;
-    for (long ibasis0=0; ibasis0<nbasis; ibasis0++) {
-        // if the contribution of this loop is smaller than epsilon/nbasis, skipt it.
-        if (epsilon>0) {
-            if (fabs(work_basis[ibasis0])*dmmaxrow[ibasis0] < epsilon)
-                continue;
-        }
-        double tmp = 0;
-        for (long ibasis1=ibasis0-1; ibasis1>=0; ibasis1--) {
-            tmp += work_basis[ibasis1]*dm[ibasis0*nbasis+ibasis1];
-        }
-        rho += (2*tmp+dm[ibasis0*(nbasis+1)]*work_basis[ibasis0])*work_basis[ibasis0];
+void GB1DMGridDensityFn::compute_block_from_dm(double* work_basis, double* dm, long npoint, long nbasis, double* output, double* work) {
+    // work = basis . dm^T
+    cblas_dgemm(CblasRowMajor, CblasNoTrans, CblasTrans, npoint, nbasis, nbasis,
+                1.0, work_basis, nbasis, dm, nbasis, 0.0, work, nbasis);
+    for (long ipoint=0; ipoint<npoint; ipoint++) {
+        output[ipoint] += cblas_ddot(nbasis, work + ipoint*nbasis, 1,
+                                     work_basis + ipoint*nbasis, 1);
     }
-    *output += rho;
 }
 
-void GB1DMGridDensityFn::compute_fock_from_pot(double* pot, double* work_basis, long nbasis, double* output) {
-    for (long ibasis0=0; ibasis0<nbasis; ibasis0++) {
-        double tmp1 = (*pot)*work_basis[ibasis0];
-        for (long ibasis1=0; ibasis1<=ibasis0; ibasis1++) {
-            double tmp2 = tmp1*work_basis[ibasis1];
-            output[ibasis0*nbasis+ibasis1] += tmp2;
-            if (ibasis0 != ibasis1) output[ibasis1*nbasis+ibasis0] += tmp2;
+void GB1DMGridDensityFn::compute_fock_from_pot(double* pot, double* work_basis, long npoint, long nbasis, double* output, double* work) {
+    // work = diag(pot) . basis
+    for (long ipoint=0; ipoint<npoint; ipoint++) {
+        for (long ibasis=0; ibasis<nbasis; ibasis++) {
+            work[ipoint*nbasis+ibasis] = pot[ipoint]*work_basis[ipoint*nbasis+ibasis];
         }
     }
+    // output += basis^T . work
+    cblas_dgemm(CblasRowMajor, CblasTrans, CblasNoTrans, nbasis, nbasis, npoint,
+                1.0, work_basis, nbasis, work, nbasis, 1.0, output, nbasis);
 }
 
 
@@ -248,39 +230,103 @@ void GB1DMGridGradientFn::add(double coeff, double alpha0, const double* scales0
     } while (i1p.inc());
 }
 
-void GB1DMGridGradientFn::compute_point_from_dm(double* work_basis, double* dm, long nbasis, double* output, double epsilon, double* dmmaxrow) {
-    double rho_x = 0, rho_y = 0, rho_z = 0;
-    for (long ibasis0=0; ibasis0<nbasis; ibasis0++) {
-        double row = 0;
-        for (long ibasis1=0; ibasis1<nbasis; ibasis1++) {
-            row += work_basis[ibasis1*4]*dm[ibasis0*nbasis+ibasis1];
+void GB1DMGridGradientFn::compute_block_from_dm(double* work_basis, double* dm, long npoint, long nbasis, double* output, double* work) {
+    // work = basis . dm^T
+    cblas_dgemm(CblasRowMajor, CblasNoTrans, CblasTrans, npoint, nbasis, nbasis,
+                1.0, work_basis, nbasis, dm, nbasis, 0.0, work, nbasis);
+    for (long ipoint=0; ipoint<npoint; ipoint++) {
+        for (long i=0; i<3; i++) {
+            output[ipoint*3+i] += 2*cblas_ddot(nbasis, work + ipoint*nbasis, 1,
+                work_basis + ((i+1)*npoint + ipoint)*nbasis, 1);
+        }
+    }
+}
+
+void GB1DMGridGradientFn::compute_fock_from_pot(double* pot, double* work_basis, long npoint, long nbasis, double* output, double* work) {
+    // work = sum_i diag(pot_i) . basis_derivative_i
+    for (long ipoint=0; ipoint<npoint; ipoint++) {
+        for (long ibasis=0; ibasis<nbasis; ibasis++) {
+            work[ipoint*nbasis+ibasis] =
+                pot[ipoint*3  ]*work_basis[(  npoint + ipoint)*nbasis + ibasis] +
+                pot[ipoint*3+1]*work_basis[(2*npoint + ipoint)*nbasis + ibasis] +
+                pot[ipoint*3+2]*work_basis[(3*npoint + ipoint)*nbasis + ibasis];
+        }
+    }
+    // output += basis^T . work + work^T . basis
+    cblas_dgemm(CblasRowMajor, CblasTrans, CblasNoTrans, nbasis, nbasis, npoint,
+                1.0, work_basis, nbasis, work, nbasis, 1.0, output, nbasis);
+    cblas_dgemm(CblasRowMajor, CblasTrans, CblasNoTrans, nbasis, nbasis, npoint,
+                1.0, work, nbasis, work_basis, nbasis, 1.0, output, nbasis);
+}
+
+
+/*
+    GB1DMGridGGAFn
+*/
+
+void GB1DMGridGGAFn::compute_block_from_dm(double* work_basis, double* dm, long npoint, long nbasis, double* output, double* work) {
+    // work = basis . dm^T, also for the derivatives when tau is needed.
+    const long nrow = tau ? 4*npoint : npoint;
+    cblas_dgemm(CblasRowMajor, CblasNoTrans, CblasTrans, nrow, nbasis, nbasis,
+                1.0, work_basis, nbasis, dm, nbasis, 0.0, work, nbasis);
+    for (long ipoint=0; ipoint<npoint; ipoint++) {
+        double* row = output + ipoint*dim_output;
+        row[0] += cblas_ddot(nbasis, work + ipoint*nbasis, 1,
+                             work_basis + ipoint*nbasis, 1);
+        for (long i=1; i<4; i++) {
+            row[i] += 2*cblas_ddot(nbasis, work + ipoint*nbasis, 1,
+                work_basis + (i*npoint + ipoint)*nbasis, 1);
+        }
+        if (tau) {
+            double tmp = 0.0;
+            for (long i=1; i<4; i++) {
+                tmp += cblas_ddot(nbasis, work + (i*npoint + ipoint)*nbasis, 1,
+                                  work_basis + (i*npoint + ipoint)*nbasis, 1);
+            }
+            row[4] += 0.5*tmp;
         }
-        rho_x += row*work_basis[ibasis0*4+1];
-        rho_y += row*work_basis[ibasis0*4+2];
-        rho_z += row*work_basis[ibasis0*4+3];
     }
-    output[0] += 2*rho_x;
-    output[1] += 2*rho_y;
-    output[2] += 2*rho_z;
 }
 
-void GB1DMGridGradientFn::compute_fock_from_pot(double* pot, double* work_basis, long nbasis, double* output) {
-    for (long ibasis0=0; ibasis0<nbasis; ibasis0++) {
-        double tmp0 = work_basis[ibasis0*4];
-        double tmp1 = pot[0]*work_basis[ibasis0*4+1] +
-                      pot[1]*work_basis[ibasis0*4+2] +
-                      pot[2]*work_basis[ibasis0*4+3];
-        for (long ibasis1=0; ibasis1<=ibasis0; ibasis1++) {
-            double result = tmp0*(pot[0]*work_basis[ibasis1*4+1] +
-                                  pot[1]*work_basis[ibasis1*4+2] +
-                                  pot[2]*work_basis[ibasis1*4+3]) +
-                            tmp1*work_basis[ibasis1*4];
-            output[ibasis1*nbasis+ibasis0] += result;
-            if (ibasis1!=ibasis0) {
-                // Enforce symmetry
-                output[ibasis0*nbasis+ibasis1] += result;
+void GB1DMGridGGAFn::compute_fock_from_pot(double* pot, double* work_basis, long npoint, long nbasis, double* output, double* work) {
+    // work = sum_i diag(pot_i) . basis_derivative_i
+    for (long ipoint=0; ipoint<npoint; ipoint++) {
+        const double* row = pot + ipoint*dim_output;
+        for (long ibasis=0; ibasis<nbasis; ibasis++) {
+            work[ipoint*nbasis+ibasis] =
+                row[1]*work_basis[(  npoint + ipoint)*nbasis + ibasis] +
+                row[2]*work_basis[(2*npoint + ipoint)*nbasis + ibasis] +
+                row[3]*work_basis[(3*npoint + ipoint)*nbasis + ibasis];
+        }
+    }
+    // output += work^T . basis
+    cblas_dgemm(CblasRowMajor, CblasTrans, CblasNoTrans, nbasis, nbasis, npoint,
+                1.0, work, nbasis, work_basis, nbasis, 1.0, output, nbasis);
+    // work += diag(pot_0) . basis
+    for (long ipoint=0; ipoint<npoint; ipoint++) {
+        const double p0 = pot[ipoint*dim_output];
+        for (long ibasis=0; ibasis<nbasis; ibasis++) {
+            work[ipoint*nbasis+ibasis] += p0*work_basis[ipoint*nbasis+ibasis];
+        }
+    }
+    // output += basis^T . work
+    cblas_dgemm(CblasRowMajor, CblasTrans, CblasNoTrans, nbasis, nbasis, npoint,
+                1.0, work_basis, nbasis, work, nbasis, 1.0, output, nbasis);
+    if (tau) {
+        // work = 0.5 diag(pot_tau) . basis_derivatives, for all three Cartesian directions
+        for (long i=1; i<4; i++) {
+            for (long ipoint=0; ipoint<npoint; ipoint++) {
+                const double p4 = 0.5*pot[ipoint*dim_output + 4];
+                for (long ibasis=0; ibasis<nbasis; ibasis++) {
+                    work[(i*npoint + ipoint)*nbasis + ibasis] =
+                        p4*work_basis[(i*npoint + ipoint)*nbasis + ibasis];
+                }
             }
         }
+        // output += basis_derivatives^T . work
+        cblas_dgemm(CblasRowMajor, CblasTrans, CblasNoTrans, nbasis, nbasis, 3*npoint,
+                    1.0, work_basis + npoint*nbasis, nbasis, work + npoint*nbasis, nbasis,
+                    1.0, output, nbasis);
     }
 }
 
@@ -328,42 +374,33 @@ void GB1DMGridKineticFn::add(double coeff, double alpha0, const double* scales0)
     } while (i1p.inc());
 }
 
-void GB1DMGridKineticFn::compute_point_from_dm(double* work_basis, double* dm, long nbasis, double* output, double epsilon, double* dmmaxrow) {
-    double tau = 0.0;
-    for (long ibasis0=0; ibasis0<nbasis; ibasis0++) {
-        double tmp_x = 0;
-        double tmp_y = 0;
-        double tmp_z = 0;
-        for (long ibasis1=0; ibasis1<ibasis0; ibasis1++) {
-            tmp_x += work_basis[ibasis1*3  ]*dm[ibasis0*nbasis+ibasis1];
-            tmp_y += work_basis[ibasis1*3+1]*dm[ibasis0*nbasis+ibasis1];
-            tmp_z += work_basis[ibasis1*3+2]*dm[ibasis0*nbasis+ibasis1];
+void GB1DMGridKineticFn::compute_block_from_dm(double* work_basis, double* dm, long npoint, long nbasis, double* output, double* work) {
+    // work = basis_derivatives . dm^T, for all three Cartesian directions at once
+    cblas_dgemm(CblasRowMajor, CblasNoTrans, CblasTrans, 3*npoint, nbasis, nbasis,
+                1.0, work_basis, nbasis, dm, nbasis, 0.0, work, nbasis);
+    for (long ipoint=0; ipoint<npoint; ipoint++) {
+        double tau = 0.0;
+        for (long i=0; i<3; i++) {
+            tau += cblas_ddot(nbasis, work + (i*npoint + ipoint)*nbasis, 1,
+                              work_basis + (i*npoint + ipoint)*nbasis, 1);
         }
-        tmp_x += 0.5*work_basis[ibasis0*3  ]*dm[ibasis0*nbasis+ibasis0];
-        tmp_y += 0.5*work_basis[ibasis0*3+1]*dm[ibasis0*nbasis+ibasis0];
-        tmp_z += 0.5*work_basis[ibasis0*3+2]*dm[ibasis0*nbasis+ibasis0];
-        tau += tmp_x*work_basis[ibasis0*3  ] +
-               tmp_y*work_basis[ibasis0*3+1] +
-               tmp_z*work_basis[ibasis0*3+2];
+        output[ipoint] += 0.5*tau;
     }
-    *output += tau;
 }
 
-void GB1DMGridKineticFn::compute_fock_from_pot(double* pot, double* work_basis, long nbasis, double* output) {
-    for (long ibasis0=0; ibasis0<nbasis; ibasis0++) {
-        double tmp_x = 0.5*(*pot)*work_basis[ibasis0*3  ];
-        double tmp_y = 0.5*(*pot)*work_basis[ibasis0*3+1];
-        double tmp_z = 0.5*(*pot)*work_basis[ibasis0*3+2];
-        for (long ibasis1=0; ibasis1<=ibasis0; ibasis1++) {
-            double result = tmp_x*work_basis[ibasis1*3  ] +
-                            tmp_y*work_basis[ibasis1*3+1] +
-                            tmp_z*work_basis[ibasis1*3+2];
-            output[ibasis1*nbasis+ibasis0] += result;
-            if (ibasis0 != ibasis1) {
-                output[ibasis0*nbasis+ibasis1] += result;
+void GB1DMGridKineticFn::compute_fock_from_pot(double* pot, double* work_basis, long npoint, long nbasis, double* output, double* work) {
+    // work = 0.5 diag(pot) . basis_derivatives, for all three Cartesian directions
+    for (long i=0; i<3; i++) {
+        for (long ipoint=0; ipoint<npoint; ipoint++) {
+            for (long ibasis=0; ibasis<nbasis; ibasis++) {
+                work[(i*npoint + ipoint)*nbasis + ibasis] =
+                    0.5*pot[ipoint]*work_basis[(i*npoint + ipoint)*nbasis + ibasis];
             }
         }
     }
+    // output += basis_derivatives^T . work
+    cblas_dgemm(CblasRowMajor, CblasTrans, CblasNoTrans, nbasis, nbasis, 3*npoint,
+                1.0, work_basis, nbasis, work, nbasis, 1.0, output, nbasis);
 }
 
 
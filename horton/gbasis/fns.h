@@ -72,11 +72,24 @@ class GB1ExpGridOrbitalFn : public GB1ExpGridFn  {
 
 
 
+/**
+    @brief
+        Base class for functions of the density matrix on a grid.
+
+    The methods compute_block_from_dm and compute_fock_from_pot work on a block
+    of grid points at once. The argument work_basis then contains the
+    (components of the) basis functions in all points of the block, with
+    shape (dim_work, npoint, nbasis). The work argument is a scratch array
+    with the same size. The argument nbasis may be smaller than the size of
+    the basis set when negligible basis functions are left out. The arguments
+    dm and output of compute_fock_from_pot are then also reduced to the
+    retained basis functions.
+*/
 class GB1DMGridFn : public GB1GridFn  {
     public:
         GB1DMGridFn(long max_shell_type, long dim_work, long dim_output) : GB1GridFn(max_shell_type, dim_work, dim_output) {};
-        virtual void compute_point_from_dm(double* work_basis, double* dm, long nbasis, double* output, double epsilon, double* dmmaxrow) = 0;
-        virtual void compute_fock_from_pot(double* pot, double* work_basis, long nbasis, double* output) = 0;
+        virtual void compute_block_from_dm(double* work_basis, double* dm, long npoint, long nbasis, double* output, double* work) = 0;
+        virtual void compute_fock_from_pot(double* pot, double* work_basis, long npoint, long nbasis, double* output, double* work) = 0;
     };
 
 
@@ -89,18 +102,41 @@ class GB1DMGridDensityFn : public GB1DMGridFn  {
 
         virtual void reset(long _shell_type0, const double* _r0, const double* _point);
         virtual void add(double coeff, double alpha0, const double* scales0);
-        virtual void compute_point_from_dm(double* work_basis, double* dm, long nbasis, double* output, double epsilon, double* dmmaxrow);
-        virtual void compute_fock_from_pot(double* pot, double* work_basis, long nbasis, double* output);
+        virtual void compute_block_from_dm(double* work_basis, double* dm, long npoint, long nbasis, double* output, double* work);
+        virtual void compute_fock_from_pot(double* pot, double* work_basis, long npoint, long nbasis, double* output, double* work);
     };
 
 
 class GB1DMGridGradientFn : public GB1DMGridFn  {
+    protected:
+        GB1DMGridGradientFn(long max_shell_type, long dim_output): GB1DMGridFn(max_shell_type, 4, dim_output) {};
     public:
         GB1DMGridGradientFn(long max_shell_type): GB1DMGridFn(max_shell_type, 4, 3) {};
 
         virtual void add(double coeff, double alpha0, const double* scales0);
-        virtual void compute_point_from_dm(double* work_basis, double* dm, long nbasis, double* output, double epsilon, double* dmmaxrow);
-        virtual void compute_fock_from_pot(double* pot, double* work_basis, long nbasis, double* output);
+        virtual void compute_block_from_dm(double* work_basis, double* dm, long npoint, long nbasis, double* output, double* work);
+        virtual void compute_fock_from_pot(double* pot, double* work_basis, long npoint, long nbasis, double* output, double* work);
+    };
+
+
+/**
+    @brief
+        The density, its gradient and optionally the kinetic energy density.
+
+    All quantities are computed from a single evaluation of the basis functions
+    and their derivatives. The output in each grid point consists of the
+    density, the three components of the gradient and (when tau is true) the
+    kinetic energy density.
+*/
+class GB1DMGridGGAFn : public GB1DMGridGradientFn  {
+    private:
+        bool tau;
+    public:
+        GB1DMGridGGAFn(long max_shell_type, bool tau): GB1DMGridGradientFn(max_shell_type, tau ? 5 : 4), tau(tau) {};
+
+        bool get_tau() {return tau;};
+        virtual void compute_block_from_dm(double* work_basis, double* dm, long npoint, long nbasis, double* output, double* work);
+        virtual void compute_fock_from_pot(double* pot, double* work_basis, long npoint, long nbasis, double* output, double* work);
     };
 
 
@@ -109,8 +145,8 @@ class GB1DMGridKineticFn : public GB1DMGridFn  {
         GB1DMGridKineticFn(long max_shell_type): GB1DMGridFn(max_shell_type, 3, 1) {};
 
         virtual void add(double coeff, double alpha0, const double* scales0);
-        virtual void compute_point_from_dm(double* work_basis, double* dm, long nbasis, double* output, double epsilon, double* dmmaxrow);
-        virtual void compute_fock_from_pot(double* pot, double* work_basis, long nbasis, double* output);
+        virtual void compute_block_from_dm(double* work_basis, double* dm, long npoint, long nbasis, double* output, double* work);
+        virtual void compute_fock_from_pot(double* pot, double* work_basis, long npoint, long nbasis, double* output, double* work);
     };
 
 
@@ -43,6 +43,9 @@ cdef extern from "horton/gbasis/fns.h":
     cdef cppclass GB1DMGridKineticFn:
         GB1DMGridKineticFn(long max_shell_type) except +
 
+    cdef cppclass GB1DMGridGGAFn:
+        GB1DMGridGGAFn(long max_shell_type, bint tau) except +
+
     cdef cppclass GB2DMGridFn:
         long get_nwork()
         long get_max_shell_type()
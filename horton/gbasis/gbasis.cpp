@@ -23,6 +23,7 @@
 #ifdef DEBUG
 #include <cstdio>
 #endif
+#include <algorithm>
 #include <cmath>
 #include <cstdlib>
 #include <stdexcept>
@@ -31,8 +32,15 @@
 #include "horton/gbasis/gbasis.h"
 #include "horton/gbasis/common.h"
 #include "horton/gbasis/iter_gb.h"
+#include "horton/gbasis/screening.h"
 using std::abs;
 
+// The number of grid points for which the basis functions are evaluated at once.
+#define GRID_BLOCK_SIZE 128
+// Shells whose basis functions and first derivatives are certainly below this
+// threshold in all points of a block are skipped.
+#define GRID_SHELL_CUTOFF 1e-20
+
 /*
 
   Auxiliary routines
@@ -147,34 +155,266 @@ void GBasis::init_scales() {
     }
 }
 
-void GBasis::compute_two_index(double* output, GB2Integral* integral) {
-    IterGB2 iter = IterGB2(this);
-    iter.update_shell();
-    do {
-        integral->reset(iter.shell_type0, iter.shell_type1, iter.r0, iter.r1);
-        iter.update_prim();
-        do {
-            integral->add(iter.con_coeff, iter.alpha0, iter.alpha1, iter.scales0, iter.scales1);
-        } while (iter.inc_prim());
-        integral->cart_to_pure();
-        iter.store(integral->get_work(), output);
-    } while (iter.inc_shell());
+void GBasis::compute_two_index(double* output, GB2Integral* integral, long nthread) {
+    nthread = get_nthread(nthread);
+    // Every thread needs its own integral object because it has a work array.
+    GB2Integral** integrals = new GB2Integral*[nthread];
+    integrals[0] = integral;
+    for (long ithread=1; ithread<nthread; ithread++) {
+        integrals[ithread] = integral->clone();
+    }
+
+    // Every first shell is a task. The expensive ones come first for a better
+    // load balance. Different tasks never write to the same output elements.
+#pragma omp parallel num_threads(nthread)
+    {
+        GB2Integral* thread_integral = integrals[get_ithread()];
+        IterGB2 iter = IterGB2(this);
+#pragma omp for schedule(dynamic)
+        for (long ishell0=nshell-1; ishell0>=0; ishell0--) {
+            iter.set_shell0(ishell0);
+            do {
+                thread_integral->reset(iter.shell_type0, iter.shell_type1, iter.r0, iter.r1);
+                iter.update_prim();
+                do {
+                    thread_integral->add(iter.con_coeff, iter.alpha0, iter.alpha1, iter.scales0, iter.scales1);
+                } while (iter.inc_prim());
+                thread_integral->cart_to_pure();
+                iter.store(thread_integral->get_work(), output);
+            } while (iter.inc_shell1());
+        }
+    }
+
+    for (long ithread=1; ithread<nthread; ithread++) {
+        delete integrals[ithread];
+    }
+    delete[] integrals;
 }
 
-void GBasis::compute_four_index(double* output, GB4Integral* integral) {
-    IterGB4 iter = IterGB4(this);
-    iter.update_shell();
-    do {
-        integral->reset(iter.shell_type0, iter.shell_type1, iter.shell_type2, iter.shell_type3,
-                        iter.r0, iter.r1, iter.r2, iter.r3);
-        iter.update_prim();
-        do {
-            integral->add(iter.con_coeff, iter.alpha0, iter.alpha1, iter.alpha2, iter.alpha3,
-                          iter.scales0, iter.scales1, iter.scales2, iter.scales3);
-        } while (iter.inc_prim());
-        integral->cart_to_pure();
-        iter.store(integral->get_work(), output);
-    } while (iter.inc_shell());
+void GBasis::compute_four_index(double* output, GB4Integral* integral, GB4Screening* screening,
+                                long nthread, bool packed) {
+    // Screened shell quartets are not stored, so the output is cleared first.
+    if (screening != NULL) {
+        if (packed) {
+            const long npair = (nbasis*(nbasis + 1))/2;
+            memset(output, 0, ((npair*(npair + 1))/2)*sizeof(double));
+        } else {
+            memset(output, 0, nbasis*nbasis*nbasis*nbasis*sizeof(double));
+        }
+    }
+
+    nthread = get_nthread(nthread);
+    // Every thread needs its own integral object because it has a work array.
+    GB4Integral** integrals = new GB4Integral*[nthread];
+    integrals[0] = integral;
+    for (long ithread=1; ithread<nthread; ithread++) {
+        integrals[ithread] = integral->clone();
+    }
+
+    // Every pair of the first two shells is a task. The expensive ones come
+    // first for a better load balance. Different tasks never write to the same
+    // output elements.
+    const long npair = (nshell*(nshell + 1))/2;
+#pragma omp parallel num_threads(nthread)
+    {
+        GB4Integral* thread_integral = integrals[get_ithread()];
+        IterGB4 iter = IterGB4(this);
+#pragma omp for schedule(dynamic)
+        for (long ipair=npair-1; ipair>=0; ipair--) {
+            iter.set_shell_pair(ipair);
+            do {
+                if ((screening != NULL) &&
+                    screening->skip_shell(iter.ishell0, iter.ishell1, iter.ishell2, iter.ishell3)) {
+                    continue;
+                }
+                thread_integral->reset(iter.shell_type0, iter.shell_type1, iter.shell_type2, iter.shell_type3,
+                                       iter.r0, iter.r1, iter.r2, iter.r3);
+                iter.update_prim();
+                do {
+                    if ((screening != NULL) &&
+                        screening->skip_prim(iter.ishell0, iter.ishell1, iter.ishell2, iter.ishell3,
+                                             iter.iprim0, iter.iprim1, iter.iprim2, iter.iprim3)) {
+                        continue;
+                    }
+                    thread_integral->add(iter.con_coeff, iter.alpha0, iter.alpha1, iter.alpha2, iter.alpha3,
+                                         iter.scales0, iter.scales1, iter.scales2, iter.scales3);
+                } while (iter.inc_prim());
+                thread_integral->cart_to_pure();
+                if (packed) {
+                    iter.store_packed(thread_integral->get_work(), output);
+                } else {
+                    iter.store(thread_integral->get_work(), output);
+                }
+            } while (iter.inc_shell23());
+        }
+    }
+
+    for (long ithread=1; ithread<nthread; ithread++) {
+        delete integrals[ithread];
+    }
+    delete[] integrals;
+}
+
+void GBasis::compute_schwarz(double* output, GB4Integral* integral) {
+    // For every pair of shells, the square root of the largest diagonal
+    // element, sqrt(<aa|bb>) = sqrt((ab|ab)), is stored in output (nshell*nshell).
+    for (long ishell0=0; ishell0<nshell; ishell0++) {
+        const double* r0 = centers + 3*shell_map[ishell0];
+        const long n0 = get_shell_nbasis(shell_types[ishell0]);
+        for (long ishell1=0; ishell1<=ishell0; ishell1++) {
+            const double* r1 = centers + 3*shell_map[ishell1];
+            const long n1 = get_shell_nbasis(shell_types[ishell1]);
+            integral->reset(shell_types[ishell0], shell_types[ishell0],
+                            shell_types[ishell1], shell_types[ishell1],
+                            r0, r0, r1, r1);
+            for (long iprim0a=0; iprim0a<nprims[ishell0]; iprim0a++) {
+                const long jprim0a = prim_offsets[ishell0] + iprim0a;
+                for (long iprim0b=0; iprim0b<nprims[ishell0]; iprim0b++) {
+                    const long jprim0b = prim_offsets[ishell0] + iprim0b;
+                    for (long iprim1a=0; iprim1a<nprims[ishell1]; iprim1a++) {
+                        const long jprim1a = prim_offsets[ishell1] + iprim1a;
+                        for (long iprim1b=0; iprim1b<nprims[ishell1]; iprim1b++) {
+                            const long jprim1b = prim_offsets[ishell1] + iprim1b;
+                            integral->add(
+                                con_coeffs[jprim0a]*con_coeffs[jprim0b]*
+                                con_coeffs[jprim1a]*con_coeffs[jprim1b],
+                                alphas[jprim0a], alphas[jprim0b],
+                                alphas[jprim1a], alphas[jprim1b],
+                                get_scales(jprim0a), get_scales(jprim0b),
+                                get_scales(jprim1a), get_scales(jprim1b));
+                        }
+                    }
+                }
+            }
+            integral->cart_to_pure();
+            const double* work = integral->get_work();
+            double maxdiag = 0.0;
+            for (long i0=0; i0<n0; i0++) {
+                for (long i1=0; i1<n1; i1++) {
+                    const double diag = fabs(work[((i0*n0 + i0)*n1 + i1)*n1 + i1]);
+                    if (diag > maxdiag) maxdiag = diag;
+                }
+            }
+            output[ishell0*nshell + ishell1] = sqrt(maxdiag);
+            output[ishell1*nshell + ishell0] = sqrt(maxdiag);
+        }
+    }
+}
+
+void GBasis::compute_four_index_dm(double* dm, double* direct, double* exchange,
+                                   GB4Integral* integral, GB4Screening* screening,
+                                   long nthread) {
+    // The four-index object is never stored. Instead, the integrals of every
+    // shell quartet are contracted with the density matrix right away.
+    if (direct != NULL) memset(direct, 0, nbasis*nbasis*sizeof(double));
+    if (exchange != NULL) memset(exchange, 0, nbasis*nbasis*sizeof(double));
+
+    // Density-weighted screening needs the largest absolute density matrix
+    // element for every pair of shells.
+    double* dm_bounds = NULL;
+    if (screening != NULL) {
+        dm_bounds = new double[nshell*nshell];
+        memset(dm_bounds, 0, nshell*nshell*sizeof(double));
+        for (long ibasis0=0; ibasis0<nbasis; ibasis0++) {
+            const long ishell0 = shell_lookup[ibasis0];
+            for (long ibasis1=0; ibasis1<nbasis; ibasis1++) {
+                const long ishell1 = shell_lookup[ibasis1];
+                const double value = fabs(dm[ibasis0*nbasis + ibasis1]);
+                if (value > dm_bounds[ishell0*nshell + ishell1])
+                    dm_bounds[ishell0*nshell + ishell1] = value;
+            }
+        }
+    }
+
+    nthread = get_nthread(nthread);
+    // Every thread needs its own integral object because it has a work array.
+    // Also the results are accumulated in separate arrays for every thread,
+    // except for the first one, which writes directly to the output.
+    GB4Integral** integrals = new GB4Integral*[nthread];
+    double** directs = new double*[nthread];
+    double** exchanges = new double*[nthread];
+    integrals[0] = integral;
+    directs[0] = direct;
+    exchanges[0] = exchange;
+    for (long ithread=1; ithread<nthread; ithread++) {
+        integrals[ithread] = integral->clone();
+        directs[ithread] = NULL;
+        exchanges[ithread] = NULL;
+        if (direct != NULL) {
+            directs[ithread] = new double[nbasis*nbasis];
+            memset(directs[ithread], 0, nbasis*nbasis*sizeof(double));
+        }
+        if (exchange != NULL) {
+            exchanges[ithread] = new double[nbasis*nbasis];
+            memset(exchanges[ithread], 0, nbasis*nbasis*sizeof(double));
+        }
+    }
+
+    // Every pair of the first two shells is a task. The expensive ones come
+    // first for a better load balance.
+    const long npair = (nshell*(nshell + 1))/2;
+#pragma omp parallel num_threads(nthread)
+    {
+        const long ithread = get_ithread();
+        GB4Integral* thread_integral = integrals[ithread];
+        double* thread_direct = directs[ithread];
+        double* thread_exchange = exchanges[ithread];
+        IterGB4 iter = IterGB4(this);
+#pragma omp for schedule(dynamic)
+        for (long ipair=npair-1; ipair>=0; ipair--) {
+            iter.set_shell_pair(ipair);
+            do {
+                if (screening != NULL) {
+                    const long s0 = iter.ishell0*nshell;
+                    const long s1 = iter.ishell1*nshell;
+                    const long s2 = iter.ishell2*nshell;
+                    double dm_max = 0.0;
+                    if (direct != NULL) {
+                        dm_max = std::max(dm_max, dm_bounds[s0 + iter.ishell2]);
+                        dm_max = std::max(dm_max, dm_bounds[s1 + iter.ishell3]);
+                    }
+                    if (exchange != NULL) {
+                        dm_max = std::max(dm_max, dm_bounds[s0 + iter.ishell1]);
+                        dm_max = std::max(dm_max, dm_bounds[s0 + iter.ishell3]);
+                        dm_max = std::max(dm_max, dm_bounds[s1 + iter.ishell2]);
+                        dm_max = std::max(dm_max, dm_bounds[s2 + iter.ishell3]);
+                    }
+                    if (screening->skip_shell(iter.ishell0, iter.ishell1, iter.ishell2, iter.ishell3, dm_max)) {
+                        continue;
+                    }
+                }
+                thread_integral->reset(iter.shell_type0, iter.shell_type1, iter.shell_type2, iter.shell_type3,
+                                       iter.r0, iter.r1, iter.r2, iter.r3);
+                iter.update_prim();
+                do {
+                    if ((screening != NULL) &&
+                        screening->skip_prim(iter.ishell0, iter.ishell1, iter.ishell2, iter.ishell3,
+                                             iter.iprim0, iter.iprim1, iter.iprim2, iter.iprim3)) {
+                        continue;
+                    }
+                    thread_integral->add(iter.con_coeff, iter.alpha0, iter.alpha1, iter.alpha2, iter.alpha3,
+                                         iter.scales0, iter.scales1, iter.scales2, iter.scales3);
+                } while (iter.inc_prim());
+                thread_integral->cart_to_pure();
+                iter.contract_dm(thread_integral->get_work(), dm, thread_direct, thread_exchange);
+            } while (iter.inc_shell23());
+        }
+    }
+
+    // Reduction of the results of all threads.
+    for (long ithread=1; ithread<nthread; ithread++) {
+        for (long i=0; i<nbasis*nbasis; i++) {
+            if (direct != NULL) direct[i] += directs[ithread][i];
+            if (exchange != NULL) exchange[i] += exchanges[ithread][i];
+        }
+        delete integrals[ithread];
+        delete[] directs[ithread];
+        delete[] exchanges[ithread];
+    }
+    delete[] integrals;
+    delete[] directs;
+    delete[] exchanges;
+    delete[] dm_bounds;
 }
 
 void GBasis::compute_grid_point1(double* output, double* point, GB1GridFn* grid_fn) {
@@ -191,6 +431,99 @@ void GBasis::compute_grid_point1(double* output, double* point, GB1GridFn* grid_
     } while (iter.inc_shell());
 }
 
+void GBasis::compute_shell_extents(double* extents, double cutoff) {
+    // For every primitive, find the distance r beyond which the upper bound
+    //   |c| max(scales) (l + 1 + 2 alpha) (1 + r)^(l+1) exp(-alpha r^2)
+    // for the basis functions and their first derivatives drops below the
+    // cutoff divided by the number of primitives in the shell. The extent of
+    // the shell is the largest one of its primitives.
+    long oprim = 0;
+    for (long ishell=0; ishell<nshell; ishell++) {
+        const long l = abs(shell_types[ishell]);
+        const long ncart = get_shell_nbasis(l);
+        extents[ishell] = 0.0;
+        for (long iprim=0; iprim<nprims[ishell]; iprim++) {
+            const double alpha = alphas[oprim + iprim];
+            const double* scales = get_scales(oprim + iprim);
+            double max_scale = 0.0;
+            for (long icart=0; icart<ncart; icart++) {
+                max_scale = std::max(max_scale, scales[icart]);
+            }
+            const double log_pre = log(fabs(con_coeffs[oprim + iprim])*max_scale*
+                                       (l + 1 + 2*alpha)*nprims[ishell]/cutoff);
+            // Fixed-point iteration, starting from the width of the Gaussian.
+            double r = 1.0/sqrt(alpha);
+            for (long iter=0; iter<20; iter++) {
+                r = sqrt(std::max(0.0, log_pre + (l + 1)*log(1.0 + r))/alpha);
+            }
+            extents[ishell] = std::max(extents[ishell], r);
+        }
+        oprim += nprims[ishell];
+    }
+}
+
+long GBasis::compute_grid_block1(double* output, long npoint, double* points, GB1GridFn* grid_fn,
+                                 double* extents, long* basis_indexes) {
+    // Bounding box of the points.
+    double lower[3], upper[3];
+    for (long i=0; i<3; i++) {
+        lower[i] = points[i];
+        upper[i] = points[i];
+    }
+    for (long ipoint=1; ipoint<npoint; ipoint++) {
+        for (long i=0; i<3; i++) {
+            lower[i] = std::min(lower[i], points[3*ipoint+i]);
+            upper[i] = std::max(upper[i], points[3*ipoint+i]);
+        }
+    }
+
+    // Select the shells that are not negligible in the bounding box.
+    long nkeep = 0;
+    for (long ishell=0; ishell<nshell; ishell++) {
+        const double* r0 = centers + 3*shell_map[ishell];
+        double d2 = 0.0;
+        for (long i=0; i<3; i++) {
+            double delta = std::max(std::max(lower[i] - r0[i], r0[i] - upper[i]), 0.0);
+            d2 += delta*delta;
+        }
+        if (d2 > extents[ishell]*extents[ishell]) continue;
+        const long n0 = get_shell_nbasis(shell_types[ishell]);
+        for (long ibasis=0; ibasis<n0; ibasis++) {
+            basis_indexes[nkeep + ibasis] = basis_offsets[ishell] + ibasis;
+        }
+        nkeep += n0;
+    }
+
+    // Evaluate the selected basis functions in all points. The components of
+    // the work array of the grid function are stored in separate matrices.
+    const long dim_work = grid_fn->get_dim_work();
+    long ikeep = 0;
+    long oprim = 0;
+    for (long ishell=0; ishell<nshell; ishell++) {
+        const long n0 = get_shell_nbasis(shell_types[ishell]);
+        if ((ikeep < nkeep) && (basis_indexes[ikeep] == basis_offsets[ishell])) {
+            const double* r0 = centers + 3*shell_map[ishell];
+            for (long ipoint=0; ipoint<npoint; ipoint++) {
+                grid_fn->reset(shell_types[ishell], r0, points + 3*ipoint);
+                for (long iprim=0; iprim<nprims[ishell]; iprim++) {
+                    grid_fn->add(con_coeffs[oprim + iprim], alphas[oprim + iprim],
+                                 get_scales(oprim + iprim));
+                }
+                grid_fn->cart_to_pure();
+                const double* work = grid_fn->get_work();
+                for (long ibasis=0; ibasis<n0; ibasis++) {
+                    for (long i=0; i<dim_work; i++) {
+                        output[(i*npoint + ipoint)*nkeep + ikeep + ibasis] = work[ibasis*dim_work + i];
+                    }
+                }
+            }
+            ikeep += n0;
+        }
+        oprim += nprims[ishell];
+    }
+    return nkeep;
+}
+
 double GBasis::compute_grid_point2(double* dm, double* point, GB2DMGridFn* grid_fn) {
     double result = 0.0;
     IterGB2 iter = IterGB2(this);
@@ -219,24 +552,112 @@ const double GOBasis::normalization(const double alpha, const long* n) const {
     return gob_cart_normalization(alpha, n);
 }
 
-void GOBasis::compute_overlap(double* output) {
+void GOBasis::compute_overlap(double* output, long nthread) {
     GB2OverlapIntegral integral = GB2OverlapIntegral(get_max_shell_type());
-    compute_two_index(output, &integral);
+    compute_two_index(output, &integral, nthread);
 }
 
-void GOBasis::compute_kinetic(double* output) {
+void GOBasis::compute_kinetic(double* output, long nthread) {
     GB2KineticIntegral integral = GB2KineticIntegral(get_max_shell_type());
-    compute_two_index(output, &integral);
+    compute_two_index(output, &integral, nthread);
 }
 
-void GOBasis::compute_nuclear_attraction(double* charges, double* centers, long ncharge, double* output) {
+void GOBasis::compute_nuclear_attraction(double* charges, double* centers, long ncharge, double* output,
+                                         long nthread) {
     GB2NuclearAttractionIntegral integral = GB2NuclearAttractionIntegral(get_max_shell_type(), charges, centers, ncharge);
-    compute_two_index(output, &integral);
+    compute_two_index(output, &integral, nthread);
+}
+
+void GOBasis::compute_electron_repulsion(double* output, GB4Screening* screening, long nthread) {
+    GB4ElectronRepulsionIntegralLibInt integral = GB4ElectronRepulsionIntegralLibInt(get_max_shell_type());
+    compute_four_index(output, &integral, screening, nthread);
 }
 
-void GOBasis::compute_electron_repulsion(double* output) {
+void GOBasis::compute_electron_repulsion_packed(double* output, GB4Screening* screening, long nthread) {
     GB4ElectronRepulsionIntegralLibInt integral = GB4ElectronRepulsionIntegralLibInt(get_max_shell_type());
-    compute_four_index(output, &integral);
+    compute_four_index(output, &integral, screening, nthread, true);
+}
+
+void GOBasis::compute_electron_repulsion_dm(double* dm, double* direct, double* exchange, GB4Screening* screening,
+                                            long nthread) {
+    GB4ElectronRepulsionIntegralLibInt integral = GB4ElectronRepulsionIntegralLibInt(get_max_shell_type());
+    compute_four_index_dm(dm, direct, exchange, &integral, screening, nthread);
+}
+
+void GOBasis::compute_electron_repulsion_two_center(double* output, long nthread) {
+    GB2ElectronRepulsionIntegralLibInt integral = GB2ElectronRepulsionIntegralLibInt(get_max_shell_type());
+    compute_two_index(output, &integral, nthread);
+}
+
+void GOBasis::compute_electron_repulsion_three_center(GOBasis* auxbasis, double* output, long nthread) {
+    const long nbasis = get_nbasis();
+    const long naux = auxbasis->get_nbasis();
+    const long max_shell_type = std::max(get_max_shell_type(), auxbasis->get_max_shell_type());
+    nthread = get_nthread(nthread);
+    // Every thread needs its own integral object because it has a work array.
+    GB3ElectronRepulsionIntegralLibInt** integrals = new GB3ElectronRepulsionIntegralLibInt*[nthread];
+    for (long ithread=0; ithread<nthread; ithread++) {
+        integrals[ithread] = new GB3ElectronRepulsionIntegralLibInt(max_shell_type);
+    }
+
+    // Every first shell is a task. The expensive ones come first for a better
+    // load balance. Different tasks never write to the same output elements.
+#pragma omp parallel num_threads(nthread)
+    {
+        GB3ElectronRepulsionIntegralLibInt* integral = integrals[get_ithread()];
+#pragma omp for schedule(dynamic)
+        for (long ishell0=nshell-1; ishell0>=0; ishell0--) {
+            const long n0 = get_shell_nbasis(shell_types[ishell0]);
+            const long oprim0 = get_prim_offsets()[ishell0];
+            const double* r0 = centers + 3*shell_map[ishell0];
+            for (long ishell1=0; ishell1<=ishell0; ishell1++) {
+                const long n1 = get_shell_nbasis(shell_types[ishell1]);
+                const long oprim1 = get_prim_offsets()[ishell1];
+                const double* r1 = centers + 3*shell_map[ishell1];
+                for (long ishell2=0; ishell2<auxbasis->nshell; ishell2++) {
+                    const long n2 = get_shell_nbasis(auxbasis->shell_types[ishell2]);
+                    const long oprim2 = auxbasis->get_prim_offsets()[ishell2];
+                    const double* r2 = auxbasis->centers + 3*auxbasis->shell_map[ishell2];
+                    integral->reset(shell_types[ishell0], shell_types[ishell1],
+                                    auxbasis->shell_types[ishell2], r0, r1, r2);
+                    for (long iprim0=oprim0; iprim0<oprim0+nprims[ishell0]; iprim0++) {
+                        for (long iprim1=oprim1; iprim1<oprim1+nprims[ishell1]; iprim1++) {
+                            for (long iprim2=oprim2; iprim2<oprim2+auxbasis->nprims[ishell2]; iprim2++) {
+                                integral->add(
+                                    con_coeffs[iprim0]*con_coeffs[iprim1]*auxbasis->con_coeffs[iprim2],
+                                    alphas[iprim0], alphas[iprim1], auxbasis->alphas[iprim2],
+                                    get_scales(iprim0), get_scales(iprim1),
+                                    auxbasis->get_scales(iprim2));
+                            }
+                        }
+                    }
+                    integral->cart_to_pure();
+
+                    // Store the results in the output, with shape (nbasis,
+                    // nbasis, naux), using the symmetry in the first two
+                    // indexes.
+                    const double* work = integral->get_work();
+                    const long b0 = get_basis_offsets()[ishell0];
+                    const long b1 = get_basis_offsets()[ishell1];
+                    const long b2 = auxbasis->get_basis_offsets()[ishell2];
+                    for (long i0=0; i0<n0; i0++) {
+                        for (long i1=0; i1<n1; i1++) {
+                            for (long i2=0; i2<n2; i2++) {
+                                const double value = work[(i0*n1 + i1)*n2 + i2];
+                                output[((b0 + i0)*nbasis + b1 + i1)*naux + b2 + i2] = value;
+                                output[((b1 + i1)*nbasis + b0 + i0)*naux + b2 + i2] = value;
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+
+    for (long ithread=0; ithread<nthread; ithread++) {
+        delete integrals[ithread];
+    }
+    delete[] integrals;
 }
 
 void GOBasis::compute_grid1_exp(long nfn, double* coeffs, long npoint, double* points, long norb, long* iorbs, double* output) {
@@ -267,34 +688,123 @@ void GOBasis::compute_grid1_exp(long nfn, double* coeffs, long npoint, double* p
     delete[] work_basis;
 }
 
-void GOBasis::compute_grid1_dm(double* dm, long npoint, double* points, GB1DMGridFn* grid_fn, double* output, double epsilon, double* dmmaxrow) {
-    // The work array contains the basis functions evaluated at the grid point,
-    // and optionally some of its derivatives.
-    long nwork = get_nbasis()*grid_fn->get_dim_work();
-    long dim_output = grid_fn->get_dim_output();
-    double* work_basis = new double[nwork];
-
-    for (long ipoint=0; ipoint<npoint; ipoint++) {
-        // A) clear the basis functions.
-        memset(work_basis, 0, nwork*sizeof(double));
+void GOBasis::compute_grid1_dm(double* dm, long npoint, double* points, GB1DMGridFn* grid_fn, double* output, double epsilon) {
+    compute_grid1_dms(1, &dm, npoint, points, grid_fn, &output, epsilon);
+}
 
-        // B) evaluate the basis functions in the current point.
-        compute_grid_point1(work_basis, points, grid_fn);
-#ifdef DEBUG
-        for (int i=0; i<nwork; i++) printf("%f ", work_basis[i]);
-        printf("\n");
-#endif
+void GOBasis::compute_grid1_dms(long ndm, double** dms, long npoint, double* points, GB1DMGridFn* grid_fn, double** outputs, double epsilon) {
+    // The work array contains the basis functions evaluated at a block of grid
+    // points, and optionally some of their derivatives. Only the basis
+    // functions that are not negligible in the block are included. The basis
+    // functions are evaluated only once for all density matrices.
+    const long nbasis = get_nbasis();
+    const long dim_work = grid_fn->get_dim_work();
+    const long nwork = nbasis*dim_work*GRID_BLOCK_SIZE;
+    const long dim_output = grid_fn->get_dim_output();
+    double* work_basis = new double[nwork];
+    double* work_screen = new double[nwork];
+    double* work = new double[nwork];
+    double* extents = new double[nshell];
+    long* basis_indexes = new long[nbasis];
+    long* use_indexes = new long[nbasis];
+    double* basis_max = new double[nbasis];
+    double* dmmaxrows = new double[ndm*nbasis];
+    double* dm_keep = new double[nbasis*nbasis];
+    compute_shell_extents(extents, GRID_SHELL_CUTOFF);
+
+    // The largest absolute value in every row (and column) of the density
+    // matrices, used to screen basis functions when epsilon > 0.
+    if (epsilon > 0) {
+        for (long idm=0; idm<ndm; idm++) {
+            double* dmmaxrow = dmmaxrows + idm*nbasis;
+            for (long ibasis0=0; ibasis0<nbasis; ibasis0++) {
+                dmmaxrow[ibasis0] = 0.0;
+                for (long ibasis1=0; ibasis1<nbasis; ibasis1++) {
+                    dmmaxrow[ibasis0] = std::max(dmmaxrow[ibasis0], std::max(
+                        fabs(dms[idm][ibasis0*nbasis + ibasis1]),
+                        fabs(dms[idm][ibasis1*nbasis + ibasis0])));
+                }
+            }
+        }
+    }
 
-        // C) Use the basis function results and the density matrix to evaluate
-        // the function at the grid point. The result is added to the output.
-        grid_fn->compute_point_from_dm(work_basis, dm, get_nbasis(), output, epsilon, dmmaxrow);
+    for (long begin=0; begin<npoint; begin+=GRID_BLOCK_SIZE) {
+        const long npoint_block = std::min(npoint - begin, (long)GRID_BLOCK_SIZE);
+
+        // A) evaluate the basis functions in the current block of points.
+        const long nkeep = compute_grid_block1(work_basis, npoint_block, points + 3*begin,
+                                               grid_fn, extents, basis_indexes);
+        if (nkeep == 0) continue;
+
+        // The largest absolute value of every basis function (and its
+        // derivatives) in the block, and the sum of these maxima.
+        double basis_sum = 0.0;
+        if (epsilon > 0) {
+            for (long ikeep=0; ikeep<nkeep; ikeep++) {
+                basis_max[ikeep] = 0.0;
+            }
+            for (long irow=0; irow<dim_work*npoint_block; irow++) {
+                for (long ikeep=0; ikeep<nkeep; ikeep++) {
+                    basis_max[ikeep] = std::max(basis_max[ikeep], fabs(work_basis[irow*nkeep + ikeep]));
+                }
+            }
+            for (long ikeep=0; ikeep<nkeep; ikeep++) {
+                basis_sum += basis_max[ikeep];
+            }
+        }
 
-        // D) Prepare for next iteration
-        output += dim_output;
-        points += 3;
+        for (long idm=0; idm<ndm; idm++) {
+            // B) leave out the basis functions whose contribution is certainly
+            // negligible in the entire block. All terms with basis function i
+            // add at most 4*basis_max[i]*dmmaxrow[i]*basis_sum to any
+            // component of the output of the density, gradient, GGA or
+            // kinetic grid functions. The basis function is left out if this
+            // bound is below epsilon/nkeep, such that the total error on every
+            // output component remains below epsilon.
+            long nuse = 0;
+            for (long ikeep=0; ikeep<nkeep; ikeep++) {
+                if ((epsilon <= 0) ||
+                    (4*nkeep*basis_max[ikeep]*dmmaxrows[idm*nbasis + basis_indexes[ikeep]]*basis_sum >= epsilon)) {
+                    use_indexes[nuse] = ikeep;
+                    nuse++;
+                }
+            }
+            if (nuse == 0) continue;
+            double* block_basis = work_basis;
+            if (nuse < nkeep) {
+                for (long irow=0; irow<dim_work*npoint_block; irow++) {
+                    for (long iuse=0; iuse<nuse; iuse++) {
+                        work_screen[irow*nuse + iuse] = work_basis[irow*nkeep + use_indexes[iuse]];
+                    }
+                }
+                block_basis = work_screen;
+            }
+
+            // C) select the relevant part of the density matrix.
+            const double* dm = dms[idm];
+            for (long iuse0=0; iuse0<nuse; iuse0++) {
+                const long ibasis0 = basis_indexes[use_indexes[iuse0]];
+                for (long iuse1=0; iuse1<nuse; iuse1++) {
+                    dm_keep[iuse0*nuse + iuse1] = dm[ibasis0*nbasis + basis_indexes[use_indexes[iuse1]]];
+                }
+            }
+
+            // D) Use the basis function results and the density matrix to evaluate
+            // the function at the grid points. The result is added to the output.
+            grid_fn->compute_block_from_dm(block_basis, dm_keep, npoint_block, nuse,
+                                           outputs[idm] + begin*dim_output, work);
+        }
     }
 
     delete[] work_basis;
+    delete[] work_screen;
+    delete[] work;
+    delete[] extents;
+    delete[] basis_indexes;
+    delete[] use_indexes;
+    delete[] basis_max;
+    delete[] dmmaxrows;
+    delete[] dm_keep;
 }
 
 void GOBasis::compute_grid2_dm(double* dm, long npoint, double* points, double* output) {
@@ -311,32 +821,59 @@ void GOBasis::compute_grid2_dm(double* dm, long npoint, double* points, double*
 }
 
 void GOBasis::compute_grid1_fock(long npoint, double* points, double* weights, long pot_stride, double* pots, GB1DMGridFn* grid_fn, double* output) {
-    // The work array contains the basis functions evaluated at the grid point,
-    // and optionally some of its derivatives.
-    long nwork = get_nbasis()*grid_fn->get_dim_work();
-    double* work_basis = new double[nwork];
-    long dim_output = grid_fn->get_dim_output();
-    double* work_pot = new double[dim_output];
-
-    for (long ipoint=0; ipoint<npoint; ipoint++) {
-        // A) clear the work array.
-        memset(work_basis, 0, nwork*sizeof(double));
-
-        // B) evaluate the basis functions in the current point.
-        compute_grid_point1(work_basis, points, grid_fn);
+    compute_grid1_focks(1, npoint, points, weights, pot_stride, &pots, grid_fn, &output);
+}
 
-        // C) Add the contribution from this grid point to the operator
-        for (long i=dim_output-1; i>=0; i--) {
-            work_pot[i] = (*weights)*pots[i];
+void GOBasis::compute_grid1_focks(long nfock, long npoint, double* points, double* weights, long pot_stride, double** pots, GB1DMGridFn* grid_fn, double** outputs) {
+    // The work array contains the basis functions evaluated at a block of grid
+    // points, and optionally some of their derivatives. Only the basis
+    // functions that are not negligible in the block are included. The basis
+    // functions are evaluated only once for all potentials.
+    const long nbasis = get_nbasis();
+    const long nwork = nbasis*grid_fn->get_dim_work()*GRID_BLOCK_SIZE;
+    const long dim_output = grid_fn->get_dim_output();
+    double* work_basis = new double[nwork];
+    double* work = new double[nwork];
+    double* work_pot = new double[dim_output*GRID_BLOCK_SIZE];
+    double* extents = new double[nshell];
+    long* basis_indexes = new long[nbasis];
+    double* fock_keep = new double[nbasis*nbasis];
+    compute_shell_extents(extents, GRID_SHELL_CUTOFF);
+
+    for (long begin=0; begin<npoint; begin+=GRID_BLOCK_SIZE) {
+        const long npoint_block = std::min(npoint - begin, (long)GRID_BLOCK_SIZE);
+
+        // A) evaluate the basis functions in the current block of points.
+        const long nkeep = compute_grid_block1(work_basis, npoint_block, points + 3*begin,
+                                               grid_fn, extents, basis_indexes);
+        if (nkeep == 0) continue;
+
+        for (long ifock=0; ifock<nfock; ifock++) {
+            // B) Add the contribution from this block to the relevant part of
+            // the operator.
+            const double* pot = pots[ifock];
+            for (long ipoint=0; ipoint<npoint_block; ipoint++) {
+                for (long i=0; i<dim_output; i++) {
+                    work_pot[ipoint*dim_output + i] = weights[begin + ipoint]*pot[(begin + ipoint)*pot_stride + i];
+                }
+            }
+            memset(fock_keep, 0, nkeep*nkeep*sizeof(double));
+            grid_fn->compute_fock_from_pot(work_pot, work_basis, npoint_block, nkeep, fock_keep, work);
+
+            // C) Add the result to the output.
+            double* output = outputs[ifock];
+            for (long ikeep0=0; ikeep0<nkeep; ikeep0++) {
+                for (long ikeep1=0; ikeep1<nkeep; ikeep1++) {
+                    output[basis_indexes[ikeep0]*nbasis + basis_indexes[ikeep1]] += fock_keep[ikeep0*nkeep + ikeep1];
+                }
+            }
         }
-        grid_fn->compute_fock_from_pot(work_pot, work_basis, get_nbasis(), output);
-
-        // D) Prepare for next iteration
-        points += 3;
-        weights++;
-        pots += pot_stride;
     }
 
     delete[] work_basis;
+    delete[] work;
     delete[] work_pot;
+    delete[] extents;
+    delete[] basis_indexes;
+    delete[] fock_keep;
 }
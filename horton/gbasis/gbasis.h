@@ -27,6 +27,9 @@
 #include "horton/gbasis/fns.h"
 
 
+class GB4Screening;
+
+
 const double gob_cart_normalization(const double alpha, const long* n);
 const double gob_pure_normalization(const double alpha, const long l);
 
@@ -58,9 +61,17 @@ class GBasis {
         virtual ~GBasis();
         virtual const double normalization(const double alpha, const long* n) const =0;
         void init_scales();
-        void compute_two_index(double* output, GB2Integral* integral);
-        void compute_four_index(double* output, GB4Integral* integral);
+        void compute_two_index(double* output, GB2Integral* integral, long nthread);
+        void compute_four_index(double* output, GB4Integral* integral, GB4Screening* screening,
+                                long nthread, bool packed=false);
+        void compute_schwarz(double* output, GB4Integral* integral);
+        void compute_four_index_dm(double* dm, double* direct, double* exchange,
+                                   GB4Integral* integral, GB4Screening* screening,
+                                   long nthread);
         void compute_grid_point1(double* output, double* point, GB1GridFn* grid_fn);
+        void compute_shell_extents(double* extents, double cutoff);
+        long compute_grid_block1(double* output, long npoint, double* points, GB1GridFn* grid_fn,
+                                 double* extents, long* basis_indexes);
         double compute_grid_point2(double* dm, double* point, GB2DMGridFn* grid_fn);
 
         const long get_nbasis() const {return nbasis;};
@@ -81,14 +92,22 @@ class GOBasis : public GBasis {
                 const long ncenter, const long nshell, const long nprim_total);
         const double normalization(const double alpha, const long* n) const;
 
-        void compute_overlap(double* output);
-        void compute_kinetic(double* output);
-        void compute_nuclear_attraction(double* charges, double* centers, long ncharge, double* output);
-        void compute_electron_repulsion(double* output);
+        void compute_overlap(double* output, long nthread);
+        void compute_kinetic(double* output, long nthread);
+        void compute_nuclear_attraction(double* charges, double* centers, long ncharge, double* output,
+                                        long nthread);
+        void compute_electron_repulsion(double* output, GB4Screening* screening, long nthread);
+        void compute_electron_repulsion_packed(double* output, GB4Screening* screening, long nthread);
+        void compute_electron_repulsion_dm(double* dm, double* direct, double* exchange, GB4Screening* screening,
+                                           long nthread);
+        void compute_electron_repulsion_two_center(double* output, long nthread);
+        void compute_electron_repulsion_three_center(GOBasis* auxbasis, double* output, long nthread);
         void compute_grid1_exp(long nfn, double* coeffs, long npoint, double* points, long norb, long* iorbs, double* output);
-        void compute_grid1_dm(double* dm, long npoint, double* points, GB1DMGridFn* grid_fn, double* output, double epsilon, double* dmmaxrow);
+        void compute_grid1_dm(double* dm, long npoint, double* points, GB1DMGridFn* grid_fn, double* output, double epsilon=0);
+        void compute_grid1_dms(long ndm, double** dms, long npoint, double* points, GB1DMGridFn* grid_fn, double** outputs, double epsilon=0);
         void compute_grid2_dm(double* dm, long npoint, double* points, double* output);
         void compute_grid1_fock(long npoint, double* points, double* weights, long pot_stride, double* pots, GB1DMGridFn* grid_fn, double* output);
+        void compute_grid1_focks(long nfock, long npoint, double* points, double* weights, long pot_stride, double** pots, GB1DMGridFn* grid_fn, double** outputs);
     };
 
 #endif
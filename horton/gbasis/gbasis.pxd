@@ -21,6 +21,7 @@
 
 
 cimport fns
+cimport screening
 
 cdef extern from "horton/gbasis/gbasis.h":
     double gob_cart_normalization(double alpha, long* n)
@@ -53,11 +54,17 @@ cdef extern from "horton/gbasis/gbasis.h":
                 long* shell_types, double* alphas, double* con_coeffs,
                 long ncenter, long nshell, long nprim_total) except +
 
-        void compute_overlap(double* output)
-        void compute_kinetic(double* output)
-        void compute_nuclear_attraction(double* charges, double* centers, long ncharge, double* output)
-        void compute_electron_repulsion(double* output)
+        void compute_overlap(double* output, long nthread)
+        void compute_kinetic(double* output, long nthread)
+        void compute_nuclear_attraction(double* charges, double* centers, long ncharge, double* output, long nthread)
+        void compute_electron_repulsion(double* output, screening.GB4Screening* screening, long nthread)
+        void compute_electron_repulsion_packed(double* output, screening.GB4Screening* screening, long nthread)
+        void compute_electron_repulsion_dm(double* dm, double* direct, double* exchange, screening.GB4Screening* screening, long nthread)
+        void compute_electron_repulsion_two_center(double* output, long nthread)
+        void compute_electron_repulsion_three_center(GOBasis* auxbasis, double* output, long nthread)
         void compute_grid1_exp(long nfn, double* coeffs, long npoint, double* points, long norb, long* iorbs, double* output)
-        void compute_grid1_dm(double* dm, long npoint, double* points, fns.GB1DMGridFn* grid_fn, double* output, double epsilon, double* dmmaxrow)
+        void compute_grid1_dm(double* dm, long npoint, double* points, fns.GB1DMGridFn* grid_fn, double* output, double epsilon)
+        void compute_grid1_dms(long ndm, double** dms, long npoint, double* points, fns.GB1DMGridFn* grid_fn, double** outputs, double epsilon)
         void compute_grid2_dm(double* dm, long npoint, double* points, double* output)
         void compute_grid1_fock(long npoint, double* points, double* weights, long pot_stride, double* pots, fns.GB1DMGridFn* grid_fn, double* output)
+        void compute_grid1_focks(long nfock, long npoint, double* points, double* weights, long pot_stride, double** pots, fns.GB1DMGridFn* grid_fn, double** outputs)
@@ -19,12 +19,20 @@
 //--
 
 
+#include <cstring>
 #include "horton/gbasis/gbw.h"
 #include "horton/gbasis/common.h"
 
-GB4IntegralWrapper::GB4IntegralWrapper(GOBasis* gobasis, GB4Integral* gb4int) :
-    gobasis(gobasis), gb4int(gb4int)
+GB4IntegralWrapper::GB4IntegralWrapper(GOBasis* gobasis, GB4Integral* gb4int,
+                                       GB4Screening* screening, long nthread) :
+    gobasis(gobasis), screening(screening), nthread(get_nthread(nthread))
 {
+  // Every thread needs its own integral object because it has a work array.
+  gb4ints = new GB4Integral*[this->nthread];
+  gb4ints[0] = gb4int;
+  for (long ithread = 1; ithread < this->nthread; ithread++) {
+    gb4ints[ithread] = gb4int->clone();
+  }
   max_shell_size = get_shell_nbasis(gobasis->get_max_shell_type());
   slice_size = gobasis->get_nbasis()*gobasis->get_nbasis();
   /*
@@ -37,13 +45,18 @@ GB4IntegralWrapper::GB4IntegralWrapper(GOBasis* gobasis, GB4Integral* gb4int) :
 }
 
 GB4IntegralWrapper::~GB4IntegralWrapper() {
+  for (long ithread = 1; ithread < nthread; ithread++) {
+    delete gb4ints[ithread];
+  }
+  delete[] gb4ints;
   delete[] integrals;
 }
 
-void GB4IntegralWrapper::compute_shell(long ishell1, long ishell3)
+void GB4IntegralWrapper::compute_shell(long ishell0, long ishell1, long ishell2, long ishell3,
+                                       GB4Integral* gb4int, bool screen)
 {
   // Configure the four-center integral with the right input for this
-  // quadruple of shells. (index0 and index2 are fixed.)
+  // quadruple of shells.
   gb4int->reset(gobasis->shell_types[ishell0], gobasis->shell_types[ishell1],
                 gobasis->shell_types[ishell2], gobasis->shell_types[ishell3],
                 gobasis->centers + gobasis->shell_map[ishell0]*3, gobasis->centers + gobasis->shell_map[ishell1]*3,
@@ -54,6 +67,11 @@ void GB4IntegralWrapper::compute_shell(long ishell1, long ishell3)
     for (long iprim1 = 0; iprim1 < gobasis->nprims[ishell1]; iprim1++) {
       for (long iprim2 = 0; iprim2 < gobasis->nprims[ishell2]; iprim2++) {
         for (long iprim3 = 0; iprim3 < gobasis->nprims[ishell3]; iprim3++) {
+          if (screen &&
+              screening->skip_prim(ishell0, ishell1, ishell2, ishell3,
+                                   iprim0, iprim1, iprim2, iprim3)) {
+            continue;
+          }
           gb4int->add(gobasis->con_coeffs[gobasis->get_prim_offsets()[ishell0] + iprim0]*
                       gobasis->con_coeffs[gobasis->get_prim_offsets()[ishell1] + iprim1]*
                       gobasis->con_coeffs[gobasis->get_prim_offsets()[ishell2] + iprim2]*
@@ -91,28 +109,43 @@ void GB4IntegralWrapper::select_2index(long index0, long index2,
 }
 
 void GB4IntegralWrapper::compute() {
+  // Screened shell quartets are not computed, so the slices are cleared first.
+  if (screening != NULL) {
+    memset(integrals, 0, max_shell_size*max_shell_size*slice_size*sizeof(double));
+  }
   // Double loop over second and fourth shell of the four-index object. The
   // entire range over these two indexes is included in the 2-index slices.
-  for (long ishell1 = 0; ishell1 < gobasis->nshell; ishell1++) {
-    for (long ishell3 = 0; ishell3 < gobasis->nshell; ishell3++) {
-      // Compute integrals for the given combination of shells.
-      compute_shell(ishell1, ishell3);
+  // Every second shell is a task for the dynamic scheduler. Different tasks
+  // never write to the same elements of ``integrals``.
+#pragma omp parallel num_threads(nthread)
+  {
+    GB4Integral* gb4int = gb4ints[get_ithread()];
+#pragma omp for schedule(dynamic)
+    for (long ishell1 = 0; ishell1 < gobasis->nshell; ishell1++) {
+      for (long ishell3 = 0; ishell3 < gobasis->nshell; ishell3++) {
+        if ((screening != NULL) &&
+            screening->skip_shell(ishell0, ishell1, ishell2, ishell3)) {
+          continue;
+        }
+        // Compute integrals for the given combination of shells.
+        compute_shell(ishell0, ishell1, ishell2, ishell3, gb4int, screening != NULL);
 
-      // Copy data from work array to ``integrals``, the temporary storage of
-      // this wrapper.
-      const double* tmp = gb4int->get_work();
-      const long n0 = get_shell_nbasis(gobasis->shell_types[ishell0]);
-      const long n1 = get_shell_nbasis(gobasis->shell_types[ishell1]);
-      const long n2 = get_shell_nbasis(gobasis->shell_types[ishell2]);
-      const long n3 = get_shell_nbasis(gobasis->shell_types[ishell3]);
-      for (long i0=0; i0<n0; i0++) {
-        for (long i1=0; i1<n1; i1++) {
-          for (long i2=0; i2<n2; i2++) {
-            for (long i3=0; i3<n3; i3++) {
-              integrals[((i0)*max_shell_size + i2)*slice_size +
-                        (i1+gobasis->get_basis_offsets()[ishell1])*gobasis->get_nbasis() +
-                        (i3+gobasis->get_basis_offsets()[ishell3])] = *tmp;
-              tmp++;
+        // Copy data from work array to ``integrals``, the temporary storage of
+        // this wrapper.
+        const double* tmp = gb4int->get_work();
+        const long n0 = get_shell_nbasis(gobasis->shell_types[ishell0]);
+        const long n1 = get_shell_nbasis(gobasis->shell_types[ishell1]);
+        const long n2 = get_shell_nbasis(gobasis->shell_types[ishell2]);
+        const long n3 = get_shell_nbasis(gobasis->shell_types[ishell3]);
+        for (long i0=0; i0<n0; i0++) {
+          for (long i1=0; i1<n1; i1++) {
+            for (long i2=0; i2<n2; i2++) {
+              for (long i3=0; i3<n3; i3++) {
+                integrals[((i0)*max_shell_size + i2)*slice_size +
+                          (i1+gobasis->get_basis_offsets()[ishell1])*gobasis->get_nbasis() +
+                          (i3+gobasis->get_basis_offsets()[ishell3])] = *tmp;
+                tmp++;
+              }
             }
           }
         }
@@ -124,21 +157,25 @@ void GB4IntegralWrapper::compute() {
 void GB4IntegralWrapper::compute_diagonal(double* diagonal) {
   // Double loop over second and fourth shell of the four-index object. The
   // entire range over these two indexes is included in the 2-index slices.
-  for (long ishell1 = 0; ishell1 < gobasis->nshell; ishell1++) {
-    for (long ishell3 = 0; ishell3 < gobasis->nshell; ishell3++) {
-      // Compute integrals for the given combination of shells.
-      ishell0 = ishell1;
-      ishell2 = ishell3;
-      compute_shell(ishell1, ishell3);
+  // Every second shell is a task for the dynamic scheduler.
+#pragma omp parallel num_threads(nthread)
+  {
+    GB4Integral* gb4int = gb4ints[get_ithread()];
+#pragma omp for schedule(dynamic)
+    for (long ishell1 = 0; ishell1 < gobasis->nshell; ishell1++) {
+      for (long ishell3 = 0; ishell3 < gobasis->nshell; ishell3++) {
+        // Compute integrals for the given combination of shells.
+        compute_shell(ishell1, ishell1, ishell3, ishell3, gb4int, false);
 
-      // copy data from work array to the output array.
-      const double* tmp = gb4int->get_work();
-      const long n1 = get_shell_nbasis(gobasis->shell_types[ishell1]);
-      const long n3 = get_shell_nbasis(gobasis->shell_types[ishell3]);
-      for (long i1=0; i1<n1; i1++) {
-        for (long i3=0; i3<n3; i3++) {
-          diagonal[(i1+gobasis->get_basis_offsets()[ishell1])*gobasis->get_nbasis() +
-                   (i3+gobasis->get_basis_offsets()[ishell3])] = tmp[(n1*i1+i1)*n3*n3 + n3*i3+i3];
+        // copy data from work array to the output array.
+        const double* tmp = gb4int->get_work();
+        const long n1 = get_shell_nbasis(gobasis->shell_types[ishell1]);
+        const long n3 = get_shell_nbasis(gobasis->shell_types[ishell3]);
+        for (long i1=0; i1<n1; i1++) {
+          for (long i3=0; i3<n3; i3++) {
+            diagonal[(i1+gobasis->get_basis_offsets()[ishell1])*gobasis->get_nbasis() +
+                     (i3+gobasis->get_basis_offsets()[ishell3])] = tmp[(n1*i1+i1)*n3*n3 + n3*i3+i3];
+          }
         }
       }
     }
@@ -25,6 +25,7 @@
 
 #include "horton/gbasis/gbasis.h"
 #include "horton/gbasis/ints.h"
+#include "horton/gbasis/screening.h"
 
 /**
     @brief
@@ -34,7 +35,9 @@
 class GB4IntegralWrapper {
     private:
         GOBasis* gobasis;
-        GB4Integral* gb4int;
+        GB4Screening* screening;
+        long nthread;
+        GB4Integral** gb4ints; // one integral object (with work array) per thread
         long max_shell_size;
         long slice_size;
         double* integrals;
@@ -47,9 +50,11 @@ class GB4IntegralWrapper {
         /**
             @brief
                 Compute four-center integrals for a quadruplet of shells
-                (defined by ishell0, ishell1, ishell2 and ishell3).
+                with the given integral object. Negligible primitive quartets
+                are skipped when screen is true.
         */
-        void compute_shell(long ishell1, long ishell3);
+        void compute_shell(long ishell0, long ishell1, long ishell2, long ishell3,
+                           GB4Integral* gb4int, bool screen);
     public:
         /**
             @brief
@@ -61,8 +66,19 @@ class GB4IntegralWrapper {
 
             @param gb4int
                 A definition/implementation of a four-center integral.
+
+            @param screening
+                When not NULL, shell and primitive quartets that are
+                negligible according to this screening object are skipped in
+                the compute method.
+
+            @param nthread
+                The number of threads used in the compute and compute_diagonal
+                methods. Non-positive values select the default number of
+                OpenMP threads.
         */
-        GB4IntegralWrapper(GOBasis* gobasis, GB4Integral* gb4int);
+        GB4IntegralWrapper(GOBasis* gobasis, GB4Integral* gb4int,
+                           GB4Screening* screening, long nthread);
         ~GB4IntegralWrapper();
 
         /**
@@ -20,10 +20,12 @@
 #--
 cimport gbasis
 cimport ints
+cimport screening
 
 cdef extern from "horton/gbasis/gbw.h":
     cdef cppclass GB4IntegralWrapper:
-        GB4IntegralWrapper(gbasis.GOBasis* gobasis, ints.GB4Integral* gb4int)
+        GB4IntegralWrapper(gbasis.GOBasis* gobasis, ints.GB4Integral* gb4int,
+                           screening.GB4Screening* screening, long nthread)
         long get_nbasis()
         void select_2index(long index0, long index2,
                             long* pbegin0, long* pend0,
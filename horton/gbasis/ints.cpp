@@ -293,9 +293,12 @@ void GB4Integral::reset(long _shell_type0, long _shell_type1, long _shell_type2,
     r2 = _r2;
     r3 = _r3;
     // We make use of the fact that a floating point zero consists of
-    // consecutive zero bytes.
-    memset(work_cart, 0, nwork*sizeof(double));
-    memset(work_pure, 0, nwork*sizeof(double));
+    // consecutive zero bytes. Only the part of the work arrays that is used
+    // for this shell quartet is cleared.
+    const long ncart = get_shell_nbasis(abs(shell_type0))*get_shell_nbasis(abs(shell_type1))*
+                       get_shell_nbasis(abs(shell_type2))*get_shell_nbasis(abs(shell_type3));
+    memset(work_cart, 0, ncart*sizeof(double));
+    memset(work_pure, 0, ncart*sizeof(double));
 }
 
 void GB4Integral::cart_to_pure() {
@@ -794,3 +797,71 @@ end_boys:
         }
     }
 }
+
+
+/*
+
+   GB2ElectronRepulsionIntegralLibInt
+
+*/
+
+
+void GB2ElectronRepulsionIntegralLibInt::add(double coeff, double alpha0, double alpha1, const double* scales0, const double* scales1) {
+    // (P|Q) = <P Q|1 1>, where 1 is a constant at the center of P or Q.
+    const double unit_scale = 1.0;
+    eri4.reset(abs(shell_type0), abs(shell_type1), 0, 0, r0, r1, r0, r1);
+    eri4.add(coeff, alpha0, alpha1, 0.0, 0.0, scales0, scales1, &unit_scale, &unit_scale);
+    const double* work = eri4.get_work();
+    const long ncart = get_shell_nbasis(abs(shell_type0))*get_shell_nbasis(abs(shell_type1));
+    for (long i=0; i<ncart; i++) {
+        work_cart[i] += work[i];
+    }
+}
+
+
+/*
+
+   GB3ElectronRepulsionIntegralLibInt
+
+*/
+
+
+GB3ElectronRepulsionIntegralLibInt::GB3ElectronRepulsionIntegralLibInt(long max_shell_type) :
+    GBCalculator(max_shell_type), eri4(max_shell_type) {
+    nwork = max_nbasis*max_nbasis*max_nbasis;
+    work_cart = new double[nwork];
+    work_pure = new double[nwork];
+}
+
+void GB3ElectronRepulsionIntegralLibInt::reset(long _shell_type0, long _shell_type1, long _shell_type2,
+                                               const double* r0, const double* r1, const double* r2) {
+    shell_type0 = _shell_type0;
+    shell_type1 = _shell_type1;
+    shell_type2 = _shell_type2;
+    // (ab|P) = <a P|b 1>, where 1 is a constant at the center of P. The
+    // results are accumulated in the work array of eri4 with shape
+    // (nbasis0, nbasis2, nbasis1).
+    eri4.reset(shell_type0, shell_type2, shell_type1, 0, r0, r2, r1, r2);
+}
+
+void GB3ElectronRepulsionIntegralLibInt::add(double coeff, double alpha0, double alpha1, double alpha2,
+                                             const double* scales0, const double* scales1, const double* scales2) {
+    const double unit_scale = 1.0;
+    eri4.add(coeff, alpha0, alpha2, alpha1, 0.0, scales0, scales2, scales1, &unit_scale);
+}
+
+void GB3ElectronRepulsionIntegralLibInt::cart_to_pure() {
+    eri4.cart_to_pure();
+    // Reorder the indexes to (nbasis0, nbasis1, nbasis2).
+    const double* work = eri4.get_work();
+    const long n0 = get_shell_nbasis(shell_type0);
+    const long n1 = get_shell_nbasis(shell_type1);
+    const long n2 = get_shell_nbasis(shell_type2);
+    for (long i0=0; i0<n0; i0++) {
+        for (long i2=0; i2<n2; i2++) {
+            for (long i1=0; i1<n1; i1++) {
+                work_cart[(i0*n1 + i1)*n2 + i2] = work[(i0*n2 + i2)*n1 + i1];
+            }
+        }
+    }
+}
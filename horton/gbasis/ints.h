@@ -37,6 +37,7 @@ class GB2Integral : public GBCalculator {
         GB2Integral(long max_shell_type);
         void reset(long shell_type0, long shell_type1, const double* r0, const double* r1);
         virtual void add(double coeff, double alpha0, double alpha1, const double* scales0, const double* scales1) = 0;
+        virtual GB2Integral* clone() const = 0;
         void cart_to_pure();
         const long get_shell_type0() const {return shell_type0;};
         const long get_shell_type1() const {return shell_type1;};
@@ -47,6 +48,7 @@ class GB2OverlapIntegral: public GB2Integral {
     public:
         GB2OverlapIntegral(long max_shell_type) : GB2Integral(max_shell_type) {};
         virtual void add(double coeff, double alpha0, double alpha1, const double* scales0, const double* scales1);
+        virtual GB2Integral* clone() const {return new GB2OverlapIntegral(max_shell_type);};
     };
 
 
@@ -54,6 +56,7 @@ class GB2KineticIntegral: public GB2Integral {
     public:
         GB2KineticIntegral(long max_shell_type) : GB2Integral(max_shell_type) {};
         virtual void add(double coeff, double alpha0, double alpha1, const double* scales0, const double* scales1);
+        virtual GB2Integral* clone() const {return new GB2KineticIntegral(max_shell_type);};
     };
 
 
@@ -71,6 +74,7 @@ class GB2NuclearAttractionIntegral: public GB2Integral {
         GB2NuclearAttractionIntegral(long max_shell_type, double* charges, double* centers, long ncharge);
         ~GB2NuclearAttractionIntegral();
         virtual void add(double coeff, double alpha0, double alpha1, const double* scales0, const double* scales1);
+        virtual GB2Integral* clone() const {return new GB2NuclearAttractionIntegral(max_shell_type, charges, centers, ncharge);};
     };
 
 
@@ -82,6 +86,7 @@ class GB4Integral : public GBCalculator {
         GB4Integral(long max_shell_type);
         virtual void reset(long shell_type0, long shell_type1, long shell_type2, long shell_type3, const double* r0, const double* r1, const double* r2, const double* r3);
         virtual void add(double coeff, double alpha0, double alpha1, double alpha2, double alpha3, const double* scales0, const double* scales1, const double* scales2, const double* scales3) = 0;
+        virtual GB4Integral* clone() const = 0;
         void cart_to_pure();
 
         const long get_shell_type0() const {return shell_type0;};
@@ -109,6 +114,52 @@ class GB4ElectronRepulsionIntegralLibInt : public GB4Integral {
         ~GB4ElectronRepulsionIntegralLibInt();
         virtual void reset(long shell_type0, long shell_type1, long shell_type2, long shell_type3, const double* r0, const double* r1, const double* r2, const double* r3);
         virtual void add(double coeff, double alpha0, double alpha1, double alpha2, double alpha3, const double* scales0, const double* scales1, const double* scales2, const double* scales3);
+        virtual GB4Integral* clone() const {return new GB4ElectronRepulsionIntegralLibInt(max_shell_type);};
+    };
+
+
+/**
+    @brief
+        Two-center electron repulsion integrals (P|Q), e.g. for density fitting.
+
+    These are computed with LibInt as four-center integrals in which the
+    missing functions are s-type functions with a zero exponent, i.e.
+    constants.
+*/
+class GB2ElectronRepulsionIntegralLibInt: public GB2Integral {
+    private:
+        GB4ElectronRepulsionIntegralLibInt eri4;
+    public:
+        GB2ElectronRepulsionIntegralLibInt(long max_shell_type) : GB2Integral(max_shell_type), eri4(max_shell_type) {};
+        virtual void add(double coeff, double alpha0, double alpha1, const double* scales0, const double* scales1);
+        virtual GB2Integral* clone() const {return new GB2ElectronRepulsionIntegralLibInt(max_shell_type);};
+    };
+
+
+/**
+    @brief
+        Three-center electron repulsion integrals (ab|P), e.g. for density
+        fitting.
+
+    The results are stored with shape (nbasis0, nbasis1, nbasis2), where the
+    first two indexes refer to the charge distribution ab and the last index
+    to the (auxiliary) function P. See GB2ElectronRepulsionIntegralLibInt for
+    the implementation with LibInt.
+*/
+class GB3ElectronRepulsionIntegralLibInt : public GBCalculator {
+    private:
+        long shell_type0, shell_type1, shell_type2;
+        GB4ElectronRepulsionIntegralLibInt eri4;
+    public:
+        GB3ElectronRepulsionIntegralLibInt(long max_shell_type);
+        void reset(long shell_type0, long shell_type1, long shell_type2, const double* r0, const double* r1, const double* r2);
+        void add(double coeff, double alpha0, double alpha1, double alpha2, const double* scales0, const double* scales1, const double* scales2);
+        void cart_to_pure();
+        GB3ElectronRepulsionIntegralLibInt* clone() const {return new GB3ElectronRepulsionIntegralLibInt(max_shell_type);};
+
+        const long get_shell_type0() const {return shell_type0;};
+        const long get_shell_type1() const {return shell_type1;};
+        const long get_shell_type2() const {return shell_type2;};
     };
 
 
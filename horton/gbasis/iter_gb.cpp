@@ -19,6 +19,7 @@
 //--
 
 
+#include <cmath>
 #include <cstdlib>
 #include <cstring>
 #include "horton/gbasis/common.h"
@@ -146,6 +147,31 @@ int IterGB2::inc_shell() {
 }
 
 
+void IterGB2::set_shell0(long ishell0) {
+    // Jump to the first shell pair with the given first shell. Together with
+    // inc_shell1, this allows one to split the loop over all shell pairs in
+    // independent tasks.
+    this->ishell0 = ishell0;
+    ishell1 = 0;
+    oprim0 = gbasis->get_prim_offsets()[ishell0];
+    oprim1 = 0;
+    update_shell();
+}
+
+
+int IterGB2::inc_shell1() {
+    // Increment the second shell, without changing the first one.
+    if (ishell1 < ishell0) {
+        ishell1++;
+        oprim1 += nprim1;
+        update_shell();
+        return 1;
+    } else {
+        return 0;
+    }
+}
+
+
 void IterGB2::update_shell() {
     // Update fields that depend on shell and related counters.
     nprim0 = gbasis->nprims[ishell0];
@@ -331,6 +357,52 @@ int IterGB4::inc_shell() {
 }
 
 
+void IterGB4::set_shell_pair(long ipair) {
+    // Jump to the first shell quartet of the given pair of first two shells.
+    // The pairs are numbered in the same order as in inc_shell. Together with
+    // inc_shell23, this allows one to split the loop over all shell quartets
+    // in independent tasks.
+    ishell0 = (long)((sqrt(8.0*ipair + 1.0) - 1.0)/2.0);
+    // Correct for rounding errors.
+    while ((ishell0*(ishell0 + 1))/2 > ipair) ishell0--;
+    while (((ishell0 + 1)*(ishell0 + 2))/2 <= ipair) ishell0++;
+    ishell1 = ipair - (ishell0*(ishell0 + 1))/2;
+    ishell2 = 0;
+    ishell3 = 0;
+    oprim0 = gbasis->get_prim_offsets()[ishell0];
+    oprim1 = gbasis->get_prim_offsets()[ishell1];
+    oprim2 = 0;
+    oprim3 = 0;
+    update_shell();
+}
+
+
+int IterGB4::inc_shell23() {
+    // Increment the last two shells, without changing the first two. The
+    // same symmetry is taken into account as in inc_shell.
+    if (ishell0==ishell1) {
+        ishell3_max = ishell2;
+    } else {
+        ishell3_max = ishell1;
+    }
+    if (ishell3 < ishell3_max) {
+        ishell3++;
+        oprim3 += nprim3;
+        update_shell();
+        return 1;
+    } else if (ishell2 < ishell0) {
+        ishell3 = 0;
+        oprim3 = 0;
+        ishell2++;
+        oprim2 += nprim2;
+        update_shell();
+        return 1;
+    } else {
+        return 0;
+    }
+}
+
+
 void IterGB4::update_shell() {
     // Update fields that depend on shell and related counters.
     nprim0 = gbasis->nprims[ishell0];
@@ -442,3 +514,82 @@ void IterGB4::store(const double *work, double *output) {
         }
     }
 }
+
+
+static inline long packed_index(long i, long j) {
+    return (i >= j) ? (i*(i + 1))/2 + j : (j*(j + 1))/2 + i;
+}
+
+void IterGB4::store_packed(const double *work, double *output) {
+    // Only the unique elements are stored. In chemists' notation, the integral
+    // <ab|cd> = (ac|bd) is stored at packed_index(packed_index(a, c),
+    // packed_index(b, d)). Elements of the same shell quartet may end up at
+    // the same position, but they have the same value.
+    const long n0 = get_shell_nbasis(shell_type0);
+    const long n1 = get_shell_nbasis(shell_type1);
+    const long n2 = get_shell_nbasis(shell_type2);
+    const long n3 = get_shell_nbasis(shell_type3);
+    const double* tmp = work;
+    for (long i0=0; i0<n0; i0++) {
+        for (long i1=0; i1<n1; i1++) {
+            for (long i2=0; i2<n2; i2++) {
+                const long pair02 = packed_index(ibasis0 + i0, ibasis2 + i2);
+                for (long i3=0; i3<n3; i3++) {
+                    const long pair13 = packed_index(ibasis1 + i1, ibasis3 + i3);
+                    output[packed_index(pair02, pair13)] = *tmp;
+                    tmp++;
+                }
+            }
+        }
+    }
+}
+
+
+void IterGB4::contract_dm(const double* work, const double* dm, double* direct, double* exchange) {
+    // Contract the integrals of the current quartet of shells, and of all its
+    // symmetry-related quartets, with a (symmetric) density matrix:
+    //   direct[a,c] += <ab|cd> dm[b,d]
+    //   exchange[a,d] += <ab|cd> dm[c,b]
+    // The permutations are the same as in the store method. Permutations that
+    // lead to a quartet of shells that was already treated are skipped, such
+    // that every integral contributes exactly once.
+    static const long perms[8][4] = {
+        {0, 1, 2, 3}, {1, 0, 3, 2}, {2, 3, 0, 1}, {3, 2, 1, 0},
+        {0, 3, 2, 1}, {1, 2, 3, 0}, {2, 1, 0, 3}, {3, 0, 1, 2}};
+    const long ishells[4] = {ishell0, ishell1, ishell2, ishell3};
+    const long ibasis[4] = {ibasis0, ibasis1, ibasis2, ibasis3};
+    const long n[4] = {
+        get_shell_nbasis(shell_type0), get_shell_nbasis(shell_type1),
+        get_shell_nbasis(shell_type2), get_shell_nbasis(shell_type3)};
+    const long nbasis = gbasis->get_nbasis();
+    for (long iperm=0; iperm<8; iperm++) {
+        const long* p = perms[iperm];
+        bool duplicate = false;
+        for (long jperm=0; jperm<iperm; jperm++) {
+            const long* q = perms[jperm];
+            if ((ishells[p[0]] == ishells[q[0]]) && (ishells[p[1]] == ishells[q[1]]) &&
+                (ishells[p[2]] == ishells[q[2]]) && (ishells[p[3]] == ishells[q[3]])) {
+                duplicate = true;
+                break;
+            }
+        }
+        if (duplicate) continue;
+        long i[4];
+        const double* tmp = work;
+        for (i[0]=0; i[0]<n[0]; i[0]++) {
+            for (i[1]=0; i[1]<n[1]; i[1]++) {
+                for (i[2]=0; i[2]<n[2]; i[2]++) {
+                    for (i[3]=0; i[3]<n[3]; i[3]++) {
+                        const long a = ibasis[p[0]] + i[p[0]];
+                        const long b = ibasis[p[1]] + i[p[1]];
+                        const long c = ibasis[p[2]] + i[p[2]];
+                        const long d = ibasis[p[3]] + i[p[3]];
+                        if (direct != NULL) direct[a*nbasis + c] += (*tmp)*dm[b*nbasis + d];
+                        if (exchange != NULL) exchange[a*nbasis + d] += (*tmp)*dm[c*nbasis + b];
+                        tmp++;
+                    }
+                }
+            }
+        }
+    }
+}
@@ -61,6 +61,8 @@ class IterGB2 {
         IterGB2(GBasis* gbasis);
 
         int inc_shell();
+        void set_shell0(long ishell0);
+        int inc_shell1();
         void update_shell();
         int inc_prim();
         void update_prim();
@@ -91,10 +93,14 @@ class IterGB4 {
         IterGB4(GBasis* gbasis);
 
         int inc_shell();
+        void set_shell_pair(long ipair);
+        int inc_shell23();
         void update_shell();
         int inc_prim();
         void update_prim();
         void store(const double* work, double* output);
+        void store_packed(const double* work, double* output);
+        void contract_dm(const double* work, const double* dm, double* direct, double* exchange);
 
         // 'public' iterator fields
         long shell_type0, shell_type1, shell_type2, shell_type3;
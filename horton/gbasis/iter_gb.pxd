@@ -73,6 +73,7 @@ cdef extern from "horton/gbasis/iter_gb.h":
         bint inc_prim()
         void update_prim()
         void store(double* work, double* output)
+        void store_packed(double* work, double* output)
 
         # 'public' iterator fields
         long shell_type0, shell_type1, shell_type2, shell_type3
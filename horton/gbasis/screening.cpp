@@ -0,0 +1,146 @@
+// HORTON: Helpful Open-source Research TOol for N-fermion systems.
+// Copyright (C) 2011-2015 The HORTON Development Team
+//
+// This file is part of HORTON.
+//
+// HORTON is free software; you can redistribute it and/or
+// modify it under the terms of the GNU General Public License
+// as published by the Free Software Foundation; either version 3
+// of the License, or (at your option) any later version.
+//
+// HORTON is distributed in the hope that it will be useful,
+// but WITHOUT ANY WARRANTY; without even the implied warranty of
+// MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+// GNU General Public License for more details.
+//
+// You should have received a copy of the GNU General Public License
+// along with this program; if not, see <http://www.gnu.org/licenses/>
+//
+//--
+
+
+#include <cmath>
+#include <cstdlib>
+#include "horton/gbasis/common.h"
+#include "horton/gbasis/screening.h"
+using std::abs;
+
+
+// sqrt(2)*pi**(5/4), such that the product of two primitive-pair bounds
+// equals the prefactor of a primitive (ss|ss) integral.
+#define SCREENING_PREFAC 5.914967172795612
+
+
+GB4Screening::GB4Screening(GBasis* gbasis, GB4Integral* integral, double threshold) :
+    gbasis(gbasis), threshold(threshold), max_shell_bound(0.0),
+    shell_bounds(NULL), prim_pair_offsets(NULL), prim_pair_bounds(NULL),
+    nquartet(0), nskip(0)
+{
+    const long nshell = gbasis->nshell;
+
+    // Schwarz bounds for all pairs of shells
+    shell_bounds = new double[nshell*nshell];
+    gbasis->compute_schwarz(shell_bounds, integral);
+    for (long i=nshell*nshell-1; i>=0; i--) {
+        if (shell_bounds[i] > max_shell_bound) max_shell_bound = shell_bounds[i];
+    }
+
+    // Primitive pair bounds are only stored for shell pairs that can still
+    // contribute in combination with the largest Schwarz bound. The number of
+    // such pairs grows linearly with the system size.
+    prim_pair_offsets = new long[nshell*nshell];
+    long nprim_pair = 0;
+    for (long ishell0=0; ishell0<nshell; ishell0++) {
+        for (long ishell1=0; ishell1<nshell; ishell1++) {
+            if (shell_bounds[ishell0*nshell + ishell1]*max_shell_bound < threshold) {
+                prim_pair_offsets[ishell0*nshell + ishell1] = -1;
+            } else {
+                prim_pair_offsets[ishell0*nshell + ishell1] = nprim_pair;
+                nprim_pair += gbasis->nprims[ishell0]*gbasis->nprims[ishell1];
+            }
+        }
+    }
+
+    // The largest normalization constant of every primitive
+    double* max_scales = new double[gbasis->nprim_total];
+    for (long ishell=0; ishell<nshell; ishell++) {
+        const long nscale = get_shell_nbasis(abs(gbasis->shell_types[ishell]));
+        const long oprim = gbasis->get_prim_offsets()[ishell];
+        for (long iprim=0; iprim<gbasis->nprims[ishell]; iprim++) {
+            const double* scales = gbasis->get_scales(oprim + iprim);
+            max_scales[oprim + iprim] = 0.0;
+            for (long iscale=0; iscale<nscale; iscale++) {
+                if (scales[iscale] > max_scales[oprim + iprim])
+                    max_scales[oprim + iprim] = scales[iscale];
+            }
+        }
+    }
+
+    /*
+        The primitive (ss|ss) integral has the prefactor
+            2 pi**(5/2) K_ab K_cd / (p q sqrt(p + q))
+        with p and q the sums of the exponents in each pair and K_ab, K_cd
+        the Gaussian product prefactors. Because 1/sqrt(p+q) <= (pq)**(-1/4),
+        it is bounded by a product of two factors, one for each pair.
+    */
+    prim_pair_bounds = new double[nprim_pair];
+    for (long ishell0=0; ishell0<nshell; ishell0++) {
+        const long oprim0 = gbasis->get_prim_offsets()[ishell0];
+        const double* r0 = gbasis->centers + 3*gbasis->shell_map[ishell0];
+        for (long ishell1=0; ishell1<nshell; ishell1++) {
+            long offset = prim_pair_offsets[ishell0*nshell + ishell1];
+            if (offset < 0) continue;
+            const long oprim1 = gbasis->get_prim_offsets()[ishell1];
+            const double* r1 = gbasis->centers + 3*gbasis->shell_map[ishell1];
+            const double d2 = dist_sq(r0, r1);
+            for (long iprim0=0; iprim0<gbasis->nprims[ishell0]; iprim0++) {
+                const double alpha0 = gbasis->alphas[oprim0 + iprim0];
+                for (long iprim1=0; iprim1<gbasis->nprims[ishell1]; iprim1++) {
+                    const double alpha1 = gbasis->alphas[oprim1 + iprim1];
+                    const double gamma = alpha0 + alpha1;
+                    prim_pair_bounds[offset] = SCREENING_PREFAC*
+                        fabs(gbasis->con_coeffs[oprim0 + iprim0]*gbasis->con_coeffs[oprim1 + iprim1])*
+                        max_scales[oprim0 + iprim0]*max_scales[oprim1 + iprim1]*
+                        exp(-alpha0*alpha1*d2/gamma)*pow(gamma, -1.25);
+                    offset++;
+                }
+            }
+        }
+    }
+
+    delete[] max_scales;
+}
+
+GB4Screening::~GB4Screening() {
+    delete[] shell_bounds;
+    delete[] prim_pair_offsets;
+    delete[] prim_pair_bounds;
+}
+
+bool GB4Screening::skip_shell(long ishell0, long ishell1, long ishell2, long ishell3) {
+    return skip_shell(ishell0, ishell1, ishell2, ishell3, 1.0);
+}
+
+bool GB4Screening::skip_shell(long ishell0, long ishell1, long ishell2, long ishell3,
+                              double factor) {
+    const long nshell = gbasis->nshell;
+    // The statistics may be updated by several threads at the same time.
+#pragma omp atomic
+    nquartet++;
+    if (shell_bounds[ishell0*nshell + ishell2]*shell_bounds[ishell1*nshell + ishell3]*factor < threshold) {
+#pragma omp atomic
+        nskip++;
+        return true;
+    }
+    return false;
+}
+
+bool GB4Screening::skip_prim(long ishell0, long ishell1, long ishell2, long ishell3,
+                             long iprim0, long iprim1, long iprim2, long iprim3) const {
+    const long nshell = gbasis->nshell;
+    const double bound02 = prim_pair_bounds[prim_pair_offsets[ishell0*nshell + ishell2] +
+                                            iprim0*gbasis->nprims[ishell2] + iprim2];
+    const double bound13 = prim_pair_bounds[prim_pair_offsets[ishell1*nshell + ishell3] +
+                                            iprim1*gbasis->nprims[ishell3] + iprim3];
+    return bound02*bound13 < threshold;
+}
@@ -0,0 +1,106 @@
+// HORTON: Helpful Open-source Research TOol for N-fermion systems.
+// Copyright (C) 2011-2015 The HORTON Development Team
+//
+// This file is part of HORTON.
+//
+// HORTON is free software; you can redistribute it and/or
+// modify it under the terms of the GNU General Public License
+// as published by the Free Software Foundation; either version 3
+// of the License, or (at your option) any later version.
+//
+// HORTON is distributed in the hope that it will be useful,
+// but WITHOUT ANY WARRANTY; without even the implied warranty of
+// MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+// GNU General Public License for more details.
+//
+// You should have received a copy of the GNU General Public License
+// along with this program; if not, see <http://www.gnu.org/licenses/>
+//
+//--
+
+// UPDATELIBDOCTITLE: Schwarz screening of four-center integrals
+
+#ifndef HORTON_GBASIS_SCREENING_H
+#define HORTON_GBASIS_SCREENING_H
+
+#include "horton/gbasis/gbasis.h"
+#include "horton/gbasis/ints.h"
+
+
+/**
+    @brief
+        Screening of shell and primitive quartets for four-center integrals.
+
+    Upper bounds for the shell quartets are obtained with the Schwarz
+    inequality, |(ac|bd)| <= sqrt((ac|ac)) sqrt((bd|bd)), using the largest
+    diagonal element in each pair of shells. Within a shell quartet that
+    survives, primitive quartets are skipped based on the prefactor of the
+    corresponding (ss|ss) integral. The latter is an estimate for integrals
+    with higher angular momenta.
+
+    All indexes use the physicist notation, i.e. in <01|23>, the shells 0 and 2
+    form one pair and the shells 1 and 3 form the other pair.
+*/
+class GB4Screening {
+    private:
+        const GBasis* gbasis;
+        double threshold;
+        double max_shell_bound;
+        double* shell_bounds;      // Schwarz bounds for all pairs of shells
+        long* prim_pair_offsets;   // first primitive pair of each significant shell pair
+        double* prim_pair_bounds;  // prefactor bounds for all primitive pairs
+        long nquartet, nskip;
+    public:
+        /**
+            @brief
+                Compute the Schwarz and primitive-pair bounds.
+
+            @param gbasis
+                The Gaussian basis set.
+
+            @param integral
+                The four-center integral used to compute the Schwarz bounds.
+                This should be the same type of integral as the one that is
+                screened afterwards.
+
+            @param threshold
+                Shell or primitive quartets whose bound is below this
+                threshold are skipped.
+        */
+        GB4Screening(GBasis* gbasis, GB4Integral* integral, double threshold);
+        ~GB4Screening();
+
+        /**
+            @brief
+                Test if the integrals <01|23> for a quartet of shells can be
+                neglected. Every call is included in the screening statistics.
+        */
+        bool skip_shell(long ishell0, long ishell1, long ishell2, long ishell3);
+
+        /**
+            @brief
+                Same as skip_shell, except that the Schwarz bound is multiplied
+                by a factor, e.g. the largest relevant density matrix element,
+                before it is compared to the threshold.
+        */
+        bool skip_shell(long ishell0, long ishell1, long ishell2, long ishell3,
+                        double factor);
+
+        /**
+            @brief
+                Test if the contribution of a quartet of primitives can be
+                neglected. The primitive indexes are relative to the shells.
+                This method may only be called for shell quartets that are not
+                skipped.
+        */
+        bool skip_prim(long ishell0, long ishell1, long ishell2, long ishell3,
+                       long iprim0, long iprim1, long iprim2, long iprim3) const;
+
+        const double get_threshold() const {return threshold;};
+        const double* get_shell_bounds() const {return shell_bounds;};
+        const long get_nquartet() const {return nquartet;};
+        const long get_nskip() const {return nskip;};
+    };
+
+
+#endif
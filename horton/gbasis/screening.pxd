@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# HORTON: Helpful Open-source Research TOol for N-fermion systems.
+# Copyright (C) 2011-2015 The HORTON Development Team
+#
+# This file is part of HORTON.
+#
+# HORTON is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# HORTON is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+#--
+
+
+cimport gbasis
+cimport ints
+
+cdef extern from "horton/gbasis/screening.h":
+    cdef cppclass GB4Screening:
+        GB4Screening(gbasis.GBasis* gbasis, ints.GB4Integral* integral, double threshold) except +
+        double get_threshold()
+        double* get_shell_bounds()
+        long get_nquartet()
+        long get_nskip()
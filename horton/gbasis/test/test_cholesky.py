@@ -20,10 +20,12 @@
 #--
 #pylint: skip-file
 
+import os
 import numpy as np
 from nose.tools import assert_raises
 
 from horton import *
+from horton.test.common import tmpdir
 
 def get_h2o_er(linalg_factory=DenseLinalgFactory):
     fn = context.get_fn('test/water.xyz')
@@ -67,3 +69,42 @@ def test_cholesky_from_gbasis():
     test_er = np.einsum('kac,kbd->abcd', vecs, vecs)
 
     assert np.allclose(ref_er, test_er), abs(ref_er - test_er).max()
+
+def test_cholesky_schwarz_screening():
+    coordinates = np.zeros((8, 3), float)
+    coordinates[:,2] = np.arange(8)*4.0
+    obasis = get_gobasis(coordinates, np.ones(8, int), '3-21g')
+    lf = DenseLinalgFactory(obasis.nbasis)
+    ref_er = obasis.compute_electron_repulsion(lf)._array
+
+    vecs = compute_cholesky(obasis, screening_threshold=1e-12)
+    test_er = np.einsum('kac,kbd->abcd', vecs, vecs)
+    assert np.allclose(ref_er, test_er), abs(ref_er - test_er).max()
+
+    lf = CholeskyLinalgFactory(obasis.nbasis)
+    er = obasis.compute_electron_repulsion(lf, threshold=1e-12)
+    test_er = np.einsum('kac,kbd->abcd', er._array, er._array)
+    assert np.allclose(ref_er, test_er), abs(ref_er - test_er).max()
+
+def test_cholesky_nthread():
+    obasis, ref_er = get_h2o_er()
+    for nthread in 1, 2, 3:
+        vecs = compute_cholesky(obasis, nthread=nthread)
+        test_er = np.einsum('kac,kbd->abcd', vecs, vecs)
+        assert np.allclose(ref_er, test_er), abs(ref_er - test_er).max()
+
+def test_cholesky_filename():
+    obasis, ref_er = get_h2o_er()
+    vecs_ref = compute_cholesky(obasis)
+    with tmpdir('horton.gbasis.test.test_cholesky.test_cholesky_filename') as dn:
+        fn = '%s/vectors.dat' % dn
+        vecs = compute_cholesky(obasis, filename=fn)
+        assert isinstance(vecs, np.memmap)
+        assert vecs.shape == vecs_ref.shape
+        assert os.path.getsize(fn) == vecs.nbytes
+        assert abs(vecs - vecs_ref).max() < 1e-10
+        lf = CholeskyLinalgFactory(obasis.nbasis)
+        er = compute_cholesky(obasis, lf=lf, filename=fn)
+        test_er = np.einsum('kac,kbd->abcd', er._array, er._array)
+        assert np.allclose(ref_er, test_er), abs(ref_er - test_er).max()
+        del vecs, er
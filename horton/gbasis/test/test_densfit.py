@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+# HORTON: Helpful Open-source Research TOol for N-fermion systems.
+# Copyright (C) 2011-2015 The HORTON Development Team
+#
+# This file is part of HORTON.
+#
+# HORTON is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# HORTON is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+#--
+#pylint: skip-file
+
+
+import numpy as np
+from nose.tools import assert_raises
+
+from horton import *
+from horton.gbasis.test.test_direct import get_random_dm
+from horton.gbasis.test.test_ints import get_hydrogen_chain_obasis
+
+
+def get_s_basis(alphas):
+    '''Uncontracted s-type functions in the origin'''
+    nshell = len(alphas)
+    return GOBasis(np.zeros((1, 3), float), np.zeros(nshell, int),
+                   np.ones(nshell, int), np.zeros(nshell, int),
+                   np.array(alphas, float), np.ones(nshell, float))
+
+
+def get_exact_fit_bases():
+    '''An orbital basis and an auxiliary basis for which the fit is exact
+
+       All products of two s-type Gaussians in the same center are again
+       s-type Gaussians in that center. When all these products are included in
+       the auxiliary basis, the density fitting becomes exact.
+    '''
+    alphas = [0.3, 1.1, 4.2]
+    aux_alphas = sorted(set(a0 + a1 for a0 in alphas for a1 in alphas))
+    return get_s_basis(alphas), get_s_basis(aux_alphas)
+
+
+def test_electron_repulsion_two_center():
+    obasis = get_hydrogen_chain_obasis(4)
+    lf = DenseLinalgFactory(obasis.nbasis)
+    metric = obasis.compute_electron_repulsion_two_center(lf)
+    assert metric.is_symmetric()
+    assert (np.linalg.eigvalsh(metric._array) > 0).all()
+    # Output argument with garbage
+    metric2 = lf.create_two_index()
+    metric2.randomize()
+    obasis.compute_electron_repulsion_two_center(metric2, nthread=2)
+    assert abs(metric._array - metric2._array).max() < 1e-10
+
+
+def test_electron_repulsion_three_center():
+    obasis = get_hydrogen_chain_obasis(4)
+    auxbasis = get_hydrogen_chain_obasis(4)
+    three = obasis.compute_electron_repulsion_three_center(auxbasis)
+    assert three.shape == (obasis.nbasis, obasis.nbasis, auxbasis.nbasis)
+    assert abs(three - three.transpose(1, 0, 2)).max() < 1e-10
+    # Output argument with garbage and multiple threads
+    three2 = np.random.uniform(0, 1, three.shape)
+    obasis.compute_electron_repulsion_three_center(auxbasis, three2, nthread=2)
+    assert abs(three - three2).max() < 1e-10
+    with assert_raises(TypeError):
+        obasis.compute_electron_repulsion_three_center(auxbasis, np.zeros((2, 2, 2)))
+
+
+def test_electron_repulsion_three_center_exact():
+    obasis, auxbasis = get_exact_fit_bases()
+    lf = DenseLinalgFactory(obasis.nbasis)
+    er = obasis.compute_electron_repulsion(lf)
+    three = obasis.compute_electron_repulsion_three_center(auxbasis)
+    metric = auxbasis.compute_electron_repulsion_two_center(
+        DenseLinalgFactory(auxbasis.nbasis))
+    three.shape = (obasis.nbasis**2, auxbasis.nbasis)
+    er_fit = np.dot(three, np.linalg.solve(metric._array, three.T))
+    assert abs(er_fit - er._array.reshape(er_fit.shape)).max() < 1e-8
+
+
+def test_electron_repulsion_three_center_products():
+    # The first four orbital shells are all in the origin and the first one
+    # is an s-type function with exponent beta. The product of one of these
+    # four shells with the first s-type function is, up to a normalization
+    # constant, a shell with the same angular momentum and exponent alpha+beta.
+    # The auxiliary basis consists of these product shells. All three-center
+    # and two-center integrals are then equal to (rescaled) four-center
+    # integrals, including p- and d-type functions on both bases.
+    beta = 0.7
+    centers = np.array([[0.0, 0.0, 0.0], [0.3, -0.4, 1.1]])
+    shell_types = np.array([0, 0, 1, -2, 1, -2])
+    alphas = np.array([beta, 1.3, 0.9, 1.6, 0.8, 1.2])
+    obasis = GOBasis(centers, np.array([0, 0, 0, 0, 1, 1]), np.ones(6, int),
+                     shell_types, alphas, np.ones(6, float))
+    aux_alphas = alphas[:4] + beta
+    auxbasis = GOBasis(centers[:1], np.zeros(4, int), np.ones(4, int),
+                       shell_types[:4], aux_alphas, np.ones(4, float))
+    naux = auxbasis.nbasis
+    assert naux == 10
+    # The normalization constant of a Gaussian with angular momentum l and
+    # exponent alpha is proportional to alpha**((2*l+3)/4).
+    powers = (2*abs(shell_types[:4]) + 3)/4.0
+    ratios = (2/np.pi)**0.75*beta**0.75*alphas[:4]**powers/aux_alphas**powers
+    ratios = np.repeat(ratios, [1, 1, 3, 5])
+    lf = DenseLinalgFactory(obasis.nbasis)
+    er = obasis.compute_electron_repulsion(lf)._array
+    # Three-center integrals: (ab|P) = (ab|P0)/ratio_P
+    three = obasis.compute_electron_repulsion_three_center(auxbasis)
+    three_ref = er[:, :naux, :, 0].transpose(0, 2, 1)/ratios
+    assert abs(three - three_ref).max() < 1e-10
+    # Two-center integrals: (P|Q) = (P0|Q0)/(ratio_P*ratio_Q)
+    metric = auxbasis.compute_electron_repulsion_two_center(
+        DenseLinalgFactory(naux))
+    metric_ref = er[:naux, :naux, 0, 0]/np.outer(ratios, ratios)
+    assert abs(metric._array - metric_ref).max() < 1e-10
+
+
+def test_density_fit_four_index_contract():
+    obasis, auxbasis = get_exact_fit_bases()
+    lf = DenseLinalgFactory(obasis.nbasis)
+    er_dense = obasis.compute_electron_repulsion(lf)
+    er_fit = DensityFitFourIndex(obasis, auxbasis)
+    assert er_fit.shape == er_dense.shape
+    assert er_fit.is_symmetric()
+    dm = get_random_dm(lf)
+    result_ref = er_dense.contract_two_to_two('abcd,bd->ac', dm)
+    result = er_fit.contract_two_to_two('abcd,bd->ac', dm)
+    assert abs(result._array - result_ref._array).max() < 1e-8
+    # Output argument, factor and clear
+    result.randomize()
+    result_before = result.copy()
+    er_fit.contract_two_to_two('abcd,bd->ac', dm, result, factor=2.0, clear=False)
+    assert abs(result._array - result_before._array - 2*result_ref._array).max() < 1e-8
+    # Exchange is not supported
+    with assert_raises(ValueError):
+        er_fit.contract_two_to_two('abcd,cb->ad', dm)
+
+
+def test_density_fit_four_index_hamiltonian():
+    obasis, auxbasis = get_exact_fit_bases()
+    lf = DenseLinalgFactory(obasis.nbasis)
+    er_dense = obasis.compute_electron_repulsion(lf)
+    er_fit = DensityFitFourIndex(obasis, auxbasis)
+    dm_alpha = get_random_dm(lf)
+    dm_beta = get_random_dm(lf)
+    # Restricted
+    results = []
+    for er in er_dense, er_fit:
+        ham = REffHam([RDirectTerm(er, 'hartree')])
+        ham.reset(dm_alpha)
+        fock_alpha = lf.create_two_index()
+        ham.compute_fock(fock_alpha)
+        results.append((ham.compute_energy(), fock_alpha))
+    assert abs(results[0][0] - results[1][0]) < 1e-8
+    assert abs(results[0][1]._array - results[1][1]._array).max() < 1e-8
+    # Unrestricted
+    results = []
+    for er in er_dense, er_fit:
+        ham = UEffHam([UDirectTerm(er, 'hartree')])
+        ham.reset(dm_alpha, dm_beta)
+        fock_alpha = lf.create_two_index()
+        fock_beta = lf.create_two_index()
+        ham.compute_fock(fock_alpha, fock_beta)
+        results.append((ham.compute_energy(), fock_alpha))
+    assert abs(results[0][0] - results[1][0]) < 1e-8
+    assert abs(results[0][1]._array - results[1][1]._array).max() < 1e-8
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# HORTON: Helpful Open-source Research TOol for N-fermion systems.
+# Copyright (C) 2011-2015 The HORTON Development Team
+#
+# This file is part of HORTON.
+#
+# HORTON is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# HORTON is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+#--
+#pylint: skip-file
+
+
+import numpy as np
+from nose.tools import assert_raises
+
+from horton import *
+from horton.gbasis.test.test_ints import get_hydrogen_chain_obasis
+
+
+def get_random_dm(lf):
+    dm = lf.create_two_index()
+    dm.randomize()
+    dm.symmetrize()
+    return dm
+
+
+def check_direct_four_index(er_direct, er_dense, dm):
+    for subscripts in 'abcd,bd->ac', 'abcd,cb->ad':
+        result_ref = er_dense.contract_two_to_two(subscripts, dm)
+        result = er_direct.contract_two_to_two(subscripts, dm)
+        assert abs(result._array - result_ref._array).max() < 1e-8
+        # Output argument, factor and clear
+        result.randomize()
+        result_before = result.copy()
+        er_direct.contract_two_to_two(subscripts, dm, result, factor=2.0, clear=False)
+        assert abs(result._array - result_before._array - 2*result_ref._array).max() < 1e-8
+
+
+def test_direct_four_index_contract():
+    obasis = get_hydrogen_chain_obasis()
+    lf = DenseLinalgFactory(obasis.nbasis)
+    er_dense = obasis.compute_electron_repulsion(lf)
+    er_direct = DirectFourIndex(obasis, threshold=1e-12, rebuild_interval=3)
+    assert er_direct.shape == er_dense.shape
+    assert er_direct.is_symmetric()
+    dm = get_random_dm(lf)
+    check_direct_four_index(er_direct, er_dense, dm)
+    # Small changes in the density matrix: incremental updates and rebuilds.
+    for i in xrange(5):
+        delta = get_random_dm(lf)
+        dm.iadd(delta, 1e-2)
+        check_direct_four_index(er_direct, er_dense, dm)
+    assert len(er_direct._channels) == 1
+    assert er_direct._channels[0][2] == 1
+    # Two density matrices at the same time, e.g. alpha and beta.
+    dm_other = get_random_dm(lf)
+    for i in xrange(3):
+        check_direct_four_index(er_direct, er_dense, dm)
+        check_direct_four_index(er_direct, er_dense, dm_other)
+        dm.iadd(get_random_dm(lf), 1e-2)
+    assert len(er_direct._channels) == 2
+    er_direct.clear()
+    assert len(er_direct._channels) == 0
+
+
+def test_direct_four_index_no_screening():
+    obasis = get_hydrogen_chain_obasis(4)
+    lf = DenseLinalgFactory(obasis.nbasis)
+    er_dense = obasis.compute_electron_repulsion(lf)
+    er_direct = DirectFourIndex(obasis, threshold=0.0)
+    assert er_direct.screening is None
+    check_direct_four_index(er_direct, er_dense, get_random_dm(lf))
+
+
+def test_direct_four_index_errors():
+    obasis = get_hydrogen_chain_obasis(2)
+    lf = DenseLinalgFactory(obasis.nbasis)
+    er_direct = DirectFourIndex(obasis)
+    with assert_raises(ValueError):
+        er_direct.contract_two_to_two('abcd,ad->bc', get_random_dm(lf))
+    with assert_raises(ValueError):
+        DirectFourIndex(obasis, rebuild_interval=0)
+    with assert_raises(ValueError):
+        DirectFourIndex(obasis, nchannel=0)
+
+
+def test_direct_four_index_scf():
+    obasis = get_hydrogen_chain_obasis(6, 1.4)
+    lf = DenseLinalgFactory(obasis.nbasis)
+    olp = obasis.compute_overlap(lf)
+    kin = obasis.compute_kinetic(lf)
+    na = obasis.compute_nuclear_attraction(obasis.centers, np.ones(6), lf)
+    er_dense = obasis.compute_electron_repulsion(lf)
+    er_direct = DirectFourIndex(obasis)
+    external = {'nn': compute_nucnuc(obasis.centers, np.ones(6))}
+    occ_model = AufbauOccModel(3)
+    energies = []
+    for er in er_dense, er_direct:
+        terms = [
+            RTwoIndexTerm(kin, 'kin'),
+            RDirectTerm(er, 'hartree'),
+            RExchangeTerm(er, 'x_hf'),
+            RTwoIndexTerm(na, 'ne'),
+        ]
+        ham = REffHam(terms, external)
+        exp_alpha = lf.create_expansion()
+        guess_core_hamiltonian(olp, kin, na, exp_alpha)
+        occ_model.assign(exp_alpha)
+        dm_alpha = exp_alpha.to_dm()
+        scf_solver = CDIISSCFSolver(threshold=1e-7)
+        scf_solver(ham, lf, olp, occ_model, dm_alpha)
+        energies.append(ham.cache['energy'])
+    assert abs(energies[0] - energies[1]) < 1e-9
@@ -179,9 +179,51 @@ def test_density_epsilon():
     rho1 = mol.obasis.compute_grid_density_dm(dm_full, grid.points)
     for epsilon in 1e-10, 1e-5, 1e-3, 1e-1:
         rho2 = mol.obasis.compute_grid_density_dm(dm_full, grid.points, epsilon=epsilon)
-        mask = (rho1 != rho2)
-        assert ((rho1[mask] < epsilon) | (abs(rho1[mask]-rho2[mask]) < epsilon)).all()
-        assert ((rho2[mask] == 0.0) | (abs(rho1[mask]-rho2[mask]) < epsilon)).all()
+        assert abs(rho1 - rho2).max() < epsilon
+        if epsilon >= 1e-3:
+            # Some basis functions must have been left out.
+            assert (rho1 != rho2).any()
+
+
+def test_gradient_epsilon():
+    fn_fchk = context.get_fn('test/n2_hfs_sto3g.fchk')
+    mol = IOData.from_file(fn_fchk)
+    grid = BeckeMolGrid(mol.coordinates, mol.numbers, mol.pseudo_numbers, random_rotate=False)
+    dm_full = mol.get_dm_full()
+    grad1 = mol.obasis.compute_grid_gradient_dm(dm_full, grid.points)
+    for epsilon in 1e-10, 1e-5, 1e-3, 1e-1:
+        grad2 = mol.obasis.compute_grid_gradient_dm(dm_full, grid.points, epsilon=epsilon)
+        assert abs(grad1 - grad2).max() < epsilon
+        if epsilon >= 1e-3:
+            assert (grad1 != grad2).any()
+
+
+def test_density_blocks():
+    # Distant atoms and many points, such that some shells are skipped in some
+    # blocks of grid points.
+    coordinates = np.array([[0.0, 0.0, 0.0], [0.0, 0.0, 1.4], [0.0, 0.0, 30.0]])
+    numbers = np.array([7, 7, 8])
+    obasis = get_gobasis(coordinates, numbers, 'cc-pvdz')
+    lf = DenseLinalgFactory(obasis.nbasis)
+    dm = lf.create_two_index()
+    dm.randomize()
+    dm.symmetrize()
+    points = np.random.normal(0, 3, (1000, 3))
+    points[500:,2] += 30.0
+    weights = np.random.uniform(0, 1, 1000)
+    pots = np.random.normal(0, 1, 1000)
+    # Reference results, computed point by point.
+    grid_fn = GB1DMGridDensityFn(obasis.max_shell_type)
+    basis = np.zeros((1000, obasis.nbasis))
+    for ipoint in xrange(1000):
+        obasis.compute_grid_point1(basis[ipoint], points[ipoint], grid_fn)
+    rho_ref = np.einsum('pa,ab,pb->p', basis, dm._array, basis)
+    fock_ref = np.dot(basis.T*(weights*pots), basis)
+    rho = obasis.compute_grid_density_dm(dm, points)
+    assert abs(rho - rho_ref).max() < 1e-10
+    fock = lf.create_two_index()
+    obasis.compute_grid_density_fock(points, weights, pots, fock)
+    assert abs(fock._array - fock_ref).max() < 1e-10
 
 
 def test_density_functional_deriv():
@@ -493,3 +535,68 @@ def test_kinetic_functional_deriv():
 
     from horton.test.common import check_delta
     check_delta(fun, fun_deriv, x, dxs)
+
+
+def check_gga_dm_fock(fn, tau):
+    mol = IOData.from_file(context.get_fn(fn))
+    obasis = mol.obasis
+    dm_full = mol.get_dm_full()
+    dm_rand = dm_full.new()
+    dm_rand.randomize()
+    dm_rand._array[:] = dm_rand._array + dm_rand._array.T
+    dms = [dm_full, dm_rand]
+    points = np.random.uniform(-2, 2, (1000, 3))
+    weights = np.random.uniform(0, 1, 1000)
+
+    # Compare with separate evaluations of all quantities
+    outputs = obasis.compute_grid_gga_dm(dms, points, tau=tau)
+    assert len(outputs) == 2
+    for dm, output in zip(dms, outputs):
+        assert output.shape == (1000, 5 if tau else 4)
+        assert abs(output[:,0] - obasis.compute_grid_density_dm(dm, points)).max() < 1e-10
+        assert abs(output[:,1:4] - obasis.compute_grid_gradient_dm(dm, points)).max() < 1e-10
+        if tau:
+            assert abs(output[:,4] - obasis.compute_grid_kinetic_dm(dm, points)).max() < 1e-10
+
+    pots = [np.random.uniform(-1, 1, output.shape) for output in outputs]
+    focks = [dm.new() for dm in dms]
+    obasis.compute_grid_gga_fock(points, weights, pots, focks, tau=tau)
+    for pot, fock in zip(pots, focks):
+        assert fock.is_symmetric()
+        ref = fock.new()
+        obasis.compute_grid_density_fock(points, weights, pot[:,0].copy(), ref)
+        obasis.compute_grid_gradient_fock(points, weights, pot[:,1:4].copy(), ref)
+        if tau:
+            obasis.compute_grid_kinetic_fock(points, weights, pot[:,4].copy(), ref)
+        assert abs(fock._array - ref._array).max() < 1e-10
+
+
+def test_gga_dm_fock_h3_321g():
+    check_gga_dm_fock('test/h3_hfs_321g.fchk', False)
+    check_gga_dm_fock('test/h3_hfs_321g.fchk', True)
+
+
+def test_gga_dm_fock_co_ccpv5z_pure():
+    check_gga_dm_fock('test/co_ccpv5z_pure_hf_g03.fchk', True)
+
+
+def test_density_dms_focks_h3_321g():
+    mol = IOData.from_file(context.get_fn('test/h3_hfs_321g.fchk'))
+    obasis = mol.obasis
+    dms = [mol.get_dm_full(), mol.get_dm_spin()]
+    points = np.random.uniform(-2, 2, (1000, 3))
+    weights = np.random.uniform(0, 1, 1000)
+
+    # Compare with separate evaluations for each density matrix
+    outputs = obasis.compute_grid_density_dms(dms, points)
+    assert len(outputs) == 2
+    for dm, output in zip(dms, outputs):
+        assert abs(output - obasis.compute_grid_density_dm(dm, points)).max() < 1e-10
+
+    pots = [np.random.uniform(-1, 1, 1000) for dm in dms]
+    focks = [dm.new() for dm in dms]
+    obasis.compute_grid_density_focks(points, weights, pots, focks)
+    for pot, fock in zip(pots, focks):
+        ref = fock.new()
+        obasis.compute_grid_density_fock(points, weights, pot, ref)
+        assert abs(fock._array - ref._array).max() < 1e-10
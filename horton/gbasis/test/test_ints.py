@@ -2215,6 +2215,100 @@ def test_electron_repulsion_water_ccpvdz_cart_hf():
     check_g09_electron_repulsion(context.get_fn('test/water_ccpvdz_cart_hf_g03.fchk'))
 
 
+def get_hydrogen_chain_obasis(natom=8, spacing=4.0):
+    coordinates = np.zeros((natom, 3), float)
+    coordinates[:,2] = np.arange(natom)*spacing
+    numbers = np.ones(natom, int)
+    return get_gobasis(coordinates, numbers, '3-21g')
+
+
+def test_electron_repulsion_schwarz_screening():
+    obasis = get_hydrogen_chain_obasis()
+    lf = DenseLinalgFactory(obasis.nbasis)
+    er_ref = obasis.compute_electron_repulsion(lf)
+    # Start from garbage to check that skipped integrals are set to zero.
+    er = lf.create_four_index()
+    er.randomize()
+    obasis.compute_electron_repulsion(er, threshold=1e-10)
+    assert abs(er._array - er_ref._array).max() < 1e-10
+    # Some shell quartets must have been skipped.
+    assert (er._array == 0.0).sum() > (er_ref._array == 0.0).sum()
+    assert er.is_symmetric()
+
+
+def test_electron_repulsion_packed():
+    obasis = get_hydrogen_chain_obasis()
+    er_ref = obasis.compute_electron_repulsion(DenseLinalgFactory(obasis.nbasis))
+    lf = PackedLinalgFactory(obasis.nbasis)
+    er = obasis.compute_electron_repulsion(lf)
+    assert isinstance(er, PackedFourIndex)
+    assert abs(er.get_dense()._array - er_ref._array).max() < 1e-10
+    # Start from garbage, with screening and multiple threads.
+    er.randomize()
+    obasis.compute_electron_repulsion(er, threshold=1e-10, nthread=2)
+    assert abs(er.get_dense()._array - er_ref._array).max() < 1e-10
+    with assert_raises(TypeError):
+        obasis.compute_electron_repulsion(PackedFourIndex(obasis.nbasis - 1))
+
+
+def test_electron_repulsion_dm():
+    obasis = get_hydrogen_chain_obasis()
+    lf = DenseLinalgFactory(obasis.nbasis)
+    er = obasis.compute_electron_repulsion(lf)
+    dm = lf.create_two_index()
+    dm.randomize()
+    dm.symmetrize()
+    direct_ref = er.contract_two_to_two('abcd,bd->ac', dm)
+    exchange_ref = er.contract_two_to_two('abcd,cb->ad', dm)
+    direct = lf.create_two_index()
+    exchange = lf.create_two_index()
+    obasis.compute_electron_repulsion_dm(dm, direct, exchange)
+    assert abs(direct._array - direct_ref._array).max() < 1e-10
+    assert abs(exchange._array - exchange_ref._array).max() < 1e-10
+    # Only the exchange term, with screening
+    screening = GB4Screening(obasis, 1e-10)
+    exchange.randomize()
+    obasis.compute_electron_repulsion_dm(dm, exchange=exchange, screening=screening)
+    assert abs(exchange._array - exchange_ref._array).max() < 1e-8
+    assert screening.nskip > 0
+    assert screening.nskip < screening.nquartet
+
+
+def test_nthread():
+    obasis = get_hydrogen_chain_obasis()
+    lf = DenseLinalgFactory(obasis.nbasis)
+    coordinates = np.array([[0.0, 0.0, 1.0], [0.0, 0.5, 7.0]])
+    charges = np.array([1.0, -0.5])
+    for nthread in 2, 3:
+        olp1 = obasis.compute_overlap(lf, nthread=1)
+        olp2 = obasis.compute_overlap(lf, nthread=nthread)
+        assert abs(olp1._array - olp2._array).max() < 1e-14
+        kin1 = obasis.compute_kinetic(lf, nthread=1)
+        kin2 = obasis.compute_kinetic(lf, nthread=nthread)
+        assert abs(kin1._array - kin2._array).max() < 1e-14
+        na1 = obasis.compute_nuclear_attraction(coordinates, charges, lf, nthread=1)
+        na2 = obasis.compute_nuclear_attraction(coordinates, charges, lf, nthread=nthread)
+        assert abs(na1._array - na2._array).max() < 1e-14
+        er1 = obasis.compute_electron_repulsion(lf, nthread=1)
+        er2 = obasis.compute_electron_repulsion(lf, nthread=nthread)
+        assert abs(er1._array - er2._array).max() < 1e-14
+        er2 = obasis.compute_electron_repulsion(lf, threshold=1e-10, nthread=nthread)
+        assert abs(er1._array - er2._array).max() < 1e-10
+        # Contraction with a density matrix, where every thread has its own
+        # accumulators.
+        dm = lf.create_two_index()
+        dm.randomize()
+        dm.symmetrize()
+        direct1 = lf.create_two_index()
+        exchange1 = lf.create_two_index()
+        obasis.compute_electron_repulsion_dm(dm, direct1, exchange1, nthread=1)
+        direct2 = lf.create_two_index()
+        exchange2 = lf.create_two_index()
+        obasis.compute_electron_repulsion_dm(dm, direct2, exchange2, nthread=nthread)
+        assert abs(direct1._array - direct2._array).max() < 1e-10
+        assert abs(exchange1._array - exchange2._array).max() < 1e-10
+
+
 def check_g09_grid_fn(fn_fchk):
     mol = IOData.from_file(fn_fchk)
     grid = BeckeMolGrid(mol.coordinates, mol.numbers, mol.pseudo_numbers, 'tv-13.7-4', random_rotate=False)
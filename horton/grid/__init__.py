@@ -22,6 +22,7 @@
 
 
 from horton.grid.base import *
+from horton.grid.cache import *
 from horton.grid.atgrid import *
 from horton.grid.cext import *
 from horton.grid.int1d import *
@@ -40,7 +40,7 @@ __all__ = [
 
 
 class AtomicGrid(IntGrid):
-    def __init__(self, number, pseudo_number, center, agspec='medium', random_rotate=True, points=None):
+    def __init__(self, number, pseudo_number, center, agspec='medium', random_rotate=True, points=None, weights=None, random_state=None):
         '''
            **Arguments:**
 
@@ -68,6 +68,15 @@ class AtomicGrid(IntGrid):
 
            points
                 Array to store the grid points
+
+           weights
+                Array with precomputed integration weights, e.g. loaded from a
+                grid cache. When given, the argument points must contain the
+                corresponding grid points, which are then not recomputed.
+
+           random_state
+                A numpy RandomState instance used for the random rotations.
+                When not given, the global numpy random generator is used.
         '''
         self._number = number
         self._pseudo_number = pseudo_number
@@ -80,13 +89,23 @@ class AtomicGrid(IntGrid):
 
         # Obtain the total size and allocate arrays for this grid.
         size = self._nlls.sum()
-        if points is None:
-            points = np.zeros((size, 3), float)
-        else:
+        if weights is not None:
+            assert points is not None
             assert len(points) == size
-        weights = np.zeros(size, float)
+            assert len(weights) == size
+        else:
+            if points is None:
+                points = np.zeros((size, 3), float)
+            else:
+                assert len(points) == size
+            weights = np.zeros(size, float)
+            self._fill(points, weights, random_state)
+
+        IntGrid.__init__(self, points, weights)
+        self._log_init()
 
-        # Fill the points and weights arrays
+    def _fill(self, points, weights, random_state):
+        '''Compute the grid points and the integration weights'''
         offset = 0
         nsphere = len(self._nlls)
         radii = self._rgrid.radii
@@ -100,7 +119,7 @@ class AtomicGrid(IntGrid):
             lebedev_laikov_sphere(my_points, my_weights)
             my_points *= radii[i]
             if self.random_rotate:
-                rotmat = get_random_rotation()
+                rotmat = get_random_rotation(random_state)
                 my_points[:] = np.dot(my_points, rotmat)
             my_weights *= rweights[i]
 
@@ -108,9 +127,6 @@ class AtomicGrid(IntGrid):
 
         points[:] += self.center
 
-        IntGrid.__init__(self, points, weights)
-        self._log_init()
-
     def _get_number(self):
         '''The element number of the grid.'''
         return self._number
@@ -285,17 +301,26 @@ def get_rotation_matrix(axis, angle):
     ])
 
 
-def get_random_rotation():
-    '''Return a random rotation matrix'''
+def get_random_rotation(random_state=None):
+    '''Return a random rotation matrix
+
+       **Optional arguments:**
+
+       random_state
+            A numpy RandomState instance. When not given, the global numpy
+            random generator is used.
+    '''
+    if random_state is None:
+        random_state = np.random
     # Get a random unit vector for the axis
     while True:
-        axis = np.random.uniform(-1, 1, 3)
+        axis = random_state.uniform(-1, 1, 3)
         norm = np.linalg.norm(axis)
         if norm < 1.0 and norm > 0.1:
             break
 
     # Get a random rotation angle
-    angle = np.random.uniform(0, 2*np.pi)
+    angle = random_state.uniform(0, 2*np.pi)
 
     return get_rotation_matrix(axis, angle)
 
@@ -24,8 +24,11 @@
 #ifdef DEBUG
 #include <cstdio>
 #endif
+#include <algorithm>
 #include <cmath>
 #include <stdexcept>
+#include <utility>
+#include <vector>
 
 #include "horton/grid/becke.h"
 
@@ -46,6 +49,25 @@ static double dist(double* p0, double* p1) {
 }
 
 
+/* compute_alpha
+
+   Heteronuclear assignment of the boundary between two atoms. (Appendix in
+   Becke's paper.)
+*/
+static double compute_alpha(double radius0, double radius1) {
+    double alpha = (radius0 - radius1)/(radius0 + radius1); // Eq. (A6)
+    alpha = alpha/(alpha*alpha-1); // Eq. (A5)
+    // Eq. (A3), except that we use some safe margin (0.45 instead of 0.5)
+    // to stay away from a ridiculous imbalance.
+    if (alpha > 0.45) {
+        alpha = 0.45;
+    } else if (alpha < -0.45) {
+        alpha = -0.45;
+    }
+    return alpha;
+}
+
+
 /* becke_helper_atom
 
    Computes the Becke weighting function for every point in the grid
@@ -90,17 +112,7 @@ void becke_helper_atom(int npoint, double* points, double* weights, int natom,
     long offset = 0;
     for (int iatom0 = 0; iatom0 < natom; iatom0++) {
         for (int iatom1 = 0; iatom1 <= iatom0; iatom1++) {
-            // Heteronuclear assignment of the boundary. (Appendix in Becke's paper.)
-            double alpha = (radii[iatom0] - radii[iatom1])/(radii[iatom0] + radii[iatom1]); // Eq. (A6)
-            alpha = alpha/(alpha*alpha-1); // Eq. (A5)
-            // Eq. (A3), except that we use some safe margin (0.45 instead of 0.5)
-            // to stay away from a ridiculous imbalance.
-            if (alpha > 0.45) {
-                alpha = 0.45;
-            } else if (alpha < -0.45) {
-                alpha = -0.45;
-            }
-            alphas[offset] = alpha;
+            alphas[offset] = compute_alpha(radii[iatom0], radii[iatom1]);
             offset += 1;
         }
     }
@@ -163,3 +175,182 @@ void becke_helper_atom(int npoint, double* points, double* weights, int natom,
         weights++;
     }
 }
+
+
+/* stratmann_switch
+
+   The switching function of Stratmann et al., applied to the size-adjusted
+   elliptical coordinate nu. It is exactly one for nu <= -a and exactly zero
+   for nu >= a.
+*/
+static double stratmann_switch(double nu, double a) {
+    if (nu <= -a) return 1.0;
+    if (nu >= a) return 0.0;
+    double x = nu/a;
+    double x2 = x*x;
+    double g = x*(35 + x2*(-35 + x2*(21 - 5*x2)))/16; // Eq. (14)
+    return 0.5*(1 - g);
+}
+
+
+/* stratmann_helper_atom
+
+   Computes the Becke weighting function for every point in the grid, using
+   the compactly supported switching function of Stratmann et al. instead of
+   Becke's polynomial. Becke's heteronuclear size adjustments are retained.
+
+   Because the switching function reaches exactly zero and one, most atom
+   pairs do not contribute to the weight of a given point. Only the atoms in a
+   sphere around the point are considered, with a radius proportional to the
+   distance between the point and the nearest atom. These atoms are found
+   with a list of neighbours of the selected atom, sorted by distance. Points
+   close enough to the selected atom get a weight of exactly one and points
+   too far from the selected atom, compared to the nearest atom, get a weight
+   of exactly zero. Both are skipped without considering other atoms.
+
+   npoint, points, weights, natom, radii, centers, select
+        See becke_helper_atom
+
+   a
+        The parameter of the switching function, 0 < a < 1. Stratmann et al.
+        recommend a value of 0.64.
+
+   See Stratmann's paper for the details:
+   R. E. Stratmann, G. E. Scuseria and M. J. Frisch, Chemical Physics Letters
+   257, 213 (1996)
+   URL http://dx.doi.org/10.1016/0009-2614(96)00600-8
+*/
+void stratmann_helper_atom(int npoint, double* points, double* weights,
+                           int natom, double* radii, double* centers,
+                           int select, double a)
+{
+    if ((a <= 0) || (a >= 1)) {
+        throw std::domain_error("The Stratmann parameter must be in the interval ]0,1[.");
+    }
+
+    // precompute the the alpha parameters and the interatomic distances for
+    // each atom pair
+    std::vector<double> alphas((natom*(natom+1))/2);
+    std::vector<double> atomic_dists((natom*(natom+1))/2);
+    long offset = 0;
+    for (int iatom0 = 0; iatom0 < natom; iatom0++) {
+        for (int iatom1 = 0; iatom1 <= iatom0; iatom1++) {
+            alphas[offset] = compute_alpha(radii[iatom0], radii[iatom1]);
+            atomic_dists[offset] = dist(&centers[3*iatom0], &centers[3*iatom1]);
+            offset += 1;
+        }
+    }
+
+    // The switching function of the pair (iatom0, iatom1) is zero when
+    // mu > b, with mu the unadjusted elliptical coordinate. The value of b
+    // follows from solving nu = mu + alpha*(1 - mu^2) = a for mu, taking the
+    // most unfavorable alpha of all pairs. It reduces to a when alpha = 0.
+    double alpha_max = 0;
+    for (long i = 0; i < (long)alphas.size(); i++) {
+        alpha_max = std::max(alpha_max, fabs(alphas[i]));
+    }
+    double b = a;
+    if (alpha_max > 0) {
+        b = (sqrt(1 + 4*alpha_max*(alpha_max + a)) - 1)/(2*alpha_max);
+    }
+    // An atom at a distance r from a point can only influence the weights of
+    // atoms within a distance ratio*r from that point.
+    const double ratio = (1 + b)/(1 - b);
+
+    // Neighbours of the selected atom, sorted by their distance to it. The
+    // distance to the nearest neighbour determines the sphere around the
+    // selected atom in which all weights are exactly one.
+    std::vector<std::pair<double, int> > neighbours;
+    for (int iatom = 0; iatom < natom; iatom++) {
+        offset = (select < iatom) ? (iatom*(iatom+1))/2+select : (select*(select+1))/2+iatom;
+        neighbours.push_back(std::make_pair(atomic_dists[offset], iatom));
+    }
+    std::sort(neighbours.begin(), neighbours.end());
+    // With only one atom, all weights are one.
+    if (natom == 1) return;
+    const double radius_one = 0.5*(1 - b)*neighbours[1].first;
+
+    // Atoms near the current point, sorted by their distance to the point.
+    std::vector<std::pair<double, int> > nearby;
+    for (int ipoint = 0; ipoint < npoint; ipoint++) {
+        double* point = &points[3*ipoint];
+        double dist_select = dist(point, &centers[3*select]);
+        if (dist_select < radius_one) continue;
+
+        // Find the distance to the nearest atom. An atom at a distance D from
+        // the selected atom is at least D - dist_select away from the point.
+        double dist_nearest = dist_select;
+        for (int ineighbour = 1; ineighbour < natom; ineighbour++) {
+            if (neighbours[ineighbour].first - dist_select >= dist_nearest) break;
+            int iatom = neighbours[ineighbour].second;
+            dist_nearest = std::min(dist_nearest, dist(point, &centers[3*iatom]));
+        }
+
+        // Only atoms closer than ratio*dist_nearest have a non-zero cell
+        // function.
+        if (dist_select > ratio*dist_nearest) {
+            weights[ipoint] = 0;
+            continue;
+        }
+
+        // Collect the atoms within a distance ratio^2*dist_nearest of the
+        // point. Atoms further away do not affect the cell function of any
+        // atom closer than ratio*dist_nearest.
+        const double cutoff = ratio*ratio*dist_nearest;
+        nearby.clear();
+        for (int ineighbour = 0; ineighbour < natom; ineighbour++) {
+            if (neighbours[ineighbour].first > dist_select + cutoff) break;
+            int iatom = neighbours[ineighbour].second;
+            double d = dist(point, &centers[3*iatom]);
+            if ((d < cutoff) || (iatom == select)) {
+                nearby.push_back(std::make_pair(d, iatom));
+            }
+        }
+        std::sort(nearby.begin(), nearby.end());
+
+        // Only atoms closer than ratio*dist_nearest can have a non-zero cell
+        // function, where dist_nearest is the distance to the closest atom.
+        double nom = 0;
+        double denom = 0;
+        const double cutoff0 = ratio*nearby[0].first;
+        for (long inearby0 = 0; inearby0 < (long)nearby.size(); inearby0++) {
+            double dist0 = nearby[inearby0].first;
+            int iatom0 = nearby[inearby0].second;
+            if ((dist0 > cutoff0) && (iatom0 != select)) continue;
+            // Atoms further than ratio*dist0 have a switching function of one.
+            const double cutoff1 = ratio*dist0;
+            double p = 1;
+            for (long inearby1 = 0; inearby1 < (long)nearby.size(); inearby1++) {
+                double dist1 = nearby[inearby1].first;
+                if (dist1 > cutoff1) break;
+                int iatom1 = nearby[inearby1].second;
+                if (iatom0 == iatom1) continue;
+
+                // compute offset for alpha and interatomic distance
+                if (iatom0 < iatom1) {
+                    offset = (iatom1*(iatom1+1))/2+iatom0;
+                } else {
+                    offset = (iatom0*(iatom0+1))/2+iatom1;
+                }
+
+                double s = (dist0 - dist1)/atomic_dists[offset]; // Eq. (11) in Becke's paper
+                s = s + alphas[offset]*(1 - 2*(iatom0<iatom1))*(1-s*s); // Eq. (A2) in Becke's paper
+                p *= stratmann_switch(s, a);
+                if (p == 0) break;
+            }
+
+            if (iatom0 == select) {
+                if (p == 0) break;
+                nom = p;
+            }
+            denom += p;
+        }
+
+        // Weight function at this grid point:
+        if (nom == 0) {
+            weights[ipoint] = 0;
+        } else {
+            weights[ipoint] *= nom/denom;
+        }
+    }
+}
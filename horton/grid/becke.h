@@ -25,5 +25,8 @@
 
 void becke_helper_atom(int npoint, double* points, double* weights, int natom,
                        double* radii, double* centers, int select, int order);
+void stratmann_helper_atom(int npoint, double* points, double* weights,
+                           int natom, double* radii, double* centers,
+                           int select, double a);
 
 #endif
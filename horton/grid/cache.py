@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+# HORTON: Helpful Open-source Research TOol for N-fermion systems.
+# Copyright (C) 2011-2015 The HORTON Development Team
+#
+# This file is part of HORTON.
+#
+# HORTON is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# HORTON is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+#--
+'''Persistent on-disk cache for molecular integration grids'''
+
+
+import hashlib, os, tempfile
+
+import h5py as h5, numpy as np
+
+from horton.log import log
+
+
+__all__ = ['GridCache', 'get_grid_cache', 'set_grid_cache']
+
+
+class GridCache(object):
+    '''A directory with HDF5 files containing grid arrays
+
+       Each file is identified by a key, i.e. a hash of all parameters that
+       determine the grid. When the total size of the files exceeds a maximum,
+       the least recently used files are removed.
+    '''
+    def __init__(self, directory, maxsize=2**30):
+        '''
+           **Arguments:**
+
+           directory
+                The directory where the grids are stored. It is created when
+                it does not exist yet.
+
+           **Optional arguments:**
+
+           maxsize
+                The maximum total size of all files in the cache, in bytes.
+        '''
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._directory = directory
+        self._maxsize = maxsize
+
+    def _get_directory(self):
+        '''The directory where the grids are stored.'''
+        return self._directory
+
+    directory = property(_get_directory)
+
+    def _get_maxsize(self):
+        '''The maximum total size of all files in the cache, in bytes.'''
+        return self._maxsize
+
+    maxsize = property(_get_maxsize)
+
+    @staticmethod
+    def get_key(*items):
+        '''Compute a key from arrays and other objects with a unique repr'''
+        sha1 = hashlib.sha1()
+        for item in items:
+            if isinstance(item, np.ndarray):
+                sha1.update(str(item.dtype))
+                sha1.update(str(item.shape))
+                sha1.update(np.ascontiguousarray(item).tobytes())
+            else:
+                sha1.update(repr(item))
+        return sha1.hexdigest()
+
+    def _get_fn(self, key):
+        return os.path.join(self._directory, '%s.h5' % key)
+
+    def load(self, key):
+        '''Return a dictionary with the arrays for the given key or None
+
+           A file that can not be read is removed from the cache.
+        '''
+        fn = self._get_fn(key)
+        if not os.path.isfile(fn):
+            return None
+        try:
+            with h5.File(fn, 'r') as f:
+                result = dict((name, ds[:]) for name, ds in f.iteritems())
+        except (IOError, KeyError):
+            if log.do_warning:
+                log.warn('Removing corrupt grid cache file %s' % fn)
+            os.remove(fn)
+            return None
+        # Mark the file as recently used.
+        os.utime(fn, None)
+        if log.do_medium:
+            log('Loaded grid from cache: %s' % fn)
+        return result
+
+    def dump(self, key, **arrays):
+        '''Store arrays under the given key and evict old files if needed'''
+        # Write to a temporary file first, such that concurrent processes
+        # never see an incomplete file.
+        fd, fn_tmp = tempfile.mkstemp('.h5.tmp', dir=self._directory)
+        os.close(fd)
+        try:
+            with h5.File(fn_tmp, 'w') as f:
+                for name, array in arrays.iteritems():
+                    f[name] = array
+            os.rename(fn_tmp, self._get_fn(key))
+        except:
+            os.remove(fn_tmp)
+            raise
+        self._evict()
+
+    def _evict(self):
+        '''Remove the least recently used files until the cache fits maxsize'''
+        records = []
+        for name in os.listdir(self._directory):
+            if not name.endswith('.h5'):
+                continue
+            fn = os.path.join(self._directory, name)
+            try:
+                stat = os.stat(fn)
+            except OSError:
+                # Removed by another process.
+                continue
+            records.append((stat.st_mtime, stat.st_size, fn))
+        records.sort()
+        total = sum(size for mtime, size, fn in records)
+        for mtime, size, fn in records:
+            if total <= self._maxsize:
+                break
+            try:
+                os.remove(fn)
+            except OSError:
+                pass
+            total -= size
+
+
+_grid_cache = None
+_grid_cache_directory = os.getenv('HORTON_GRID_CACHE')
+if _grid_cache_directory is not None:
+    _grid_cache = GridCache(_grid_cache_directory, int(os.getenv('HORTON_GRID_CACHE_SIZE', 2**30)))
+
+
+def get_grid_cache():
+    '''Return the default grid cache, or None when it is disabled.'''
+    return _grid_cache
+
+
+def set_grid_cache(cache):
+    '''Set the default grid cache
+
+       **Arguments:**
+
+       cache
+            A GridCache instance, or None to disable the default cache. The
+            default cache can also be set with the environment variables
+            ``HORTON_GRID_CACHE`` (the directory) and
+            ``HORTON_GRID_CACHE_SIZE`` (the maximum size in bytes).
+    '''
+    global _grid_cache
+    _grid_cache = cache
@@ -49,7 +49,7 @@ __all__ = [
     # lebedev_laikov
     'lebedev_laikov_npoints', 'lebedev_laikov_lmaxs', 'lebedev_laikov_sphere',
     # becke
-    'becke_helper_atom',
+    'becke_helper_atom', 'stratmann_helper_atom',
     # cubic_spline
     'Extrapolation', 'ZeroExtrapolation', 'CuspExtrapolation',
     'PowerExtrapolation', 'tridiagsym_solve', 'CubicSpline',
@@ -170,15 +170,63 @@ def becke_helper_atom(np.ndarray[double, ndim=2] points not None,
     assert weights.flags['C_CONTIGUOUS']
     assert weights.shape[0] == npoint
     assert radii.flags['C_CONTIGUOUS']
-    natom = radii.shape[0]
+    cdef int natom = radii.shape[0]
     assert centers.flags['C_CONTIGUOUS']
     assert centers.shape[0] == natom
     assert centers.shape[1] == 3
     assert select >= 0 and select < natom
     assert order > 0
 
-    becke.becke_helper_atom(points.shape[0], &points[0, 0], &weights[0], natom,
-                            &radii[0], &centers[0, 0], select, order)
+    with nogil:
+        becke.becke_helper_atom(points.shape[0], &points[0, 0], &weights[0],
+                                natom, &radii[0], &centers[0, 0], select,
+                                order)
+
+
+def stratmann_helper_atom(np.ndarray[double, ndim=2] points not None,
+                          np.ndarray[double, ndim=1] weights not None,
+                          np.ndarray[double, ndim=1] radii not None,
+                          np.ndarray[double, ndim=2] centers not None,
+                          int select, double a=0.64):
+    '''stratmann_helper_atom(points, weights, radii, centers, i, a=0.64)
+
+       Compute the Becke weights for a given atom an a grid, using the
+       switching function of Stratmann et al.
+
+       **Arguments:**
+
+       points, weights, radii, centers, select
+            See ``becke_helper_atom``.
+
+       **Optional arguments:**
+
+       a
+            The parameter of the switching function, must be in the interval
+            ]0,1[. The switching function is exactly zero or one outside the
+            interval [-a,a] of the (size-adjusted) elliptical coordinate.
+
+       Unlike Becke's switching function, this one has a finite range. Only
+       atoms in the neighbourhood of a grid point are taken into account and
+       points close to the selected atom get a weight of exactly one, such
+       that the cost scales linearly with the system size. See
+       http://dx.doi.org/10.1016/0009-2614(96)00600-8
+    '''
+    assert points.flags['C_CONTIGUOUS']
+    assert points.shape[1] == 3
+    npoint = points.shape[0]
+    assert weights.flags['C_CONTIGUOUS']
+    assert weights.shape[0] == npoint
+    assert radii.flags['C_CONTIGUOUS']
+    cdef int natom = radii.shape[0]
+    assert centers.flags['C_CONTIGUOUS']
+    assert centers.shape[0] == natom
+    assert centers.shape[1] == 3
+    assert select >= 0 and select < natom
+
+    with nogil:
+        becke.stratmann_helper_atom(points.shape[0], &points[0, 0],
+                                    &weights[0], natom, &radii[0],
+                                    &centers[0, 0], select, a)
 
 
 #
@@ -528,8 +576,9 @@ def eval_spline_grid(CubicSpline spline not None,
     assert points.shape[1] == 3
     assert points.shape[0] == output.shape[0]
 
-    evaluate.eval_spline_grid(spline._this, &center[0], &output[0],
-                              &points[0, 0], cell._this, output.shape[0])
+    with nogil:
+        evaluate.eval_spline_grid(spline._this, &center[0], &output[0],
+                                  &points[0, 0], cell._this, output.shape[0])
 
 
 def eval_decomposition_grid(splines not None,
@@ -561,6 +610,7 @@ def eval_decomposition_grid(splines not None,
     # parse the splines argument and construct an array of c++ cubic spline objects
     assert len(splines) > 0
     cdef CubicSpline spline
+    cdef long nspline = len(splines)
     cdef cubic_spline.CubicSpline** cpp_splines = <cubic_spline.CubicSpline**>malloc(len(splines)*sizeof(cubic_spline.CubicSpline*))
     if cpp_splines == NULL:
         raise MemoryError()
@@ -577,9 +627,10 @@ def eval_decomposition_grid(splines not None,
         assert points.shape[1] == 3
         assert points.shape[0] == output.shape[0]
 
-        evaluate.eval_decomposition_grid(cpp_splines, <double*>center.data,
-            <double*>output.data, <double*>points.data, cell._this, len(splines),
-            output.shape[0])
+        with nogil:
+            evaluate.eval_decomposition_grid(cpp_splines, <double*>center.data,
+                <double*>output.data, <double*>points.data, cell._this, nspline,
+                output.shape[0])
     finally:
         free(cpp_splines)
 
@@ -1744,11 +1795,13 @@ def dot_multi(*integranda, np.ndarray[long, ndim=1] segments=None):
             an array with the same size as segments.
     '''
     cdef long npoint = _check_integranda(integranda)
+    cdef long nvector = len(integranda)
     segments, nsegment = _parse_segments(segments, npoint)
     cdef np.ndarray[double, ndim=1] output = np.zeros(nsegment)
     cdef double** pointers = _parse_integranda(integranda)
     try:
-        utils.dot_multi(npoint, len(integranda), pointers, &segments[0], &output[0])
+        with nogil:
+            utils.dot_multi(npoint, nvector, pointers, &segments[0], &output[0])
     finally:
         free(pointers)
     if nsegment == 1:
@@ -26,6 +26,7 @@
 
 #include <cmath>
 #include <stdexcept>
+#include <vector>
 #include "horton/moments.h"
 #include "horton/grid/evaluate.h"
 
@@ -71,25 +72,39 @@ void eval_spline_cube(CubicSpline* spline, double* center, double* output,
     }
 }
 
-void eval_spline_grid(CubicSpline* spline, double* center, double* output,
-                      double* points, Cell* cell, long npoint) {
-    double rcut = spline->get_last_x();
+/*
+    Grid points are sorted into bins of approximately rcut wide, such that only
+    the points in bins near an image of the center need to be considered. The
+    number of bins is limited to EVAL_BIN_MAX along each Cartesian axis.
+*/
+#define EVAL_BIN_MAX 64
+/*
+    The maximum number of distances that are collected before the spline is
+    evaluated, when the spline has a tail.
+*/
+#define EVAL_TAIL_BATCH 4096
 
-    while (npoint > 0) {
-        // Find the ranges for the triple loop
+static void eval_spline_grid_tail(CubicSpline* spline, double* center,
+                                  double* output, double* points, Cell* cell,
+                                  long npoint) {
+    // All images within the ranges of a point contribute, also beyond rcut.
+    // The distances are collected in batches, such that the spline is
+    // evaluated for many distances in a single call.
+    double rcut = spline->get_last_x();
+    std::vector<long> indexes;
+    std::vector<double> dists;
+    std::vector<double> values(EVAL_TAIL_BATCH);
+    indexes.reserve(EVAL_TAIL_BATCH);
+    dists.reserve(EVAL_TAIL_BATCH);
+    for (long ipoint=0; ipoint < npoint; ipoint++) {
         double delta[3];
-        delta[0] = points[0] - center[0];
-        delta[1] = points[1] - center[1];
-        delta[2] = points[2] - center[2];
-        long ranges_begin[3], ranges_end[3];
+        delta[0] = points[3*ipoint] - center[0];
+        delta[1] = points[3*ipoint+1] - center[1];
+        delta[2] = points[3*ipoint+2] - center[2];
+        long ranges_begin[3] = {0, 0, 0};
+        long ranges_end[3] = {1, 1, 1};
         cell->set_ranges_rcut(delta, rcut, ranges_begin, ranges_end);
 
-        for (int i=cell->get_nvec(); i < 3; i++) {
-            ranges_begin[i] = 0;
-            ranges_end[i] = 1;
-        }
-
-        // Run the triple loop
         for (long i0 = ranges_begin[0]; i0 < ranges_end[0]; i0++) {
             for (long i1 = ranges_begin[1]; i1 < ranges_end[1]; i1++) {
                 for (long i2 = ranges_begin[2]; i2 < ranges_end[2]; i2++) {
@@ -102,26 +117,159 @@ void eval_spline_grid(CubicSpline* spline, double* center, double* output,
                     double x = cart[0] + delta[0];
                     double y = cart[1] + delta[1];
                     double z = cart[2] + delta[2];
-                    double d = sqrt(x*x+y*y+z*z);
+                    indexes.push_back(ipoint);
+                    dists.push_back(sqrt(x*x+y*y+z*z));
+                }
+            }
+        }
 
-                    // Evaluate spline if needed
-                    if ((d < rcut) || spline->get_extrapolation()->has_tail()) {
-                        double s;
-                        spline->eval(&d, &s, 1);
+        // Evaluate the spline when the batch is full or at the last point.
+        if ((dists.size() >= EVAL_TAIL_BATCH) || (ipoint == npoint - 1)) {
+            if (values.size() < dists.size()) values.resize(dists.size());
+            spline->eval(&dists[0], &values[0], dists.size());
+            for (long i = 0; i < (long)dists.size(); i++) {
+                output[indexes[i]] += values[i];
+            }
+            indexes.clear();
+            dists.clear();
+        }
+    }
+}
+
+void eval_spline_grid(CubicSpline* spline, double* center, double* output,
+                      double* points, Cell* cell, long npoint) {
+    if (npoint <= 0) return;
+    if (spline->get_extrapolation()->has_tail()) {
+        eval_spline_grid_tail(spline, center, output, points, cell, npoint);
+        return;
+    }
+    double rcut = spline->get_last_x();
+
+    // Find the union of the ranges of periodic images that are relevant for
+    // each point.
+    long ranges_begin[3] = {0, 0, 0};
+    long ranges_end[3] = {1, 1, 1};
+    for (long ipoint=0; ipoint < npoint; ipoint++) {
+        double delta[3];
+        delta[0] = points[3*ipoint] - center[0];
+        delta[1] = points[3*ipoint+1] - center[1];
+        delta[2] = points[3*ipoint+2] - center[2];
+        long begin[3], end[3];
+        cell->set_ranges_rcut(delta, rcut, begin, end);
+        for (int i=0; i < cell->get_nvec(); i++) {
+            if ((ipoint == 0) || (begin[i] < ranges_begin[i])) ranges_begin[i] = begin[i];
+            if ((ipoint == 0) || (end[i] > ranges_end[i])) ranges_end[i] = end[i];
+        }
+    }
+
+    // Sort the points into bins, using a counting sort.
+    double lower[3], upper[3], width[3];
+    long nbin[3];
+    for (int i=0; i < 3; i++) {
+        lower[i] = points[i];
+        upper[i] = points[i];
+    }
+    for (long ipoint=1; ipoint < npoint; ipoint++) {
+        for (int i=0; i < 3; i++) {
+            if (points[3*ipoint+i] < lower[i]) lower[i] = points[3*ipoint+i];
+            if (points[3*ipoint+i] > upper[i]) upper[i] = points[3*ipoint+i];
+        }
+    }
+    for (int i=0; i < 3; i++) {
+        nbin[i] = ceil((upper[i] - lower[i])/rcut);
+        if (nbin[i] < 1) nbin[i] = 1;
+        if (nbin[i] > EVAL_BIN_MAX) nbin[i] = EVAL_BIN_MAX;
+        width[i] = (upper[i] - lower[i])/nbin[i];
+        if (width[i] <= 0) width[i] = 1;
+    }
+    std::vector<long> bin_of_point(npoint);
+    std::vector<long> bin_begin(nbin[0]*nbin[1]*nbin[2] + 1, 0);
+    for (long ipoint=0; ipoint < npoint; ipoint++) {
+        long b[3];
+        for (int i=0; i < 3; i++) {
+            b[i] = (points[3*ipoint+i] - lower[i])/width[i];
+            if (b[i] >= nbin[i]) b[i] = nbin[i] - 1;
+        }
+        bin_of_point[ipoint] = (b[0]*nbin[1] + b[1])*nbin[2] + b[2];
+        bin_begin[bin_of_point[ipoint] + 1]++;
+    }
+    for (long ibin=0; ibin < (long)bin_begin.size() - 1; ibin++) {
+        bin_begin[ibin + 1] += bin_begin[ibin];
+    }
+    std::vector<long> sorted(npoint);
+    {
+        std::vector<long> fill(bin_begin.begin(), bin_begin.end() - 1);
+        for (long ipoint=0; ipoint < npoint; ipoint++) {
+            sorted[fill[bin_of_point[ipoint]]++] = ipoint;
+        }
+    }
+
+    // Loop over all relevant images of the center. For each image, the
+    // distances to the points within rcut are collected in a contiguous
+    // array, such that the spline is evaluated for all of them in one call.
+    std::vector<long> indexes(npoint);
+    std::vector<double> dists(npoint);
+    std::vector<double> values(npoint);
+    for (long i0 = ranges_begin[0]; i0 < ranges_end[0]; i0++) {
+        for (long i1 = ranges_begin[1]; i1 < ranges_end[1]; i1++) {
+            for (long i2 = ranges_begin[2]; i2 < ranges_end[2]; i2++) {
+                // Compute the position of the image of the center
+                double frac[3], cart[3], image[3];
+                frac[0] = i0;
+                frac[1] = i1;
+                frac[2] = i2;
+                cell->to_cart(frac, cart);
+                image[0] = center[0] - cart[0];
+                image[1] = center[1] - cart[1];
+                image[2] = center[2] - cart[2];
+
+                // Select the bins that may contain points within rcut.
+                long bin_lo[3], bin_hi[3];
+                bool empty = false;
+                for (int i=0; i < 3; i++) {
+                    if ((image[i] + rcut < lower[i]) || (image[i] - rcut > upper[i])) {
+                        empty = true;
+                        break;
+                    }
+                    bin_lo[i] = floor((image[i] - rcut - lower[i])/width[i]);
+                    bin_hi[i] = floor((image[i] + rcut - lower[i])/width[i]);
+                    if (bin_lo[i] < 0) bin_lo[i] = 0;
+                    if (bin_hi[i] >= nbin[i]) bin_hi[i] = nbin[i] - 1;
+                }
+                if (empty) continue;
+
+                long nselect = 0;
+                for (long b0 = bin_lo[0]; b0 <= bin_hi[0]; b0++) {
+                    for (long b1 = bin_lo[1]; b1 <= bin_hi[1]; b1++) {
+                        for (long b2 = bin_lo[2]; b2 <= bin_hi[2]; b2++) {
+                            long ibin = (b0*nbin[1] + b1)*nbin[2] + b2;
+                            for (long j = bin_begin[ibin]; j < bin_begin[ibin+1]; j++) {
+                                long ipoint = sorted[j];
+                                double x = points[3*ipoint] - image[0];
+                                double y = points[3*ipoint+1] - image[1];
+                                double z = points[3*ipoint+2] - image[2];
+                                double d = sqrt(x*x+y*y+z*z);
+                                if (d < rcut) {
+                                    indexes[nselect] = ipoint;
+                                    dists[nselect] = d;
+                                    nselect++;
+                                }
+                            }
+                        }
+                    }
+                }
 #ifdef DEBUG
-                        printf("i=[%li,%li,%li] d=%f s=%f \n", i0, i1, i2, d, s);
+                printf("i=[%li,%li,%li] nselect=%li\n", i0, i1, i2, nselect);
 #endif
-                        *output += s;
-                    }
+                if (nselect == 0) continue;
 
+                // Evaluate the spline and add the results to the output
+                spline->eval(&dists[0], &values[0], nselect);
+                for (long iselect = 0; iselect < nselect; iselect++) {
+                    output[indexes[iselect]] += values[iselect];
                 }
             }
         }
-
-        // move on
-        points += 3;
-        output++;
-        npoint--;
     }
 }
 
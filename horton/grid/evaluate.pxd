@@ -30,8 +30,8 @@ cdef extern from "horton/grid/evaluate.h":
 
     void eval_spline_grid(cubic_spline.CubicSpline* spline, double* center,
         double* output, double* points, horton.cell.Cell* cell,
-        long npoint)
+        long npoint) nogil
 
     void eval_decomposition_grid(cubic_spline.CubicSpline** splines,
         double* center, double* output, double* points, horton.cell.Cell* cell,
-        long nspline, long npoint)
+        long nspline, long npoint) nogil except +
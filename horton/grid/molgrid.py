@@ -22,11 +22,14 @@
 
 
 
+from multiprocessing.pool import ThreadPool
+
 import numpy as np
 
 from horton.grid.base import IntGrid
+from horton.grid.cache import GridCache, get_grid_cache
 from horton.grid.atgrid import AtomicGrid, AtomicGridSpec
-from horton.grid.cext import becke_helper_atom
+from horton.grid.cext import becke_helper_atom, stratmann_helper_atom
 from horton.log import log, timer
 from horton.periodic import periodic
 from horton.utils import typecheck_geo, doc_inherit
@@ -42,7 +45,7 @@ class BeckeMolGrid(IntGrid):
     '''Molecular integration grid using Becke weights'''
 
     @timer.with_section('Becke-Lebedev')
-    def __init__(self, centers, numbers, pseudo_numbers=None, agspec='medium', k=3, random_rotate=True, mode='discard'):
+    def __init__(self, centers, numbers, pseudo_numbers=None, agspec='medium', k=3, random_rotate=True, mode='discard', stratmann_a=None, nthread=1, cache=None, random_seed=None):
         '''
            **Arguments:**
 
@@ -81,6 +84,31 @@ class BeckeMolGrid(IntGrid):
                 * ``'only'`` means that only the subgrids are constructed and
                   that the computation of the molecular integration weights
                   (based on the Becke partitioning) is skipped.
+
+           stratmann_a
+                When given, the switching function of Stratmann et al. is used
+                instead of Becke's, with this value for the parameter a (0.64
+                is recommended). The argument k is then ignored. Only nearby
+                atoms contribute to the weights of a grid point, which makes
+                the construction of grids for large systems much faster.
+
+           nthread
+                The number of threads used to compute the Becke weights of
+                different atoms concurrently. The result does not depend on
+                the number of threads.
+
+           cache
+                A GridCache instance in which the grid is looked up before it
+                is constructed and where it is stored afterwards. When not
+                given, the default cache is used (see ``set_grid_cache``), if
+                any. Set to False to disable caching.
+
+           random_seed
+                An integer seed for the random rotations of the atomic grids.
+                When not given and a cache is used, the seed is derived from
+                the cache key, such that the grid can be reproduced. When not
+                given and no cache is used, the global numpy random generator
+                is used.
         '''
         natom, centers, numbers, pseudo_numbers = typecheck_geo(centers, numbers, pseudo_numbers)
         self._centers = centers
@@ -98,7 +126,9 @@ class BeckeMolGrid(IntGrid):
 
         # assign attributes
         self._k = k
+        self._stratmann_a = stratmann_a
         self._random_rotate = random_rotate
+        self._random_seed = random_seed
         self._mode = mode
 
         # allocate memory for the grid
@@ -119,24 +149,92 @@ class BeckeMolGrid(IntGrid):
             # More recent covalent radii are used than in the original work of Becke.
             cov_radii = np.array([periodic[n].cov_radius for n in self.numbers])
 
+        def compute_becke(task):
+            i, begin, end, atweights = task
+            atbecke_weights = self._becke_weights[begin:end]
+            if stratmann_a is None:
+                becke_helper_atom(points[begin:end], atbecke_weights, cov_radii, self.centers, i, self._k)
+            else:
+                stratmann_helper_atom(points[begin:end], atbecke_weights, cov_radii, self.centers, i, stratmann_a)
+            weights[begin:end] = atweights*atbecke_weights
+
+        # Look for a previously constructed grid in the cache.
+        if cache is None:
+            cache = get_grid_cache()
+        arrays = None
+        if cache:
+            key = self._get_cache_key()
+            arrays = cache.load(key)
+            if random_seed is None:
+                # The rotations must be reproducible to cache the grid.
+                random_seed = int(key[:8], 16)
+        if random_rotate and random_seed is not None:
+            random_state = np.random.RandomState(random_seed)
+        else:
+            random_state = None
+
         # The actual work:
         if log.do_medium:
             log('Preparing Becke-Lebedev molecular integration grid.')
         pb = log.progress(natom)
-        for i in xrange(natom):
-            atsize = agspec.get_size(self.numbers[i], self.pseudo_numbers[i])
-            atgrid = AtomicGrid(
-                self.numbers[i], self.pseudo_numbers[i],
-                self.centers[i], agspec, random_rotate,
-                points[offset:offset+atsize])
-            if mode != 'only':
-                atbecke_weights = self._becke_weights[offset:offset+atsize]
-                becke_helper_atom(points[offset:offset+atsize], atbecke_weights, cov_radii, self.centers, i, self._k)
-                weights[offset:offset+atsize] = atgrid.weights*atbecke_weights
+        if arrays is not None:
+            points[:] = arrays['points']
+            weights[:] = arrays['weights']
+            self._becke_weights[:] = arrays['becke_weights']
             if mode != 'discard':
-                atgrids.append(atgrid)
-            offset += atsize
-            pb()
+                # The atomic grids are built from the cached (rotated) points
+                # and their weights.
+                atweights = arrays['atweights']
+                for i in xrange(natom):
+                    atsize = agspec.get_size(self.numbers[i], self.pseudo_numbers[i])
+                    atgrids.append(AtomicGrid(
+                        self.numbers[i], self.pseudo_numbers[i],
+                        self.centers[i], agspec, random_rotate,
+                        points[offset:offset+atsize],
+                        atweights[offset:offset+atsize]))
+                    offset += atsize
+            pb(natom)
+        else:
+            # The atomic grids are constructed serially, such that the random
+            # rotations do not depend on the number of threads.
+            tasks = []
+            if mode != 'discard':
+                atweights = np.zeros(size, float)
+            for i in xrange(natom):
+                atsize = agspec.get_size(self.numbers[i], self.pseudo_numbers[i])
+                atgrid = AtomicGrid(
+                    self.numbers[i], self.pseudo_numbers[i],
+                    self.centers[i], agspec, random_rotate,
+                    points[offset:offset+atsize], random_state=random_state)
+                if mode != 'only':
+                    tasks.append((i, offset, offset+atsize, atgrid.weights))
+                else:
+                    pb()
+                if mode != 'discard':
+                    atweights[offset:offset+atsize] = atgrid.weights
+                    atgrids.append(atgrid)
+                offset += atsize
+
+            # The Becke weights of different atoms are computed concurrently.
+            # The low-level routines release the GIL.
+            if nthread > 1 and len(tasks) > 1:
+                pool = ThreadPool(min(nthread, len(tasks)))
+                try:
+                    for dummy in pool.imap_unordered(compute_becke, tasks):
+                        pb()
+                finally:
+                    pool.close()
+                    pool.join()
+            else:
+                for task in tasks:
+                    compute_becke(task)
+                    pb()
+
+            if cache:
+                arrays = {'points': points, 'weights': weights, 'becke_weights': self._becke_weights}
+                if mode != 'discard':
+                    arrays['atweights'] = atweights
+                cache.dump(key, **arrays)
 
         # finish
         IntGrid.__init__(self, points, weights, atgrids)
@@ -144,6 +242,19 @@ class BeckeMolGrid(IntGrid):
         # Some screen info
         self._log_init()
 
+    def _get_cache_key(self):
+        '''Return a hash of all parameters that determine the grid arrays
+
+           When no random seed is given, the random rotations are derived
+           from this key, such that the key also determines the rotations.
+        '''
+        items = [self.__class__.__name__, self._centers, self._numbers, self._pseudo_numbers]
+        for i in xrange(len(self._numbers)):
+            rgrid, nlls = self._agspec.get(self._numbers[i], self._pseudo_numbers[i])
+            items.extend([rgrid.rtransform.to_string(), rgrid.int1d.__class__.__name__, nlls])
+        items.extend([self._k, self._stratmann_a, self._random_rotate, self._random_seed, self._mode])
+        return GridCache.get_key(*items)
+
     def __del__(self):
         if log is not None and hasattr(self, 'weights'):
             log.mem.denounce(self.points.nbytes + self.weights.nbytes)
@@ -158,6 +269,8 @@ class BeckeMolGrid(IntGrid):
             grp['k'][()],
             grp['random_rotate'][()],
             grp.attrs['mode'],
+            grp.attrs.get('stratmann_a'),
+            random_seed=grp.attrs.get('random_seed'),
         )
 
     def to_hdf5(self, grp):
@@ -170,6 +283,10 @@ class BeckeMolGrid(IntGrid):
         grp['random_rotate'] = self._random_rotate
         grp['k'] = self._k
         grp.attrs['mode'] = self._mode
+        if self._stratmann_a is not None:
+            grp.attrs['stratmann_a'] = self._stratmann_a
+        if self._random_seed is not None:
+            grp.attrs['random_seed'] = self._random_seed
 
     def _get_centers(self):
         '''The positions of the nuclei'''
@@ -201,12 +318,24 @@ class BeckeMolGrid(IntGrid):
 
     k = property(_get_k)
 
+    def _get_stratmann_a(self):
+        '''The parameter of Stratmann's switching function, or None.'''
+        return self._stratmann_a
+
+    stratmann_a = property(_get_stratmann_a)
+
     def _get_random_rotate(self):
         '''The random rotation flag.'''
         return self._random_rotate
 
     random_rotate = property(_get_random_rotate)
 
+    def _get_random_seed(self):
+        '''The seed for the random rotations, or None.'''
+        return self._random_seed
+
+    random_seed = property(_get_random_seed)
+
     def _get_mode(self):
         '''The MO of this molecular grid'''
         return self._mode
@@ -222,13 +351,19 @@ class BeckeMolGrid(IntGrid):
     def _log_init(self):
         if log.do_medium:
             log('Initialized: %s' % self)
+            if self._stratmann_a is None:
+                switching = 'k=%i' % self._k
+            else:
+                switching = 'Stratmann a=%.2f' % self._stratmann_a
             log.deflist([
                 ('Size', self.size),
-                ('Switching function', 'k=%i' % self._k),
+                ('Switching function', switching),
             ])
             log.blank()
         # Cite reference
         log.cite('becke1988_multicenter', 'the multicenter integration scheme used for the molecular integration grid')
+        if self._stratmann_a is not None:
+            log.cite('stratmann1996', 'the switching function used for the molecular integration grid')
         log.cite('cordero2008', 'the covalent radii used for the Becke-Lebedev molecular integration grid')
 
     @doc_inherit(IntGrid)
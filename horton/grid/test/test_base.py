@@ -299,6 +299,29 @@ def test_eval_spline_grid_0d_random():
         assert abs(output1 - output2).max() < 1e-10
 
 
+def test_eval_spline_grid_3d_reference():
+    # Many points spread over a region much larger than the cutoff, such that
+    # the points are sorted into many bins.
+    npoint = 2000
+    cs = get_cosine_spline()
+    rcut = np.pi
+    cell = Cell(np.array([[4.0, 0.5, 0.0], [0.2, 5.0, 0.3], [-0.5, 0.0, 4.5]]))
+    points = np.random.uniform(-6, 6, (npoint, 3))
+    g = IntGrid(points, np.random.normal(0, 1.0, npoint))
+    center = np.random.uniform(-2, 2, 3)
+
+    output1 = np.zeros(npoint)
+    g.eval_spline(cs, center, output1, cell)
+
+    output2 = np.zeros(npoint)
+    for image in np.indices((11, 11, 11)).reshape(3, -1).T - 5:
+        distances = np.sqrt(((g.points - center + np.dot(image, cell.rvecs))**2).sum(axis=1))
+        mask = distances < rcut
+        output2[mask] += cs(distances[mask])
+
+    assert abs(output1 - output2).max() < 1e-10
+
+
 def test_eval_spline_grid_add_random():
     npoint = 10
     cs = get_cosine_spline()
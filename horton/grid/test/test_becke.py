@@ -83,3 +83,62 @@ def test_becke_special_points():
     assert abs(weights[0]) < 1e-10
     assert abs(weights[1]) < 1e-10
     assert abs(weights[2] - 1.0) < 1e-10
+
+
+def get_stratmann_reference(points, radii, centers, select, a):
+    # Straightforward evaluation of the cell functions for all atom pairs.
+    natom = len(radii)
+    cell_fns = np.ones((natom, len(points)))
+    for iatom0 in xrange(natom):
+        dist0 = np.sqrt(((points - centers[iatom0])**2).sum(axis=1))
+        for iatom1 in xrange(natom):
+            if iatom0 == iatom1:
+                continue
+            dist1 = np.sqrt(((points - centers[iatom1])**2).sum(axis=1))
+            mu = (dist0 - dist1)/np.linalg.norm(centers[iatom0] - centers[iatom1])
+            alpha = (radii[iatom0] - radii[iatom1])/(radii[iatom0] + radii[iatom1])
+            alpha = np.clip(alpha/(alpha**2 - 1), -0.45, 0.45)
+            x = np.clip((mu + alpha*(1 - mu**2))/a, -1, 1)
+            cell_fns[iatom0] *= 0.5*(1 - (35*x - 35*x**3 + 21*x**5 - 5*x**7)/16)
+    return cell_fns[select]/cell_fns.sum(axis=0)
+
+
+def test_stratmann_reference():
+    natom = 20
+    radii = np.random.choice([0.31, 0.76, 1.2], natom)
+    centers = np.random.uniform(0, 10, (natom, 3))
+    for select in 0, 7, 13:
+        points = centers[select] + np.random.normal(0, 1.5, (500, 3))
+        points[0] = centers[select]
+        weights = np.ones(len(points))
+        stratmann_helper_atom(points, weights, radii, centers, select, 0.64)
+        expected = get_stratmann_reference(points, radii, centers, select, 0.64)
+        assert abs(weights - expected).max() < 1e-10
+        # The nucleus is close enough to get a weight of exactly one.
+        assert weights[0] == 1.0
+
+
+def test_stratmann_sum3_one():
+    npoint = 100
+    points = np.random.uniform(-5, 5, (npoint, 3))
+
+    radii = np.array([0.5, 0.8, 5.0])
+    centers = np.array([[1.2, 2.3, 0.1], [-0.4, 0.0, -2.2], [2.2, -1.5, 0.0]])
+    total = np.zeros(npoint)
+    for select in xrange(3):
+        weights = np.ones(npoint, float)
+        stratmann_helper_atom(points, weights, radii, centers, select, 0.64)
+        assert (weights >= 0).all()
+        total += weights
+
+    assert abs(total - 1).max() < 1e-10
+
+
+def test_stratmann_special_points():
+    radii = np.array([0.5, 0.8, 5.0])
+    centers = np.array([[1.2, 2.3, 0.1], [-0.4, 0.0, -2.2], [2.2, -1.5, 0.0]])
+
+    for select in xrange(3):
+        weights = np.ones(3, float)
+        stratmann_helper_atom(centers, weights, radii, centers, select)
+        assert (weights == np.identity(3)[select]).all()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# HORTON: Helpful Open-source Research TOol for N-fermion systems.
+# Copyright (C) 2011-2015 The HORTON Development Team
+#
+# This file is part of HORTON.
+#
+# HORTON is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# HORTON is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+#--
+#pylint: skip-file
+
+
+import os
+
+import numpy as np
+
+from horton import *
+from horton.test.common import tmpdir
+
+
+def get_molgrid(cache, **kwargs):
+    numbers = np.array([6, 8], int)
+    coordinates = np.array([[0.0, 0.2, -0.5], [0.1, 0.0, 0.5]], float)
+    rtf = ExpRTransform(1e-3, 1e1, 20)
+    rgrid = RadialGrid(rtf)
+    kwargs.setdefault('random_rotate', False)
+    return BeckeMolGrid(coordinates, numbers, None, (rgrid, 26), cache=cache, **kwargs)
+
+
+def check_same_grids(mg1, mg2):
+    assert (mg1.points == mg2.points).all()
+    assert (mg1.weights == mg2.weights).all()
+    assert (mg1.becke_weights == mg2.becke_weights).all()
+    if mg1.subgrids is None:
+        assert mg2.subgrids is None
+    else:
+        for atgrid1, atgrid2 in zip(mg1.subgrids, mg2.subgrids):
+            assert (atgrid1.points == atgrid2.points).all()
+            assert (atgrid1.weights == atgrid2.weights).all()
+
+
+def test_grid_cache_reuse():
+    with tmpdir('horton.grid.test.test_cache.test_grid_cache_reuse') as dn:
+        cache = GridCache(dn)
+        nfile = 0
+        for random_rotate in False, True:
+            for mode in 'keep', 'discard', 'only':
+                mg1 = get_molgrid(cache, mode=mode, random_rotate=random_rotate)
+                nfile += 1
+                assert len(os.listdir(dn)) == nfile
+                # The cached grid is reused.
+                mg2 = get_molgrid(cache, mode=mode, random_rotate=random_rotate)
+                assert len(os.listdir(dn)) == nfile
+                check_same_grids(mg1, mg2)
+                # The cached grid is identical to one built without cache, with
+                # the seed derived from the cache key.
+                random_seed = int(mg1._get_cache_key()[:8], 16)
+                mg3 = get_molgrid(False, mode=mode, random_rotate=random_rotate,
+                                  random_seed=random_seed)
+                check_same_grids(mg1, mg3)
+        # Different parameters give a different grid.
+        mg4 = get_molgrid(cache, k=2)
+        assert len(os.listdir(dn)) == nfile + 1
+        mg5 = get_molgrid(cache)
+        assert not (mg4.becke_weights == mg5.becke_weights).all()
+        # A different seed gives different rotations.
+        mg6 = get_molgrid(cache, random_rotate=True, random_seed=1)
+        assert len(os.listdir(dn)) == nfile + 2
+        mg7 = get_molgrid(cache, random_rotate=True)
+        assert not (mg6.points == mg7.points).all()
+
+
+def test_random_seed():
+    # Without cache, a seed makes the random rotations reproducible.
+    mg1 = get_molgrid(False, random_rotate=True, random_seed=5)
+    mg2 = get_molgrid(False, random_rotate=True, random_seed=5)
+    check_same_grids(mg1, mg2)
+    mg3 = get_molgrid(False, random_rotate=True, random_seed=6)
+    assert not (mg1.points == mg3.points).all()
+
+
+def test_grid_cache_default():
+    with tmpdir('horton.grid.test.test_cache.test_grid_cache_default') as dn:
+        old_cache = get_grid_cache()
+        set_grid_cache(GridCache(dn))
+        try:
+            get_molgrid(None)
+            assert len(os.listdir(dn)) == 1
+            get_molgrid(False, k=2)
+            assert len(os.listdir(dn)) == 1
+        finally:
+            set_grid_cache(old_cache)
+
+
+def test_grid_cache_evict():
+    with tmpdir('horton.grid.test.test_cache.test_grid_cache_evict') as dn:
+        cache = GridCache(dn)
+        a = np.random.uniform(0, 1, 1000)
+        cache.dump('a', points=a)
+        size = os.path.getsize(os.path.join(dn, 'a.h5'))
+        # Make the first file look old
+        os.utime(os.path.join(dn, 'a.h5'), (0, 0))
+        cache = GridCache(dn, int(1.5*size))
+        cache.dump('b', points=a)
+        assert os.listdir(dn) == ['b.h5']
+        assert (cache.load('b')['points'] == a).all()
+        assert cache.load('a') is None
+
+
+def test_grid_cache_key():
+    a = np.array([1.0, 2.0])
+    assert GridCache.get_key(a, 3) == GridCache.get_key(a.copy(), 3)
+    assert GridCache.get_key(a, 3) != GridCache.get_key(a, 4)
+    assert GridCache.get_key(a, 3) != GridCache.get_key(a.astype(np.float32), 3)
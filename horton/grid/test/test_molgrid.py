@@ -101,6 +101,34 @@ def test_molgrid_attrs_subgrid():
         assert atgrid.random_rotate
 
 
+def test_integrate_hydrogen_pair_1s_stratmann():
+    numbers = np.array([1, 1], int)
+    coordinates = np.array([[0.0, 0.0, -0.5], [0.0, 0.0, 0.5]], float)
+    rtf = ExpRTransform(1e-3, 1e1, 100)
+    rgrid = RadialGrid(rtf)
+
+    mg = BeckeMolGrid(coordinates, numbers, None, (rgrid, 110), random_rotate=False, stratmann_a=0.64)
+    assert mg.stratmann_a == 0.64
+    dist0 = np.sqrt(((coordinates[0] - mg.points)**2).sum(axis=1))
+    dist1 = np.sqrt(((coordinates[1] - mg.points)**2).sum(axis=1))
+    fn = np.exp(-2*dist0)/np.pi + np.exp(-2*dist1)/np.pi
+    occupation = mg.integrate(fn)
+    assert abs(occupation - 2.0) < 1e-3
+
+
+def test_molgrid_nthread():
+    numbers = np.array([6, 8, 1, 1], int)
+    coordinates = np.array([[0.0, 0.2, -0.5], [0.1, 0.0, 0.5], [1.5, 0.3, -1.0], [-1.2, 0.4, -1.1]], float)
+    rtf = ExpRTransform(1e-3, 1e1, 50)
+    rgrid = RadialGrid(rtf)
+    for stratmann_a in None, 0.64:
+        mg1 = BeckeMolGrid(coordinates, numbers, None, (rgrid, 26), random_rotate=False, stratmann_a=stratmann_a)
+        mg2 = BeckeMolGrid(coordinates, numbers, None, (rgrid, 26), random_rotate=False, stratmann_a=stratmann_a, nthread=3)
+        assert (mg1.points == mg2.points).all()
+        assert (mg1.becke_weights == mg2.becke_weights).all()
+        assert (mg1.weights == mg2.weights).all()
+
+
 def test_molgrid_attrs():
     numbers = np.array([6, 8], int)
     coordinates = np.array([[0.0, 0.2, -0.5], [0.1, 0.0, 0.5]], float)
@@ -114,6 +142,7 @@ def test_molgrid_attrs():
     assert mg.becke_weights.shape == (mg.size,)
     assert mg.subgrids is None
     assert mg.k == 3
+    assert mg.stratmann_a is None
     assert mg.random_rotate
 
 
@@ -144,5 +173,6 @@ def test_molgrid_hdf5():
     assert mg1.k == mg2.k
     assert mg1.random_rotate == mg2.random_rotate
     assert mg1.mode == mg2.mode
+    assert mg1.stratmann_a == mg2.stratmann_a
     assert (mg1.points == mg2.points).all()
     assert (mg1.weights == mg2.weights).all()
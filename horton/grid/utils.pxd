@@ -24,7 +24,7 @@ cimport uniform
 
 cdef extern from "horton/grid/utils.h":
     void dot_multi(long npoint, long nvector, double** data, long* segments,
-        double* output)
+        double* output) nogil
     void dot_multi_moments_cube(long nvector, double** data, uniform.UniformGrid* ugrid,
         double* center, long lmax, long mtype, double* output, long nmoment) except +
     void dot_multi_moments(long npoint, long nvector, double** data, double* points,
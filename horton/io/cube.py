@@ -21,7 +21,7 @@
 '''Gaussian cube file format'''
 
 
-import numpy as np
+import os, numpy as np
 from horton.cext import Cell
 from horton.grid.cext import UniformGrid
 
@@ -79,21 +79,57 @@ def _read_cube_header(f):
 
 
 def _read_cube_data(f, ugrid):
-    data = np.zeros(tuple(ugrid.shape), float)
-    tmp = data.ravel()
-    counter = 0
-    while True:
-        line = f.readline()
-        if len(line) == 0:
-            break
-        words = line.split()
-        for word in words:
-            tmp[counter] = float(word)
-            counter += 1
+    data = np.fromstring(f.read(), float, sep=' ')
+    if data.size != np.prod(ugrid.shape):
+        raise IOError('The number of values in the cube file does not match the grid.')
+    return data.reshape(tuple(ugrid.shape))
+
+
+def _load_sidecar(filename, shape):
+    '''Load grid data from the binary sidecar file of a text grid file
+
+       **Arguments:**
+
+       filename
+            The name of the text file. The sidecar file has the same name with
+            an additional extension ``.npy``.
+
+       shape
+            The expected shape of the grid data.
+
+       **Returns:** a copy-on-write memory-mapped array or None when the
+       sidecar file does not exist, is older than the text file or does not
+       match the expected shape.
+    '''
+    fn_npy = filename + '.npy'
+    if not os.path.isfile(fn_npy) or os.path.getmtime(fn_npy) < os.path.getmtime(filename):
+        return None
+    data = np.load(fn_npy, mmap_mode='c')
+    if data.shape != tuple(shape) or data.dtype != float:
+        return None
     return data
 
 
-def load_cube(filename):
+def _dump_sidecar(filename, data):
+    '''Write the binary sidecar file of a text grid file
+
+       **Arguments:**
+
+       filename
+            The name of the text file.
+
+       data
+            The grid data parsed from the text file.
+    '''
+    try:
+        np.save(filename + '.npy', data)
+    except (IOError, OSError):
+        # The sidecar is only a cache. When it can not be written, e.g. in a
+        # read-only directory, the text file is simply parsed again next time.
+        pass
+
+
+def load_cube(filename, sidecar=False):
     '''Load data from a cube file
 
        **Arguments:**
@@ -101,12 +137,26 @@ def load_cube(filename):
        filename
             The name of the cube file
 
+       **Optional arguments:**
+
+       sidecar
+            When True, the grid data are also stored in a binary file with the
+            same name and an additional extension ``.npy``. When this file
+            already exists and is not older than the cube file, the grid data
+            are memory-mapped from it instead of parsed from the cube file.
+
        **Returns** a dictionary with ``title``, ``coordinates``, ``numbers``,
        ``cube_data``, ``grid``, ``pseudo_numbers``.
     '''
     with open(filename) as f:
         title, coordinates, numbers, cell, ugrid, pseudo_numbers = _read_cube_header(f)
-        data = _read_cube_data(f, ugrid)
+        data = None
+        if sidecar:
+            data = _load_sidecar(filename, ugrid.shape)
+        if data is None:
+            data = _read_cube_data(f, ugrid)
+            if sidecar:
+                _dump_sidecar(filename, data)
         return {
             'title': title,
             'coordinates': coordinates,
@@ -134,13 +184,16 @@ def _write_cube_header(f, title, coordinates, numbers, ugrid, pseudo_numbers):
         print >> f, '%5i % 11.6f % 11.6f % 11.6f % 11.6f' % (numbers[i], q, x, y, z)
 
 
-def _write_cube_data(f, cube_data):
-    counter = 0
-    for value in cube_data.flat:
-        f.write(' % 12.5E' % value)
-        if counter%6 == 5:
-            f.write('\n')
-        counter += 1
+def _write_cube_data(f, cube_data, nline_chunk=1000):
+    values = cube_data.ravel()
+    # Write chunks of complete lines with six values each.
+    chunk_size = 6*nline_chunk
+    nfull = (len(values)//6)*6
+    for begin in xrange(0, nfull, chunk_size):
+        chunk = values[begin:min(begin + chunk_size, nfull)]
+        f.write((' % 12.5E'*6 + '\n')*(len(chunk)//6) % tuple(chunk))
+    # The remaining values on an incomplete line
+    f.write(' % 12.5E'*(len(values) - nfull) % tuple(values[nfull:]))
 
 
 def dump_cube(filename, data):
@@ -21,7 +21,7 @@
 '''Gaussian LOG and FCHK file fromats'''
 
 
-import numpy as np
+import mmap, re, numpy as np
 
 
 __all__ = ['load_operators_g09', 'FCHKFile', 'load_fchk']
@@ -108,7 +108,7 @@ def _load_twoindex_g09(f, nbasis, lf):
     return result
 
 
-def _load_fourindex_g09(f, nbasis, lf):
+def _load_fourindex_g09(f, nbasis, lf, nline_chunk=1000000):
     """Load a four-index operator from a Gaussian log file
 
        **Arguments:**
@@ -121,37 +121,71 @@ def _load_fourindex_g09(f, nbasis, lf):
 
        lf
             A LinalgFactory instance.
+
+       **Optional arguments:**
+
+       nline_chunk
+            The number of lines with integrals that are parsed at once.
     """
     result = lf.create_four_index(nbasis)
     # Skip first six lines
     for i in xrange(6):
         f.next()
-    # Start reading elements until a line is encountered that does not start
-    # with ' I='
-    while True:
-        line = f.next()
+    # Collect lines until a line is encountered that does not start with ' I='
+    lines = []
+    for line in f:
         if not line.startswith(' I='):
             break
-        #print line[3:7], line[9:13], line[15:19], line[21:25], line[28:].replace('D', 'E')
-        i = int(line[3:7])-1
-        j = int(line[9:13])-1
-        k = int(line[15:19])-1
-        l = int(line[21:25])-1
-        value = float(line[29:].replace('D', 'E'))
-        # Gaussian uses the chemists notation for the 4-center indexes. HORTON
-        # uses the physicists notation.
-        result.set_element(i, k, j, l, value)
+        lines.append(line)
+        if len(lines) == nline_chunk:
+            _set_fourindex_g09(result, lines)
+            lines = []
+    _set_fourindex_g09(result, lines)
     return result
 
 
+def _set_fourindex_g09(result, lines):
+    """Parse lines with four-index integrals and assign them at once
+
+       **Arguments:**
+
+       result
+            The four-index object in which the integrals are stored.
+
+       lines
+            A list of lines, formatted as ``I=  6 J=  2 K=  5 L=  1 Int= ...``
+    """
+    if len(lines) == 0:
+        return
+    text = ''.join(lines).replace('Int=', ' ')
+    for label in 'I=', 'J=', 'K=', 'L=':
+        text = text.replace(label, ' ')
+    data = np.fromstring(text.replace('D', 'E'), float, sep=' ')
+    if data.size != 5*len(lines):
+        raise IOError('Could not interpret the two-electron integrals in the Gaussian log file.')
+    data = data.reshape(-1, 5)
+    i, j, k, l = data[:,:4].astype(int).T - 1
+    # Gaussian uses the chemists notation for the 4-center indexes. HORTON
+    # uses the physicists notation.
+    result.set_element(i, k, j, l, data[:,4])
+
+
 class FCHKFile(dict):
     """Reader for Formatted checkpoint files
 
        After initialization, the data from the file is available in the fields
        dictionary. Also the following attributes are read from the file: title,
        command, lot (level of theory) and basis.
+
+       Only the positions of the fields in the file are determined at
+       initialization. Array fields are parsed (in bulk) when they are accessed
+       for the first time with ``fchk[label]`` or ``fchk.get(label)``.
     """
 
+    # A header line of a field: a label of 43 characters, the type (I, R, C or
+    # L), an optional 'N=' for arrays and the value or the length.
+    _header_pattern = re.compile(r'^(\S.{42})([IRCL])   (N=)?[ ]*(\S+)[ \r]*$', re.M)
+
     def __init__(self, filename, field_labels=None):
         """
            **Arguments:**
@@ -167,82 +201,97 @@ class FCHKFile(dict):
         """
         dict.__init__(self, [])
         self.filename = filename
-        self._read(filename, set(field_labels))
+        if field_labels is not None:
+            field_labels = set(field_labels)
+        self._read(filename, field_labels)
 
     def _read(self, filename, field_labels=None):
-        """Read all the requested fields"""
+        """Locate all the requested fields and read the scalar fields"""
         # if fields is None, all fields are read
-        def read_field(f):
-            """Read a single field"""
-            datatype = None
-            while datatype is None:
-                # find a sane header line
-                line = f.readline()
-                if line == "":
-                    return False
-
-                label = line[:43].strip()
-                if field_labels is not None:
-                    if len(field_labels) == 0:
-                        return False
-                    elif label not in field_labels:
-                        return True
-                    else:
-                        field_labels.discard(label)
-                line = line[43:]
-                words = line.split()
-                if len(words) == 0:
-                    return True
-
-                if words[0] == 'I':
-                    datatype = int
-                elif words[0] == 'R':
-                    datatype = float
-
-            if len(words) == 2:
-                try:
-                    value = datatype(words[1])
-                except ValueError:
-                    return True
-            elif len(words) == 3:
-                if words[1] != "N=":
-                    raise IOError("Unexpected line in formatted checkpoint file %s\n%s" % (filename, line[:-1]))
-                length = int(words[2])
-                value = np.zeros(length, datatype)
-                counter = 0
-                try:
-                    while counter < length:
-                        line = f.readline()
-                        if line == "":
-                            raise IOError("Unexpected end of formatted checkpoint file %s" % filename)
-                        for word in line.split():
-                            try:
-                                value[counter] = datatype(word)
-                            except (ValueError, OverflowError), e:
-                                raise IOError('Could not interpret word while reading %s: %s' % (word, filename))
-                            counter += 1
-                except ValueError:
-                    return True
+        with open(filename, 'rb') as f:
+            self.title = f.readline()[:-1].strip()
+            words = f.readline().split()
+            if len(words) == 3:
+                self.command, self.lot, self.obasis = words
+            elif len(words) == 2:
+                self.command, self.lot = words
             else:
-                raise IOError("Unexpected line in formatted checkpoint file %s\n%s" % (filename, line[:-1]))
-
+                raise IOError('The second line of the FCHK file should contain two or three words.')
+            begin = f.tell()
+            f.seek(0, 2)
+            if f.tell() == begin:
+                return
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                headers = list(self._header_pattern.finditer(data, begin))
+                for iheader, match in enumerate(headers):
+                    label = match.group(1).strip()
+                    if field_labels is not None and label not in field_labels:
+                        continue
+                    if match.group(2) == 'I':
+                        datatype = int
+                    elif match.group(2) == 'R':
+                        datatype = float
+                    else:
+                        continue
+                    if match.group(3) is None:
+                        try:
+                            self[label] = datatype(match.group(4))
+                        except ValueError:
+                            pass
+                    else:
+                        # The data of an array runs until the next header.
+                        if iheader + 1 < len(headers):
+                            end = headers[iheader + 1].start()
+                        else:
+                            end = len(data)
+                        self[label] = _FCHKArray(datatype, int(match.group(4)), match.end(), end)
+            finally:
+                data.close()
+
+    def __getitem__(self, label):
+        value = dict.__getitem__(self, label)
+        if isinstance(value, _FCHKArray):
+            value = value.load(self.filename)
             self[label] = value
-            return True
-
-        f = file(filename, 'r')
-        self.title = f.readline()[:-1].strip()
-        words = f.readline().split()
-        if len(words) == 3:
-            self.command, self.lot, self.obasis = words
-        elif len(words) == 2:
-            self.command, self.lot = words
-        else:
-            raise IOError('The second line of the FCHK file should contain two or three words.')
+        return value
+
+    def get(self, label, default=None):
+        if label in self:
+            return self[label]
+        return default
+
 
-        while read_field(f):
-            pass
+class _FCHKArray(object):
+    """The location of an array field in a formatted checkpoint file"""
 
-        f.close()
+    def __init__(self, datatype, length, begin, end):
+        """
+           **Arguments:**
+
+           datatype
+                int or float
+
+           length
+                The number of elements in the array.
+
+           begin, end
+                The positions in the file of the text with the array elements.
+        """
+        self.datatype = datatype
+        self.length = length
+        self.begin = begin
+        self.end = end
+
+    def load(self, filename):
+        """Parse the array elements"""
+        with open(filename, 'rb') as f:
+            f.seek(self.begin)
+            text = f.read(self.end - self.begin)
+        value = np.fromstring(text, self.datatype, sep=' ')
+        if len(value) != self.length:
+            raise IOError('Could not interpret all array elements while reading %s' % filename)
+        return value
 
 
 def triangle_to_dense(triangle):
@@ -259,12 +308,9 @@ def triangle_to_dense(triangle):
     '''
     nrow = int(np.round((np.sqrt(1+8*len(triangle))-1)/2))
     result = np.zeros((nrow, nrow))
-    begin = 0
-    for irow in xrange(nrow):
-        end = begin + irow + 1
-        result[irow,:irow+1] = triangle[begin:end]
-        result[:irow+1,irow] = triangle[begin:end]
-        begin = end
+    irows, icols = np.tril_indices(nrow)
+    result[irows, icols] = triangle
+    result[icols, irows] = triangle
     return result
 
 
@@ -409,12 +455,7 @@ def load_fchk(filename, lf):
     def load_dm(label):
         if label in fchk:
             dm = lf.create_two_index(obasis.nbasis)
-            start = 0
-            for i in xrange(obasis.nbasis):
-                stop = start+i+1
-                dm._array[i,:i+1] = fchk[label][start:stop]
-                dm._array[:i+1,i] = fchk[label][start:stop]
-                start = stop
+            dm._array[:] = triangle_to_dense(fchk[label])
             return dm
 
     # First try to load the post-hf density matrices.
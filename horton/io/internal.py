@@ -21,26 +21,124 @@
 '''HORTON internal file format'''
 
 
-import numpy as np, h5py as h5
+import inspect, numpy as np, h5py as h5
 from horton.io.lockedh5 import LockedH5File
+from horton.utils import check_options
 
 
-__all__ = ['load_h5', 'dump_h5']
+__all__ = ['load_h5', 'dump_h5', 'create_array_dataset']
 
 
-def load_h5(item):
+def create_array_dataset(grp, name, array, chunks=True, chunked=False,
+                         compression=None):
+    '''Write an array to an HDF5 dataset, using the storage mode of dump_h5
+
+       **Arguments:**
+
+       grp
+            The h5py.Group in which the dataset is created.
+
+       name
+            The name of the dataset.
+
+       array
+            The numpy array to be written.
+
+       **Optional arguments:**
+
+       chunks
+            The chunk shape used when chunked storage is enabled. When True,
+            h5py picks a chunk shape. For arrays that are accessed in blocks
+            along the first index, the shape of one such block is a good
+            choice.
+
+       chunked, compression
+            The storage mode, see ``dump_h5``. When neither is set, a plain
+            contiguous dataset is created.
+    '''
+    if (chunked or compression is not None) and array.size > 0:
+        grp.create_dataset(name, data=array, chunks=chunks,
+                           compression=compression,
+                           shuffle=(compression is not None))
+    else:
+        grp[name] = array
+
+
+def _from_hdf5(cls, grp, lazy):
+    '''Call cls.from_hdf5, with the lazy argument if the class supports it'''
+    if lazy and 'lazy' in inspect.getargspec(cls.from_hdf5).args:
+        return cls.from_hdf5(grp, lazy=True)
+    return cls.from_hdf5(grp)
+
+
+def _to_hdf5(data, grp, chunked, compression):
+    '''Call data.to_hdf5, with the storage mode if the class supports it'''
+    if 'chunked' in inspect.getargspec(data.to_hdf5).args:
+        data.to_hdf5(grp, chunked=chunked, compression=compression)
+    else:
+        data.to_hdf5(grp)
+
+
+class LazyH5Data(object):
+    '''Lazily loaded contents of an HDF5 file, see ``load_h5``
+
+       The attribute ``data`` contains the loaded object, whose arrays are
+       h5py.Dataset objects in the file. The file is opened with a shared lock
+       and is kept open until ``close`` is called. When used as a context
+       manager, the ``with`` statement gets the loaded object and the file is
+       closed at the end of the block.
+    '''
+    def __init__(self, filename):
+        self._f = LockedH5File(filename, 'r')
+        try:
+            self.data = load_h5(self._f, lazy=True)
+        except:
+            self._f.close()
+            raise
+
+    def close(self):
+        '''Close the HDF5 file. The datasets in ``data`` become invalid.'''
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def __enter__(self):
+        return self.data
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def load_h5(item, lazy=False):
     '''Load a (HORTON) object from an h5py File/Group
 
        **Arguments:**
 
        item
             A HD5 Dataset or group, or a filename of an HDF5 file
+
+       **Optional arguments:**
+
+       lazy
+            When True, arrays are not read into memory. Instead, h5py.Dataset
+            objects are returned, from which slices can be read on demand.
+            Objects whose ``from_hdf5`` method has a ``lazy`` argument, such as
+            ``CholeskyFourIndex``, keep a reference to their datasets. When a
+            filename is given, a ``LazyH5Data`` object is returned, which
+            keeps the file open until it is closed, e.g.::
+
+                with load_h5('ham.h5', lazy=True) as data:
+                    ...
     '''
     if isinstance(item, basestring):
+        if lazy:
+            return LazyH5Data(item)
         with LockedH5File(item, 'r') as f:
             return load_h5(f)
     elif isinstance(item, h5.Dataset):
         if len(item.shape) > 0:
+            if lazy:
+                return item
             # convert to a numpy array
             return np.array(item)
         else:
@@ -52,15 +150,15 @@ def load_h5(item):
             # assuming that an entire dictionary must be read.
             result = {}
             for key, subitem in item.iteritems():
-                result[key] = load_h5(subitem)
+                result[key] = load_h5(subitem, lazy)
             return result
         else:
             # special constructor. the class is found with the imp module
             cls = __import__('horton', fromlist=[class_name]).__dict__[class_name]
-            return cls.from_hdf5(item)
+            return _from_hdf5(cls, item, lazy)
 
 
-def dump_h5(grp, data):
+def dump_h5(grp, data, chunked=False, compression=None):
     '''Dump a (HORTON) object to a HDF5 file.
 
        grp
@@ -70,27 +168,42 @@ def dump_h5(grp, data):
             The object to be written. This can be a dictionary of objects or
             an instance of a HORTON class that has a ``to_hdf5`` method. The
             dictionary my contain numpy arrays
+
+       **Optional arguments:**
+
+       chunked
+            When True, arrays in the dictionary and the large arrays of HORTON
+            objects (see ``create_array_dataset``) are stored in chunked
+            datasets, such that they can be read efficiently in blocks.
+
+       compression
+            None, ``'gzip'`` or ``'lzf'``. When given, chunked datasets are
+            compressed with the given filter.
     '''
+    check_options('compression', compression, None, 'gzip', 'lzf')
     if isinstance(grp, basestring):
         with LockedH5File(grp, 'w') as f:
-            dump_h5(f, data)
+            dump_h5(f, data, chunked, compression)
     elif isinstance(data, dict):
         for key, value in data.iteritems():
             # Simply overwrite old data
             if key in grp:
                 del grp[key]
-            if isinstance(value, int) or isinstance(value, float) or isinstance(value, np.ndarray) or isinstance(value, basestring):
+            if isinstance(value, np.ndarray) and value.ndim > 0:
+                create_array_dataset(grp, key, value, chunked=chunked,
+                                     compression=compression)
+            elif isinstance(value, int) or isinstance(value, float) or isinstance(value, np.ndarray) or isinstance(value, basestring):
                 grp[key] = value
             else:
                 subgrp = grp.require_group(key)
-                dump_h5(subgrp, value)
+                dump_h5(subgrp, value, chunked, compression)
     else:
         # clear the group if anything was present
         for key in grp.keys():
             del grp[key]
         for key in grp.attrs.keys():
             del grp.attrs[key]
-        data.to_hdf5(grp)
+        _to_hdf5(data, grp, chunked, compression)
         # The following is needed to create object of the right type when
         # reading from the checkpoint:
         grp.attrs['class'] = data.__class__.__name__
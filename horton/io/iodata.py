@@ -272,6 +272,12 @@ class IOData(object):
            lf
                 A LinalgFactory instance. DenseLinalgFactory is used as default.
 
+           sidecar
+                When True, grid data from cube, CHGCAR, AECCAR and LOCPOT files
+                are cached in a binary file with an additional extension
+                ``.npy``, which is memory-mapped when the same file is loaded
+                again. See :py:func:`horton.io.cube.load_cube`.
+
            This routine uses the extension or prefix of the filename to
            determine the file format. It returns a dictionary with data loaded
            from the file.
@@ -284,6 +290,7 @@ class IOData(object):
         lf = kwargs.pop('lf', None)
         if lf is None:
             lf = DenseLinalgFactory()
+        sidecar = kwargs.pop('sidecar', False)
         if len(kwargs) > 0:
             raise TypeError('Keyword argument(s) not supported: %s' % kwargs.keys())
 
@@ -308,7 +315,7 @@ class IOData(object):
                 result.update(load_molden(filename, lf))
             elif filename.endswith('.cube'):
                 from horton.io.cube import load_cube
-                result.update(load_cube(filename))
+                result.update(load_cube(filename, sidecar))
             elif filename.endswith('.wfn'):
                 from horton.io.wfn import load_wfn
                 result.update(load_wfn(filename, lf))
@@ -317,10 +324,10 @@ class IOData(object):
                 result.update(load_poscar(filename))
             elif os.path.basename(filename)[:6] in ['CHGCAR', 'AECCAR']:
                 from horton.io.vasp import load_chgcar
-                result.update(load_chgcar(filename))
+                result.update(load_chgcar(filename, sidecar))
             elif os.path.basename(filename).startswith('LOCPOT'):
                 from horton.io.vasp import load_locpot
-                result.update(load_locpot(filename))
+                result.update(load_locpot(filename, sidecar))
             elif filename.endswith('.cp2k.out'):
                 from horton.io.cp2k import load_atom_cp2k
                 result.update(load_atom_cp2k(filename, lf))
@@ -27,10 +27,17 @@
 '''
 
 
+from itertools import islice
+
+import numpy as np
+
+from horton.matrix.cholesky import CholeskyFourIndex
+
+
 __all__ = ['load_fcidump', 'dump_fcidump']
 
 
-def load_fcidump(filename, lf):
+def load_fcidump(filename, lf, nline_chunk=1000000):
     '''Read one- and two-electron integrals from a Molpro 2012 FCIDUMP file.
 
        Works only for restricted wavefunctions.
@@ -46,6 +53,11 @@ def load_fcidump(filename, lf):
        lf
             A LinalgFactory instance.
 
+       **Optional arguments:**
+
+       nline_chunk
+            The number of lines with integrals that are parsed at once.
+
        **Returns**: A dictionary with keys: ``lf``, ``nelec``, ``ms2``,
        ``one_mo``, ``two_mo``, ``core_energy``
     '''
@@ -75,30 +87,33 @@ def load_fcidump(filename, lf):
             if words[0] == "&END" or words[0] == "/END" or words[0]=="/":
                 break
 
-        # read the integrals
+        # read the integrals in chunks of lines
         one_mo = lf.create_two_index()
         two_mo = lf.create_four_index()
         core_energy = 0.0
 
-        for line in f:
-            words = line.split()
-            if len(words) != 5:
+        while True:
+            lines = list(islice(f, nline_chunk))
+            if len(lines) == 0:
+                break
+            data = np.fromstring(''.join(lines), float, sep=' ')
+            if data.size != 5*len(lines):
                 raise IOError('Expecting 5 fields on each data line in FCIDUMP')
-            if words[3] != '0':
-                ii = int(words[1])-1
-                ij = int(words[2])-1
-                ik = int(words[3])-1
-                il = int(words[4])-1
-                # Uncomment the following line if you want to assert that the
-                # FCIDUMP file does not contain duplicate 4-index entries.
-                #assert two_mo.get_element(ii,ik,ij,il) == 0.0
-                two_mo.set_element(ii,ik,ij,il,float(words[0]))
-            elif words[1] != '0':
-                ii = int(words[1])-1
-                ij = int(words[2])-1
-                one_mo.set_element(ii,ij,float(words[0]))
-            else:
-                core_energy = float(words[0])
+            data = data.reshape(-1, 5)
+            values = data[:,0]
+            indexes = data[:,1:].astype(int) - 1
+            # two-electron integrals, chemists' notation in the file
+            mask_two = indexes[:,2] != -1
+            ii, ij, ik, il = indexes[mask_two].T
+            two_mo.set_element(ii, ik, ij, il, values[mask_two])
+            # one-electron integrals
+            mask_one = ~mask_two & (indexes[:,0] != -1)
+            ii, ij = indexes[mask_one,:2].T
+            one_mo.set_element(ii, ij, values[mask_one])
+            # core energy
+            mask_core = ~mask_two & ~mask_one
+            if mask_core.any():
+                core_energy = values[mask_core][-1]
 
     return {
         'lf': lf,
@@ -110,7 +125,7 @@ def load_fcidump(filename, lf):
     }
 
 
-def dump_fcidump(filename, data):
+def dump_fcidump(filename, data, threshold=0.0, chunk_size=1000000):
     '''Write one- and two-electron integrals in the Molpro 2012 FCIDUMP format.
 
        Works only for restricted wavefunctions.
@@ -124,6 +139,18 @@ def dump_fcidump(filename, data):
        data
             An IOData instance. Must contain ``one_mo``, ``two_mo``.
             May contain ``core_energy``, ``nelec`` and ``ms``
+
+       **Optional arguments:**
+
+       threshold
+            Only the unique integrals whose absolute value is larger than this
+            threshold are written.
+
+       chunk_size
+            The two-electron integrals are written in chunks of about this
+            number of integrals. For a CholeskyFourIndex, the chunks are
+            smaller by a factor nvec, such that the memory usage of the
+            intermediate products is comparable to the dense case.
     '''
     with open(filename, 'w') as f:
         one_mo = data.one_mo
@@ -139,19 +166,35 @@ def dump_fcidump(filename, data):
         print >> f, '  ISYM=1'
         print >> f, ' &END'
 
-        # Write integrals and core energy
-        for i in xrange(nactive):
-            for j in xrange(i+1):
-                for k in xrange(nactive):
-                    for l in xrange(k+1):
-                        if (i*(i+1))/2+j >= (k*(k+1))/2+l:
-                            value = two_mo.get_element(i,k,j,l)
-                            if value != 0.0:
-                                print >> f, '%23.16e %4i %4i %4i %4i' % (value, i+1, j+1, k+1, l+1)
-        for i in xrange(nactive):
-            for j in xrange(i+1):
-                value = one_mo.get_element(i,j)
-                if value != 0.0:
-                    print >> f, '%23.16e %4i %4i %4i %4i' % (value, i+1, j+1, 0, 0)
+        # Write integrals and core energy. The unique two-electron integrals
+        # (ij|kl) have i >= j, k >= l and ij >= kl, where ij and kl are indexes
+        # of pairs.
+        pair0, pair1 = np.tril_indices(nactive)
+        npair = len(pair0)
+        nrow_chunk = chunk_size/npair
+        if isinstance(two_mo, CholeskyFourIndex):
+            # Every integral involves nvec products of Cholesky vectors.
+            nrow_chunk /= two_mo.nvec
+        nrow_chunk = max(1, nrow_chunk)
+        for begin in xrange(0, npair, nrow_chunk):
+            rows = np.arange(begin, min(begin + nrow_chunk, npair))
+            ij = np.repeat(rows, rows+1)
+            kl = np.arange(len(ij)) - np.repeat((rows*(rows+1))/2 - (begin*(begin+1))/2, rows+1)
+            i, j = pair0[ij], pair1[ij]
+            k, l = pair0[kl], pair1[kl]
+            values = two_mo.get_element(i, k, j, l)
+            _write_fcidump_lines(f, values, i+1, j+1, k+1, l+1, threshold)
+        i, j = pair0, pair1
+        zeros = np.zeros(npair, int)
+        _write_fcidump_lines(f, one_mo.get_element(i, j), i+1, j+1, zeros, zeros, threshold)
         if core_energy != 0.0:
             print >> f, '%23.16e %4i %4i %4i %4i' % (core_energy, 0, 0, 0, 0)
+
+
+def _write_fcidump_lines(f, values, i, j, k, l, threshold):
+    '''Write lines with integrals whose absolute value exceeds the threshold'''
+    mask = abs(values) > threshold
+    nline = mask.sum()
+    if nline > 0:
+        fields = np.column_stack([values[mask], i[mask], j[mask], k[mask], l[mask]])
+        f.write('%23.16e %4i %4i %4i %4i\n'*nline % tuple(fields.ravel()))
@@ -21,7 +21,7 @@
 #pylint: skip-file
 
 
-import numpy as np
+import os, shutil, numpy as np
 
 from horton import *
 from horton.test.common import tmpdir
@@ -70,3 +70,33 @@ def test_load_dump_load_aelta():
         assert (ugrid1.shape == ugrid2.shape).all()
         assert abs(mol1.cube_data - mol2.cube_data).max() < 1e-4
         assert abs(mol1.pseudo_numbers - mol2.pseudo_numbers).max() < 1e-4
+
+
+def test_load_cube_sidecar():
+    with tmpdir('horton.io.test.test_cube.test_load_cube_sidecar') as dn:
+        fn_cube = '%s/%s' % (dn, 'aelta.cube')
+        shutil.copy(context.get_fn('test/aelta.cube'), fn_cube)
+        mol1 = IOData.from_file(fn_cube, sidecar=True)
+        assert os.path.isfile(fn_cube + '.npy')
+        mol2 = IOData.from_file(fn_cube, sidecar=True)
+        assert isinstance(mol2.cube_data, np.memmap)
+        assert (mol1.cube_data == mol2.cube_data).all()
+        assert mol1.title == mol2.title
+        assert (mol1.grid.shape == mol2.grid.shape).all()
+        # Without the sidecar option, the text is parsed.
+        mol3 = IOData.from_file(fn_cube)
+        assert not isinstance(mol3.cube_data, np.memmap)
+        assert (mol1.cube_data == mol3.cube_data).all()
+
+
+def test_write_cube_data():
+    from horton.io.cube import _write_cube_data
+    from StringIO import StringIO
+    cube_data = np.random.normal(0, 1, (5, 1, 5))
+    f = StringIO()
+    _write_cube_data(f, cube_data, nline_chunk=2)
+    lines = f.getvalue().split('\n')
+    assert len(lines) == 5
+    assert lines[0] == ''.join(' % 12.5E' % value for value in cube_data.flat[:6])
+    assert lines[-1] == ''.join(' % 12.5E' % value for value in cube_data.flat[24:])
+    assert abs(np.fromstring(f.getvalue(), float, sep=' ') - cube_data.ravel()).max() < 1e-4
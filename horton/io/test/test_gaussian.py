@@ -21,6 +21,7 @@
 #pylint: skip-file
 
 
+import numpy as np
 from nose.tools import assert_raises
 
 from horton import *
@@ -103,12 +104,57 @@ def test_load_operators_water_ccpvdz_pure_hf_g03():
     assert abs(electronic_repulsion.get_element(15,2,12,0) - (-0.0000308196281033)) < eps
 
 
+def test_load_fourindex_g09_chunks():
+    from horton.io.gaussian import _load_fourindex_g09
+    fn = context.get_fn('test/water_sto3g_hf_g03.log')
+    lf = DenseLinalgFactory(7)
+    ref = load_operators_g09(fn, lf)['er']
+    with open(fn) as f:
+        for line in f:
+            if line.startswith(' *** Dumping Two-Electron integrals ***'):
+                break
+        er = _load_fourindex_g09(f, 7, lf, nline_chunk=10)
+    assert er == ref
+    assert er.is_symmetric()
+
+
 def test_load_fchk_nonexistent():
     lf = DenseLinalgFactory()
     with assert_raises(IOError):
         load_fchk(context.get_fn('test/fubar_crap.fchk'), lf)
 
 
+def test_fchk_file_lazy():
+    fchk = FCHKFile(context.get_fn('test/hf_sto3g.fchk'))
+    assert fchk.title == 'hf_sto3g'
+    assert fchk.command == 'SP'
+    assert fchk.lot == 'RHF'
+    assert fchk.obasis == 'STO-3G'
+    # Scalars are read immediately, arrays only when accessed.
+    assert fchk['Number of basis functions'] == 6
+    assert fchk['Total Energy'] == -9.856961609951867E+01
+    assert not isinstance(dict.__getitem__(fchk, 'Alpha Orbital Energies'), np.ndarray)
+    energies = fchk['Alpha Orbital Energies']
+    assert energies.shape == (6,)
+    assert energies[0] == -2.59083334E+01
+    assert energies[5] == 5.39578910E-01
+    assert dict.__getitem__(fchk, 'Alpha Orbital Energies') is energies
+    assert (fchk.get('Atomic numbers') == [9, 1]).all()
+    assert fchk['Atomic numbers'].dtype == int
+    assert fchk.get('Foo') is None
+    # Only a selection of fields
+    fchk = FCHKFile(context.get_fn('test/hf_sto3g.fchk'), ['Total SCF Density', 'Foo'])
+    assert fchk.keys() == ['Total SCF Density']
+    assert len(fchk['Total SCF Density']) == 21
+    assert fchk['Total SCF Density'][-1] == 6.41251717E-01
+
+
+def test_triangle_to_dense():
+    from horton.io.gaussian import triangle_to_dense
+    assert (triangle_to_dense(np.array([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])) ==
+            [[1.0, 2.0, 4.0], [2.0, 3.0, 5.0], [4.0, 5.0, 6.0]]).all()
+
+
 def test_load_fchk_hf_sto3g_num():
     lf = DenseLinalgFactory()
     fields = load_fchk(context.get_fn('test/hf_sto3g.fchk'), lf)
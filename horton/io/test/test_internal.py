@@ -21,7 +21,8 @@
 #pylint: skip-file
 
 
-import h5py as h5
+import numpy as np, h5py as h5
+from nose.tools import assert_raises
 
 from horton import *
 from horton.test.common import tmpdir
@@ -47,3 +48,71 @@ def test_consistency_core():
         mol1.to_file(f)
         mol2 = IOData.from_file(f)
         compare_mols(mol1, mol2)
+
+
+def test_dump_h5_chunked_compressed():
+    data = {'a': np.random.uniform(0, 1, (20, 10)), 'b': np.arange(5), 'c': 1.5,
+            'd': np.zeros(0)}
+    for chunked, compression in (True, None), (False, 'gzip'), (True, 'lzf'):
+        with h5.File('horton.io.test.test_internal.test_dump_h5_chunked_compressed', driver='core', backing_store=False) as f:
+            dump_h5(f, data, chunked=chunked, compression=compression)
+            assert f['a'].chunks is not None
+            assert f['a'].compression == compression
+            result = load_h5(f)
+            assert (result['a'] == data['a']).all()
+            assert (result['b'] == data['b']).all()
+            assert result['c'] == data['c']
+            assert result['d'].shape == (0,)
+            # Without storage arguments, plain datasets are written.
+            dump_h5(f.create_group('plain'), data)
+            assert f['plain/a'].chunks is None
+    with h5.File('horton.io.test.test_internal.test_dump_h5_chunked_compressed', driver='core', backing_store=False) as f:
+        with assert_raises(ValueError):
+            dump_h5(f, data, compression='foo')
+
+
+def test_load_h5_lazy():
+    data = {'a': np.random.uniform(0, 1, (20, 10)), 'b': {'c': np.arange(5)}}
+    with h5.File('horton.io.test.test_internal.test_load_h5_lazy', driver='core', backing_store=False) as f:
+        dump_h5(f, data, chunked=True)
+        result = load_h5(f, lazy=True)
+        assert isinstance(result['a'], h5.Dataset)
+        assert isinstance(result['b']['c'], h5.Dataset)
+        assert (result['a'][3:5] == data['a'][3:5]).all()
+        assert (result['b']['c'][:] == data['b']['c']).all()
+
+
+def test_load_h5_lazy_file():
+    data = {'a': np.random.uniform(0, 1, (20, 10)), 'b': 2}
+    with tmpdir('horton.io.test.test_internal.test_load_h5_lazy_file') as dn:
+        fn_h5 = '%s/foo.h5' % dn
+        dump_h5(fn_h5, data, chunked=True)
+        with load_h5(fn_h5, lazy=True) as result:
+            assert isinstance(result['a'], h5.Dataset)
+            assert (result['a'][3:5] == data['a'][3:5]).all()
+            assert result['b'] == 2
+            # The file is locked for reading, so it can not be written.
+            with assert_raises(IOError):
+                LockedH5File(fn_h5, 'a', count=1)
+        # Once the file is closed, the datasets are no longer valid and the
+        # file can be opened for writing again.
+        assert not result['a'].id.valid
+        with LockedH5File(fn_h5, 'a', count=1) as f:
+            assert 'a' in f
+        # Closing twice is harmless.
+        lazy = load_h5(fn_h5, lazy=True)
+        lazy.close()
+        lazy.close()
+
+
+def test_dump_h5_direct_to_hdf5():
+    # The storage mode is passed explicitly, so calling to_hdf5 directly does
+    # not depend on an enclosing dump_h5.
+    four = DenseFourIndex(4)
+    four.randomize()
+    with h5.File('horton.io.test.test_internal.test_dump_h5_direct_to_hdf5', driver='core', backing_store=False) as f:
+        four.to_hdf5(f.create_group('plain'))
+        assert f['plain/array'].chunks is None
+        four.to_hdf5(f.create_group('gzip'), compression='gzip')
+        assert f['gzip/array'].compression == 'gzip'
+        assert (f['gzip/array'][:] == four._array).all()
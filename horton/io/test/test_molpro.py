@@ -104,6 +104,35 @@ def test_dump_load_fcidimp_consistency_ao():
     assert mol0.two_mo == mol1.two_mo
 
 
+def test_dump_load_fcidimp_consistency_ao_cholesky():
+    # Setup IOData with a Cholesky-decomposed two-electron operator
+    mol0 = IOData.from_file(context.get_fn('test/water.xyz'))
+    obasis = get_gobasis(mol0.coordinates, mol0.numbers, '3-21G')
+    lf = CholeskyLinalgFactory(obasis.nbasis)
+    mol0.one_mo = lf.create_two_index()
+    obasis.compute_kinetic(mol0.one_mo)
+    obasis.compute_nuclear_attraction(mol0.coordinates, mol0.pseudo_numbers, mol0.one_mo)
+    mol0.two_mo = obasis.compute_electron_repulsion(lf)
+    assert isinstance(mol0.two_mo, CholeskyFourIndex)
+
+    # The same operator in dense form
+    mol2 = IOData(one_mo=mol0.one_mo, two_mo=mol0.two_mo.get_dense())
+
+    # Dump to files and load them again. With these chunk sizes, the
+    # Cholesky operator is written one row of pairs at a time.
+    with tmpdir('horton.io.test.test_molpro.test_dump_load_fcidump_consistency_ao_cholesky') as dn:
+        for chunk_size in 1, 1000, 1000000:
+            dump_fcidump('%s/FCIDUMP' % dn, mol0, chunk_size=chunk_size)
+            mol1 = IOData.from_file('%s/FCIDUMP' % dn)
+            dump_fcidump('%s/FCIDUMP_dense' % dn, mol2)
+            mol3 = IOData.from_file('%s/FCIDUMP_dense' % dn)
+
+            # Compare results
+            assert mol0.one_mo == mol1.one_mo
+            assert abs(mol2.two_mo._array - mol1.two_mo._array).max() < 1e-10
+            assert abs(mol3.two_mo._array - mol1.two_mo._array).max() < 1e-10
+
+
 def check_dump_load_fcidimp_consistency_mo(fn):
     # Setup IOData
     mol0 = IOData.from_file(fn)
@@ -172,3 +201,33 @@ def test_dump_load_fcidimp_consistency_mo_active():
     assert mol0.ms2 == mol1.ms2
     assert mol0.one_mo == mol1.one_mo
     assert mol0.two_mo == mol1.two_mo
+
+
+def test_load_fcidump_chunks():
+    fn = context.get_fn('test/FCIDUMP.psi4.h2')
+    ref = load_fcidump(fn, DenseLinalgFactory())
+    result = load_fcidump(fn, DenseLinalgFactory(), nline_chunk=7)
+    assert result['core_energy'] == ref['core_energy']
+    assert result['one_mo'] == ref['one_mo']
+    assert result['two_mo'] == ref['two_mo']
+    # Packed storage of the four-index object
+    result = load_fcidump(fn, PackedLinalgFactory(), nline_chunk=7)
+    assert isinstance(result['two_mo'], PackedFourIndex)
+    assert (result['two_mo'].get_dense()._array == ref['two_mo']._array).all()
+
+
+def test_dump_fcidump_threshold_chunks():
+    mol0 = IOData.from_file(context.get_fn('test/FCIDUMP.psi4.h2'))
+    with tmpdir('horton.io.test.test_molpro.test_dump_fcidump_threshold_chunks') as dn:
+        # Small chunks
+        dump_fcidump('%s/FCIDUMP' % dn, mol0, chunk_size=20)
+        mol1 = IOData.from_file('%s/FCIDUMP' % dn)
+        assert mol0.one_mo == mol1.one_mo
+        assert mol0.two_mo == mol1.two_mo
+        # Small integrals are not written.
+        dump_fcidump('%s/FCIDUMP' % dn, mol0, threshold=1e-2)
+        mol2 = IOData.from_file('%s/FCIDUMP' % dn)
+        expected = mol0.two_mo._array.copy()
+        expected[abs(expected) <= 1e-2] = 0.0
+        assert (mol2.two_mo._array == expected).all()
+        assert (abs(mol2.one_mo._array)[mol2.one_mo._array != 0.0] > 1e-2).all()
@@ -21,26 +21,13 @@
 #pylint: skip-file
 
 
-import numpy as np
+import os, shutil, numpy as np
 
 from horton import *
 from horton.test.common import get_random_cell, tmpdir
 
 
 
-def test_unravel_counter():
-    from horton.io.vasp import _unravel_counter
-    assert _unravel_counter(0, [3, 3, 3]) == [0, 0, 0]
-    assert _unravel_counter(0, [2, 4, 3]) == [0, 0, 0]
-    assert _unravel_counter(1, [2, 4, 3]) == [1, 0, 0]
-    assert _unravel_counter(2, [2, 4, 3]) == [0, 1, 0]
-    assert _unravel_counter(3, [2, 4, 3]) == [1, 1, 0]
-    assert _unravel_counter(8, [2, 4, 3]) == [0, 0, 1]
-    assert _unravel_counter(9, [2, 4, 3]) == [1, 0, 1]
-    assert _unravel_counter(11, [2, 4, 3]) == [1, 1, 1]
-    assert _unravel_counter(24, [2, 4, 3]) == [0, 0, 0]
-
-
 def test_load_chgcar_oxygen():
     fn = context.get_fn('test/CHGCAR.oxygen')
     mol = IOData.from_file(fn)
@@ -111,3 +98,18 @@ def test_load_dump_consistency():
     assert abs(mol0.coordinates[0] - mol1.coordinates[1]).max() < 1e-10
     assert abs(mol0.coordinates[2] - mol1.coordinates[2]).max() < 1e-10
     assert abs(mol0.cell.rvecs - mol1.cell.rvecs).max() < 1e-10
+
+
+def test_load_chgcar_sidecar():
+    with tmpdir('horton.io.test.test_vasp.test_load_chgcar_sidecar') as dn:
+        fn = '%s/CHGCAR.oxygen' % dn
+        shutil.copy(context.get_fn('test/CHGCAR.oxygen'), fn)
+        mol1 = IOData.from_file(fn, sidecar=True)
+        assert os.path.isfile(fn + '.npy')
+        mol2 = IOData.from_file(fn, sidecar=True)
+        assert isinstance(mol2.cube_data, np.memmap)
+        assert abs(mol1.cube_data - mol2.cube_data).max() < 1e-10
+        assert abs(mol2.cube_data[1,0,0] - 0.76183317989E+04/mol2.cell.volume) < 1e-10
+        # The normalization must not be written to the sidecar file.
+        mol3 = IOData.from_file(fn, sidecar=True)
+        assert abs(mol1.cube_data - mol3.cube_data).max() < 1e-10
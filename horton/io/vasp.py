@@ -21,24 +21,19 @@
 '''VASP POSCAR, CHGCAR and POTCAR file formats'''
 
 
+from itertools import islice
+
 import numpy as np
 from horton.units import angstrom, electronvolt
 from horton.periodic import periodic
 from horton.cext import Cell
 from horton.grid.cext import UniformGrid
+from horton.io.cube import _load_sidecar, _dump_sidecar
 
 
 __all__ = ['load_chgcar', 'load_locpot', 'load_poscar', 'dump_poscar']
 
 
-def _unravel_counter(counter, shape):
-    result = []
-    for i in xrange(0, len(shape)):
-        result.append(counter % shape[i])
-        counter /= shape[i]
-    return result
-
-
 def _load_vasp_header(f, nskip):
     '''Load the cell and atoms from a VASP file
 
@@ -88,7 +83,7 @@ def _load_vasp_header(f, nskip):
     return title, cell, numbers, coordinates
 
 
-def _load_vasp_grid(filename):
+def _load_vasp_grid(filename, sidecar=False):
     '''Load a grid data file from VASP 5
 
        **Arguments:**
@@ -96,6 +91,11 @@ def _load_vasp_grid(filename):
        filename
             The VASP filename
 
+       **Optional arguments:**
+
+       sidecar
+            See :py:func:`horton.io.cube.load_cube`.
+
        **Returns:** a dictionary containing: ``title``, ``coordinates``,
        ``numbers``, ``cell``, ``grid``, ``cube_data``.
     '''
@@ -107,18 +107,24 @@ def _load_vasp_grid(filename):
         shape = np.array([int(w) for w in f.next().split()])
 
         # read data
-        cube_data = np.zeros(shape, float)
-        counter = 0
-        for line in f:
-            if counter >= cube_data.size:
-                break
-            for w in line.split():
-                i0, i1, i2 = _unravel_counter(counter, shape)
-                # Fill in the data with transposed indexes. In horton, X is
-                # the slowest index while Z is the fastest.
-                cube_data[i0, i1, i2] = float(w)
-                counter += 1
-        assert counter == cube_data.size
+        cube_data = None
+        if sidecar:
+            cube_data = _load_sidecar(filename, shape)
+        if cube_data is None:
+            # All lines of the data block, except the last, contain the same
+            # number of values as the first line.
+            size = shape.prod()
+            lines = [f.next()]
+            nword = len(lines[0].split())
+            lines.extend(islice(f, (size - 1)//nword))
+            values = np.fromstring(''.join(lines), float, sep=' ')
+            if values.size != size:
+                raise IOError('Could not read all grid data from the VASP file %s.' % filename)
+            # Transpose the data. In VASP, X is the fastest index while in
+            # HORTON, X is the slowest index and Z is the fastest.
+            cube_data = values.reshape(shape[::-1]).transpose(2, 1, 0).copy()
+            if sidecar:
+                _dump_sidecar(filename, cube_data)
 
     return {
         'title': title,
@@ -130,7 +136,7 @@ def _load_vasp_grid(filename):
     }
 
 
-def load_chgcar(filename):
+def load_chgcar(filename, sidecar=False):
     '''Reads a vasp 5 chgcar file.
 
        **Arguments:**
@@ -138,16 +144,21 @@ def load_chgcar(filename):
        filename
             The VASP filename
 
+       **Optional arguments:**
+
+       sidecar
+            See :py:func:`horton.io.cube.load_cube`.
+
        **Returns:** a dictionary containing: ``title``, ``coordinates``,
        ``numbers``, ``cell``, ``grid``, ``cube_data``.
     '''
-    result = _load_vasp_grid(filename)
+    result = _load_vasp_grid(filename, sidecar)
     # renormalize electron density
     result['cube_data'] /= result['cell'].volume
     return result
 
 
-def load_locpot(filename):
+def load_locpot(filename, sidecar=False):
     '''Reads a vasp 5 locpot file.
 
        **Arguments:**
@@ -155,10 +166,15 @@ def load_locpot(filename):
        filename
             The VASP filename
 
+       **Optional arguments:**
+
+       sidecar
+            See :py:func:`horton.io.cube.load_cube`.
+
        **Returns:** a dictionary containing: ``title``, ``coordinates``,
        ``numbers``, ``cell``, ``grid``, ``cube_data``.
     '''
-    result = _load_vasp_grid(filename)
+    result = _load_vasp_grid(filename, sidecar)
     # convert locpot to atomic units
     result['cube_data'] *= electronvolt
     return result
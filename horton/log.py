@@ -29,6 +29,7 @@
 '''
 
 import sys, os, datetime, getpass, time, atexit, traceback, resource, urllib
+import threading
 from contextlib import contextmanager
 from functools import wraps
 import horton
@@ -282,6 +283,7 @@ class TimerGroup(object):
     def __init__(self):
         self.parts = {}
         self._stack = []
+        self._thread = threading.current_thread()
         self._start('Total')
 
     def reset(self):
@@ -291,6 +293,13 @@ class TimerGroup(object):
 
     @contextmanager
     def section(self, label):
+        # The stack of timers is shared, so only the thread that created the
+        # TimerGroup may touch it. Sections entered from worker threads (e.g.
+        # a ThreadPool over atoms) are not timed separately: their CPU time is
+        # already accounted for by the section that launched the workers.
+        if threading.current_thread() is not self._thread:
+            yield
+            return
         self._start(label)
         try:
             yield
@@ -54,6 +54,10 @@ class CholeskyFourIndex(FourIndex):
     """Cholesky symmetric four-dimensional matrix.
     """
 
+    # The maximum size in bytes of a block of Cholesky vectors that is loaded
+    # in memory at once when the vectors are stored in a memory-mapped file.
+    memmap_block_size = 2**27
+
     #
     # Constructor and destructor
     #
@@ -79,8 +83,8 @@ class CholeskyFourIndex(FourIndex):
            Either nvec or array must be given (or both).
         """
         def check_array(a, name):
-            if a.ndim != 3:
-                raise TypeError('Argument %s has %i dimensions, expecting 3.' % (name, a.ndim))
+            if len(a.shape) != 3:
+                raise TypeError('Argument %s has %i dimensions, expecting 3.' % (name, len(a.shape)))
             if nvec is not None and nvec != a.shape[0]:
                 raise TypeError('nvec does not match %s.shape[0].' % name)
             if not (nbasis == a.shape[1] and nbasis == a.shape[2]):
@@ -143,16 +147,27 @@ class CholeskyFourIndex(FourIndex):
             (other._array2 == self._array2).all()
 
     @classmethod
-    def from_hdf5(cls, grp):
+    def from_hdf5(cls, grp, lazy=False):
         '''Construct an instance from data previously stored in an h5py.Group.
 
            **Arguments:**
 
            grp
                 An h5py.Group object.
+
+           **Optional arguments:**
+
+           lazy
+                When True, the Cholesky vectors are not read into memory.
+                The h5py datasets are used as arrays instead, from which
+                blocks of vectors are read when needed, as with memory-mapped
+                arrays. The HDF5 file must remain open while the result is in
+                use.
         '''
         nvec = grp['array'].shape[0]
         nbasis = grp['array'].shape[1]
+        if lazy:
+            return cls(nbasis, nvec, grp['array'], grp.get('array2'))
         result = cls(nbasis, nvec)
         grp['array'].read_direct(result._array)
         if 'array2' in grp:
@@ -160,18 +175,28 @@ class CholeskyFourIndex(FourIndex):
             grp['array2'].read_direct(result._array2)
         return result
 
-    def to_hdf5(self, grp):
+    def to_hdf5(self, grp, chunked=False, compression=None):
         '''Dump this object in an h5py.Group
 
            **Arguments:**
 
            grp
                 An h5py.Group object.
+
+           **Optional arguments:**
+
+           chunked, compression
+                The storage mode of the arrays, see ``dump_h5``. When chunked,
+                every Cholesky vector is a chunk.
         '''
+        from horton.io.internal import create_array_dataset
         grp.attrs['class'] = self.__class__.__name__
-        grp['array'] = self._array
-        if self._array is not self._array:
-            grp['array2'] = self._array2
+        chunks = (1,) + self._array.shape[1:]
+        create_array_dataset(grp, 'array', self._array, chunks, chunked,
+                             compression)
+        if self._array2 is not self._array:
+            create_array_dataset(grp, 'array2', self._array2, chunks, chunked,
+                                 compression)
 
     def new(self):
         '''Return a new four-index object with the same nbasis'''
@@ -247,8 +272,11 @@ class CholeskyFourIndex(FourIndex):
             self._array2 *= np.sqrt(factor)
 
     def get_element(self, i, j, k, l):
-        '''Return a matrix element'''
-        return np.dot(self._array[:,i,k], self._array2[:,j,l])
+        '''Return a matrix element
+
+           The indexes may also be integer arrays, to get many elements at once.
+        '''
+        return np.einsum('x...,x...->...', self._array[:,i,k], self._array2[:,j,l])
 
     def set_element(self, i, j, k, l, value):
         '''This method is not supported due to the Cholesky decomposition.'''
@@ -270,6 +298,28 @@ class CholeskyFourIndex(FourIndex):
 
     nvec = property(_get_nvec)
 
+    @staticmethod
+    def _in_memory(array):
+        '''Is the array in memory, i.e. not memory-mapped or in an HDF5 file?'''
+        return isinstance(array, np.ndarray) and not isinstance(array, np.memmap)
+
+    def _iter_vec_slices(self):
+        '''Iterate over slices of Cholesky vectors that are processed at once
+
+           When the vectors are stored in a memory-mapped file (e.g. obtained
+           with ``compute_cholesky`` with the ``filename`` argument) or in an
+           HDF5 dataset (``from_hdf5`` with ``lazy=True``), blocks of at most
+           ``memmap_block_size`` bytes are used. Otherwise all vectors are
+           processed at once.
+        '''
+        nvec = self.nvec
+        if not self._in_memory(self._array) or not self._in_memory(self._array2):
+            nvec_block = max(1, self.memmap_block_size/(self._array[0].nbytes + self._array2[0].nbytes))
+        else:
+            nvec_block = max(1, nvec)
+        for begin in xrange(0, nvec, nvec_block):
+            yield slice(begin, min(begin + nvec_block, nvec))
+
     def _get_is_decoupled(self):
         return self._array is not self._array2
 
@@ -461,12 +511,13 @@ class CholeskyFourIndex(FourIndex):
                 out.clear()
         else:
             check_type('out', out, DenseTwoIndex)
-        if subscripts == 'abcd,bd->ac':
-            tmp = np.tensordot(self._array2, two._array, axes=([(1,2),(1,0)]))
-            out._array[:] += factor*np.tensordot(self._array, tmp, [0,0])
-        elif subscripts == 'abcd,cb->ad':
-            tmp = np.tensordot(self._array2, two._array, axes=([1,1]))
-            out._array[:] += factor*np.tensordot(self._array, tmp, ([0,2],[0,2]))
+        for s in self._iter_vec_slices():
+            if subscripts == 'abcd,bd->ac':
+                tmp = np.tensordot(self._array2[s], two._array, axes=([(1,2),(1,0)]))
+                out._array[:] += factor*np.tensordot(self._array[s], tmp, [0,0])
+            elif subscripts == 'abcd,cb->ad':
+                tmp = np.tensordot(self._array2[s], two._array, axes=([1,1]))
+                out._array[:] += factor*np.tensordot(self._array[s], tmp, ([0,2],[0,2]))
         return out
 
     def assign_four_index_transform(self, ao_integrals, exp0, exp1=None, exp2=None, exp3=None, method='tensordot'):
@@ -488,22 +539,27 @@ class CholeskyFourIndex(FourIndex):
 
            method
                 Either ``einsum`` or ``tensordot`` (default).
+
+           The transformation is carried out for blocks of Cholesky vectors
+           at a time, such that memory-mapped AO integrals are never loaded
+           in memory as a whole.
         '''
         check_type('ao_integrals', ao_integrals, CholeskyFourIndex)
+        check_options('method', method, 'einsum', 'tensordot')
         exp0, exp1, exp2, exp3 = parse_four_index_transform_exps(exp0, exp1, exp2, exp3, DenseExpansion)
-        if method == 'einsum':
-            if ao_integrals.is_decoupled or not (exp0 is exp1 and exp2 is exp3):
-                self.decouple_array2()
-                self._array2[:] = np.einsum('bi,kbd->kid', exp1.coeffs, ao_integrals._array2)
-                self._array2[:] = np.einsum('dj,kid->kij', exp3.coeffs, self._array2)
-            self._array[:] = np.einsum('ai,kac->kic', exp0.coeffs, ao_integrals._array)
-            self._array[:] = np.einsum('cj,kic->kij', exp2.coeffs, self._array)
-        elif method == 'tensordot':
-            if ao_integrals.is_decoupled or not (exp0 is exp1 and exp2 is exp3):
-                self.decouple_array2()
-                self._array2[:] = np.tensordot(ao_integrals._array2, exp1.coeffs, axes=([1],[0]))
-                self._array2[:] = np.tensordot(self._array2, exp3.coeffs, axes=([1],[0]))
-            self._array[:] = np.tensordot(ao_integrals._array, exp0.coeffs, axes=([1],[0]))
-            self._array[:] = np.tensordot(self._array, exp2.coeffs, axes=([1],[0]))
-        else:
-            raise ValueError('The method must either be \'einsum\' or \'tensordot\'.')
+        decouple = ao_integrals.is_decoupled or not (exp0 is exp1 and exp2 is exp3)
+        if decouple:
+            self.decouple_array2()
+        for s in ao_integrals._iter_vec_slices():
+            if method == 'einsum':
+                if decouple:
+                    tmp = np.einsum('bi,kbd->kid', exp1.coeffs, ao_integrals._array2[s])
+                    self._array2[s] = np.einsum('dj,kid->kij', exp3.coeffs, tmp)
+                tmp = np.einsum('ai,kac->kic', exp0.coeffs, ao_integrals._array[s])
+                self._array[s] = np.einsum('cj,kic->kij', exp2.coeffs, tmp)
+            else:
+                if decouple:
+                    tmp = np.tensordot(ao_integrals._array2[s], exp1.coeffs, axes=([1],[0]))
+                    self._array2[s] = np.tensordot(tmp, exp3.coeffs, axes=([1],[0]))
+                tmp = np.tensordot(ao_integrals._array[s], exp0.coeffs, axes=([1],[0]))
+                self._array[s] = np.tensordot(tmp, exp2.coeffs, axes=([1],[0]))
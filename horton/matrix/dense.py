@@ -1704,10 +1704,12 @@ class DenseTwoIndex(TwoIndex):
            **Arguments:**
 
            i, j
-                The matrix indexes to be set
+                The matrix indexes to be set. These may also be integer arrays
+                to set many elements at once.
 
            value
-                The value to be assigned to the matrix element.
+                The value to be assigned to the matrix element, or an array
+                with a value for every element.
 
            **Optional arguments:**
 
@@ -2705,6 +2707,10 @@ class DenseFourIndex(FourIndex):
        implementation mainly serves as a reference for testing purposes.
     """
 
+    # The maximum size in bytes of the scratch buffer used in the four-index
+    # transformation.
+    block_size = 2**27
+
     #
     # Constructor and destructor
     #
@@ -2777,16 +2783,23 @@ class DenseFourIndex(FourIndex):
         grp['array'].read_direct(result._array)
         return result
 
-    def to_hdf5(self, grp):
+    def to_hdf5(self, grp, chunked=False, compression=None):
         '''Dump this object in an h5py.Group
 
            **Arguments:**
 
            grp
                 An h5py.Group object.
+
+           **Optional arguments:**
+
+           chunked, compression
+                The storage mode of the array, see ``dump_h5``.
         '''
+        from horton.io.internal import create_array_dataset
         grp.attrs['class'] = self.__class__.__name__
-        grp['array'] = self._array
+        create_array_dataset(grp, 'array', self._array, chunked=chunked,
+                             compression=compression)
 
     # FIXME: rename into clean_copy
     def new(self):
@@ -2948,10 +2961,12 @@ class DenseFourIndex(FourIndex):
            **Arguments:**
 
            i, j, k, l
-                The matrix indexes to be set
+                The matrix indexes to be set. These may also be integer arrays
+                to set many elements at once.
 
            value
-                The value to be assigned to the matrix element.
+                The value to be assigned to the matrix element, or an array
+                with a value for every element.
 
            **Optional arguments:**
 
@@ -3530,7 +3545,7 @@ class DenseFourIndex(FourIndex):
             for i in range(self.nbasis1):
                 self._array[:,i,:,i] += three._array[:,:,i]*factor
 
-    def assign_four_index_transform(self, ao_integrals, exp0, exp1=None, exp2=None, exp3=None, method='tensordot'):
+    def assign_four_index_transform(self, ao_integrals, exp0, exp1=None, exp2=None, exp3=None, method='tensordot', begin0=0, end0=None, begin1=0, end1=None, begin2=0, end2=None, begin3=0, end3=None):
         '''Perform four index transformation.
 
            **Arguments:**
@@ -3548,24 +3563,68 @@ class DenseFourIndex(FourIndex):
 
            method
                 Either ``einsum`` or ``tensordot`` (default).
+
+           begin0, end0, begin1, end1, begin2, end2, begin3, end3
+                Can be used to select a range of orbitals of exp0, exp1, exp2
+                and exp3, e.g. to transform directly to an (occupied, virtual,
+                occupied, virtual) block. When not given, all orbitals are
+                used. The shape of self must match the selected ranges.
+
+           The transformation is carried out for blocks of the first index of
+           the result, such that no temporary arrays with the size of the
+           result are needed. Besides the result, only a scratch buffer of at
+           most ``block_size`` bytes (or at least the size needed for a single
+           value of the first index) is allocated.
         '''
         # parse arguments
         check_type('ao_integrals', ao_integrals, DenseFourIndex)
+        check_options('method', method, 'einsum', 'tensordot')
         exp0, exp1, exp2, exp3 = parse_four_index_transform_exps(exp0, exp1, exp2, exp3, DenseExpansion)
-        # actual transform
-        if method == 'einsum':
-            # The order of the dot products is according to literature
-            # conventions.
-            self._array[:] = np.einsum('sd,pqrs->pqrd', exp3.coeffs, ao_integrals._array, casting='no', order='C')
-            self._array[:] = np.einsum('rc,pqrd->pqcd', exp2.coeffs, self._array, casting='no', order='C')
-            self._array[:] = np.einsum('qb,pqcd->pbcd', exp1.coeffs, self._array, casting='no', order='C')
-            self._array[:] = np.einsum('pa,pbcd->abcd', exp0.coeffs, self._array, casting='no', order='C')
-        elif method == 'tensordot':
-            # because the way tensordot works, the order of the dot products is
-            # not according to literature conventions.
-            self._array[:] = np.tensordot(ao_integrals._array, exp0.coeffs, axes=([0],[0]))
-            self._array[:] = np.tensordot(self._array, exp1.coeffs, axes=([0],[0]))
-            self._array[:] = np.tensordot(self._array, exp2.coeffs, axes=([0],[0]))
-            self._array[:] = np.tensordot(self._array, exp3.coeffs, axes=([0],[0]))
-        else:
-            raise ValueError('The method must either be \'einsum\' or \'tensordot\'.')
+        if ao_integrals is self:
+            raise ValueError('The four-index transformation can not be carried out in-place.')
+        coeffs0 = exp0.coeffs[:,begin0:end0]
+        coeffs1 = exp1.coeffs[:,begin1:end1]
+        coeffs2 = exp2.coeffs[:,begin2:end2]
+        coeffs3 = exp3.coeffs[:,begin3:end3]
+        n = ao_integrals.nbasis
+        n0, n1, n2, n3 = coeffs0.shape[1], coeffs1.shape[1], coeffs2.shape[1], coeffs3.shape[1]
+        if self.shape != (n0, n1, n2, n3):
+            raise TypeError('The shape of the output does not match the selected ranges of orbitals.')
+        # A single scratch buffer, split in two halves that are used
+        # alternately for the intermediate results of a block.
+        nhalf = max(n*n*n, n*n*n3, n*n3*n2, n3*n2*n1)
+        nblock = max(1, min(n0, self.block_size/(16*nhalf)))
+        scratch = np.empty(2*nblock*nhalf)
+        ao = ao_integrals._array.reshape(n, n*n*n)
+        for begin in xrange(0, n0, nblock):
+            end = min(begin + nblock, n0)
+            m = end - begin
+            buf0 = scratch[:m*nhalf]
+            buf1 = scratch[nblock*nhalf:nblock*nhalf + m*nhalf]
+            if method == 'einsum':
+                # The order of the dot products is according to literature
+                # conventions, except for the first index, which is blocked.
+                tmp0 = buf0[:m*n*n*n].reshape(m, n, n, n)
+                np.einsum('pa,pqrs->aqrs', coeffs0[:,begin:end], ao_integrals._array, out=tmp0)
+                tmp1 = buf1[:m*n*n*n3].reshape(m, n, n, n3)
+                np.einsum('sd,aqrs->aqrd', coeffs3, tmp0, out=tmp1)
+                tmp0 = buf0[:m*n*n2*n3].reshape(m, n, n2, n3)
+                np.einsum('rc,aqrd->aqcd', coeffs2, tmp1, out=tmp0)
+                np.einsum('qb,aqcd->abcd', coeffs1, tmp0, out=self._array[begin:end])
+            else:
+                # Every step is a matrix product over the last index (written
+                # in the other half of the buffer), followed by a transposition
+                # that brings the next index to the end.
+                tmp0 = buf0[:m*n*n*n].reshape(m, n*n*n)
+                np.dot(coeffs0[:,begin:end].T, ao, out=tmp0)
+                tmp1 = buf1[:m*n*n*n3].reshape(m*n*n, n3)
+                np.dot(tmp0.reshape(m*n*n, n), coeffs3, out=tmp1)
+                tmp0 = buf0[:m*n*n3*n].reshape(m, n, n3, n)
+                tmp0[:] = tmp1.reshape(m, n, n, n3).transpose(0, 1, 3, 2)
+                tmp1 = buf1[:m*n*n3*n2].reshape(m*n*n3, n2)
+                np.dot(tmp0.reshape(m*n*n3, n), coeffs2, out=tmp1)
+                tmp0 = buf0[:m*n3*n2*n].reshape(m, n3, n2, n)
+                tmp0[:] = tmp1.reshape(m, n, n3, n2).transpose(0, 2, 3, 1)
+                tmp1 = buf1[:m*n3*n2*n1].reshape(m*n3*n2, n1)
+                np.dot(tmp0.reshape(m*n3*n2, n), coeffs1, out=tmp1)
+                self._array[begin:end] = tmp1.reshape(m, n3, n2, n1).transpose(0, 3, 2, 1)
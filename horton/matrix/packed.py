@@ -0,0 +1,449 @@
+# -*- coding: utf-8 -*-
+# HORTON: Helpful Open-source Research TOol for N-fermion systems.
+# Copyright (C) 2011-2015 The HORTON Development Team
+#
+# This file is part of HORTON.
+#
+# HORTON is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# HORTON is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+#--
+"""Four-index objects with eight-fold symmetry, of which only the unique
+   elements are stored
+"""
+
+
+import numpy as np
+from horton.log import log
+from horton.utils import check_type, check_options, doc_inherit
+from horton.matrix.base import parse_four_index_transform_exps, FourIndex
+from horton.matrix.dense import DenseLinalgFactory, DenseExpansion, \
+    DenseTwoIndex, DenseFourIndex
+
+
+__all__ = [
+    'PackedFourIndex', 'PackedLinalgFactory',
+]
+
+
+def _packed_index(i, j):
+    '''Return the position of element (i, j) in a packed symmetric matrix
+
+       Only the lower triangle is stored, row by row. The arguments may be
+       integers or integer arrays.
+    '''
+    return np.where(i >= j, (i*(i + 1))//2 + j, (j*(j + 1))//2 + i)
+
+
+class PackedLinalgFactory(DenseLinalgFactory):
+    @doc_inherit(DenseLinalgFactory)
+    def create_four_index(self, nbasis=None):
+        nbasis = nbasis or self.default_nbasis
+        return PackedFourIndex(nbasis)
+
+    @doc_inherit(DenseLinalgFactory)
+    def _check_four_index_init_args(self, four_index, nbasis=None):
+        nbasis = nbasis or self.default_nbasis
+        four_index.__check_init_args__(nbasis)
+
+    create_four_index.__check_init_args__ = _check_four_index_init_args
+
+
+class PackedFourIndex(FourIndex):
+    """Four-dimensional matrix with eight-fold symmetry in packed storage.
+
+       The element ``<ab|cd>`` (physicists' notation, as in DenseFourIndex) is
+       equal to ``(ac|bd)`` in chemists' notation. The pairs ``ac`` and ``bd``
+       are mapped on pair indexes, which define a symmetric matrix of which
+       only the lower triangle is stored. This requires about eight times less
+       memory than DenseFourIndex.
+
+       Operations that need unpacked elements process blocks of rows of the
+       symmetric pair matrix, whose size is limited by ``block_size``.
+    """
+
+    # The maximum size in bytes of a block of unpacked elements.
+    block_size = 2**27
+
+    #
+    # Constructor and destructor
+    #
+
+    def __init__(self, nbasis):
+        """
+           **Arguments:**
+
+           nbasis
+                The number of basis functions.
+        """
+        self._nbasis = nbasis
+        npair = (nbasis*(nbasis + 1))/2
+        self._array = np.zeros((npair*(npair + 1))/2)
+        log.mem.announce(self._array.nbytes)
+        # The basis functions in every pair and the pair index for all
+        # combinations of basis functions.
+        self._pair0, self._pair1 = np.tril_indices(nbasis)
+        self._pair_index = _packed_index(*np.indices((nbasis, nbasis)))
+
+    def __del__(self):
+        if log is not None:
+            if hasattr(self, '_array'):
+                log.mem.denounce(self._array.nbytes)
+
+    #
+    # Methods from base class
+    #
+
+    def __check_init_args__(self, nbasis):
+        '''Is self compatible with the given constructor arguments?'''
+        assert nbasis == self.nbasis
+
+    def __eq__(self, other):
+        '''Compare self with other'''
+        return isinstance(other, PackedFourIndex) and \
+            other.nbasis == self.nbasis and \
+            (other._array == self._array).all()
+
+    @classmethod
+    def from_hdf5(cls, grp):
+        '''Construct an instance from data previously stored in an h5py.Group.
+
+           **Arguments:**
+
+           grp
+                An h5py.Group object.
+        '''
+        result = cls(grp.attrs['nbasis'])
+        grp['array'].read_direct(result._array)
+        return result
+
+    def to_hdf5(self, grp, chunked=False, compression=None):
+        '''Dump this object in an h5py.Group
+
+           **Arguments:**
+
+           grp
+                An h5py.Group object.
+
+           **Optional arguments:**
+
+           chunked, compression
+                The storage mode of the array, see ``dump_h5``.
+        '''
+        from horton.io.internal import create_array_dataset
+        grp.attrs['class'] = self.__class__.__name__
+        grp.attrs['nbasis'] = self.nbasis
+        create_array_dataset(grp, 'array', self._array, chunked=chunked,
+                             compression=compression)
+
+    def new(self):
+        '''Return a new four-index object with the same nbasis'''
+        return PackedFourIndex(self.nbasis)
+
+    def _check_new_init_args(self, other):
+        '''Check whether an already initialized object is compatible'''
+        other.__check_init_args__(self.nbasis)
+
+    new.__check_init_args__ = _check_new_init_args
+
+    def clear(self):
+        '''Reset all elements to zero.'''
+        self._array[:] = 0.0
+
+    def copy(self):
+        '''Return a copy of the current four-index operator'''
+        result = PackedFourIndex(self.nbasis)
+        result.assign(self)
+        return result
+
+    def assign(self, other):
+        '''Assign with the contents of another object
+
+           **Arguments:**
+
+           other
+                Another PackedFourIndex object or a DenseFourIndex object with
+                eight-fold symmetry. In the latter case, only the unique
+                elements are copied.
+        '''
+        check_type('other', other, PackedFourIndex, DenseFourIndex)
+        if isinstance(other, PackedFourIndex):
+            self._array[:] = other._array
+        else:
+            if other.shape != self.shape:
+                raise TypeError('The shape of the DenseFourIndex object does not match.')
+            for rows, indexes in self._iter_row_blocks():
+                # (ac|bd) = <ab|cd> for all pairs ac in rows and all pairs bd.
+                values = other._array[
+                    self._pair0[rows, None], self._pair0,
+                    self._pair1[rows, None], self._pair1]
+                self._array[indexes] = values
+
+    def randomize(self):
+        '''Fill with random normal data'''
+        self._array[:] = np.random.normal(0, 1, self._array.shape)
+
+    def permute_basis(self, permutation):
+        '''Reorder the coefficients for a given permutation of basis functions.
+
+           **Arguments:**
+
+           permutation
+                An integer numpy array that defines the new order of the basis
+                functions.
+        '''
+        # The old pair index of every new pair
+        old_pairs = self._pair_index[permutation[self._pair0], permutation[self._pair1]]
+        result = np.zeros(self._array.shape)
+        for rows, indexes in self._iter_row_blocks():
+            result[indexes] = self._array[_packed_index(old_pairs[rows, None], old_pairs)]
+        self._array[:] = result
+
+    def change_basis_signs(self, signs):
+        '''Correct for different sign conventions of the basis functions.
+
+           **Arguments:**
+
+           signs
+                A numpy array with sign changes indicated by +1 and -1.
+        '''
+        pair_signs = signs[self._pair0]*signs[self._pair1]
+        for rows, indexes in self._iter_row_blocks():
+            # Only the lower triangle, such that every element is changed once.
+            lower = np.arange(self.npair) <= np.arange(self.npair)[rows, None]
+            self._array[indexes[lower]] *= (pair_signs[rows, None]*pair_signs)[lower]
+
+    def iadd(self, other, factor=1.0):
+        '''Add another PackedFourIndex object in-place, multiplied by factor
+
+           **Arguments:**
+
+           other
+                A PackedFourIndex instance to be added
+
+           **Optional arguments:**
+
+           factor
+                The added term is scaled by this factor.
+        '''
+        check_type('other', other, PackedFourIndex)
+        check_type('factor', factor, float, int)
+        self._array += other._array*factor
+
+    def iscale(self, factor):
+        '''In-place multiplication with a scalar
+
+           **Arguments:**
+
+           factor
+                A scalar factor.
+        '''
+        check_type('factor', factor, float, int)
+        self._array *= factor
+
+    def get_element(self, i, j, k, l):
+        '''Return a matrix element'''
+        return self._array[_packed_index(self._pair_index[i, k], self._pair_index[j, l])]
+
+    def set_element(self, i, j, k, l, value, symmetry=8):
+        '''Set a matrix element
+
+           **Arguments:**
+
+           i, j, k, l
+                The matrix indexes to be set. These may also be integer arrays
+                to set many elements at once.
+
+           value
+                The value to be assigned to the matrix element, or an array
+                with a value for every element.
+
+           **Optional arguments:**
+
+           symmetry
+                Only eight-fold symmetry is supported. The seven elements that
+                are equivalent by symmetry are set as well.
+        '''
+        check_options('symmetry', symmetry, 8)
+        self._array[_packed_index(self._pair_index[i, k], self._pair_index[j, l])] = value
+
+    #
+    # Properties
+    #
+
+    def _get_nbasis(self):
+        '''The number of basis functions'''
+        return self._nbasis
+
+    nbasis = property(_get_nbasis)
+
+    def _get_npair(self):
+        '''The number of unique pairs of basis functions'''
+        return len(self._pair0)
+
+    npair = property(_get_npair)
+
+    def _get_shape(self):
+        '''The shape of the object'''
+        return (self.nbasis, self.nbasis, self.nbasis, self.nbasis)
+
+    shape = property(_get_shape)
+
+    def _iter_row_blocks(self):
+        '''Iterate over blocks of rows of the symmetric pair matrix
+
+           **Yields:** a slice with pair indexes (rows) and an array with the
+           positions in the packed storage of all elements in these rows,
+           shape (nrow, npair).
+        '''
+        npair = self.npair
+        nrow_block = max(1, self.block_size/(8*npair))
+        for begin in xrange(0, npair, nrow_block):
+            rows = slice(begin, min(begin + nrow_block, npair))
+            yield rows, _packed_index(np.arange(npair)[rows, None], np.arange(npair))
+
+    #
+    # New methods for this implementation
+    # TODO: consider adding these to base class
+    #
+
+    def get_dense(self):
+        '''Return the DenseFourIndex equivalent. ONLY FOR TESTING.'''
+        result = DenseFourIndex(self.nbasis)
+        result._array[:] = self._array[_packed_index(
+            self._pair_index[:, None, :, None],
+            self._pair_index[None, :, None, :])]
+        return result
+
+    def is_symmetric(self, symmetry=8, rtol=1e-5, atol=1e-8):
+        '''The packed storage always has an eight-fold symmetry'''
+        check_options('symmetry', symmetry, 1, 2, 4, 8)
+        return True
+
+    def symmetrize(self, symmetry=8):
+        '''The packed storage is always symmetric, so nothing is done'''
+        check_options('symmetry', symmetry, 1, 2, 4, 8)
+
+    def itranspose(self):
+        '''In-place transpose: ``0,1,2,3 -> 1,0,3,2``, does nothing'''
+        pass
+
+    def sum(self):
+        '''Return the sum of all elements of the unpacked object'''
+        # Every pair ac with a != c corresponds to two elements.
+        weights = np.where(self._pair0 == self._pair1, 1.0, 2.0)
+        result = 0.0
+        for rows, indexes in self._iter_row_blocks():
+            result += np.dot(weights[rows], np.dot(self._array[indexes], weights))
+        return result
+
+    def contract_two_to_two(self, subscripts, two, out=None, factor=1.0, clear=True):
+        """Contract self with a two-index to obtain a two-index.
+
+           **Arguments:**
+
+           subscripts
+                Any of ``abcd,bd->ac`` (direct), ``abcd,cb->ad`` (exchange)
+
+           two
+                The input two-index object. (DenseTwoIndex)
+
+           **Optional arguments:**
+
+           out, factor, clear
+                See :py:meth:`DenseLinalgFactory.einsum`
+        """
+        check_options('subscripts', subscripts, 'abcd,bd->ac', 'abcd,cb->ad')
+        check_type('two', two, DenseTwoIndex)
+        if out is None:
+            out = DenseTwoIndex(self.nbasis)
+        else:
+            check_type('out', out, DenseTwoIndex)
+            if clear:
+                out.clear()
+        if subscripts == 'abcd,bd->ac':
+            # Fold the two-index object onto the pairs bd.
+            two_pairs = (two._array + two._array.T)[self._pair0, self._pair1]
+            two_pairs[self._pair0 == self._pair1] *= 0.5
+            result = np.zeros(self.npair)
+            for rows, indexes in self._iter_row_blocks():
+                result[rows] = np.dot(self._array[indexes], two_pairs)
+            out._array[:] += factor*result[self._pair_index]
+        elif subscripts == 'abcd,cb->ad':
+            for rows, indexes in self._iter_row_blocks():
+                # Unpacked elements (ac|bd) with shape (nrow, b, d)
+                block = self._array[indexes][:, self._pair_index]
+                pair0 = self._pair0[rows]
+                pair1 = self._pair1[rows]
+                # Contributions of (ac|bd) two[c,b] to out[a,d]
+                tmp = np.einsum('pb,pbd->pd', two._array[pair1], block)
+                np.add.at(out._array, pair0, factor*tmp)
+                # Contributions of (ca|bd) two[a,b] to out[c,d] for a != c
+                mask = pair0 != pair1
+                tmp = np.einsum('pb,pbd->pd', two._array[pair0[mask]], block[mask])
+                np.add.at(out._array, pair1[mask], factor*tmp)
+        return out
+
+    def assign_four_index_transform(self, ao_integrals, exp0, exp1=None, exp2=None, exp3=None, method='tensordot'):
+        '''Perform four index transformation.
+
+           **Arguments:**
+
+           oa_integrals
+                A PackedFourIndex with integrals in atomic orbitals.
+
+           exp0
+                A DenseExpansion object with molecular orbitals
+
+           **Optional arguments:**
+
+           exp1, exp2, exp3
+                Only transformations that preserve the eight-fold symmetry are
+                supported, so these must be the same as exp0 if given.
+
+           method
+                Either ``einsum`` or ``tensordot`` (default). Both give the
+                same result.
+
+           The transformation is carried out in two halves. The intermediate
+           result takes about twice the memory of the packed integrals.
+        '''
+        check_type('ao_integrals', ao_integrals, PackedFourIndex)
+        check_options('method', method, 'einsum', 'tensordot')
+        exp0, exp1, exp2, exp3 = parse_four_index_transform_exps(exp0, exp1, exp2, exp3, DenseExpansion)
+        if not (exp0 is exp1 and exp0 is exp2 and exp0 is exp3):
+            raise ValueError('PackedFourIndex only supports transformations that preserve the eight-fold symmetry.')
+        coeffs = exp0.coeffs
+        npair = self.npair
+        # First half: transform the pairs bd for blocks of pairs ac.
+        half = np.zeros((npair, npair))
+        for rows, indexes in ao_integrals._iter_row_blocks():
+            block = ao_integrals._array[indexes][:, ao_integrals._pair_index]
+            if method == 'einsum':
+                block = np.einsum('pbd,bj->pdj', block, coeffs)
+                block = np.einsum('pdj,dl->pjl', block, coeffs)
+            else:
+                block = np.tensordot(block, coeffs, axes=([1], [0]))
+                block = np.tensordot(block, coeffs, axes=([1], [0]))
+            half[rows] = block[:, self._pair0, self._pair1]
+        # Second half: transform the pairs ac for blocks of (transformed) pairs
+        # bd. Because of the symmetry, these are rows of the final result.
+        for rows, indexes in self._iter_row_blocks():
+            block = half[:, rows][ao_integrals._pair_index]
+            if method == 'einsum':
+                block = np.einsum('ai,acq->icq', coeffs, block)
+                block = np.einsum('ck,icq->kiq', coeffs, block)
+            else:
+                block = np.tensordot(coeffs, block, axes=([0], [0]))
+                block = np.tensordot(coeffs, block, axes=([0], [1]))
+            self._array[indexes] = block[self._pair0, self._pair1].T
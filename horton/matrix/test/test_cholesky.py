@@ -25,6 +25,7 @@ import numpy as np, h5py as h5
 from nose.tools import assert_raises
 
 from horton import *
+from horton.test.common import tmpdir
 
 
 def test_linalg_factory_constructors():
@@ -141,6 +142,26 @@ def test_four_index_hdf5():
         assert a == b
 
 
+def test_four_index_hdf5_decoupled_lazy():
+    cho, dense = get_four_cho_dense(nbasis=6, nvec=4, sym=4)
+    with h5.File('horton.matrix.test.test_cholesky.test_four_index_hdf5_decoupled_lazy', driver='core', backing_store=False) as f:
+        dump_h5(f, {'cho': cho}, chunked=True)
+        assert 'array2' in f['cho']
+        assert f['cho/array'].chunks == (1, 6, 6)
+        b = CholeskyFourIndex.from_hdf5(f['cho'])
+        assert b.is_decoupled
+        assert cho == b
+        c = load_h5(f['cho'], lazy=True)
+        assert isinstance(c._array, h5.Dataset)
+        assert isinstance(c._array2, h5.Dataset)
+        c.memmap_block_size = c._array[0].nbytes*4
+        dm = DenseTwoIndex(6)
+        dm.randomize()
+        for subscripts in 'abcd,bd->ac', 'abcd,cb->ad':
+            assert np.allclose(c.contract_two_to_two(subscripts, dm)._array,
+                               dense.contract_two_to_two(subscripts, dm)._array)
+
+
 def test_four_index_copy_new_randomize_clear_assign():
     lf = CholeskyLinalgFactory(5)
     for args in (None, 3), (4, 3):
@@ -563,3 +584,31 @@ def test_four_index_transform_1_1_tensordot():
 
 def test_four_index_transform_1_1_einsum():
     check_four_index_transform(1, 1, 'einsum')
+
+
+def test_four_memmap_blocks():
+    nbasis = 10
+    cho, dense = get_four_cho_dense(nbasis, 8, 8)
+    with tmpdir('horton.matrix.test.test_cholesky.test_four_memmap_blocks') as dn:
+        array = np.memmap('%s/vectors.dat' % dn, float, 'w+', shape=cho._array.shape)
+        array[:] = cho._array
+        cho_mm = CholeskyFourIndex(nbasis, array=array)
+        # Use blocks of three Cholesky vectors.
+        cho_mm.memmap_block_size = 3*cho._array[0].nbytes*2
+        assert [s.stop - s.start for s in cho_mm._iter_vec_slices()] == [3, 3, 2]
+        dm = DenseTwoIndex(nbasis)
+        dm.randomize()
+        for subscripts in 'abcd,bd->ac', 'abcd,cb->ad':
+            assert np.allclose(dense.contract_two_to_two(subscripts, dm)._array,
+                               cho_mm.contract_two_to_two(subscripts, dm)._array)
+        exp0 = DenseExpansion(nbasis)
+        exp0.randomize()
+        exp1 = DenseExpansion(nbasis)
+        exp1.randomize()
+        for method in 'tensordot', 'einsum':
+            dense_mo = DenseFourIndex(nbasis)
+            dense_mo.assign_four_index_transform(dense, exp0, exp1, method=method)
+            cho_mo = CholeskyFourIndex(nbasis, 8)
+            cho_mo.assign_four_index_transform(cho_mm, exp0, exp1, method=method)
+            assert np.allclose(dense_mo._array, cho_mo.get_dense()._array)
+        del array, cho_mm
@@ -1912,6 +1912,19 @@ def test_four_index_get_set():
     assert op.get_element(3, 2, 1, 0) == 1.2
 
 
+def test_four_index_get_set_arrays():
+    lf = DenseLinalgFactory(4)
+    op1 = lf.create_four_index()
+    op2 = lf.create_four_index()
+    indexes = np.array([[0, 1, 2, 3], [1, 1, 0, 2], [3, 3, 3, 3]])
+    values = np.array([1.2, 2.3, 3.4])
+    for (i, j, k, l), value in zip(indexes, values):
+        op1.set_element(i, j, k, l, value)
+    op2.set_element(indexes[:,0], indexes[:,1], indexes[:,2], indexes[:,3], values)
+    assert op1 == op2
+    assert (op2.get_element(indexes[:,2], indexes[:,1], indexes[:,0], indexes[:,3]) == values).all()
+
+
 def test_four_index_is_symmetric():
     lf = DenseLinalgFactory(4)
     op = lf.create_four_index()
@@ -2524,6 +2537,33 @@ def test_four_index_assign_four_index_transform_consistency():
     assert np.allclose(b._array, c._array)
 
 
+def test_four_index_assign_four_index_transform_blocks_ranges():
+    lf = DenseLinalgFactory(6)
+    a = lf.create_four_index()
+    a.randomize()
+    e0 = lf.create_expansion()
+    e0.randomize()
+    e1 = lf.create_expansion()
+    e1.randomize()
+    ref = a.new()
+    ref.assign_four_index_transform(a, e0, e1, e0, e1)
+    for method in 'tensordot', 'einsum':
+        # Small blocks
+        b = a.new()
+        b.block_size = 16*6**3*2
+        b.assign_four_index_transform(a, e0, e1, e0, e1, method=method)
+        assert np.allclose(b._array, ref._array), method
+        # Rectangular (occupied, virtual, occupied, virtual) block
+        c = DenseFourIndex(2, 4, 2, 4)
+        c.assign_four_index_transform(a, e0, e1, e0, e1, method=method,
+                                      end0=2, begin1=2, end2=2, begin3=2)
+        assert np.allclose(c._array, ref._array[:2,2:,:2,2:]), method
+    with assert_raises(TypeError):
+        c.assign_four_index_transform(a, e0, e1, e0, e1)
+    with assert_raises(ValueError):
+        a.assign_four_index_transform(a, e0)
+
+
 #
 # Tests on water (not really unit tests. oh well...)
 #
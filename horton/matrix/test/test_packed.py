@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+# HORTON: Helpful Open-source Research TOol for N-fermion systems.
+# Copyright (C) 2011-2015 The HORTON Development Team
+#
+# This file is part of HORTON.
+#
+# HORTON is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# HORTON is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+#--
+#pylint: skip-file
+
+
+import numpy as np, h5py as h5
+from nose.tools import assert_raises
+
+from horton import *
+
+
+def get_four_packed_dense(nbasis=6):
+    '''Create a random packed four-index object and the dense equivalent
+
+       **Optional arguments:**
+
+       nbasis
+            The number of basis functions
+    '''
+    dense = DenseFourIndex(nbasis)
+    dense.randomize()
+    dense.symmetrize(8)
+    packed = PackedFourIndex(nbasis)
+    packed.assign(dense)
+    return packed, dense
+
+
+def test_linalg_factory_constructors():
+    lf = PackedLinalgFactory(5)
+    assert lf.default_nbasis == 5
+    op4 = lf.create_four_index()
+    assert isinstance(op4, PackedFourIndex)
+    lf.create_four_index.__check_init_args__(lf, op4)
+    assert op4.nbasis == 5
+    assert op4.npair == 15
+    assert op4.shape == (5, 5, 5, 5)
+    assert op4._array.shape == (120,)
+    op4 = lf.create_four_index(3)
+    lf.create_four_index.__check_init_args__(lf, op4, 3)
+    assert op4.nbasis == 3
+    # Other objects are still dense
+    assert isinstance(lf.create_two_index(), DenseTwoIndex)
+
+
+def test_four_index_hdf5():
+    lf = PackedLinalgFactory(5)
+    a = lf.create_four_index()
+    a.randomize()
+    with h5.File('horton.matrix.test.test_packed.test_four_index_hdf5', driver='core', backing_store=False) as f:
+        a.to_hdf5(f)
+        b = PackedFourIndex.from_hdf5(f)
+        assert a == b
+        c = load_h5(f)
+        assert a == c
+
+
+def test_four_index_copy_new_randomize_clear_assign():
+    lf = PackedLinalgFactory(5)
+    a = lf.create_four_index()
+    b = a.copy()
+    b.randomize()
+    assert a != b
+    c = b.copy()
+    c.new.__check_init_args__(c, b)
+    assert b == c
+    d = c.new()
+    assert a == d
+    b.assign(c)
+    assert b == c
+    b.clear()
+    assert a == b
+
+
+def test_four_index_assign_dense():
+    packed, dense = get_four_packed_dense()
+    assert abs(packed.get_dense()._array - dense._array).max() < 1e-10
+    with assert_raises(TypeError):
+        packed.assign(DenseFourIndex(packed.nbasis + 1))
+
+
+def test_four_index_get_set_element():
+    packed, dense = get_four_packed_dense()
+    assert packed.get_element(0, 1, 2, 3) == dense.get_element(0, 1, 2, 3)
+    packed.set_element(0, 1, 2, 3, 1.2)
+    dense.set_element(0, 1, 2, 3, 1.2)
+    assert abs(packed.get_dense()._array - dense._array).max() < 1e-10
+    for i, j, k, l in (1, 0, 3, 2), (2, 1, 0, 3), (3, 2, 1, 0):
+        assert packed.get_element(i, j, k, l) == 1.2
+    with assert_raises(ValueError):
+        packed.set_element(0, 1, 2, 3, 1.2, symmetry=4)
+
+
+def test_four_index_iadd_iscale_sum():
+    packed, dense = get_four_packed_dense()
+    assert abs(packed.sum() - dense.sum()) < 1e-10
+    other = packed.copy()
+    packed.iadd(other, 0.5)
+    packed.iscale(2.0)
+    assert abs(packed.get_dense()._array - 3*dense._array).max() < 1e-10
+
+
+def test_four_index_permute_change_signs():
+    packed, dense = get_four_packed_dense()
+    permutation = np.random.permutation(dense.nbasis)
+    packed.permute_basis(permutation)
+    dense.permute_basis(permutation)
+    assert abs(packed.get_dense()._array - dense._array).max() < 1e-10
+    signs = np.random.randint(0, 2, dense.nbasis)*2 - 1
+    packed.change_basis_signs(signs)
+    dense.change_basis_signs(signs)
+    assert abs(packed.get_dense()._array - dense._array).max() < 1e-10
+
+
+def check_four_contract_two_to_two(subscripts):
+    packed, dense = get_four_packed_dense()
+    dm = DenseTwoIndex(dense.nbasis)
+    dm.randomize()
+    factor = np.random.uniform(1, 2)
+    # check return value
+    assert np.allclose(dense.contract_two_to_two(subscripts, dm, factor=factor)._array,
+                       packed.contract_two_to_two(subscripts, dm, factor=factor)._array)
+    # check output argument
+    out_dense = DenseTwoIndex(dense.nbasis)
+    out_packed = DenseTwoIndex(packed.nbasis)
+    out_packed.randomize()
+    dense.contract_two_to_two(subscripts, dm, out_dense, factor)
+    packed.contract_two_to_two(subscripts, dm, out_packed, factor)
+    assert np.allclose(out_dense._array, out_packed._array)
+    # check output argument and clear=False
+    factor = np.random.uniform(1, 2)
+    dense.contract_two_to_two(subscripts, dm, out_dense, factor, clear=False)
+    packed.contract_two_to_two(subscripts, dm, out_packed, factor, clear=False)
+    assert np.allclose(out_dense._array, out_packed._array)
+
+
+def test_four_contract_two_to_two_direct():
+    check_four_contract_two_to_two('abcd,bd->ac')
+
+
+def test_four_contract_two_to_two_exchange():
+    check_four_contract_two_to_two('abcd,cb->ad')
+
+
+def test_four_contract_two_to_two_small_blocks():
+    packed, dense = get_four_packed_dense()
+    dm = DenseTwoIndex(dense.nbasis)
+    dm.randomize()
+    packed.block_size = 8*packed.npair*3
+    for subscripts in 'abcd,bd->ac', 'abcd,cb->ad':
+        assert np.allclose(dense.contract_two_to_two(subscripts, dm)._array,
+                           packed.contract_two_to_two(subscripts, dm)._array)
+
+
+def check_four_index_transform(method):
+    packed, dense = get_four_packed_dense()
+    exp0 = DenseExpansion(dense.nbasis)
+    exp0.randomize()
+    dense_mo = dense.new()
+    dense_mo.assign_four_index_transform(dense, exp0, method=method)
+    packed_mo = packed.new()
+    packed_mo.assign_four_index_transform(packed, exp0, method=method)
+    assert np.allclose(dense_mo._array, packed_mo.get_dense()._array)
+    # Transformations that break the eight-fold symmetry
+    exp1 = DenseExpansion(dense.nbasis)
+    exp1.randomize()
+    with assert_raises(ValueError):
+        packed_mo.assign_four_index_transform(packed, exp0, exp1, method=method)
+
+
+def test_four_index_transform_tensordot():
+    check_four_index_transform('tensordot')
+
+
+def test_four_index_transform_einsum():
+    check_four_index_transform('einsum')
@@ -33,6 +33,8 @@ __all__ = ['RBeckeHartree', 'UBeckeHartree', 'RDiracExchange', 'UDiracExchange']
 
 
 class BeckeHartree(GridObservable):
+    local = False
+
     def __init__(self, lmax, label='hartree_becke'):
         self.lmax = lmax
         GridObservable.__init__(self, label)
@@ -21,6 +21,10 @@
 '''Container for observables involving numerical integration'''
 
 
+import numpy as np
+
+from horton.cache import Cache
+from horton.grid.base import IntGrid
 from horton.meanfield.observable import Observable
 from horton.utils import doc_inherit
 
@@ -32,7 +36,7 @@ __all__ = [
 
 class GridGroup(Observable):
     '''A group of terms for the effective Hamiltonian that use numerical integration'''
-    def __init__(self, obasis, grid, grid_terms, label='grid_group'):
+    def __init__(self, obasis, grid, grid_terms, label='grid_group', block_size=None):
         '''
            **Arguments:**
 
@@ -52,10 +56,25 @@ class GridGroup(Observable):
 
            label
                 A label for the group.
+
+           block_size
+                When given, the grid is processed in blocks of at most this
+                number of points. All intermediate results on the grid are
+                then only kept for one block at a time, such that the memory
+                usage no longer grows with the size of the grid. This only
+                works when all grid terms are local, see
+                :py:attr:`GridObservable.local`.
         '''
+        if block_size is not None:
+            if block_size <= 0:
+                raise ValueError('The block_size must be strictly positive.')
+            for grid_term in grid_terms:
+                if not grid_term.local:
+                    raise TypeError('The grid term %s can not be evaluated in blocks of grid points.' % grid_term.label)
         self.grid_terms = grid_terms
         self.obasis = obasis
         self.grid = grid
+        self.block_size = block_size
         Observable.__init__(self, label)
 
     def _get_gga(self):
@@ -64,59 +83,187 @@ class GridGroup(Observable):
 
     gga = property(_get_gga)
 
-    def _get_potentials(self, cache):
+    def _get_potentials(self, cache, grid):
         '''Get list of output arrays passed to ```GridObservable.add_pot```.
 
            **Arguments:**
 
            cache
                 An instance of Cache, used to store intermediate results.
+
+           grid
+                The (block of the) integration grid.
         '''
         raise NotImplementedError
 
-    def _update_rho(self, cache, select):
-        '''Recompute a density when not present in the cache.
+    def _update_densities(self, cache, grid, selects):
+        '''Recompute densities (and gradients) when not present in the cache.
 
            **Arguments:**
 
            cache
                 An instance of Cache, used to store intermediate results.
 
-           select
-                'alpha' or 'beta'.
+           grid
+                The (block of the) integration grid.
+
+           selects
+                A list with 'alpha' and/or 'beta'.
+
+           The densities (and for GGA functionals their gradients) of all
+           spin components are computed with a single evaluation of the basis
+           functions on the grid.
+
+           **Returns:** a list of densities and, when GGA functionals are
+           used, a list of density gradients.
         '''
-        rho, new = cache.load('rho_%s' % select, alloc=self.grid.size)
-        if new:
-            dm = cache['dm_%s' % select]
-            self.obasis.compute_grid_density_dm(dm, self.grid.points, rho)
-        return rho
+        rhos = []
+        grad_rhos = []
+        todo = []
+        for select in selects:
+            rho, new = cache.load('rho_%s' % select, alloc=grid.size)
+            rhos.append(rho)
+            if self.gga:
+                grad_rho, gnew = cache.load('grad_rho_%s' % select, alloc=(grid.size, 3))
+                grad_rhos.append(grad_rho)
+                new |= gnew
+            if new:
+                todo.append(select)
+        if len(todo) > 0:
+            dms = [cache['dm_%s' % select] for select in todo]
+            if self.gga:
+                outputs = self.obasis.compute_grid_gga_dm(dms, grid.points)
+                for select, output in zip(todo, outputs):
+                    cache['rho_%s' % select][:] = output[:,0]
+                    cache['grad_rho_%s' % select][:] = output[:,1:4]
+            else:
+                outputs = [cache['rho_%s' % select] for select in todo]
+                self.obasis.compute_grid_density_dms(dms, grid.points, outputs)
+        if self.gga:
+            return rhos, grad_rhos
+        else:
+            return rhos
 
-    def _update_grad(self, cache, select):
-        '''Recompute a density gradient when not present in the cache.
+    def _update_grid_data(self, cache, grid):
+        '''Compute all grid data used as input for GridObservable instances
 
            **Arguments:**
 
            cache
                 An instance of Cache, used to store intermediate results.
 
-           select
-                'alpha' or 'beta'.
+           grid
+                The (block of the) integration grid.
         '''
-        grad_rho, new = cache.load('grad_rho_%s' % select, alloc=(self.grid.size, 3))
-        if new:
-            dm = cache['dm_%s' % select]
-            self.obasis.compute_grid_gradient_dm(dm, self.grid.points, grad_rho)
-        return grad_rho
+        raise NotImplementedError
 
-    def _update_grid_data(self, cache):
-        '''Compute all grid data used as input for GridObservable instances
+    def _iter_blocks(self, cache):
+        '''Iterate over blocks of grid points
 
            **Arguments:**
 
            cache
                 An instance of Cache, used to store intermediate results.
+
+           **Yields:** a grid object and a new Cache instance for each block.
+           The latter only contains the density matrices.
         '''
-        raise NotImplementedError
+        for begin in xrange(0, self.grid.size, self.block_size):
+            end = min(begin + self.block_size, self.grid.size)
+            block_grid = IntGrid(self.grid.points[begin:end], self.grid.weights[begin:end])
+            block_cache = Cache()
+            for select in 'alpha', 'beta':
+                key = 'dm_%s' % select
+                if key in cache:
+                    block_cache[key] = cache[key]
+            yield block_grid, block_cache
+
+    def _compute_blocks(self, cache, focks):
+        '''Compute energies and Fock contributions block by block
+
+           **Arguments:**
+
+           cache
+                An instance of Cache, used to store intermediate results.
+
+           focks
+                A list of Fock matrices to which the contributions are added.
+                The list may be empty.
+
+           The energies of all grid terms are stored in the cache, unless
+           they are already present.
+
+           **Returns:** the sum of the energies.
+        '''
+        labels = [grid_term.label for grid_term in self.grid_terms]
+        do_energy = not all(('energy_%s' % label) in cache for label in labels)
+        energies = dict((label, 0.0) for label in labels)
+        if do_energy or len(focks) > 0:
+            for grid, block_cache in self._iter_blocks(cache):
+                # compute stuff on the grid that the grid_observables may use
+                self._update_grid_data(block_cache, grid)
+                if do_energy:
+                    for grid_term in self.grid_terms:
+                        energies[grid_term.label] += grid_term.compute_energy(block_cache, grid)
+                if len(focks) > 0:
+                    dpots, gpots, new = self._get_potentials(block_cache, grid)
+                    self._add_pots(block_cache, grid, dpots, gpots)
+                    self._add_fock_grid(grid, dpots, gpots, focks)
+        result = 0.0
+        for label in labels:
+            if do_energy:
+                cache['energy_%s' % label] = energies[label]
+            result += cache['energy_%s' % label]
+        return result
+
+    def _add_pots(self, cache, grid, dpots, gpots):
+        '''Collect the total potentials of all grid terms
+
+           **Arguments:**
+
+           cache
+                An instance of Cache, used to store intermediate results.
+
+           grid
+                The (block of the) integration grid.
+
+           dpots, gpots
+                The lists of output arrays from ``_get_potentials``.
+        '''
+        for grid_term in self.grid_terms:
+            if grid_term.gga:
+                grid_term.add_pot(cache, grid, *(dpots + gpots))
+            else:
+                grid_term.add_pot(cache, grid, *dpots)
+
+    def _add_fock_grid(self, grid, dpots, gpots, focks):
+        '''Add the contributions of the potentials to the Fock matrices
+
+           **Arguments:**
+
+           grid
+                The (block of the) integration grid.
+
+           dpots, gpots
+                The lists of potentials from ``_get_potentials``.
+
+           focks
+                A list of Fock matrices to which the contributions are added.
+        '''
+        # The potentials of all channels are processed with a single
+        # evaluation of the basis functions.
+        if self.gga:
+            pots = []
+            for ichannel in xrange(len(focks)):
+                pot = np.zeros((grid.size, 4))
+                pot[:,0] = dpots[ichannel]
+                pot[:,1:4] = gpots[ichannel]
+                pots.append(pot)
+            self.obasis.compute_grid_gga_fock(
+                grid.points, grid.weights, pots, focks)
+        else:
+            self.obasis.compute_grid_density_focks(
+                grid.points, grid.weights, dpots[:len(focks)], focks)
 
     def compute_energy(self, cache):
         '''Compute the sum of the expectation values.
@@ -129,8 +276,11 @@ class GridGroup(Observable):
            This method basically dispatches the work to all ``GridObservable``
            instances in ``self.grid_terms``.
         '''
+        if self.block_size is not None:
+            return self._compute_blocks(cache, [])
+
         # compute stuff on the grid that the grid_observables may use
-        self._update_grid_data(cache)
+        self._update_grid_data(cache, self.grid)
 
         # compute energy terms and sum up
         result = 0.0
@@ -151,30 +301,22 @@ class GridGroup(Observable):
            This method basically dispatches the work to all ``GridObservable``
            instances in ``self.grid_terms``.
         '''
+        if self.block_size is not None:
+            self._compute_blocks(cache, focks)
+            return
+
         # Get the potentials. If they are not yet evaluated, some computations
         # are needed.
-        dpots, gpots, new = self._get_potentials(cache)
+        dpots, gpots, new = self._get_potentials(cache, self.grid)
 
         if new:
             # compute stuff on the grid that the grid_observables may use
-            self._update_grid_data(cache)
+            self._update_grid_data(cache, self.grid)
 
             # Collect the total potentials.
-            for grid_term in self.grid_terms:
-                if grid_term.gga:
-                    grid_term.add_pot(cache, self.grid, *(dpots + gpots))
-                else:
-                    grid_term.add_pot(cache, self.grid, *dpots)
-
-        for ichannel in xrange(len(focks)):
-            # d = density
-            self.obasis.compute_grid_density_fock(
-                self.grid.points, self.grid.weights,
-                dpots[ichannel], focks[ichannel])
-            if self.gga:
-                self.obasis.compute_grid_gradient_fock(
-                    self.grid.points, self.grid.weights,
-                    gpots[ichannel], focks[ichannel])
+            self._add_pots(cache, self.grid, dpots, gpots)
+
+        self._add_fock_grid(self.grid, dpots, gpots, focks)
 
 
 class RGridGroup(GridGroup):
@@ -208,11 +350,11 @@ class RGridGroup(GridGroup):
     '''
 
     @doc_inherit(GridGroup)
-    def _get_potentials(self, cache):
-        dpot, new = cache.load('dpot_total_alpha', alloc=self.grid.size)
+    def _get_potentials(self, cache, grid):
+        dpot, new = cache.load('dpot_total_alpha', alloc=grid.size)
         dpots = [dpot]
         if self.gga:
-            gpot, gnew = cache.load('gpot_total_alpha', alloc=(self.grid.size, 3))
+            gpot, gnew = cache.load('gpot_total_alpha', alloc=(grid.size, 3))
             new |= gnew
             gpots = [gpot]
         else:
@@ -224,22 +366,24 @@ class RGridGroup(GridGroup):
         return dpots, gpots, new
 
     @doc_inherit(GridGroup)
-    def _update_grid_data(self, cache):
-        rho_alpha = self._update_rho(cache, 'alpha')
-        rho_full, new = cache.load('rho_full', alloc=self.grid.size)
+    def _update_grid_data(self, cache, grid):
+        if self.gga:
+            (rho_alpha,), (grad_rho_alpha,) = self._update_densities(cache, grid, ['alpha'])
+        else:
+            (rho_alpha,) = self._update_densities(cache, grid, ['alpha'])
+        rho_full, new = cache.load('rho_full', alloc=grid.size)
         if new:
             rho_full[:] = rho_alpha
             rho_full *= 2
         if self.gga:
-            grad_rho_alpha = self._update_grad(cache, 'alpha')
-            sigma_alpha, new = cache.load('sigma_alpha', alloc=self.grid.size)
+            sigma_alpha, new = cache.load('sigma_alpha', alloc=grid.size)
             if new:
                 sigma_alpha[:] = (grad_rho_alpha**2).sum(axis=1)
-            grad_rho_full, new = cache.load('grad_rho_full', alloc=(self.grid.size, 3))
+            grad_rho_full, new = cache.load('grad_rho_full', alloc=(grid.size, 3))
             if new:
                 grad_rho_full[:] = grad_rho_alpha
                 grad_rho_full *= 2
-            sigma_full, new = cache.load('sigma_full', alloc=self.grid.size)
+            sigma_full, new = cache.load('sigma_full', alloc=grid.size)
             if new:
                 sigma_full[:] = (grad_rho_full**2).sum(axis=1)
 
@@ -289,14 +433,14 @@ class UGridGroup(GridGroup):
             3). This is mostly useful for LibXC
     '''
     @doc_inherit(GridGroup)
-    def _get_potentials(self, cache):
-        dpot_alpha, newa = cache.load('dpot_total_alpha', alloc=self.grid.size)
-        dpot_beta, newb = cache.load('dpot_total_beta', alloc=self.grid.size)
+    def _get_potentials(self, cache, grid):
+        dpot_alpha, newa = cache.load('dpot_total_alpha', alloc=grid.size)
+        dpot_beta, newb = cache.load('dpot_total_beta', alloc=grid.size)
         dpots = [dpot_alpha, dpot_beta]
         new = newa or newb
         if self.gga:
-            gpot_alpha, gnewa = cache.load('gpot_total_alpha', alloc=(self.grid.size, 3))
-            gpot_beta, gnewb = cache.load('gpot_total_beta', alloc=(self.grid.size, 3))
+            gpot_alpha, gnewa = cache.load('gpot_total_alpha', alloc=(grid.size, 3))
+            gpot_beta, gnewb = cache.load('gpot_total_beta', alloc=(grid.size, 3))
             new |= gnewa or gnewb
             gpots = [gpot_alpha, gpot_beta]
         else:
@@ -310,31 +454,32 @@ class UGridGroup(GridGroup):
         return dpots, gpots, new
 
     @doc_inherit(GridGroup)
-    def _update_grid_data(self, cache):
-        rho_alpha = self._update_rho(cache, 'alpha')
-        rho_beta = self._update_rho(cache, 'beta')
-        rho_full, new = cache.load('rho_full', alloc=self.grid.size)
+    def _update_grid_data(self, cache, grid):
+        if self.gga:
+            (rho_alpha, rho_beta), (grad_rho_alpha, grad_rho_beta) = \
+                self._update_densities(cache, grid, ['alpha', 'beta'])
+        else:
+            rho_alpha, rho_beta = self._update_densities(cache, grid, ['alpha', 'beta'])
+        rho_full, new = cache.load('rho_full', alloc=grid.size)
         if new:
             rho_full[:] = rho_alpha
             rho_full += rho_beta
-        rho_both, new = cache.load('rho_both', alloc=(self.grid.size, 2))
+        rho_both, new = cache.load('rho_both', alloc=(grid.size, 2))
         if new:
             rho_both[:,0] = rho_alpha
             rho_both[:,1] = rho_beta
 
         if self.gga:
-            grad_rho_alpha = self._update_grad(cache, 'alpha')
-            grad_rho_beta = self._update_grad(cache, 'beta')
-            sigma_alpha, new = cache.load('sigma_alpha', alloc=self.grid.size)
+            sigma_alpha, new = cache.load('sigma_alpha', alloc=grid.size)
             if new:
                 sigma_alpha[:] = (grad_rho_alpha**2).sum(axis=1)
-            sigma_beta, new = cache.load('sigma_beta', alloc=self.grid.size)
+            sigma_beta, new = cache.load('sigma_beta', alloc=grid.size)
             if new:
                 sigma_beta[:] = (grad_rho_beta**2).sum(axis=1)
-            sigma_cross, new = cache.load('sigma_cross', alloc=self.grid.size)
+            sigma_cross, new = cache.load('sigma_cross', alloc=grid.size)
             if new:
                 sigma_cross[:] = (grad_rho_alpha*grad_rho_beta).sum(axis=1)
-            sigma_all, new = cache.load('sigma_all', alloc=(self.grid.size, 3))
+            sigma_all, new = cache.load('sigma_all', alloc=(grid.size, 3))
             if new:
                 sigma_all[:,0] = sigma_alpha
                 sigma_all[:,1] = sigma_cross
@@ -342,8 +487,16 @@ class UGridGroup(GridGroup):
 
 
 class GridObservable(object):
-    '''Base class for contributions to the GridGroup object'''
+    '''Base class for contributions to the GridGroup object
+
+       The class attribute ``gga`` indicates that the density gradient is
+       used. The class attribute ``local`` indicates that the energy density
+       and the potential in a grid point only depend on the density (and its
+       derivatives) in the same point. Only then the grid can be processed in
+       blocks, see the ``block_size`` argument of :py:class:`GridGroup`.
+    '''
     gga = False
+    local = True
 
     def __init__(self, label):
         '''
@@ -50,6 +50,7 @@ class EffHam(object):
     '''
     ndm = None
     deriv_scale = 1.0
+    _dm_keys = None
 
     def __init__(self, terms, external=None):
         '''
@@ -90,6 +91,37 @@ class EffHam(object):
         '''
         raise NotImplementedError
 
+    def reset_delta(self, *delta_dms):
+        '''Add changes to the input density matrices and clear the cache.
+
+           The operators of the two-electron terms are linear in the density
+           matrices. For these, only the contraction with the changes in the
+           density matrices is computed and added to the operators of the
+           previous input. All other terms are recomputed from scratch. This
+           method can only be used after a call to ``reset``.
+
+           **Arguments:**
+
+           delta_dm1, delta_dm2, ...
+                The changes in the input density matrices, relative to the
+                previous call to ``reset`` or ``reset_delta``.
+        '''
+        if len(delta_dms) != self.ndm:
+            raise TypeError('Expecting %i density matrices, got %i.' % (self.ndm, len(delta_dms)))
+        # Take copies of the linear operators and compute the new density
+        # matrices before the cache is cleared.
+        old_ops = [(key, op.copy()) for key, op in self.cache.iteritems(tags='i')]
+        dms = []
+        for key, delta_dm in zip(self._dm_keys, delta_dms):
+            dm = self.cache[key].copy()
+            dm.iadd(delta_dm)
+            dms.append(dm)
+        self.reset(*dms)
+        for key, op in old_ops:
+            self.cache['old_%s' % key] = op
+        for key, delta_dm in zip(self._dm_keys, delta_dms):
+            self.cache['delta_%s' % key] = delta_dm.copy()
+
     def compute_energy(self):
         '''Compute the expectation value.
 
@@ -147,6 +179,7 @@ class EffHam(object):
 class REffHam(EffHam):
     ndm = 1
     deriv_scale = 2.0
+    _dm_keys = ['dm_alpha']
 
     @doc_inherit(EffHam)
     def reset(self, in_dm_alpha):
@@ -162,6 +195,7 @@ class REffHam(EffHam):
 
 class UEffHam(EffHam):
     ndm = 2
+    _dm_keys = ['dm_alpha', 'dm_beta']
 
     @doc_inherit(EffHam)
     def reset(self, in_dm_alpha, in_dm_beta):
@@ -172,6 +206,13 @@ class UEffHam(EffHam):
         dm_beta = self.cache.load('dm_beta', alloc=in_dm_beta.new)[0]
         dm_beta.assign(in_dm_beta)
 
+    @doc_inherit(EffHam)
+    def reset_delta(self, delta_dm_alpha, delta_dm_beta):
+        EffHam.reset_delta(self, delta_dm_alpha, delta_dm_beta)
+        delta_dm_full = delta_dm_alpha.copy()
+        delta_dm_full.iadd(delta_dm_beta)
+        self.cache['delta_dm_full'] = delta_dm_full
+
     @doc_inherit(EffHam)
     def compute_fock(self, fock_alpha, fock_beta):
         EffHam.compute_fock(self, fock_alpha, fock_beta)
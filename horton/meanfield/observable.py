@@ -23,7 +23,7 @@ from horton.utils import doc_inherit
 
 
 __all__ = [
-    'compute_dm_full',
+    'compute_dm_full', 'update_linear_op',
     'Observable',
     'RTwoIndexTerm', 'UTwoIndexTerm',
     'RDirectTerm', 'UDirectTerm',
@@ -42,6 +42,51 @@ def compute_dm_full(cache):
     return dm_full
 
 
+def update_linear_op(cache, op, subscripts, dm_key, op_key, scale=1.0):
+    '''Recompute an operator that is linear in a density matrix if it is invalid
+
+       **Arguments:**
+
+       cache
+            The cache of the effective Hamiltonian.
+
+       op
+            The four-index object that is contracted with the density matrix.
+
+       subscripts
+            The subscripts of the contraction, e.g. ``abcd,bd->ac``.
+
+       dm_key
+            The key of the density matrix in the cache.
+
+       op_key
+            The key under which the result is stored in the cache.
+
+       **Optional arguments:**
+
+       scale
+            A factor for the result of the contraction.
+
+       After :py:meth:`horton.meanfield.hamiltonian.EffHam.reset_delta`, the
+       cache contains the previous value of the operator (``old_`` + op_key) and
+       the change in the density matrix (``delta_`` + dm_key). Then only the
+       change in the density matrix is contracted and added to the previous
+       operator.
+
+       **Returns:** the operator.
+    '''
+    dm = cache[dm_key]
+    result, new = cache.load(op_key, alloc=dm.new, tags='i')
+    if new:
+        old = cache.load('old_%s' % op_key, default=None)
+        if old is None:
+            op.contract_two_to_two(subscripts, dm, result, scale)
+        else:
+            op.contract_two_to_two(subscripts, cache['delta_%s' % dm_key], result, scale)
+            result.iadd(old)
+    return result
+
+
 class Observable(object):
     def __init__(self, label):
         self.label = label
@@ -125,11 +170,9 @@ class RDirectTerm(Observable):
 
     def _update_direct(self, cache):
         '''Recompute the direct operator if it has become invalid'''
-        dm_alpha = cache['dm_alpha']
-        direct, new = cache.load('op_%s_alpha' % self.label, alloc=dm_alpha.new)
-        if new:
-            self.op_alpha.contract_two_to_two('abcd,bd->ac', dm_alpha, direct)
-            direct.iscale(2) # contribution from beta electrons is identical
+        # The contribution from beta electrons is identical, hence the factor 2.
+        update_linear_op(cache, self.op_alpha, 'abcd,bd->ac', 'dm_alpha',
+                         'op_%s_alpha' % self.label, 2.0)
 
     @doc_inherit(Observable)
     def compute_energy(self, cache):
@@ -154,10 +197,9 @@ class UDirectTerm(Observable):
         '''Recompute the direct operator(s) if it/they has/have become invalid'''
         if self.op_alpha is self.op_beta:
             # This branch is nearly always going to be followed in practice.
-            dm_full = compute_dm_full(cache)
-            direct, new = cache.load('op_%s' % self.label, alloc=dm_full.new)
-            if new:
-                self.op_alpha.contract_two_to_two('abcd,bd->ac', dm_full, direct)
+            compute_dm_full(cache)
+            update_linear_op(cache, self.op_alpha, 'abcd,bd->ac', 'dm_full',
+                             'op_%s' % self.label)
         else:
             # This is probably never going to happen. In case it does, please
             # add the proper code here.
@@ -198,11 +240,8 @@ class RExchangeTerm(Observable):
 
     def _update_exchange(self, cache):
         '''Recompute the Exchange operator if invalid'''
-        dm_alpha = cache['dm_alpha']
-        exchange_alpha, new = cache.load('op_%s_alpha' % self.label,
-                                         alloc=dm_alpha.new)
-        if new:
-            self.op_alpha.contract_two_to_two('abcd,cb->ad', dm_alpha, exchange_alpha)
+        update_linear_op(cache, self.op_alpha, 'abcd,cb->ad', 'dm_alpha',
+                         'op_%s_alpha' % self.label)
 
     @doc_inherit(Observable)
     def compute_energy(self, cache):
@@ -227,18 +266,10 @@ class UExchangeTerm(Observable):
 
     def _update_exchange(self, cache):
         '''Recompute the Exchange operator(s) if invalid'''
-        # alpha
-        dm_alpha = cache['dm_alpha']
-        exchange_alpha, new = cache.load('op_%s_alpha' % self.label,
-                                         alloc=dm_alpha.new)
-        if new:
-            self.op_alpha.contract_two_to_two('abcd,cb->ad', dm_alpha, exchange_alpha)
-        # beta
-        dm_beta = cache['dm_beta']
-        exchange_beta, new = cache.load('op_%s_beta' % self.label,
-                                         alloc=dm_beta.new)
-        if new:
-            self.op_beta.contract_two_to_two('abcd,cb->ad', dm_beta, exchange_beta)
+        update_linear_op(cache, self.op_alpha, 'abcd,cb->ad', 'dm_alpha',
+                         'op_%s_alpha' % self.label)
+        update_linear_op(cache, self.op_beta, 'abcd,cb->ad', 'dm_beta',
+                         'op_%s_beta' % self.label)
 
     @doc_inherit(Observable)
     def compute_energy(self, cache):
@@ -24,6 +24,7 @@
 from horton.log import log, timer
 from horton.exceptions import NoSCFConvergence
 from horton.meanfield.convergence import convergence_error_eigen
+from horton.meanfield.utils import reset_incremental
 
 
 __all__ = ['PlainSCFSolver']
@@ -33,7 +34,7 @@ class PlainSCFSolver(object):
     '''A bare-bones SCF solver without mixing.'''
     kind = 'exp' # input/output variable is the wfn expansion
 
-    def __init__(self, threshold=1e-8, maxiter=128, skip_energy=False):
+    def __init__(self, threshold=1e-8, maxiter=128, skip_energy=False, rebuild_interval=0):
         '''
            **Optional arguments:**
 
@@ -48,10 +49,19 @@ class PlainSCFSolver(object):
                 When set to True, the final energy is not computed. Note that some
                 DIIS variants need to compute the energy anyway. for these methods
                 this option is irrelevant.
+
+           rebuild_interval
+                When positive, the two-electron terms of the Hamiltonian are
+                updated incrementally with the change in density matrices, see
+                :py:meth:`horton.meanfield.hamiltonian.EffHam.reset_delta`.
+                After this number of incremental updates, they are recomputed
+                from scratch to avoid the accumulation of rounding errors. When
+                zero, all terms are recomputed in every iteration.
         '''
         self.maxiter = maxiter,
         self.threshold = threshold
         self.skip_energy = skip_energy
+        self.rebuild_interval = rebuild_interval
 
     @timer.with_section('SCF')
     def __call__(self, ham, lf, overlap, occ_model, *exps):
@@ -91,6 +101,7 @@ class PlainSCFSolver(object):
 
         focks = [lf.create_two_index() for i in xrange(ham.ndm)]
         dms = [lf.create_two_index() for i in xrange(ham.ndm)]
+        previous = [None, 0]
         converged = False
         counter = 0
         while self.maxiter is None or counter < self.maxiter:
@@ -98,7 +109,7 @@ class PlainSCFSolver(object):
             for i in xrange(ham.ndm):
                 exps[i].to_dm(dms[i])
             # feed the latest density matrices in the hamiltonian
-            ham.reset(*dms)
+            reset_incremental(ham, dms, previous, self.rebuild_interval)
             # Construct the Fock operator
             ham.compute_fock(*focks)
             # Check for convergence
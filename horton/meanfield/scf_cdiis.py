@@ -35,7 +35,7 @@ __all__ = ['CDIISSCFSolver']
 class CDIISSCFSolver(DIISSCFSolver):
     '''The Commmutatator (or Pulay) DIIS SCF solver [pulay1980]_'''
 
-    def __init__(self, threshold=1e-6, maxiter=128, nvector=6, skip_energy=False, prune_old_states=False):
+    def __init__(self, threshold=1e-6, maxiter=128, nvector=6, skip_energy=False, prune_old_states=False, rebuild_interval=0):
         '''
            **Optional arguments:**
 
@@ -56,9 +56,17 @@ class CDIISSCFSolver(DIISSCFSolver):
                 coefficient is zero. Pruning starts at the oldest state and stops
                 as soon as a state is encountered with a non-zero coefficient. Even
                 if some newer states have a zero coefficient.
+
+           rebuild_interval
+                When positive, the two-electron terms of the Hamiltonian are
+                updated incrementally with the change in density matrices, see
+                :py:meth:`horton.meanfield.hamiltonian.EffHam.reset_delta`.
+                After this number of incremental updates, they are recomputed
+                from scratch to avoid the accumulation of rounding errors. When
+                zero, all terms are recomputed in every iteration.
         '''
         log.cite('pulay1980', 'the commutator DIIS SCF algorithm')
-        DIISSCFSolver.__init__(self, CDIISHistory, threshold, maxiter, nvector, skip_energy, prune_old_states)
+        DIISSCFSolver.__init__(self, CDIISHistory, threshold, maxiter, nvector, skip_energy, prune_old_states, rebuild_interval)
 
 
 class CDIISHistory(DIISHistory):
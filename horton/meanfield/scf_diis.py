@@ -25,7 +25,7 @@ import numpy as np
 
 from horton.log import log, timer
 from horton.exceptions import NoSCFConvergence
-from horton.meanfield.utils import compute_commutator, check_dm
+from horton.meanfield.utils import compute_commutator, check_dm, reset_incremental
 from horton.meanfield.convergence import convergence_error_commutator
 
 
@@ -36,7 +36,7 @@ class DIISSCFSolver(object):
     '''Base class for all DIIS SCF solvers'''
     kind = 'dm' # input/output variable is the density matrix
 
-    def __init__(self, DIISHistoryClass, threshold=1e-6, maxiter=128, nvector=6, skip_energy=False, prune_old_states=False):
+    def __init__(self, DIISHistoryClass, threshold=1e-6, maxiter=128, nvector=6, skip_energy=False, prune_old_states=False, rebuild_interval=0):
         '''
            **Arguments:**
 
@@ -62,6 +62,14 @@ class DIISSCFSolver(object):
                 coefficient is zero. Pruning starts at the oldest state and stops
                 as soon as a state is encountered with a non-zero coefficient. Even
                 if some newer states have a zero coefficient.
+
+           rebuild_interval
+                When positive, the two-electron terms of the Hamiltonian are
+                updated incrementally with the change in density matrices, see
+                :py:meth:`horton.meanfield.hamiltonian.EffHam.reset_delta`.
+                After this number of incremental updates, they are recomputed
+                from scratch to avoid the accumulation of rounding errors. When
+                zero, all terms are recomputed in every iteration.
         '''
         self.DIISHistoryClass = DIISHistoryClass
         self.threshold = threshold
@@ -69,6 +77,7 @@ class DIISSCFSolver(object):
         self.nvector = nvector
         self.skip_energy = skip_energy
         self.prune_old_states = prune_old_states
+        self.rebuild_interval = rebuild_interval
 
     @timer.with_section('SCF')
     def __call__(self, ham, lf, overlap, occ_model, *dms):
@@ -112,13 +121,14 @@ class DIISSCFSolver(object):
             log('Iter         Error        CN         Last nv Method          Energy       Change')
             log.hline()
 
+        previous = [None, 0]
         converged = False
         counter = 0
         while self.maxiter is None or counter < self.maxiter:
             # Construct the Fock operator from scratch if the history is empty:
             if self._history.nused == 0:
                 # feed the latest density matrices in the hamiltonian
-                ham.reset(*dms)
+                reset_incremental(ham, dms, previous, self.rebuild_interval)
                 # Construct the Fock operators
                 ham.compute_fock(*self._focks)
                 # Compute the energy if needed by the history
@@ -154,7 +164,7 @@ class DIISSCFSolver(object):
             occ_model.assign(*self._exps)
             for i in xrange(ham.ndm):
                 self._exps[i].to_dm(dms[i])
-            ham.reset(*dms)
+            reset_incremental(ham, dms, previous, self.rebuild_interval)
             energy = ham.compute_energy() if self._history.need_energy else None
             ham.compute_fock(*self._focks)
 
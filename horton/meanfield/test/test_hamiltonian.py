@@ -148,3 +148,73 @@ def test_ghost_hf():
     # The convergence should be reasonable, not perfect because of limited
     # precision in Gaussian fchk file:
     assert convergence_error_eigen(ham, mol.lf, olp, mol.exp_alpha) < 1e-5
+
+
+def check_reset_delta(ham, lf, dms, delta_dms):
+    # Reference: reset with the final density matrices.
+    dms_final = []
+    for dm, delta_dm in zip(dms, delta_dms):
+        dm_final = dm.copy()
+        dm_final.iadd(delta_dm)
+        dms_final.append(dm_final)
+    ham.reset(*dms_final)
+    energy_ref = ham.compute_energy()
+    focks_ref = [lf.create_two_index() for i in xrange(ham.ndm)]
+    ham.compute_fock(*focks_ref)
+    # Incremental
+    ham.reset(*dms)
+    focks = [lf.create_two_index() for i in xrange(ham.ndm)]
+    ham.compute_fock(*focks)
+    ham.reset_delta(*delta_dms)
+    for key, dm_final in zip(['dm_alpha', 'dm_beta'], dms_final):
+        assert abs(ham.cache[key]._array - dm_final._array).max() < 1e-12
+    assert abs(ham.compute_energy() - energy_ref) < 1e-10
+    ham.compute_fock(*focks)
+    for fock, fock_ref in zip(focks, focks_ref):
+        assert abs(fock._array - fock_ref._array).max() < 1e-10
+
+
+def test_reset_delta():
+    fn_fchk = context.get_fn('test/water_hfs_321g.fchk')
+    mol = IOData.from_file(fn_fchk)
+    grid = BeckeMolGrid(mol.coordinates, mol.numbers, mol.pseudo_numbers, random_rotate=False)
+    kin = mol.obasis.compute_kinetic(mol.lf)
+    na = mol.obasis.compute_nuclear_attraction(mol.coordinates, mol.pseudo_numbers, mol.lf)
+    er = mol.obasis.compute_electron_repulsion(mol.lf)
+    dm_alpha = mol.exp_alpha.to_dm()
+    delta_dm_alpha = mol.lf.create_two_index()
+    delta_dm_alpha.randomize()
+    delta_dm_alpha.symmetrize()
+    delta_dm_alpha.iscale(1e-2)
+    delta_dm_beta = delta_dm_alpha.copy()
+    delta_dm_beta.iscale(-0.5)
+
+    # Restricted, with a term that is not linear in the density matrix.
+    terms = [
+        RTwoIndexTerm(kin, 'kin'),
+        RDirectTerm(er, 'hartree'),
+        RExchangeTerm(er, 'x_hf', 0.2),
+        RGridGroup(mol.obasis, grid, [
+            RDiracExchange(),
+        ]),
+        RTwoIndexTerm(na, 'ne'),
+    ]
+    ham = REffHam(terms)
+    check_reset_delta(ham, mol.lf, [dm_alpha], [delta_dm_alpha])
+
+    # Unrestricted
+    terms = [
+        UTwoIndexTerm(kin, 'kin'),
+        UDirectTerm(er, 'hartree'),
+        UExchangeTerm(er, 'x_hf', 0.2),
+        UGridGroup(mol.obasis, grid, [
+            UDiracExchange(),
+        ]),
+        UTwoIndexTerm(na, 'ne'),
+    ]
+    ham = UEffHam(terms)
+    check_reset_delta(ham, mol.lf, [dm_alpha, dm_alpha], [delta_dm_alpha, delta_dm_beta])
+
+    # The number of density matrices must match.
+    with assert_raises(TypeError):
+        ham.reset_delta(delta_dm_alpha)
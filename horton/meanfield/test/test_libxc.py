@@ -24,7 +24,7 @@
 import numpy as np
 from nose.tools import assert_raises
 from horton import *
-from horton.meanfield.test.common import check_interpolation
+from horton.meanfield.test.common import check_interpolation, helper_compute
 
 
 def test_cubic_interpolation_c_pbe_cs():
@@ -227,6 +227,43 @@ def test_cubic_interpolation_o3lyp_os():
     check_interpolation(ham, mol.lf, olp, kin, na, [mol.exp_alpha, mol.exp_beta])
 
 
+def check_block_size(fn_fchk, GridGroup, EffHam, make_terms, block_size):
+    mol = IOData.from_file(context.get_fn(fn_fchk))
+    grid = BeckeMolGrid(mol.coordinates, mol.numbers, mol.pseudo_numbers, random_rotate=False)
+    if GridGroup is RGridGroup:
+        exps = [mol.exp_alpha]
+    else:
+        exps = [mol.exp_alpha, mol.exp_beta]
+    results = []
+    for bs in None, block_size:
+        ham = EffHam([GridGroup(mol.obasis, grid, make_terms(), block_size=bs)])
+        results.append(helper_compute(ham, mol.lf, *exps))
+    (energy1, focks1), (energy2, focks2) = results
+    assert abs(energy1 - energy2) < 1e-10
+    for fock1, fock2 in zip(focks1, focks2):
+        assert abs(fock1._array - fock2._array).max() < 1e-10
+
+
+def test_block_size_cs():
+    check_block_size('test/co_pbe_sto3g.fchk', RGridGroup, REffHam,
+                     lambda: [RLibXCLDA('x'), RLibXCGGA('c_pbe')], 1000)
+
+
+def test_block_size_os():
+    check_block_size('test/h3_pbe_321g.fchk', UGridGroup, UEffHam,
+                     lambda: [ULibXCGGA('x_pbe'), ULibXCLDA('c_vwn')], 777)
+
+
+def test_block_size_nonlocal():
+    fn_fchk = context.get_fn('test/water_hfs_321g.fchk')
+    mol = IOData.from_file(fn_fchk)
+    grid = BeckeMolGrid(mol.coordinates, mol.numbers, mol.pseudo_numbers, random_rotate=False)
+    with assert_raises(TypeError):
+        RGridGroup(mol.obasis, grid, [RBeckeHartree(8)], block_size=1000)
+    with assert_raises(ValueError):
+        RGridGroup(mol.obasis, grid, [RLibXCLDA('x')], block_size=0)
+
+
 def test_hyb_gga_exx_fraction():
     fn_fchk = context.get_fn('test/h3_hfs_321g.fchk')
     mol = IOData.from_file(fn_fchk)
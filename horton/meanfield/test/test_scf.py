@@ -58,3 +58,11 @@ def test_hf_water_321g_mistake():
     scf_solver = PlainSCFSolver()
     with assert_raises(AssertionError):
         scf_solver(ham, lf, olp, occ_model, exp_alpha)
+
+
+def test_hf_cs_hf_incremental():
+    check_hf_cs_hf(PlainSCFSolver(threshold=1e-10, rebuild_interval=3))
+
+
+def test_lih_os_hf_incremental():
+    check_lih_os_hf(PlainSCFSolver(threshold=1e-10, rebuild_interval=3))
@@ -54,3 +54,15 @@ def test_co_cs_pbe():
 
 def test_h3_os_pbe():
     check_h3_os_pbe(CDIISSCFSolver(threshold=1e-6))
+
+
+def test_hf_cs_hf_incremental():
+    check_hf_cs_hf(CDIISSCFSolver(threshold=1e-7, rebuild_interval=3))
+
+
+def test_lih_os_hf_incremental():
+    check_lih_os_hf(CDIISSCFSolver(threshold=1e-7, rebuild_interval=3))
+
+
+def test_water_cs_hfs_incremental():
+    check_water_cs_hfs(CDIISSCFSolver(threshold=1e-6, rebuild_interval=3))
@@ -23,7 +23,7 @@
 
 __all__ = [
     'check_dm', 'get_level_shift', 'get_spin', 'get_homo_lumo',
-    'compute_commutator',
+    'compute_commutator', 'reset_incremental',
 ]
 
 
@@ -161,3 +161,43 @@ def compute_commutator(dm, fock, overlap, work, output):
     work.idot(dm)
     work.idot(overlap)
     output.iadd(work, factor=-1)
+
+
+def reset_incremental(ham, dms, previous, rebuild_interval):
+    '''Feed new density matrices to an effective Hamiltonian
+
+       **Arguments:**
+
+       ham
+            An effective Hamiltonian.
+
+       dms
+            A list with the new density matrices.
+
+       previous
+            A list ``[dms, nupdate]`` with copies of the density matrices of the
+            previous call and the number of incremental updates since the last
+            rebuild from scratch. Use ``[None, 0]`` for the first call. This
+            list is updated in-place.
+
+       rebuild_interval
+            The maximum number of incremental updates before the Hamiltonian
+            is reset from scratch. In an incremental update, only the changes in
+            the density matrices are fed to the Hamiltonian with
+            ``ham.reset_delta``. When zero, ``ham.reset`` is always used.
+    '''
+    if rebuild_interval <= 0:
+        ham.reset(*dms)
+    elif previous[0] is None or previous[1] >= rebuild_interval:
+        ham.reset(*dms)
+        previous[0] = [dm.copy() for dm in dms]
+        previous[1] = 0
+    else:
+        delta_dms = []
+        for dm, dm_prev in zip(dms, previous[0]):
+            delta_dm = dm.copy()
+            delta_dm.iadd(dm_prev, -1)
+            delta_dms.append(delta_dm)
+            dm_prev.assign(dm)
+        ham.reset_delta(*delta_dms)
+        previous[1] += 1
@@ -22,7 +22,7 @@
 
 
 from horton.log import timer
-from horton.matrix import TwoIndex, Expansion
+from horton.matrix import TwoIndex, Expansion, DenseFourIndex
 from horton.utils import check_type, check_options
 
 
@@ -192,6 +192,9 @@ def split_core_active(one, two, ecore, orb, ncore, nactive, indextrans='tensordo
     if nactive+ncore > one.nbasis:
         raise ValueError('More active orbitals than basis functions.')
 
+    if orb is not None and isinstance(two, DenseFourIndex):
+        return _split_core_active_dense(one, two, ecore, orb, ncore, nactive, indextrans)
+
     #
     # Optional transformation to mo basis
     #
@@ -229,3 +232,51 @@ def split_core_active(one, two, ecore, orb, ncore, nactive, indextrans='tensordo
 
     # Done
     return one_mo_small, two_mo_small, ecore
+
+
+def _split_core_active_dense(one, two, ecore, orb, ncore, nactive, indextrans):
+    '''Reduce a Hamiltonian to an active space, for a DenseFourIndex in the
+       AO basis
+
+       The arguments and return values are the same as for
+       ``split_core_active``. The two-electron integrals are only transformed
+       to the blocks that are needed, such that the full four-index object in
+       the MO basis is never allocated.
+    '''
+    core = (0, ncore)
+    active = (ncore, ncore+nactive)
+
+    def transform(*ranges):
+        '''Transform two to the MO basis for the given ranges of orbitals'''
+        result = DenseFourIndex(*[end-begin for begin, end in ranges])
+        ends = dict(zip(['begin0', 'end0', 'begin1', 'end1', 'begin2', 'end2',
+                         'begin3', 'end3'], sum(ranges, ())))
+        result.assign_four_index_transform(two, orb, method=indextrans, **ends)
+        return result
+
+    # One-body integrals in the MO basis
+    one_mo = one.new()
+    one_mo.assign_two_index_transform(one, orb)
+
+    # Core energy
+    #   One body term
+    ecore += 2*one_mo.trace(0, ncore, 0, ncore)
+    two_core = transform(core, core, core, core)
+    #   Direct part
+    ecore += two_core.slice_to_two('abab->ab', None, 2.0).sum()
+    #   Exchange part
+    ecore += two_core.slice_to_two('abba->ab', None,-1.0).sum()
+    del two_core
+
+    # Active space one-body integrals
+    one_mo_small = one_mo.copy(ncore, ncore+nactive, ncore, ncore+nactive)
+    #   Direct part
+    transform(active, core, active, core).contract_to_two('abcb->ac', one_mo_small, 2.0, False)
+    #   Exchange part
+    transform(active, core, core, active).contract_to_two('abbc->ac', one_mo_small,-1.0, False)
+
+    # Active space two-body integrals
+    two_mo_small = transform(active, active, active, active)
+
+    # Done
+    return one_mo_small, two_mo_small, ecore
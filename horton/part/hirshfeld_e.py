@@ -185,6 +185,7 @@ class HirshfeldEMixin(object):
                 ('Scheme', 'Hirshfeld-E'),
                 ('Convergence threshold', '%.1e' % self._threshold),
                 ('Maximum iterations', self._maxiter),
+                ('Threads', self._nthread),
                 ('Proatomic DB',  self._proatomdb),
             ])
             log.cite('verstraelen2013', 'the use of Hirshfeld-E partitioning')
@@ -303,7 +304,10 @@ class HirshfeldEMixin(object):
         qp_b = B - np.dot(A, lower_bounds)
         qp_s -= np.dot(qp_r, lower_bounds)
         qps = QPSolver(qp_a, qp_b, qp_r, qp_s)
-        qp_x = qps.find_brute()[1]
+        #    the coefficients above their lower bound in the previous iteration
+        #    are a good guess of the free components.
+        old_propars = self.cache.load('propars')[begin:begin+nbasis]
+        qp_x = qps.find_active(old_propars*scales > lower_bounds)[1]
         # convert back to atom_pars
         atom_propars = qp_x + lower_bounds
 
@@ -397,7 +401,7 @@ class HirshfeldEWPart(HirshfeldEMixin, HirshfeldIWPart):
     '''Extended Hirshfeld partitioning with Becke-Lebedev grids'''
     def __init__(self, coordinates, numbers, pseudo_numbers, grid, moldens,
                  proatomdb, spindens=None, local=True, lmax=3, threshold=1e-6,
-                 maxiter=500, greedy=False):
+                 maxiter=500, greedy=False, nthread=1):
         '''
            **Arguments:** (that are not defined in ``WPart``)
 
@@ -418,12 +422,16 @@ class HirshfeldEWPart(HirshfeldEMixin, HirshfeldIWPart):
 
            greedy
                 Reduce the CPU cost at the expense of more memory consumption.
+
+           nthread
+                The number of threads used to update the pro-atoms of different
+                atoms concurrently.
         '''
         hebasis = HEBasis(numbers, proatomdb)
         HirshfeldEMixin.__init__(self, hebasis)
         HirshfeldIWPart.__init__(self, coordinates, numbers, pseudo_numbers,
                                  grid, moldens, proatomdb, spindens, local,
-                                 lmax, threshold, maxiter, greedy)
+                                 lmax, threshold, maxiter, greedy, nthread)
 
     def get_wcor_fit(self, index):
         return None
@@ -447,7 +455,7 @@ class HirshfeldECPart(HirshfeldEMixin, HirshfeldICPart):
     def __init__(self, coordinates, numbers, pseudo_numbers, grid, moldens,
                  proatomdb, spindens=None, local=True, lmax=3,
                  wcor_numbers=None, wcor_rcut_max=2.0, wcor_rcond=0.1,
-                 threshold=1e-6, maxiter=500, greedy=False):
+                 threshold=1e-6, maxiter=500, greedy=False, nthread=1):
         '''
            **Arguments:** (that are not defined in ``CPart``)
 
@@ -468,13 +476,17 @@ class HirshfeldECPart(HirshfeldEMixin, HirshfeldICPart):
 
            greedy
                 Reduce the CPU cost at the expense of more memory consumption.
+
+           nthread
+                The number of threads used to update the pro-atoms of different
+                atoms concurrently.
         '''
         hebasis = HEBasis(numbers, proatomdb)
         HirshfeldEMixin.__init__(self, hebasis)
         HirshfeldICPart.__init__(self, coordinates, numbers, pseudo_numbers,
                                  grid, moldens, proatomdb, spindens, local,
                                  lmax, wcor_numbers, wcor_rcut_max, wcor_rcond,
-                                 threshold, maxiter, greedy)
+                                 threshold, maxiter, greedy, nthread)
 
     def get_memory_estimates(self):
         if self.local:
@@ -33,13 +33,14 @@ __all__ = ['HirshfeldIWPart', 'HirshfeldICPart']
 
 class HirshfeldIMixin(IterativeProatomMixin):
     name = 'hi'
-    options = ['lmax', 'threshold', 'maxiter', 'greedy']
+    options = ['lmax', 'threshold', 'maxiter', 'greedy', 'nthread']
     linear = False
 
-    def __init__(self, threshold=1e-6, maxiter=500, greedy=False):
+    def __init__(self, threshold=1e-6, maxiter=500, greedy=False, nthread=1):
         self._threshold = threshold
         self._maxiter = maxiter
         self._greedy = greedy
+        self._nthread = nthread
 
     def _init_log_scheme(self):
         if log.do_medium:
@@ -47,6 +48,7 @@ class HirshfeldIMixin(IterativeProatomMixin):
                 ('Scheme', 'Hirshfeld-I'),
                 ('Convergence threshold', '%.1e' % self._threshold),
                 ('Maximum iterations', self._maxiter),
+                ('Threads', self._nthread),
                 ('Proatomic DB',  self._proatomdb),
             ])
             log.cite('bultinck2007', 'the use of Hirshfeld-I partitioning')
@@ -127,7 +129,7 @@ class HirshfeldIWPart(HirshfeldIMixin, HirshfeldWPart):
 
     def __init__(self, coordinates, numbers, pseudo_numbers, grid, moldens,
                  proatomdb, spindens=None, local=True, lmax=3, threshold=1e-6,
-                 maxiter=500, greedy=False):
+                 maxiter=500, greedy=False, nthread=1):
         '''
            **Arguments:** (that are not defined in ``WPart``)
 
@@ -148,8 +150,12 @@ class HirshfeldIWPart(HirshfeldIMixin, HirshfeldWPart):
 
            greedy
                 Reduce the CPU cost at the expense of more memory consumption.
+
+           nthread
+                The number of threads used to update the pro-atoms of different
+                atoms concurrently.
         '''
-        HirshfeldIMixin.__init__(self, threshold, maxiter, greedy)
+        HirshfeldIMixin.__init__(self, threshold, maxiter, greedy, nthread)
         HirshfeldWPart.__init__(self, coordinates, numbers, pseudo_numbers,
                                 grid, moldens, proatomdb, spindens, local, lmax)
 
@@ -172,7 +178,7 @@ class HirshfeldICPart(HirshfeldIMixin, HirshfeldCPart):
     def __init__(self, coordinates, numbers, pseudo_numbers, grid, moldens,
                  proatomdb, spindens=None, local=True, lmax=3,
                  wcor_numbers=None, wcor_rcut_max=2.0, wcor_rcond=0.1,
-                 threshold=1e-6, maxiter=500, greedy=False):
+                 threshold=1e-6, maxiter=500, greedy=False, nthread=1):
         '''
            **Arguments:** (that are not defined in ``CPart``)
 
@@ -193,8 +199,12 @@ class HirshfeldICPart(HirshfeldIMixin, HirshfeldCPart):
 
            greedy
                 Reduce the CPU cost at the expense of more memory consumption.
+
+           nthread
+                The number of threads used to update the pro-atoms of different
+                atoms concurrently.
         '''
-        HirshfeldIMixin.__init__(self, threshold, maxiter, greedy)
+        HirshfeldIMixin.__init__(self, threshold, maxiter, greedy, nthread)
         HirshfeldCPart.__init__(self, coordinates, numbers, pseudo_numbers,
                                 grid, moldens, proatomdb, spindens, local,
                                 lmax, wcor_numbers, wcor_rcut_max, wcor_rcond)
@@ -22,6 +22,8 @@
 
 
 import numpy as np
+from multiprocessing.pool import ThreadPool
+
 from horton.cache import just_once
 from horton.log import log
 from horton.part.stockholder import StockholderWPart
@@ -53,13 +55,53 @@ class IterativeProatomMixin():
         # Update the partitioning based on the latest proatoms
         self.update_at_weights()
 
-        # Update the proatoms
-        for index in xrange(self.natom):
-            self._update_propars_atom(index)
+        # Update the proatoms. The first iteration is always carried out
+        # serially because it also fills caches that are shared by all atoms.
+        if len(self.history_propars) == 1:
+            self._update_propars_atoms(nthread=1)
+        else:
+            self._update_propars_atoms(nthread=self._nthread)
 
         # Keep track of history
         self.history_charges.append(self.cache.load('charges').copy())
 
+    def _map_atoms(self, fn, indexes, nthread=1):
+        '''Call fn for each atom index, concurrently when nthread > 1
+
+           **Returns:** a list with the return values, in the order of indexes.
+
+           Each call may only modify the results of its own atom. Hence, the
+           result does not depend on the number of threads.
+        '''
+        indexes = list(indexes)
+        if nthread > 1 and len(indexes) > 1:
+            pool = ThreadPool(min(nthread, len(indexes)))
+            try:
+                return pool.map(fn, indexes)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            return [fn(index) for index in indexes]
+
+    def _update_propars_atoms(self, indexes=None, nthread=1):
+        '''Update the pro-atom parameters of the given atoms (default all)
+
+           **Optional arguments:**
+
+           indexes
+                The atoms to be updated. All atoms by default.
+
+           nthread
+                The number of threads used to update different atoms
+                concurrently.
+
+           Subclasses may override this method to update several atoms at once.
+        '''
+        if indexes is None:
+            indexes = xrange(self.natom)
+        self._map_atoms(self._update_propars_atom, indexes, nthread)
+
     def _update_propars_atom(self, index):
         raise NotImplementedError
 
@@ -111,11 +153,12 @@ class IterativeProatomMixin():
 class IterativeStockholderWPart(IterativeProatomMixin, StockholderWPart):
     '''Iterative Stockholder Partitioning with Becke-Lebedev grids'''
     name = 'is'
-    options = ['lmax', 'threshold', 'maxiter']
+    options = ['lmax', 'threshold', 'maxiter', 'nthread']
     linear = False
 
     def __init__(self, coordinates, numbers, pseudo_numbers, grid, moldens,
-                 spindens=None, lmax=3, threshold=1e-6, maxiter=500):
+                 spindens=None, lmax=3, threshold=1e-6, maxiter=500,
+                 nthread=1):
         '''
            **Optional arguments:** (that are not defined in ``WPart``)
 
@@ -128,9 +171,14 @@ class IterativeStockholderWPart(IterativeProatomMixin, StockholderWPart):
                 The maximum number of iterations. If no convergence is reached
                 in the end, no warning is given.
                 Reduce the CPU cost at the expense of more memory consumption.
+
+           nthread
+                The number of threads used to update the pro-atoms of different
+                atoms concurrently.
         '''
         self._threshold = threshold
         self._maxiter = maxiter
+        self._nthread = nthread
         StockholderWPart.__init__(self, coordinates, numbers, pseudo_numbers,
                                   grid, moldens, spindens, True, lmax)
 
@@ -140,6 +188,7 @@ class IterativeStockholderWPart(IterativeProatomMixin, StockholderWPart):
                 ('Scheme', 'Iterative Stockholder'),
                 ('Convergence threshold', '%.1e' % self._threshold),
                 ('Maximum iterations', self._maxiter),
+                ('Threads', self._nthread),
             ])
             log.cite('lillestolen2008', 'the use of Iterative Stockholder partitioning')
 
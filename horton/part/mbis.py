@@ -53,46 +53,102 @@ def _get_initial_mbis_propars(number):
 
 
 def _opt_mbis_propars(rho, propars, rgrid, threshold):
-    assert len(propars)%2 == 0
-    nshell = len(propars)/2
-    r = rgrid.radii
-    terms = np.zeros((nshell, len(r)), float)
+    return _opt_mbis_propars_batch([rho], [propars], [rgrid], threshold)[0]
+
+
+def _opt_mbis_propars_batch(rhos, propars, rgrids, threshold):
+    '''Optimize the pro-atom parameters of several atoms simultaneously
+
+       **Arguments:**
+
+       rhos
+            A list with the spherically averaged AIM densities of the atoms.
+
+       propars
+            A list with the initial pro-atom parameters of the atoms. These are
+            pairs of a population and an exponent for each shell.
+
+       rgrids
+            A list with the radial grids of the atoms.
+
+       threshold
+            The convergence threshold for the change in pro-atom density.
+
+       **Returns:** a list with the optimized pro-atom parameters.
+
+       The radial grids are stacked in one array, padded with zero weights
+       up to the largest grid. The shells are padded with zero populations up
+       to the largest number of shells. Atoms are removed from the batch as
+       soon as they are converged.
+    '''
+    natom = len(rhos)
+    nshells = np.array([len(p)/2 for p in propars])
+    npoints = np.array([rgrid.size for rgrid in rgrids])
+    nshell = nshells.max()
+    npoint = npoints.max()
+
+    # stack all arrays
+    r = np.zeros((natom, npoint), float)
+    w = np.zeros((natom, npoint), float)
+    rho = np.zeros((natom, npoint), float)
+    pops = np.zeros((natom, nshell), float)
+    exps = np.ones((natom, nshell), float)
+    for iatom in xrange(natom):
+        assert len(propars[iatom])%2 == 0
+        r[iatom, :npoints[iatom]] = rgrids[iatom].radii
+        w[iatom, :npoints[iatom]] = rgrids[iatom].weights
+        rho[iatom, :npoints[iatom]] = rhos[iatom]
+        pops[iatom, :nshells[iatom]] = propars[iatom][::2]
+        exps[iatom, :nshells[iatom]] = propars[iatom][1::2]
+    mask = np.arange(nshell) < nshells[:, None]
+    rw = r*w
+
+    active = np.arange(natom)
     oldpro = None
     for irep in xrange(1000):
-        # compute the contributions to the pro-atom
-        for ishell in xrange(nshell):
-            N = propars[2*ishell]
-            S = propars[2*ishell+1]
-            terms[ishell] = (N*S**3/(8*np.pi))*np.exp(-S*r)
-        pro = terms.sum(axis=0)
+        # compute the contributions to the pro-atoms
+        S = exps[active, :, None]
+        terms = (pops[active, :, None]*S**3/(8*np.pi))*np.exp(-S*r[active, None, :])
+        pro = terms.sum(axis=1)
         # transform to partitions
-        terms *= rho/pro
+        terms *= (rho[active]/pro)[:, None, :]
         # the partitions and the updated parameters
-        for ishell in xrange(nshell):
-            m0 = rgrid.integrate(terms[ishell])
-            m1 = rgrid.integrate(terms[ishell], r)
-            propars[2*ishell] = m0
-            propars[2*ishell+1] = 3*m0/m1
-        # check for convergence
+        m0 = np.einsum('asp,ap->as', terms, w[active])
+        m1 = np.einsum('asp,ap->as', terms, rw[active])
+        pops[active] = m0
+        exps[active] = np.where(mask[active], 3*m0/np.where(mask[active], m1, 1.0), 1.0)
+        # check for convergence, per atom
         if oldpro is None:
-            change = 1e100
+            converged = np.zeros(len(active), bool)
         else:
             error = oldpro - pro
-            change = np.sqrt(rgrid.integrate(error, error))
-        if change < threshold:
-            return propars
-        oldpro = pro
-    assert False
+            change = np.sqrt(np.einsum('ap,ap->a', error*error, w[active]))
+            converged = change < threshold
+        active = active[~converged]
+        if len(active) == 0:
+            break
+        oldpro = pro[~converged]
+    else:
+        assert False
+
+    result = []
+    for iatom in xrange(natom):
+        my_propars = np.zeros(2*nshells[iatom], float)
+        my_propars[::2] = pops[iatom, :nshells[iatom]]
+        my_propars[1::2] = exps[iatom, :nshells[iatom]]
+        result.append(my_propars)
+    return result
 
 
 class MBISWPart(IterativeProatomMixin, StockholderWPart):
     '''Iterative Stockholder Partitioning with Becke-Lebedev grids'''
     name = 'mbis'
-    options = ['lmax', 'threshold', 'maxiter']
+    options = ['lmax', 'threshold', 'maxiter', 'nthread']
     linear = False
 
     def __init__(self, coordinates, numbers, pseudo_numbers, grid, moldens,
-                 spindens=None, lmax=3, threshold=1e-6, maxiter=500):
+                 spindens=None, lmax=3, threshold=1e-6, maxiter=500,
+                 nthread=1):
         '''
            **Optional arguments:** (that are not defined in ``WPart``)
 
@@ -105,9 +161,14 @@ class MBISWPart(IterativeProatomMixin, StockholderWPart):
                 The maximum number of iterations. If no convergence is reached
                 in the end, no warning is given.
                 Reduce the CPU cost at the expense of more memory consumption.
+
+           nthread
+                The number of threads used to compute the spherical averages
+                of different atoms concurrently.
         '''
         self._threshold = threshold
         self._maxiter = maxiter
+        self._nthread = nthread
         StockholderWPart.__init__(self, coordinates, numbers, pseudo_numbers,
                                   grid, moldens, spindens, True, lmax)
 
@@ -117,6 +178,7 @@ class MBISWPart(IterativeProatomMixin, StockholderWPart):
                 ('Scheme', 'Minimal Basis Iterative Stockholder (MBIS)'),
                 ('Convergence threshold', '%.1e' % self._threshold),
                 ('Maximum iterations', self._maxiter),
+                ('Threads', self._nthread),
             ])
 
     def get_rgrid(self, iatom):
@@ -152,21 +214,32 @@ class MBISWPart(IterativeProatomMixin, StockholderWPart):
         return propars
 
     def _update_propars_atom(self, iatom):
-        # compute spherical average
+        self._update_propars_atoms([iatom])
+
+    def _get_spherical_average(self, iatom):
         atgrid = self.get_grid(iatom)
-        rgrid = atgrid.rgrid
         dens = self.get_moldens(iatom)
         at_weights = self.cache.load('at_weights', iatom)
-        spherical_average = np.clip(atgrid.get_spherical_average(at_weights, dens), 1e-100, np.inf)
+        return np.clip(atgrid.get_spherical_average(at_weights, dens), 1e-100, np.inf)
 
-        # assign as new propars
-        my_propars = self.cache.load('propars')[self._ranges[iatom]:self._ranges[iatom+1]]
-        my_propars[:] = _opt_mbis_propars(spherical_average, my_propars.copy(), rgrid, self._threshold)
-
-        # compute the new charge
-        pseudo_population = rgrid.integrate(spherical_average)
+    def _update_propars_atoms(self, indexes=None, nthread=1):
+        if indexes is None:
+            indexes = range(self.natom)
+        propars = self.cache.load('propars')
         charges = self.cache.load('charges', alloc=self.natom, tags='o')[0]
-        charges[iatom] = self.pseudo_numbers[iatom] - pseudo_population
+
+        # compute spherical averages and the new charges
+        spherical_averages = self._map_atoms(self._get_spherical_average, indexes, nthread)
+        rgrids = [self.get_rgrid(iatom) for iatom in indexes]
+        for iatom, rgrid, spherical_average in zip(indexes, rgrids, spherical_averages):
+            pseudo_population = rgrid.integrate(spherical_average)
+            charges[iatom] = self.pseudo_numbers[iatom] - pseudo_population
+
+        # optimize the propars of all atoms at once and assign them
+        old_propars = [propars[self._ranges[iatom]:self._ranges[iatom+1]].copy() for iatom in indexes]
+        new_propars = _opt_mbis_propars_batch(spherical_averages, old_propars, rgrids, self._threshold)
+        for iatom, my_propars in zip(indexes, new_propars):
+            propars[self._ranges[iatom]:self._ranges[iatom+1]] = my_propars
 
     def _finalize_propars(self):
         IterativeProatomMixin._finalize_propars(self)
@@ -217,3 +217,11 @@ def test_hirshfeld_e_fake_pseudo_nowcor_local_greedy():
 
 def test_hirshfeld_e_fake_pseudo_nowcor_global_greedy():
     check_fake('he', pseudo=True, dowcor=True, local=False, absmean=0.396, threshold=1e-4, greedy=True)
+
+
+def test_hirshfeld_i_fake_local_nthread():
+    check_fake('hi', pseudo=False, dowcor=True, local=True, absmean=0.428, threshold=1e-5, nthread=2)
+
+
+def test_hirshfeld_e_fake_global_nthread():
+    check_fake('he', pseudo=False, dowcor=True, local=False, absmean=0.373, threshold=1e-4, nthread=2)
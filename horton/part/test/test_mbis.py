@@ -22,8 +22,11 @@
 #pylint: skip-file
 
 
+import numpy as np
+
 from horton import *
-from horton.part.mbis import _get_nshell, _get_initial_mbis_propars
+from horton.part.mbis import _get_nshell, _get_initial_mbis_propars, \
+    _opt_mbis_propars, _opt_mbis_propars_batch
 
 
 def test_get_nshell():
@@ -36,3 +39,24 @@ def test_get_initial_mbis_propars():
     assert (_get_initial_mbis_propars(1) == [1.0, 2.0]).all()
     assert (_get_initial_mbis_propars(2) == [2.0, 4.0]).all()
     assert (_get_initial_mbis_propars(3) == [2.0, 6.0, 1.0, 2.0]).all()
+
+
+def get_mbis_rho(rgrid, propars):
+    r = rgrid.radii
+    return sum((N*S**3/(8*np.pi))*np.exp(-S*r) for N, S in propars.reshape(-1, 2))
+
+
+def test_opt_mbis_propars_batch():
+    # Two atoms with different numbers of shells and different radial grids
+    rgrids = [
+        RadialGrid(ExpRTransform(1e-3, 2e1, 100)),
+        RadialGrid(ExpRTransform(1e-4, 2e1, 120)),
+    ]
+    exact = [np.array([1.0, 2.5]), np.array([2.0, 10.0, 1.0, 1.5])]
+    rhos = [get_mbis_rho(rgrid, propars) for rgrid, propars in zip(rgrids, exact)]
+    initials = [_get_initial_mbis_propars(1), _get_initial_mbis_propars(3)]
+    batch = _opt_mbis_propars_batch(rhos, [p.copy() for p in initials], rgrids, 1e-8)
+    for iatom in xrange(2):
+        single = _opt_mbis_propars(rhos[iatom], initials[iatom].copy(), rgrids[iatom], 1e-8)
+        assert abs(batch[iatom] - single).max() < 1e-10
+        assert abs(batch[iatom] - exact[iatom]).max() < 1e-5
@@ -125,6 +125,35 @@ def test_mbis_water_hf_sto3g():
     assert (wpart['valence_widths'] > 0).all()
 
 
+def check_water_hf_sto3g_nthread(scheme, expecting, needs_padb=True, **kwargs):
+    wpart1 = check_water_hf_sto3g(scheme, expecting, needs_padb, nthread=1, **kwargs)
+    wpart3 = check_water_hf_sto3g(scheme, expecting, needs_padb, nthread=3, **kwargs)
+    # The result must not depend on the number of threads.
+    assert wpart1['niter'] == wpart3['niter']
+    assert (wpart1['history_charges'] == wpart3['history_charges']).all()
+    assert (wpart1['history_propars'] == wpart3['history_propars']).all()
+
+
+def test_hirshfeld_i_water_hf_sto3g_nthread():
+    expecting = np.array([-0.4214, 0.2107, 0.2107]) # From HiPart
+    check_water_hf_sto3g_nthread('hi', expecting, local=True, greedy=True)
+
+
+def test_hirshfeld_e_water_hf_sto3g_nthread():
+    expecting = np.array([-0.422794483125, 0.211390419810, 0.211404063315]) # From HiPart
+    check_water_hf_sto3g_nthread('he', expecting, local=False, greedy=True)
+
+
+def test_is_water_hf_sto3g_nthread():
+    expecting = np.array([-0.490017586929, 0.245018706885, 0.244998880045]) # From HiPart
+    check_water_hf_sto3g_nthread('is', expecting, needs_padb=False)
+
+
+def test_mbis_water_hf_sto3g_nthread():
+    expecting = np.array([-0.61891067, 0.3095756, 0.30932584])
+    check_water_hf_sto3g_nthread('mbis', expecting, needs_padb=False)
+
+
 def check_msa_hf_lan(scheme, expecting, needs_padb=True, **kwargs):
     if needs_padb:
         proatomdb = get_proatomdb_hf_lan()
@@ -32,7 +32,9 @@ r'''A light-weight quadratic programming solver
 
    The equality constraints are optional. When A is positive definite, a
    polynomial-scaling interior point algorithm can be used:
-   ``QPSolver.find_local``. If A has negative eigenvalues, only the brute force
+   ``QPSolver.find_local``. The active-set solver, ``QPSolver.find_active``,
+   needs no initial guess and can be warm-started with the free components of
+   a similar problem. If A has negative eigenvalues, only the brute force
    solver is reliable but it's cost scales exponentially with problem size.
 
    No a priori feasibility tests are carried out and it is assumed that in
@@ -747,6 +749,176 @@ class QPSolver(object):
         self.check_solution(x)
         return cost, x
 
+    def _get_bound_multipliers(self, x, free):
+        '''Return the Lagrange multipliers of the bounds x >= 0
+
+           **Arguments:**
+
+           x
+                A solution vector that satisfies the equality constraints.
+
+           free
+                Boolean array with the free components.
+
+           The multipliers of the equality constraints are fitted to the
+           gradient of the free components. The multipliers of the frozen
+           components are the remaining components of the gradient. All of them
+           must be positive in a solution.
+        '''
+        gradient = np.dot(self.a, x) - self.b
+        if self.nl > 0 and free.any():
+            lagrange = np.linalg.lstsq(self.r[:,free].T, gradient[free])[0]
+            gradient -= np.dot(self.r.T, lagrange)
+        return gradient
+
+    def _solve_pdas(self, free, maxiter):
+        '''Primal-dual active-set iterations, starting from a guess of the free components
+
+           **Arguments:**
+
+           free
+                Boolean array with the initial guess of the free components.
+
+           maxiter
+                The maximum number of iterations.
+
+           **Returns:** the solution vector, or None when the iterations get
+           stuck in a cycle, hit an infeasible set of free components or do not
+           converge.
+
+           Each iteration solves the equality-constrained problem for the
+           current free components. Free components that become negative are
+           frozen and frozen components with a negative multiplier are released.
+           When the guess is good, e.g. from a similar problem, this converges
+           in one or a few iterations.
+        '''
+        visited = set([])
+        for counter in xrange(maxiter):
+            if free.sum() < max(self.nl, 1):
+                return None
+            visited.add(free.tostring())
+            try:
+                x = self.solve(free)
+            except FeasibilityError:
+                return None
+            if self.nl > 0 and abs(np.dot(self.r, x) - self.s).max() > self.eps:
+                return None
+            multipliers = self._get_bound_multipliers(x, free)
+            new_free = np.where(free, x >= 0, multipliers < -self.eps)
+            if (new_free == free).all():
+                return x
+            free = new_free
+            if free.tostring() in visited:
+                return None
+        return None
+
+    def _solve_primal_active(self, maxiter):
+        '''Primal active-set method, starting from a feasible point
+
+           **Arguments:**
+
+           maxiter
+                The maximum number of iterations.
+
+           **Returns:** the solution vector.
+
+           A feasible initial point is found with non-negative least squares on
+           the equality constraints. Then, the problem is solved with the
+           current set of free components. Each step is truncated at the first
+           component that becomes negative, which is then frozen. When a full
+           step is taken, the frozen component with the most negative multiplier
+           is released. This converges in a finite number of steps when A is
+           positive definite.
+        '''
+        from scipy.optimize import nnls
+        if self.nl > 0:
+            x = nnls(self.r, self.s)[0]
+            if abs(np.dot(self.r, x) - self.s).max() > self.eps:
+                raise FeasibilityError('The equality constraints can not be satisfied with positive x.')
+        else:
+            x = np.zeros(self.nx)
+        free = np.ones(self.nx, dtype=bool)
+        for counter in xrange(maxiter):
+            if free.sum() >= max(self.nl, 1):
+                step = self.solve(free) - x
+            else:
+                # The equality constraints fix the free components.
+                step = np.zeros(self.nx)
+            if abs(step).max() <= self.eps*max(1.0, abs(x).max()):
+                # release the frozen component with the most negative multiplier, if any
+                multipliers = self._get_bound_multipliers(x, free)
+                if free.all():
+                    return x
+                ilow = np.where(free, np.inf, multipliers).argmin()
+                if multipliers[ilow] >= -self.eps:
+                    return x
+                free[ilow] = True
+            else:
+                # find the first component that becomes negative along the step
+                tmin = 1.0
+                imin = None
+                for i in (free & (step < 0)).nonzero()[0]:
+                    t = -x[i]/step[i]
+                    if t < tmin:
+                        tmin = t
+                        imin = i
+                x = x + tmin*step
+                if imin is not None:
+                    free[imin] = False
+                    x[imin] = 0.0
+        raise ConvergenceError('Active-set solver failed to converge')
+
+    def find_active(self, free=None, maxiter=None):
+        '''Active-set solution of the quadratic programming problem
+
+           **Optional arguments:**
+
+           free
+                A guess of the free components (boolean array), e.g. the
+                non-zero components of the solution of a similar problem. By
+                default, all components are assumed to be free.
+
+           maxiter
+                The maximum number of iterations of each active-set algorithm,
+                10*nx by default.
+
+           **Returns:**
+
+           cost
+                The value of the cost function at the solution
+
+           x
+                The solution vector
+
+           The cost scales polynomially with the problem size, in contrast to
+           ``find_brute``. It gives the same solution when A is positive
+           definite in the space allowed by the equality constraints, i.e.
+           when the problem is strictly convex. In all other cases, this method
+           falls back to ``find_brute``.
+        '''
+        try:
+            x0, basis, evals, evecs, b_diag = diagonal_form(self.a, self.b, self.r, self.s)
+        except FeasibilityError:
+            return self.find_brute()
+        if evals is None or evals.min() <= self.eps*abs(evals).max():
+            return self.find_brute()
+
+        if maxiter is None:
+            maxiter = self.nx*10
+        if free is None:
+            free = np.ones(self.nx, dtype=bool)
+        else:
+            free = np.array(free, dtype=bool)
+            if free.shape != (self.nx,):
+                raise TypeError('The argument free has the wrong shape.')
+
+        x = self._solve_pdas(free, maxiter)
+        if x is None:
+            x = self._solve_primal_active(maxiter)
+
+        self.check_solution(x)
+        return self.compute_cost(x), x
+
     def find_local(self, x, trust_radius, maxiter=None):
         '''A local solver for the quadratic programming problem
 
@@ -69,6 +69,9 @@ def test_scripts():
         check_script('horton-esp-test.py esp.h5 other.h5:charges foo.h5', dn)
         check_script('horton-esp-gen.py other.h5:charges esp.cube gen.h5', dn)
         check_files(dn, ['esp.h5', 'other.h5', 'foo.h5', 'gen.h5'])
+        check_script('horton-esp-cost.py esp.cube esp.h5:threads --wnear=0:1.0:0.5 --nthread=2', dn)
+        with h5.File(os.path.join(dn, 'esp.h5')) as f:
+            assert abs(f['cost/A'][:] - f['threads/cost/A'][:]).max() < 1e-10
 
     # Write the cube file to the tmpdir and run scripts (run 2)
     with tmpdir('horton.scripts.test.test_espfit.test_scripts2') as dn:
@@ -82,6 +85,27 @@ def test_scripts():
         check_files(dn, ['esp.h5', 'other.h5', 'foo.h5', 'gen.h5'])
 
 
+def test_scripts_spme():
+    # Generate some random system with random esp data
+    natom = 5
+    numbers = np.random.randint(1, 20, natom)
+    coordinates = np.random.uniform(0, 10, (natom, 3))
+    origin = np.zeros(3, float)
+    grid_rvecs = np.identity(3, float)*1.0
+    shape = np.array([10, 10, 10])
+    pbc = np.ones(3, int)
+    ugrid = UniformGrid(origin, grid_rvecs, shape, pbc)
+    esp_cube_data = np.random.uniform(-1, 1, shape)
+    mol_esp = IOData(coordinates=coordinates, numbers=numbers, grid=ugrid, cube_data=esp_cube_data)
+
+    with tmpdir('horton.scripts.test.test_espfit.test_scripts_spme') as dn:
+        mol_esp.to_file(os.path.join(dn, 'esp.cube'))
+        check_script('horton-esp-cost.py esp.cube esp.h5 --wnear=0:1.0:0.5 --spme', dn)
+        check_script('horton-esp-fit.py esp.h5 other.h5', dn)
+        check_script('horton-esp-gen.py other.h5:charges esp.cube gen.h5 --spme', dn)
+        check_files(dn, ['esp.h5', 'other.h5', 'gen.h5'])
+
+
 def test_scripts_symmetry():
     # Write the cube file to the tmpdir and run scripts
     with tmpdir('horton.scripts.test.test_espfit.test_scripts_symmetry') as dn:
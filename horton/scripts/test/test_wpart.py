@@ -36,7 +36,7 @@ def test_wpart_schemes():
     assert 'hi' in wpart_schemes
     assert 'he' in wpart_schemes
     assert wpart_schemes['hi'] is HirshfeldIWPart
-    assert wpart_schemes['hi'].options == ['lmax', 'threshold', 'maxiter', 'greedy']
+    assert wpart_schemes['hi'].options == ['lmax', 'threshold', 'maxiter', 'greedy', 'nthread']
     assert not wpart_schemes['hi'].linear
     assert wpart_schemes['h'].linear
     assert wpart_schemes['b'].linear
@@ -54,7 +54,7 @@ def write_atomdb_sto3g(dn, do_deriv=True):
     padb.to_file(os.path.join(dn, 'atoms.h5'))
 
 
-def check_script_water_sto3g(scheme, do_deriv=True):
+def check_script_water_sto3g(scheme, do_deriv=True, extra=''):
     with tmpdir('horton.scripts.test.test_wpart.test_script_water_sto3g_%s' % scheme) as dn:
         fn_fchk = 'water_sto3g_hf_g03.fchk'
         copy_files(dn, [fn_fchk])
@@ -62,7 +62,7 @@ def check_script_water_sto3g(scheme, do_deriv=True):
             check_script('horton-wpart.py %s water_sto3g_hf_g03_wpart.h5:wpart %s --debug' % (fn_fchk, scheme), dn)
         else:
             write_atomdb_sto3g(dn, do_deriv)
-            check_script('horton-wpart.py %s water_sto3g_hf_g03_wpart.h5:wpart %s atoms.h5 --slow' % (fn_fchk, scheme), dn)
+            check_script('horton-wpart.py %s water_sto3g_hf_g03_wpart.h5:wpart %s atoms.h5 --slow %s' % (fn_fchk, scheme, extra), dn)
         fn_h5 = 'water_sto3g_hf_g03_wpart.h5'
         check_files(dn, [fn_h5])
         with h5.File(os.path.join(dn, fn_h5)) as f:
@@ -110,6 +110,10 @@ def test_script_water_sto3g_he_noderiv():
     check_script_water_sto3g('he', do_deriv=False)
 
 
+def test_script_water_sto3g_he_nthread():
+    check_script_water_sto3g('he', extra='--nthread=2')
+
+
 def check_script_ch3_rohf_sto3g(scheme, do_deriv=True):
     with tmpdir('horton.scripts.test.test_wpart.test_script_ch3_rohf_sto3g_%s' % scheme) as dn:
         fn_fchk = 'ch3_rohf_sto3g_g03.fchk'
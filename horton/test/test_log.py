@@ -21,6 +21,8 @@
 #pylint: skip-file
 
 
+from multiprocessing.pool import ThreadPool
+
 from horton import *
 
 
@@ -32,3 +34,17 @@ def test_recursive_timer():
         else:
             return factorial(n-1)*n
     assert factorial(4) == 24
+
+
+def test_threaded_timer():
+    @timer.with_section('Foo')
+    def square(n):
+        return n*n
+    stack = list(timer._stack)
+    pool = ThreadPool(4)
+    try:
+        assert pool.map(square, range(100)) == [n*n for n in range(100)]
+    finally:
+        pool.close()
+        pool.join()
+    assert timer._stack == stack
@@ -453,6 +453,75 @@ def test_brute_local():
                 raise
 
 
+def test_brute_active_posdef():
+    for counter in xrange(100):
+        # A large eps is used because some random problems are very ill-behaved.
+        qps = QPSolver(*get_random_problem(nx=6, posdef=True), eps=1e-6)
+
+        try:
+            cost0, x0 = qps.find_brute()
+        except FeasibilityError:
+            with assert_raises(FeasibilityError):
+                qps.find_active()
+            continue
+
+        try:
+            cost1, x1 = qps.find_active()
+            qps.check_solution(x1)
+            assert abs(x0 - x1).max() < qps.eps
+        except:
+            print 'problem with active'
+            qps.log(x0)
+            raise
+
+        try:
+            cost2, x2 = qps.find_active(x0 > 0)
+            qps.check_solution(x2)
+            assert abs(x0 - x2).max() < qps.eps
+        except:
+            print 'problem with active from solution'
+            qps.log(x0)
+            raise
+
+        try:
+            cost3, x3 = qps.find_active(get_random_free(qps))
+            qps.check_solution(x3)
+            assert abs(x0 - x3).max() < qps.eps
+        except:
+            print 'problem with active from random'
+            qps.log(x0)
+            raise
+
+
+def test_brute_active():
+    for counter in xrange(100):
+        # Problems that are not strictly convex are solved with find_brute.
+        qps = QPSolver(*get_random_problem(nx=6), eps=1e-6)
+        try:
+            cost0, x0 = qps.find_brute()
+        except (FeasibilityError, BoundedError), e:
+            with assert_raises(e.__class__):
+                qps.find_active()
+            continue
+        cost1, x1 = qps.find_active()
+        assert abs(x0 - x1).max() < qps.eps
+
+
+def test_active_large():
+    for counter in xrange(10):
+        qps = QPSolver(*get_random_problem(nx=40, nl=1, posdef=True), eps=1e-6)
+        try:
+            cost0, x0 = qps.find_active()
+        except FeasibilityError:
+            continue
+        qps.check_solution(x0)
+        # warm start from the solution
+        cost1, x1 = qps.find_active(x0 > 0)
+        assert abs(x0 - x1).max() < qps.eps
+        with assert_raises(TypeError):
+            qps.find_active(np.ones(39, bool))
+
+
 def test_brute_case1():
     qps = QPSolver(
         np.array([
@@ -472,6 +541,8 @@ def test_brute_case1():
     )
     cost, x = qps.find_brute()
     qps.check_solution(x)
+    cost1, x1 = qps.find_active()
+    assert abs(x - x1).max() < qps.eps
 
 
 def test_brute_case2():
@@ -493,6 +564,8 @@ def test_brute_case2():
     )
     with assert_raises(FeasibilityError):
         cost, x = qps.find_brute()
+    with assert_raises(FeasibilityError):
+        cost, x = qps.find_active()
 
 
 def test_brute_case3():
@@ -514,6 +587,8 @@ def test_brute_case3():
     )
     cost, x = qps.find_brute()
     qps.check_solution(x)
+    cost1, x1 = qps.find_active()
+    assert abs(x - x1).max() < qps.eps
 
 
 def test_brute_case4():
@@ -634,6 +709,8 @@ def test_brute_case9():
     )
     cost, x = qps.find_brute()
     qps.check_solution(x)
+    cost1, x1 = qps.find_active()
+    assert abs(x - x1).max() < qps.eps
 
 
 def test_local_case1():
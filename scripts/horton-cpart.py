@@ -60,6 +60,10 @@ def parse_args():
         help='Reduce the grid by subsamping with the given stride in all three '
              'directions. Zero and negative values are ignored. '
              '[default=%(default)s]')
+    parser.add_argument('--sidecar', default=False, action='store_true',
+        help='Cache the grid data in a binary .npy file next to each input '
+             'file. When this file is present and up to date, it is '
+             'memory-mapped instead of parsing the text file again.')
     parser.add_argument('--chop', default=0, type=int,
         help='The number of layers to chop of the end of the grid in each '
              'direction. For most codes this should be zero. For Crystal, this '
@@ -109,6 +113,11 @@ def parse_args():
         help='Keep more precomputed results in memory. This speeds up the '
              'partitioning but consumes more memory. It is only applicable to '
              'the Hirshfeld-I (hi) and Hirhfeld-E (he) schemes.')
+    parser.add_argument('--nthread', default=1, type=int,
+        help='The number of threads used to update the pro-atoms of different '
+             'atoms concurrently. The results do not depend on the number of '
+             'threads. It is only applicable to the Hirshfeld-I (hi) and '
+             'Hirshfeld-E (he) schemes. [default=%(default)s]')
     parser.add_argument('--lmax', default=3, type=int,
         help='The maximum angular momentum to consider in multipole expansions')
 
@@ -124,7 +133,7 @@ def main():
         return
 
     # Load the IOData
-    mol = IOData.from_file(args.cube)
+    mol = IOData.from_file(args.cube, sidecar=args.sidecar)
     ugrid = mol.grid
     if not isinstance(ugrid, UniformGrid):
         raise TypeError('The density cube file does not contain data on a rectangular grid.')
@@ -137,7 +146,7 @@ def main():
 
     # Load the spin density (optional)
     if args.spindens is not None:
-        molspin = IOData.from_file(args.spindens)
+        molspin = IOData.from_file(args.spindens, sidecar=args.sidecar)
         if not isinstance(molspin.grid, UniformGrid):
             raise TypeError('The spin cube file does not contain data on a rectangular grid.')
         spindens = molspin.cube_data
@@ -61,6 +61,10 @@ def parse_args():
         help='Reduce the grid by subsamping with the given stride in all three '
              'directions. Zero and negative values are ignored. '
              '[default=%(default)s]')
+    parser.add_argument('--sidecar', default=False, action='store_true',
+        help='Cache the grid data in a binary .npy file next to each input '
+             'file. When this file is present and up to date, it is '
+             'memory-mapped instead of parsing the text file again.')
     parser.add_argument('--chop', default=0, type=int,
         help='The number of layers to chop of the end of the grid in each '
              'direction. For most codes this should be zero. For Crystal, this '
@@ -77,6 +81,14 @@ def parse_args():
         help='The gcut scale (gcut = gcut_scale*alpha) for the reciprocal '
              'space constribution to the electrostatic interactions. '
              '[default=%(default)s]')
+    parser.add_argument('--spme', default=False, action='store_true',
+        help='Use smooth particle-mesh Ewald summation to compute the '
+             'electrostatic potential on the entire grid at once. This is '
+             'much faster for large 3D periodic grids. The options --rcut, '
+             '--alpha-scale and --gcut-scale are ignored.')
+    parser.add_argument('--nthread', default=1, type=int,
+        help='The number of threads used to set up the cost function with '
+             'the (default) Ewald summation. [default=%(default)s]')
 
     parser.add_argument('--wdens', default=None, type=str, nargs='?', const=':-9:0.8',
         help='Define weights based on an electron density. The argument has '
@@ -124,7 +136,7 @@ def main():
     # Load the potential data
     if log.do_medium:
         log('Loading potential array')
-    mol_pot = IOData.from_file(args.cube)
+    mol_pot = IOData.from_file(args.cube, sidecar=args.sidecar)
     if not isinstance(mol_pot.grid, UniformGrid):
         raise TypeError('The specified file does not contain data on a rectangular grid.')
     mol_pot.grid.pbc[:] = parse_pbc(args.pbc) # correct pbc
@@ -190,20 +202,28 @@ def main():
         log('Highest weight:               %12.5e' % wmax)
         log('Max weight at edge:           %12.5f' % max_at_edge(weights, mol_pot.grid.pbc))
 
-    # Ewald parameters
-    rcut, alpha, gcut = parse_ewald_args(args)
+    if args.spme:
+        # Construct the cost function
+        if log.do_medium:
+            log('Smooth particle-mesh Ewald summation')
+            log.hline()
+            log('Setting up cost function (may take a while)   ')
+        cost = ESPCost.from_grid_data(mol_pot.coordinates, mol_pot.grid, esp, weights, method='spme')
+    else:
+        # Ewald parameters
+        rcut, alpha, gcut = parse_ewald_args(args)
 
-    # Some screen info
-    if log.do_medium:
-        log('Ewald real cutoff:       %12.5e' % rcut)
-        log('Ewald alpha:             %12.5e' % alpha)
-        log('Ewald reciprocal cutoff: %12.5e' % gcut)
-        log.hline()
+        # Some screen info
+        if log.do_medium:
+            log('Ewald real cutoff:       %12.5e' % rcut)
+            log('Ewald alpha:             %12.5e' % alpha)
+            log('Ewald reciprocal cutoff: %12.5e' % gcut)
+            log.hline()
 
-    # Construct the cost function
-    if log.do_medium:
-        log('Setting up cost function (may take a while)   ')
-    cost = ESPCost.from_grid_data(mol_pot.coordinates, mol_pot.grid, esp, weights, rcut, alpha, gcut)
+        # Construct the cost function
+        if log.do_medium:
+            log('Setting up cost function (may take a while)   ')
+        cost = ESPCost.from_grid_data(mol_pot.coordinates, mol_pot.grid, esp, weights, rcut, alpha, gcut, nthread=args.nthread)
 
     # Store cost function info
     results = {}
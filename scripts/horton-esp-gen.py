@@ -23,7 +23,7 @@
 
 import sys, argparse, os, numpy as np
 
-from horton import IOData, UniformGrid, log, angstrom, \
+from horton import IOData, UniformGrid, SPMEGrid, log, angstrom, \
     compute_esp_grid_cube, __version__
 from horton.scripts.common import parse_h5, parse_ewald_args, store_args, \
     check_output, write_script_output
@@ -68,6 +68,11 @@ def parse_args():
         help='The gcut scale (gcut = gcut_scale*alpha) for the reciprocal '
              'space constribution to the electrostatic interactions. '
              '[default=%(default)s]')
+    parser.add_argument('--spme', default=False, action='store_true',
+        help='Use smooth particle-mesh Ewald summation to compute the '
+             'electrostatic potential on the entire grid at once. This is '
+             'much faster for large 3D periodic grids. The options --rcut, '
+             '--alpha-scale and --gcut-scale are ignored.')
 
     return parser.parse_args()
 
@@ -103,25 +108,36 @@ def main():
     # Determine the grid specification
     results['ugrid'] = ugrid
 
-    # Ewald parameters
-    rcut, alpha, gcut = parse_ewald_args(args)
-
     # Some screen info
     if log.do_medium:
         log('Important parameters:')
         log.hline()
         log('Number of grid points:   %12i' % ugrid.size)
         log('Grid shape:                 [%8i, %8i, %8i]' % tuple(ugrid.shape))
-        log('Ewald real cutoff:       %12.5e' % rcut)
-        log('Ewald alpha:             %12.5e' % alpha)
-        log('Ewald reciprocal cutoff: %12.5e' % gcut)
-        log.hline()
-        # TODO: add summation ranges
-        log('Computing ESP (may take a while)')
 
-    # Allocate and compute ESP grid
-    esp = np.zeros(ugrid.shape, float)
-    compute_esp_grid_cube(ugrid, esp, coordinates, charges, rcut, alpha, gcut)
+    if args.spme:
+        if log.do_medium:
+            log('Smooth particle-mesh Ewald summation')
+            log.hline()
+            log('Computing ESP')
+        # Compute ESP grid
+        esp = SPMEGrid(ugrid).compute_esp(coordinates, charges)
+    else:
+        # Ewald parameters
+        rcut, alpha, gcut = parse_ewald_args(args)
+
+        # Some screen info
+        if log.do_medium:
+            log('Ewald real cutoff:       %12.5e' % rcut)
+            log('Ewald alpha:             %12.5e' % alpha)
+            log('Ewald reciprocal cutoff: %12.5e' % gcut)
+            log.hline()
+            # TODO: add summation ranges
+            log('Computing ESP (may take a while)')
+
+        # Allocate and compute ESP grid
+        esp = np.zeros(ugrid.shape, float)
+        compute_esp_grid_cube(ugrid, esp, coordinates, charges, rcut, alpha, gcut)
     results['esp'] = esp
 
     # Store the results in an HDF5 file
@@ -24,7 +24,7 @@
 import argparse, os, numpy as np
 
 from horton import IOData, Cell, ProAtomDB, log, BeckeMolGrid, \
-    lebedev_laikov_npoints, AtomicGridSpec, __version__
+    lebedev_laikov_npoints, AtomicGridSpec, GridCache, __version__
 from horton.scripts.common import store_args, write_part_output, parse_h5, \
     check_output
 from horton.scripts.wpart import wpart_slow_analysis, wpart_schemes
@@ -69,6 +69,11 @@ def parse_args():
              'for each grid type. See documentation for more details and other '
              'possible arguments for this option that allow a more '
              'fine-grained control of the atomic integration grid.')
+    parser.add_argument('--grid-cache', default=None, type=str,
+        help='A directory where molecular integration grids are stored, such '
+             'that they can be reused by later runs on the same geometry. '
+             'When not given, the directory in the environment variable '
+             'HORTON_GRID_CACHE is used, if set.')
     parser.add_argument('-e', '--epsilon', default=1e-8, type=float,
         help='Allow errors on the computed electron density of this magnitude '
              'for the sake of efficiency.')
@@ -82,6 +87,12 @@ def parse_args():
         help='Keep more precomputed results in memory. This speeds up the '
              'partitioning but consumes more memory. It is only applicable to '
              'the Hirshfeld-I (hi) and Hirhfeld-E (he) schemes.')
+    parser.add_argument('--nthread', default=1, type=int,
+        help='The number of threads used to update the pro-atoms of different '
+             'atoms concurrently. The results do not depend on the number of '
+             'threads. It is only applicable to the Hirshfeld-I (hi), '
+             'Hirshfeld-E (he), iterative stockholder (is) and MBIS (mbis) '
+             'schemes. [default=%(default)s]')
     parser.add_argument('--lmax', default=3, type=int,
         help='The maximum angular momentum to consider in multipole expansions')
     parser.add_argument('--slow', default=False, action='store_true',
@@ -116,7 +127,11 @@ def main():
 
     # Run the partitioning
     agspec = AtomicGridSpec(args.grid)
-    grid = BeckeMolGrid(mol.coordinates, mol.numbers, mol.pseudo_numbers, agspec, mode='only')
+    if args.grid_cache is None:
+        cache = None
+    else:
+        cache = GridCache(args.grid_cache)
+    grid = BeckeMolGrid(mol.coordinates, mol.numbers, mol.pseudo_numbers, agspec, mode='only', cache=cache)
     dm_full = mol.get_dm_full()
     moldens = mol.obasis.compute_grid_density_dm(dm_full, grid.points, epsilon=args.epsilon)
     dm_spin = mol.get_dm_spin()
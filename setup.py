@@ -379,9 +379,11 @@ setup(
             extra_objects=libint2_config['extra_objects'] +
                           blas_config['extra_objects'],
             extra_compile_args=libint2_config['extra_compile_args'] +
-                                blas_config['extra_compile_args'],
+                                blas_config['extra_compile_args'] +
+                                ['-fopenmp'],
             extra_link_args=libint2_config['extra_link_args'] +
-                             blas_config['extra_link_args'],
+                             blas_config['extra_link_args'] +
+                             ['-fopenmp'],
             define_macros=[blas_precompiler],
             language="c++"),
         Extension("horton.grid.cext",
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# HORTON: Helpful Open-source Research TOol for N-fermion systems.
+# Copyright (C) 2011-2015 The HORTON Development Team
+#
+# This file is part of HORTON.
+#
+# HORTON is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# HORTON is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+#--
+"""Measures the construction time of BeckeMolGrid versus the number of atoms.
+
+The molecules are cubic chunks of a simple cubic lattice of hydrogen and carbon
+atoms. Usage:
+
+    ./bench_molgrid.py [nthread [agspec]]
+"""
+
+
+import sys, time
+
+import numpy as np
+
+from horton import *
+
+
+def get_lattice(natom_side):
+    '''Return coordinates and numbers for natom_side**3 atoms'''
+    indexes = np.indices((natom_side,)*3).reshape(3, -1).T
+    coordinates = indexes*2.5*angstrom
+    numbers = np.where(indexes.sum(axis=1) % 2 == 0, 6, 1)
+    return coordinates, numbers
+
+
+def main():
+    nthread = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    agspec = sys.argv[2] if len(sys.argv) > 2 else 'coarse'
+    log.set_level(log.silent)
+    print '%6s  %12s  %12s  %8s  %12s' % ('natom', 'serial [s]', 'threads [s]', 'speedup', 'stratmann [s]')
+    for natom_side in 2, 3, 4, 5, 6:
+        coordinates, numbers = get_lattice(natom_side)
+        timings = []
+        for kwargs in dict(nthread=1), dict(nthread=nthread), dict(nthread=nthread, stratmann_a=0.64):
+            start = time.time()
+            BeckeMolGrid(coordinates, numbers, None, agspec, random_rotate=False, **kwargs)
+            timings.append(time.time() - start)
+        print '%6i  %12.3f  %12.3f  %8.2f  %12.3f' % (
+            len(numbers), timings[0], timings[1], timings[0]/timings[1], timings[2])
+
+
+if __name__ == '__main__':
+    main()